@@ -4,6 +4,7 @@ Oligomer
 """
 
 from ssbio.protein.structure.structprop import StructProp
+from ssbio.protein.structure.utils.structureio import StructureIO
 import os.path as op
 from string import ascii_uppercase
 from copy import copy
@@ -60,8 +61,10 @@ class Oligomer(StructProp):
             if self.structure:
                 parsed = copy(self.structure)
             else:
-                parsed = self.parse_structure()
-            self.structure = merge_all_models_into_first_model(parsed)
+                # Models are merged in place, so the structure must not be shared through the structure cache
+                parsed = StructureIO(self.structure_path, self.file_type, use_cache=False)
+            merge_all_models_into_first_model(parsed.structure)
+            self.structure = parsed
         else:
             new_structure_path = write_merged_bioassembly(inpath=self.structure_path,
                                                           outdir=outdir, outname=outname,
@@ -109,9 +112,9 @@ def write_merged_bioassembly(inpath, outdir, outname, force_rerun=False):
     outpath = outfile=op.join(outdir, outname + '.pdb')
 
     if ssbio.utils.force_rerun(flag=force_rerun, outfile=op.join(outdir, outname + '.pdb')):
-        s = StructProp('Model merging', structure_path=inpath, file_type='pdb')
-        ss = s.parse_structure()
+        # Models are merged in place, so the structure must not be shared through the structure cache
+        ss = StructureIO(inpath, 'pdb', use_cache=False)
         merge_all_models_into_first_model(ss.structure)
         outpath = ss.write_pdb(custom_name=outname, out_dir=outdir, force_rerun=force_rerun)
-    else:
-        return outpath
\ No newline at end of file
+
+    return outpath
\ No newline at end of file
@@ -12,7 +12,7 @@ import os.path as op
 import json
 import seaborn as sns
 from slugify import Slugify
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 from six.moves.urllib.error import URLError
 
 from Bio.Seq import Seq
@@ -25,6 +25,7 @@ from cobra.core import DictList
 import ssbio.utils
 import ssbio.databases.pdb
 import ssbio.databases.pdbflex
+import ssbio.protein.sequence.properties.protein_analysis
 import ssbio.protein.sequence.utils.alignment
 import ssbio.protein.sequence.utils.fasta
 import ssbio.protein.structure.properties.quality
@@ -36,6 +37,7 @@ from ssbio.protein.structure.structprop import StructProp
 from ssbio.databases.pdb import PDBProp
 from ssbio.protein.structure.homology.itasser.itasserprop import ITASSERProp
 from ssbio.protein.structure.homology.itasser.itasserprep import ITASSERPrep
+from ssbio.protein.structure.utils.resnum_mapping import ResnumMapping, format_resnums
 
 
 custom_slugify = Slugify(safe_chars='-_.')
@@ -571,9 +573,9 @@ class Protein(Object):
         return self.representative_sequence
 
     def pairwise_align_sequences_to_representative(self, gapopen=10, gapextend=0.5, outdir=None,
-                                                   engine='needle', parse=True, force_rerun=False):
+                                                   engine='needle', parse=True, force_rerun=False, threads=1):
         """Pairwise all sequences in the sequences attribute to the representative sequence. Stores the alignments
-        in the ``sequence_alignments`` DictList attribute.
+        in the ``sequence_alignments`` DictList attribute. Identical sequences are only aligned once.
 
         Args:
             gapopen (int): Only for ``engine='needle'`` - Gap open penalty is the score taken away when a gap is created
@@ -581,13 +583,18 @@ class Protein(Object):
                 for each base or residue in the gap
             outdir (str): Only for ``engine='needle'`` - Path to output directory. Default is the protein sequence
                 directory.
-            engine (str): ``biopython`` or ``needle`` - which pairwise alignment program to use.
+            engine (str): ``biopython``, ``needle``, or ``numpy`` - which pairwise alignment program to use.
                 ``needle`` is the standard EMBOSS tool to run pairwise alignments.
                 ``biopython`` is Biopython's implementation of needle. Results can differ!
+                ``numpy`` is an in-process implementation of needle, no alignment files are written.
             parse (bool): Store locations of mutations, insertions, and deletions in the alignment object (as an
                 annotation)
             force_rerun (bool): Only for ``engine='needle'`` - Default False, set to True if you want to rerun the
                 alignment if outfile exists.
+            threads (int): Number of alignments to run at the same time
+
+        Raises:
+            ValueError: If any alignment failed to run, after the alignments which ran are stored
 
         """
 
@@ -599,9 +606,9 @@ class Protein(Object):
             if not outdir:
                 raise ValueError('Output directory must be specified')
 
+        seqs_to_align = OrderedDict()
         for seq in self.sequences:
             aln_id = '{}_{}'.format(self.id, seq.id)
-            outfile = '{}.needle'.format(aln_id)
 
             if self.sequence_alignments.has_id(aln_id):
                 log.debug('{}: alignment already completed'.format(seq.id))
@@ -615,30 +622,44 @@ class Protein(Object):
             if seq.id == self.representative_sequence.id:
                 continue
 
-            aln = ssbio.protein.sequence.utils.alignment.pairwise_sequence_alignment(a_seq=self.representative_sequence.seq_str,
-                                                                                     a_seq_id=self.id,
-                                                                                     b_seq=seq.seq_str,
-                                                                                     b_seq_id=seq.id,
-                                                                                     gapopen=gapopen, gapextend=gapextend,
-                                                                                     engine=engine,
-                                                                                     outdir=outdir,
-                                                                                     outfile=outfile,
-                                                                                     force_rerun=force_rerun)
+            seqs_to_align[seq.id] = seq.seq_str
+
+        if not seqs_to_align:
+            return
+
+        alignments = ssbio.protein.sequence.utils.alignment.pairwise_sequence_alignment_many(a_seq=self.representative_sequence.seq_str,
+                                                                                             a_seq_id=self.id,
+                                                                                             b_seqs=seqs_to_align,
+                                                                                             gapopen=gapopen, gapextend=gapextend,
+                                                                                             engine=engine,
+                                                                                             outdir=outdir,
+                                                                                             force_rerun=force_rerun,
+                                                                                             threads=threads)
+
+        for seq_id, aln in alignments.items():
+            aln_id = '{}_{}'.format(self.id, seq_id)
+
             # Add an identifier to the MultipleSeqAlignment object for storage in a DictList
             aln.id = aln_id
             aln.annotations['a_seq'] = self.representative_sequence.id
-            aln.annotations['b_seq'] = seq.id
+            aln.annotations['b_seq'] = seq_id
 
             if parse:
-                aln_df = ssbio.protein.sequence.utils.alignment.get_alignment_df(a_aln_seq=str(list(aln)[0].seq),
-                                                                                 b_aln_seq=str(list(aln)[1].seq))
+                aln_cols = ssbio.protein.sequence.utils.alignment.AlignmentColumns(a_aln_seq=str(list(aln)[0].seq),
+                                                                                   b_aln_seq=str(list(aln)[1].seq))
                 aln.annotations['ssbio_type'] = 'seqalign'
-                aln.annotations['mutations'] = ssbio.protein.sequence.utils.alignment.get_mutations(aln_df)
-                aln.annotations['deletions'] = ssbio.protein.sequence.utils.alignment.get_deletions(aln_df)
-                aln.annotations['insertions'] = ssbio.protein.sequence.utils.alignment.get_insertions(aln_df)
+                aln.annotations['mutations'] = aln_cols.mutations
+                aln.annotations['deletions'] = aln_cols.deletions
+                aln.annotations['insertions'] = aln_cols.insertions
 
             self.sequence_alignments.append(aln)
 
+        # Alignments which ran are kept, but failures are not silently skipped
+        failed = [x for x in seqs_to_align if x not in alignments]
+        if failed:
+            raise ValueError('{}: alignment to representative sequence failed for {}'.format(self.id,
+                                                                                           ', '.join(failed)))
+
     def pairwise_align_sequences_to_representative_parallelize(self, sc, gapopen=10, gapextend=0.5, outdir=None,
                                                       engine='needle', parse=True, force_rerun=False):
         """Pairwise all sequences in the sequences attribute to the representative sequence. Stores the alignments
@@ -651,9 +672,10 @@ class Protein(Object):
                 for each base or residue in the gap
             outdir (str): Only for ``engine='needle'`` - Path to output directory. Default is the protein sequence
                 directory.
-            engine (str): ``biopython`` or ``needle`` - which pairwise alignment program to use.
+            engine (str): ``biopython``, ``needle``, or ``numpy`` - which pairwise alignment program to use.
                 ``needle`` is the standard EMBOSS tool to run pairwise alignments.
                 ``biopython`` is Biopython's implementation of needle. Results can differ!
+                ``numpy`` is an in-process implementation of needle, no alignment files are written.
             parse (bool): Store locations of mutations, insertions, and deletions in the alignment object (as an
                 annotation)
             force_rerun (bool): Only for ``engine='needle'`` - Default False, set to True if you want to rerun the
@@ -688,12 +710,12 @@ class Protein(Object):
             aln.annotations['b_seq'] = seqprop.id
 
             if parse:
-                aln_df = ssbio.protein.sequence.utils.alignment.get_alignment_df(a_aln_seq=str(list(aln)[0].seq),
-                                                                                 b_aln_seq=str(list(aln)[1].seq))
+                aln_cols = ssbio.protein.sequence.utils.alignment.AlignmentColumns(a_aln_seq=str(list(aln)[0].seq),
+                                                                                   b_aln_seq=str(list(aln)[1].seq))
                 aln.annotations['ssbio_type'] = 'seqalign'
-                aln.annotations['mutations'] = ssbio.protein.sequence.utils.alignment.get_mutations(aln_df)
-                aln.annotations['deletions'] = ssbio.protein.sequence.utils.alignment.get_deletions(aln_df)
-                aln.annotations['insertions'] = ssbio.protein.sequence.utils.alignment.get_insertions(aln_df)
+                aln.annotations['mutations'] = aln_cols.mutations
+                aln.annotations['deletions'] = aln_cols.deletions
+                aln.annotations['insertions'] = aln_cols.insertions
 
             return aln
 
@@ -752,19 +774,20 @@ class Protein(Object):
                 if not s.seq:
                     log.warning('{}: no sequence stored. '
                                 'Cannot get sequence properties.'.format(s.id))
-                    continue
 
-                else:
-                    s.get_biopython_pepstats(clean_seq=clean_seq)
-                    s.get_emboss_pepstats()
+            # Biopython properties are computed for all sequences at once
+            seqprops = [s for s in self.sequences if s.seq]
+            ssbio.protein.sequence.properties.protein_analysis.get_biopython_pepstats_many(seqprops, clean_seq=clean_seq)
+            for s in seqprops:
+                s.get_emboss_pepstats()
 
     def get_sequence_sliding_window_properties(self, scale, window, representative_only=True):
         """Run Biopython ProteinAnalysis with a sliding window to calculate a given property.
         Results are stored in the protein's respective SeqProp objects at ``.letter_annotations``
 
         Args:
-            scale (str): Scale name
-            window (int): Sliding window size
+            scale (str, list): Scale name, or a list of scale names
+            window (int, list): Sliding window size, or a list of sizes
             representative_only (bool): If analysis should only be run on the representative sequence
 
         """
@@ -780,7 +803,7 @@ class Protein(Object):
                             'Cannot get sequence properties.'.format(self.id, self.representative_sequence.id))
                 return
 
-            self.representative_sequence.get_sliding_window_properties(scale=scale, window=window)
+            seqprops = [self.representative_sequence]
 
         if not representative_only:
             for s in self.sequences:
@@ -788,10 +811,16 @@ class Protein(Object):
                 if not s.seq:
                     log.warning('{}: no sequence stored. '
                                 'Cannot get sequence properties.'.format(s.id))
-                    continue
 
-                else:
-                    s.get_sliding_window_properties(scale=scale, window=window)
+            seqprops = [s for s in self.sequences if s.seq]
+
+        # Profiles of all sequences, scales and windows are computed at once
+        try:
+            ssbio.protein.sequence.properties.protein_analysis.get_sliding_window_properties_many(seqprops,
+                                                                                                 scales=scale,
+                                                                                                 windows=window)
+        except ValueError as e:
+            log.error('{}: unable to run ProteinAnalysis module, {}'.format(self.id, e))
 
     def prep_itasser_modeling(self, itasser_installation, itlib_folder, runtype, create_in_dir=None,
                               execute_from_dir=None, print_exec=False, **kwargs):
@@ -1322,13 +1351,13 @@ class Protein(Object):
 
     def align_seqprop_to_structprop(self, seqprop, structprop, chains=None, outdir=None,
                                     engine='needle', structure_already_parsed=False, parse=True, force_rerun=False,
-                                    **kwargs):
+                                    processes=1, threads=1, **kwargs):
         """Run and store alignments of a SeqProp to chains in the ``mapped_chains`` attribute of a StructProp.
 
         Alignments are stored in the sequence_alignments attribute, with the IDs formatted as
         ``<SeqProp_ID>_<StructProp_ID>-<Chain_ID>``. Although it is more intuitive to align to individual ChainProps,
         StructProps should be loaded as little as possible to reduce run times so the alignment is done to the entire
-        structure.
+        structure. Chains with identical sequences (i.e. in homo-oligomers) are only aligned once.
 
         Args:
             seqprop (SeqProp): SeqProp object with a loaded sequence
@@ -1336,14 +1365,17 @@ class Protein(Object):
             chains (str, list): Chain ID or IDs to map to. If not specified, ``mapped_chains`` attribute is inspected
                 for chains. If no chains there, all chains will be aligned to.
             outdir (str): Directory to output sequence alignment files (only if running with needle)
-            engine (str): ``biopython`` or ``needle`` - which pairwise alignment program to use.
+            engine (str): ``biopython``, ``needle``, or ``numpy`` - which pairwise alignment program to use.
                 ``needle`` is the standard EMBOSS tool to run pairwise alignments.
                 ``biopython`` is Biopython's implementation of needle. Results can differ!
+                ``numpy`` is an in-process implementation of needle, no alignment files are written.
             structure_already_parsed (bool): If the structure has already been parsed and the chain sequences are
                 stored. Temporary option until Hadoop sequence file is implemented to reduce number of times a
                 structure is parsed.
             parse (bool): Store locations of mutations, insertions, and deletions in the alignment object (as an annotation)
             force_rerun (bool): If alignments should be rerun
+            processes (int): Number of processes to run unique chain alignments across
+            threads (int): Number of threads to run unique chain alignments across, if ``processes`` is 1
             **kwargs: Other alignment options
 
         Todo:
@@ -1368,10 +1400,11 @@ class Protein(Object):
                                                                                                                     structprop.id))
             chains_to_align_to = structprop.chains.list_attr('id')
 
+        chain_seqs_to_align = OrderedDict()
+        chain_ids = {}
         for chain_id in chains_to_align_to:
             full_structure_id = '{}-{}'.format(structprop.id, chain_id)
             aln_id = '{}_{}'.format(seqprop.id, full_structure_id)
-            outfile = '{}.needle'.format(aln_id)
 
             if self.sequence_alignments.has_id(aln_id) and not force_rerun:
                 log.debug('{}: alignment already completed, skipping'.format(aln_id))
@@ -1394,19 +1427,31 @@ class Protein(Object):
                 log.error('{}: chain sequence not available, was structure parsed?'.format(full_structure_id))
                 continue
 
-            # Run the pairwise alignment
-            try:
-                aln = ssbio.protein.sequence.utils.alignment.pairwise_sequence_alignment(a_seq=seqprop,
-                                                                                         a_seq_id=seqprop.id,
-                                                                                         b_seq=chain_seq_record,
-                                                                                         b_seq_id=full_structure_id,
-                                                                                         engine=engine,
-                                                                                         outdir=outdir,
-                                                                                         outfile=outfile,
-                                                                                         force_rerun=force_rerun)
-            except ValueError:
+            chain_seqs_to_align[full_structure_id] = chain_seq_record
+            chain_ids[full_structure_id] = chain_id
+
+        if not chain_seqs_to_align:
+            return
+
+        # Run the pairwise alignments, identical chain sequences are only aligned once
+        alignments = ssbio.protein.sequence.utils.alignment.pairwise_sequence_alignment_many(a_seq=seqprop,
+                                                                                             a_seq_id=seqprop.id,
+                                                                                             b_seqs=chain_seqs_to_align,
+                                                                                             engine=engine,
+                                                                                             outdir=outdir,
+                                                                                             force_rerun=force_rerun,
+                                                                                             processes=processes,
+                                                                                             threads=threads)
+
+        parsed_alignments = {}
+        for full_structure_id in chain_seqs_to_align:
+            chain_id = chain_ids[full_structure_id]
+            aln_id = '{}_{}'.format(seqprop.id, full_structure_id)
+
+            if full_structure_id not in alignments:
                 log.error('{}: alignment failed to run, unable to check structure\'s chain'.format(full_structure_id))
                 continue
+            aln = alignments[full_structure_id]
 
             # Add an identifier to the MultipleSeqAlignment object for storage in a DictList
             aln.id = aln_id
@@ -1421,15 +1466,28 @@ class Protein(Object):
             # Store mapping to chain index as letter annotations in the sequence
             # Store locations in the alignment's annotations
             if parse:
-                aln_df = ssbio.protein.sequence.utils.alignment.get_alignment_df(a_aln_seq=str(list(aln)[0].seq),
-                                                                                 b_aln_seq=str(list(aln)[1].seq))
+                a_aln_seq = str(list(aln)[0].seq)
+                b_aln_seq = str(list(aln)[1].seq)
+
+                # Identical chain sequences have identical alignments, only parse them once
+                if (a_aln_seq, b_aln_seq) not in parsed_alignments:
+                    parsed_alignments[(a_aln_seq, b_aln_seq)] = ssbio.protein.sequence.utils.alignment.AlignmentColumns(a_aln_seq=a_aln_seq,
+                                                                                                                        b_aln_seq=b_aln_seq)
+                aln_cols = parsed_alignments[(a_aln_seq, b_aln_seq)]
 
-                chain_indices = aln_df[pd.notnull(aln_df.id_a_pos)].id_b_pos.tolist()
-                seqprop.letter_annotations['{}_chain_index'.format(aln_id)] = chain_indices
+                seqprop.letter_annotations['{}_chain_index'.format(aln_id)] = aln_cols.chain_index
 
-                aln.annotations['mutations'] = ssbio.protein.sequence.utils.alignment.get_mutations(aln_df)
-                aln.annotations['deletions'] = ssbio.protein.sequence.utils.alignment.get_deletions(aln_df)
-                aln.annotations['insertions'] = ssbio.protein.sequence.utils.alignment.get_insertions(aln_df)
+                # Dense residue number mapping to the structure, so residues are not searched for when mapped
+                chain_seq_record = chain_seqs_to_align[full_structure_id]
+                aln.annotations['resnum_mapping'] = ResnumMapping(chain_index=aln_cols.chain_index,
+                                                                  structure_resnums=chain_seq_record.letter_annotations['structure_resnums'],
+                                                                  seq=seqprop.seq,
+                                                                  chain_seq=chain_seq_record.seq,
+                                                                  structure_icodes=chain_seq_record.letter_annotations.get('structure_icodes'))
+
+                aln.annotations['mutations'] = list(aln_cols.mutations)
+                aln.annotations['deletions'] = list(aln_cols.deletions)
+                aln.annotations['insertions'] = list(aln_cols.insertions)
 
             if force_rerun and self.sequence_alignments.has_id(aln.id):
                 self.sequence_alignments.remove(aln.id)
@@ -1518,6 +1576,73 @@ class Protein(Object):
                                                                    allow_unresolved=allow_unresolved)
         return chain_passes_quality_check
 
+    def get_seqres_candidate_chains(self, seqprop, structprop, seq_ident_cutoff=0.5, chains_to_check=None):
+        """Find the chains of a structure which can meet a sequence identity cutoff to a reference sequence, using only
+        the full chain sequences (SEQRES) in its header, without parsing its 3D coordinates.
+
+        The reference sequence is aligned to the SEQRES of each chain with the in-process aligner. Residues which are
+        not observed in the structure can only lower the identity of the alignment to the observed residues, so a
+        chain whose SEQRES has fewer identical residues than ``seq_ident_cutoff`` of the reference sequence length
+        cannot pass :meth:`check_structure_chain_quality`. The full structure only needs to be parsed, and its observed
+        residues aligned, for the remaining chains.
+
+        Args:
+            seqprop (SeqProp): SeqProp object to compare to chain sequences
+            structprop (StructProp): StructProp object of an MMTF or mmCIF structure file
+            seq_ident_cutoff (float): Percent sequence identity cutoff, in decimal form
+            chains_to_check (str, list): Chain ID or IDs to check. If not specified, the ``mapped_chains`` attribute is
+                inspected for chains. If no chains there, all polymer chains in the header are checked.
+
+        Returns:
+            list: Chain IDs which can meet the cutoff, in the order checked, or None if the header could not be read
+            and the full structure must be parsed to check the chains
+
+        """
+        if not structprop.structure_file or not seqprop.seq_str:
+            return None
+
+        try:
+            header = structprop.parse_header()
+        except (ValueError, KeyError, IOError, ExtraData) as e:
+            log.debug('{}: unable to read chain sequences from header, {}'.format(structprop.id, e))
+            return None
+        if not header or not header.get('chain_sequences'):
+            return None
+
+        if chains_to_check:
+            chains_to_check = ssbio.utils.force_list(chains_to_check)
+        elif structprop.mapped_chains:
+            chains_to_check = structprop.mapped_chains
+        else:
+            chains_to_check = list(header['chain_sequences'])
+
+        seqres = OrderedDict((x, header['chain_sequences'][x]) for x in chains_to_check
+                             if header['chain_sequences'].get(x))
+        # Chains without a SEQRES in the header can only be checked with a full parse
+        unknown = [x for x in chains_to_check if x not in seqres]
+        if unknown:
+            log.debug('{}: no header sequence for chains {}'.format(structprop.id, unknown))
+            return None
+
+        alignments = ssbio.protein.sequence.utils.alignment.pairwise_sequence_alignment_many(a_seq=seqprop.seq_str,
+                                                                                             a_seq_id=seqprop.id,
+                                                                                             b_seqs=seqres,
+                                                                                             engine='numpy')
+        candidates = []
+        for chain_id in chains_to_check:
+            if chain_id not in alignments:
+                candidates.append(chain_id)
+                continue
+            aln = alignments[chain_id]
+            a_aln_seq, b_aln_seq = str(aln[0].seq), str(aln[1].seq)
+            identical = sum(1 for x, y in zip(a_aln_seq, b_aln_seq) if x == y and x != '-')
+            if identical >= seq_ident_cutoff * len(seqprop.seq_str):
+                candidates.append(chain_id)
+            else:
+                log.debug('{}-{}: chain sequence in header does not meet identity cutoff'.format(structprop.id,
+                                                                                                 chain_id))
+        return candidates
+
     def find_representative_chain(self, seqprop, structprop, chains_to_check=None,
                                   seq_ident_cutoff=0.5, allow_missing_on_termini=0.2,
                                   allow_mutants=True, allow_deletions=False,
@@ -1576,24 +1701,8 @@ class Protein(Object):
             log.debug('{}: no chains meet quality checks'.format(structprop.id))
             return None
 
-    def _map_seqprop_resnums_to_structprop_chain_index(self, resnums, seqprop=None, structprop=None, chain_id=None,
-                                                       use_representatives=False):
-        """Map a residue number in any SeqProp to the mapping index in the StructProp + chain ID. This does not provide
-        a mapping to residue number, only a mapping to the index which then can be mapped to the structure resnum!
-
-        Args:
-            resnums (int, list): Residue numbers in the sequence
-            seqprop (SeqProp): SeqProp object
-            structprop (StructProp): StructProp object
-            chain_id (str): Chain ID to map to index
-            use_representatives (bool): If representative sequence/structure/chain should be used in mapping
-
-        Returns:
-            dict: Mapping of resnums to indices
-
-        """
-        resnums = ssbio.utils.force_list(resnums)
-
+    def _get_mapping_props(self, seqprop=None, structprop=None, chain_id=None, use_representatives=False):
+        """Return the SeqProp, StructProp and chain ID to map residue numbers between"""
         if use_representatives:
             seqprop = self.representative_sequence
             structprop = self.representative_structure
@@ -1603,12 +1712,33 @@ class Protein(Object):
         else:
             if not seqprop or not structprop or not chain_id:
                 raise ValueError('Please specify sequence, structure, and chain ID')
+        return seqprop, structprop, chain_id
 
-        if self.representative_structure:
-            if structprop.id == self.representative_structure.id:
-                full_structure_id = '{}-{}'.format(structprop.id, chain_id).replace('REP-', '')
-            else:
-                full_structure_id = '{}-{}'.format(structprop.id, chain_id)
+    def get_resnum_mapping(self, seqprop=None, structprop=None, chain_id=None, use_representatives=False):
+        """Get the dense residue number mapping between a SeqProp and a StructProp's chain, to map many residue
+        numbers at once.
+
+        The mapping is built when the alignment is parsed in ``align_seqprop_to_structprop`` and stored in the
+        ``resnum_mapping`` annotation of the alignment. Alignments parsed before it existed get it the first time it
+        is needed.
+
+        Args:
+            seqprop (SeqProp): SeqProp object
+            structprop (StructProp): StructProp object
+            chain_id (str): Chain ID to map to
+            use_representatives (bool): If the representative sequence and structure should be used. If True, seqprop,
+                structprop, and chain_id do not need to be defined.
+
+        Returns:
+            ResnumMapping: Mapping between sequence residue numbers, chain indices, and structure residue numbers
+
+        """
+        seqprop, structprop, chain_id = self._get_mapping_props(seqprop=seqprop, structprop=structprop,
+                                                                chain_id=chain_id,
+                                                                use_representatives=use_representatives)
+
+        if self.representative_structure and structprop.id == self.representative_structure.id:
+            full_structure_id = '{}-{}'.format(structprop.id, chain_id).replace('REP-', '')
         else:
             full_structure_id = '{}-{}'.format(structprop.id, chain_id)
 
@@ -1617,25 +1747,76 @@ class Protein(Object):
         if access_key not in seqprop.letter_annotations:
             raise KeyError('{}: structure mapping {} not available in sequence letter annotations. Was alignment parsed? '
                            'Run ``align_seqprop_to_structprop`` with ``parse=True``.'.format(access_key, aln_id))
-        chain_index_mapping = seqprop.letter_annotations[access_key]
 
-        resnum_to_chain_index = {}
-        for x in resnums:
-            ix = chain_index_mapping[x - 1] - 1
+        alignment = None
+        if self.sequence_alignments.has_id(aln_id):
+            alignment = self.sequence_alignments.get_by_id(aln_id)
+            if alignment.annotations.get('resnum_mapping') is not None:
+                return alignment.annotations['resnum_mapping']
+
+        chain_seq_record = structprop.chains.get_by_id(chain_id).seq_record
+        mapping = ResnumMapping(chain_index=seqprop.letter_annotations[access_key],
+                                structure_resnums=chain_seq_record.letter_annotations['structure_resnums'],
+                                seq=seqprop.seq,
+                                chain_seq=chain_seq_record.seq,
+                                structure_icodes=chain_seq_record.letter_annotations.get('structure_icodes'))
+        if alignment is not None:
+            alignment.annotations['resnum_mapping'] = mapping
+        return mapping
 
-            if np.isnan(ix):
-                log.warning('{}-{}, {}: no equivalent residue found in structure sequence'.format(structprop.id,
-                                                                                                  chain_id,
-                                                                                                  x))
-            else:
-                resnum_to_chain_index[int(x)] = int(ix)
+    def _map_seqprop_resnums_to_structprop_chain_index(self, resnums, seqprop=None, structprop=None, chain_id=None,
+                                                       use_representatives=False):
+        """Map a residue number in any SeqProp to the mapping index in the StructProp + chain ID. This does not provide
+        a mapping to residue number, only a mapping to the index which then can be mapped to the structure resnum!
 
-        return resnum_to_chain_index
+        Args:
+            resnums (int, list): Residue numbers in the sequence
+            seqprop (SeqProp): SeqProp object
+            structprop (StructProp): StructProp object
+            chain_id (str): Chain ID to map to index
+            use_representatives (bool): If representative sequence/structure/chain should be used in mapping
+
+        Returns:
+            dict: Mapping of resnums to indices
+
+        """
+        resnums = np.asarray(ssbio.utils.force_list(resnums), dtype=np.int64)
+        seqprop, structprop, chain_id = self._get_mapping_props(seqprop=seqprop, structprop=structprop,
+                                                                chain_id=chain_id,
+                                                                use_representatives=use_representatives)
+        mapping = self.get_resnum_mapping(seqprop=seqprop, structprop=structprop, chain_id=chain_id)
+
+        chain_index = mapping.map_seq_to_chain_index(resnums)
+        is_aligned = chain_index >= 0
+        if not is_aligned.all():
+            log.warning('{}-{}: no equivalent residues found in structure sequence for sequence residues {}'.format(structprop.id,
+                                                                                                                    chain_id,
+                                                                                                                    format_resnums(resnums[~is_aligned].tolist())))
+
+        return dict(zip(resnums[is_aligned].tolist(), chain_index[is_aligned].tolist()))
+
+    def _log_resnum_mismatches(self, mapping, seq_resnums, structure_resnums, seqprop, structprop, chain_id):
+        """Log once for all mapped residues which are not the same in the sequence and the structure"""
+        is_mismatch = mapping.mismatches(seq_resnums)
+        if not is_mismatch.any():
+            return
+
+        chain_index = mapping.map_seq_to_chain_index(seq_resnums[is_mismatch])
+        mismatches = ['{}{}/{}{}'.format(chr(mapping.seq_letters[seq_rn]), seq_rn,
+                                         chr(mapping.chain_letters[ix]), struct_rn)
+                      for seq_rn, ix, struct_rn in zip(seq_resnums[is_mismatch].tolist(), chain_index.tolist(),
+                                                       structure_resnums[is_mismatch].tolist())]
+        log.warning('Sequence {} residues do not match to structure {}-{} residues ({}). NOTE: this may be due to '
+                    'structural differences'.format(seqprop.id, structprop.id, chain_id, format_resnums(mismatches)))
 
     def map_seqprop_resnums_to_structprop_resnums(self, resnums, seqprop=None, structprop=None, chain_id=None,
                                                   use_representatives=False):
         """Map a residue number in any SeqProp to the structure's residue number for a specified chain.
 
+        Residues that cannot be mapped, or that differ between the sequence and structure, are reported in one log
+        message per call. To map residue numbers to arrays, use the :class:`ResnumMapping` from
+        :meth:`get_resnum_mapping`.
+
         Args:
             resnums (int, list): Residue numbers in the sequence
             seqprop (SeqProp): SeqProp object
@@ -1648,66 +1829,39 @@ class Protein(Object):
             dict: Mapping of sequence residue numbers to structure residue numbers
 
         """
-        resnums = ssbio.utils.force_list(resnums)
-
-        if use_representatives:
-            seqprop = self.representative_sequence
-            structprop = self.representative_structure
-            chain_id = self.representative_chain
-            if not structprop:
-                raise ValueError('No representative structure set, please specify sequence, structure, and chain ID')
-        else:
-            if not seqprop or not structprop or not chain_id:
-                raise ValueError('Please specify sequence, structure, and chain ID')
-
-        mapping_to_repchain_index = self._map_seqprop_resnums_to_structprop_chain_index(resnums=resnums,
-                                                                                        seqprop=seqprop,
-                                                                                        structprop=structprop,
-                                                                                        chain_id=chain_id,
-                                                                                        use_representatives=use_representatives)
-
-        chain = structprop.chains.get_by_id(chain_id)
-        chain_structure_resnum_mapping = chain.seq_record.letter_annotations['structure_resnums']
-
-        final_mapping = {}
-        for k, v in mapping_to_repchain_index.items():
-            k = int(k)
-            rn = chain_structure_resnum_mapping[v]
-
-            if rn == float('Inf'):
-                log.warning('{}-{}, {}: structure file does not contain coordinates for this residue'.format(structprop.id,
+        resnums = np.asarray(ssbio.utils.force_list(resnums), dtype=np.int64)
+        seqprop, structprop, chain_id = self._get_mapping_props(seqprop=seqprop, structprop=structprop,
+                                                                chain_id=chain_id,
+                                                                use_representatives=use_representatives)
+        mapping = self.get_resnum_mapping(seqprop=seqprop, structprop=structprop, chain_id=chain_id)
+
+        is_aligned = mapping.map_seq_to_chain_index(resnums) >= 0
+        structure_resnums, structure_icodes, is_mapped = mapping.map_seq_to_structure(resnums)
+
+        if not is_aligned.all():
+            log.warning('{}-{}: no equivalent residues found in structure sequence for sequence residues {}'.format(structprop.id,
+                                                                                                                    chain_id,
+                                                                                                                    format_resnums(resnums[~is_aligned].tolist())))
+        no_coords = is_aligned & ~is_mapped
+        if no_coords.any():
+            log.warning('{}-{}: structure file does not contain coordinates for sequence residues {}'.format(structprop.id,
                                                                                                              chain_id,
-                                                                                                             k))
-            else:
-                rn = int(rn)
-                final_mapping[k] = rn
-                index_of_structure_resnum = chain_structure_resnum_mapping.index(rn)
-
-                # Additionally report if residues are the same - they could be different in the structure though
-                format_data = {'seqprop_id'       : seqprop.id,
-                               'seqprop_resid'    : seqprop[k - 1],
-                               'seqprop_resnum'   : k,
-                               'structprop_id'    : structprop.id,
-                               'structprop_chid'  : chain_id,
-                               'structprop_resid' : chain.seq_record[index_of_structure_resnum],
-                               'structprop_resnum': rn}
-
-                if seqprop[k-1] != chain.seq_record[index_of_structure_resnum]:
-                    log.warning('Sequence {seqprop_id} residue {seqprop_resid}{seqprop_resnum} does not match to '
-                                'structure {structprop_id}-{structprop_chid} residue '
-                                '{structprop_resid}{structprop_resnum}. NOTE: this may be due to '
-                                'structural differences'.format(**format_data))
-                else:
-                    log.debug('Sequence {seqprop_id} residue {seqprop_resid}{seqprop_resnum} is mapped to '
-                              'structure {structprop_id}-{structprop_chid} residue '
-                              '{structprop_resid}{structprop_resnum}'.format(**format_data))
+                                                                                                             format_resnums(resnums[no_coords].tolist())))
+
+        self._log_resnum_mismatches(mapping=mapping, seq_resnums=resnums[is_mapped],
+                                    structure_resnums=structure_resnums[is_mapped],
+                                    seqprop=seqprop, structprop=structprop, chain_id=chain_id)
 
-        return final_mapping
+        return dict(zip(resnums[is_mapped].tolist(), structure_resnums[is_mapped].tolist()))
 
     def map_structprop_resnums_to_seqprop_resnums(self, resnums, structprop=None, chain_id=None, seqprop=None,
                                                   use_representatives=False):
         """Map a residue number in any StructProp + chain ID to any SeqProp's residue number.
 
+        Residues that cannot be mapped, or that differ between the sequence and structure, are reported in one log
+        message per call. To map residue numbers to arrays, use the :class:`ResnumMapping` from
+        :meth:`get_resnum_mapping`.
+
         Args:
             resnums (int, list): Residue numbers in the structure
             structprop (StructProp): StructProp object
@@ -1720,71 +1874,24 @@ class Protein(Object):
             dict: Mapping of structure residue numbers to sequence residue numbers
 
         """
-        resnums = ssbio.utils.force_list(resnums)
-
-        if use_representatives:
-            seqprop = self.representative_sequence
-            structprop = self.representative_structure
-            chain_id = self.representative_chain
-            if not structprop:
-                raise ValueError('No representative structure set, please specify sequence, structure, and chain ID')
-        else:
-            if not seqprop or not structprop or not chain_id:
-                raise ValueError('Please specify sequence, structure, and chain ID')
+        resnums = np.asarray(ssbio.utils.force_list(resnums), dtype=np.int64)
+        seqprop, structprop, chain_id = self._get_mapping_props(seqprop=seqprop, structprop=structprop,
+                                                                chain_id=chain_id,
+                                                                use_representatives=use_representatives)
+        mapping = self.get_resnum_mapping(seqprop=seqprop, structprop=structprop, chain_id=chain_id)
 
-        if structprop.id == self.representative_structure.id:
-            full_structure_id = '{}-{}'.format(structprop.id, chain_id).replace('REP-', '')
-        else:
-            full_structure_id = '{}-{}'.format(structprop.id, chain_id)
+        seq_resnums, is_mapped = mapping.map_structure_to_seq(resnums)
+        if not is_mapped.all():
+            log.warning('{}-{} -> {}: unable to map residues {} from structure to sequence'.format(structprop.id,
+                                                                                                chain_id,
+                                                                                                seqprop.id,
+                                                                                                format_resnums(resnums[~is_mapped].tolist())))
 
-        aln_id = '{}_{}'.format(seqprop.id, full_structure_id)
-        access_key = '{}_chain_index'.format(aln_id)
-        if access_key not in seqprop.letter_annotations:
-            raise KeyError(
-                '{}: structure mapping {} not available in sequence letter annotations. Was alignment parsed? '
-                'Run ``align_seqprop_to_structprop`` with ``parse=True``.'.format(access_key, aln_id))
-
-        chain = structprop.chains.get_by_id(chain_id)
-        chain_structure_resnum_mapping = chain.seq_record.letter_annotations['structure_resnums']
-
-        final_mapping = {}
-        for resnum in resnums:
-            resnum = int(resnum)
-
-            resnum_index = chain_structure_resnum_mapping.index(resnum)
-            struct_res_singleaa = structprop.chains.get_by_id(chain_id).seq_record[resnum_index]
-
-            # if resnum not in seqprop.letter_annotations[access_key]:
-            #     log.warning('{}-{} -> {}: unable to map residue {} from structure to sequence, '
-            #                 'skipping'.format(structprop.id, chain_id, seqprop.id, resnum))
-            #     continue
-            what = seqprop.letter_annotations[access_key].index(resnum_index+1)
-            # TODO in progress...
-            seq_res_singleaa = seqprop[what]
-            sp_resnum = what + 1
-
-            final_mapping[resnum] = sp_resnum
-
-            # Additionally report if residues are the same - they could be different in the structure though
-            format_data = {'seqprop_id'       : seqprop.id,
-                           'seqprop_resid'    : seq_res_singleaa,
-                           'seqprop_resnum'   : sp_resnum,
-                           'structprop_id'    : structprop.id,
-                           'structprop_chid'  : chain_id,
-                           'structprop_resid' : struct_res_singleaa,
-                           'structprop_resnum': resnum}
-
-            if struct_res_singleaa != seq_res_singleaa:
-                log.warning('Sequence {seqprop_id} residue {seqprop_resid}{seqprop_resnum} does not match to '
-                            'structure {structprop_id}-{structprop_chid} residue '
-                            '{structprop_resid}{structprop_resnum}. NOTE: this may be due to '
-                            'structural differences'.format(**format_data))
-            else:
-                log.debug('Sequence {seqprop_id} residue {seqprop_resid}{seqprop_resnum} is mapped to '
-                          'structure {structprop_id}-{structprop_chid} residue '
-                          '{structprop_resid}{structprop_resnum}'.format(**format_data))
+        self._log_resnum_mismatches(mapping=mapping, seq_resnums=seq_resnums[is_mapped],
+                                    structure_resnums=resnums[is_mapped],
+                                    seqprop=seqprop, structprop=structprop, chain_id=chain_id)
 
-        return final_mapping
+        return dict(zip(resnums[is_mapped].tolist(), seq_resnums[is_mapped].tolist()))
 
     def get_seqprop_subsequence_from_structchain_property(self,
                                                           property_key, property_value, condition,
@@ -1937,9 +2044,10 @@ class Protein(Object):
             struct_outdir (str): Path to output directory of structure files, must be set if Protein directory
                 was not created initially
             pdb_file_type (str): ``pdb``, ``mmCif``, ``xml``, ``mmtf`` - file type for files downloaded from the PDB
-            engine (str): ``biopython`` or ``needle`` - which pairwise alignment program to use.
+            engine (str): ``biopython``, ``needle``, or ``numpy`` - which pairwise alignment program to use.
                 ``needle`` is the standard EMBOSS tool to run pairwise alignments.
                 ``biopython`` is Biopython's implementation of needle. Results can differ!
+                ``numpy`` is an in-process implementation of needle, no alignment files are written.
             always_use_homology (bool): If homology models should always be set as the representative structure
             rez_cutoff (float): Resolution cutoff, in Angstroms (only if experimental structure)
             seq_ident_cutoff (float): Percent sequence identity cutoff, in decimal form
@@ -2042,10 +2150,20 @@ class Protein(Object):
                     if pdb.resolution > rez_cutoff:
                         log.debug('{}: structure does not meet experimental resolution cutoff'.format(pdb, pdb_file_type))
                         continue
+                # Skip structures whose chain sequences in the header cannot meet the identity cutoff, before parsing
+                # them. Only the candidate chains are aligned to and checked.
+                candidate_chains = self.get_seqres_candidate_chains(seqprop=self.representative_sequence,
+                                                                    structprop=pdb,
+                                                                    seq_ident_cutoff=seq_ident_cutoff)
+                if candidate_chains is not None and not candidate_chains:
+                    log.debug('{}: no chain sequences meet identity cutoff, structure not parsed'.format(pdb))
+                    continue
+
                 # TODO: clean up these try/except things
                 try:
                     self.align_seqprop_to_structprop(seqprop=self.representative_sequence,
                                                      structprop=pdb,
+                                                     chains=candidate_chains,
                                                      outdir=seq_outdir,
                                                      engine=engine,
                                                      parse=True,
@@ -2063,6 +2181,7 @@ class Protein(Object):
                     try:
                         self.align_seqprop_to_structprop(seqprop=self.representative_sequence,
                                                          structprop=pdb,
+                                                         chains=candidate_chains,
                                                          outdir=seq_outdir,
                                                          engine=engine,
                                                          parse=True,
@@ -2074,6 +2193,7 @@ class Protein(Object):
 
                 best_chain = self.find_representative_chain(seqprop=self.representative_sequence,
                                                             structprop=pdb,
+                                                            chains_to_check=candidate_chains,
                                                             seq_ident_cutoff=seq_ident_cutoff,
                                                             allow_missing_on_termini=allow_missing_on_termini,
                                                             allow_mutants=allow_mutants, allow_deletions=allow_deletions,
@@ -2374,7 +2494,7 @@ class Protein(Object):
                 struct_seq_features = struct_f.extract(chain.seq_record)
                 struct_info = ssbio.utils.clean_single_dict(indict=struct_seq_features.letter_annotations,
                                                             prepend_to_keys='struct_',
-                                                            remove_keys_containing='structure_resnums')
+                                                            remove_keys_containing='structure_')
                 struct_info['struct_resnum'] = struct_resnum
                 struct_info['struct_residue'] = str(struct_seq_features.seq)
                 all_info.update(struct_info)
@@ -3021,9 +3141,12 @@ class Protein(Object):
         if len(sites) > 0:
             log.debug(
                 '{} unique {} sites to find subsequence within {} angstroms of'.format(len(sites), prop_name, within))
-            ps = protein.representative_structure.parse_structure()
+            spatial_index = protein.representative_structure.get_spatial_index()
 
-            all_subseq_resnums = []
+            # Find the center of each site first, so all sites can be searched at once
+            site_ids = []
+            site_coords = []
+            site_resnums = []
             for site in sites:
                 site_binding_residues, site_binding_resnums = protein.representative_sequence.get_subsequence_from_property(
                     property_key=prop_name,
@@ -3034,7 +3157,7 @@ class Protein(Object):
                 all_residues = []
                 for resnum in mapping_to_structure_resnums:
                     try:
-                        target_residue = ps.first_model[protein.representative_chain][resnum]
+                        target_residue = spatial_index.model[protein.representative_chain][resnum]
                     except KeyError:
                         log.error('Protein {}, RepStruct {}-{}: cannot find resnum {}, not including in list of '
                                   'residues to find center of mass'.format(protein.id,
@@ -3049,13 +3172,19 @@ class Protein(Object):
                     continue
                 coords = center_of_mass(all_residues, geometric=True)
                 log.debug('{}: center of mass of site {}'.format(coords, site))
-                subseq, subseq_resnums = protein.representative_structure.get_seqprop_within(
-                    chain_id=protein.representative_chain,
-                    angstroms=within, resnum=None,
-                    custom_coord=coords, return_resnums=True)
-                log.debug('{}: structure resnums within {} of site {} (resnums {})'.format(subseq_resnums, within, site,
-                                                                                           site_binding_resnums))
-                all_subseq_resnums.extend(subseq_resnums)
+                site_ids.append(site)
+                site_coords.append(coords)
+                site_resnums.append(site_binding_resnums)
+
+            all_subseq_resnums = []
+            if site_coords:
+                sites_residues = spatial_index.residues_within(site_coords, within)
+                for site, site_binding_resnums, residue_list in zip(site_ids, site_resnums, sites_residues):
+                    subseq_resnums = [int(x.id[1]) for x in residue_list if x.id[0] == ' ']
+                    log.debug('{}: structure resnums within {} of site {} (resnums {})'.format(subseq_resnums, within,
+                                                                                               site,
+                                                                                               site_binding_resnums))
+                    all_subseq_resnums.extend(subseq_resnums)
         else:
             log.debug('No {} sites'.format(prop_name))
             return {'subseq_len': 0, 'subseq': None, 'subseq_resnums': []}
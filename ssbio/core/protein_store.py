@@ -0,0 +1,318 @@
+"""
+Protein Store
+=============
+"""
+
+import json
+import logging
+import os
+import os.path as op
+from collections import OrderedDict
+
+import ssbio.io
+import ssbio.utils
+from ssbio.core.protein import Protein
+
+log = logging.getLogger(__name__)
+
+
+PROTEIN_ATTRIBUTE_GROUPS = OrderedDict([('sequences', ['sequences', 'representative_sequence']),
+                                        ('structures', ['structures', 'representative_structure']),
+                                        ('alignments', ['sequence_alignments', 'structure_alignments'])])
+"""dict: Groups of Protein attributes which are stored and loaded together, all other attributes are stored in the
+``annotations`` group"""
+
+ANNOTATIONS_GROUP = 'annotations'
+"""str: Group of all Protein attributes which are not in ``PROTEIN_ATTRIBUTE_GROUPS``"""
+
+
+def get_attribute_group(attribute):
+    """Get the group a Protein attribute is stored in.
+
+    Args:
+        attribute (str): Name of the attribute
+
+    Returns:
+        str: Name of the group
+
+    """
+    for group, attributes in PROTEIN_ATTRIBUTE_GROUPS.items():
+        if attribute in attributes:
+            return group
+    return ANNOTATIONS_GROUP
+
+
+class ProteinStore(object):
+
+    """Store of Protein objects on disk, with one shard per protein and each group of attributes in a separate file,
+    so a protein can be used with only the attributes which are needed loaded into memory.
+
+    Each shard is a directory named by the protein ID, containing an ``index.json`` file with the names of the
+    attributes in each group, and a pickle file for each group (see ``PROTEIN_ATTRIBUTE_GROUPS``). Proteins loaded from
+    the store with :meth:`get_proxy` load each group the first time one of its attributes is used.
+
+    Args:
+        store_dir (str): Path to the directory to store proteins in, created if it does not exist
+        protocol (int): Pickle protocol to use. Default is 2 to remain compatible with Python 2
+
+    """
+
+    INDEX_FILE = 'index.json'
+    """str: Name of the file in each shard listing its groups and their attributes"""
+
+    def __init__(self, store_dir, protocol=2):
+        self.store_dir = ssbio.utils.make_dir(store_dir)
+        self.protocol = protocol
+
+    def __repr__(self):
+        return '<ProteinStore: {} proteins at {}>'.format(len(self.ids), self.store_dir)
+
+    def __contains__(self, protein_id):
+        return op.exists(op.join(self.get_shard_dir(protein_id), self.INDEX_FILE))
+
+    @property
+    def ids(self):
+        """list: IDs of all proteins in the store"""
+        return sorted(x for x in os.listdir(self.store_dir) if x in self)
+
+    def get_shard_dir(self, protein_id):
+        """str: Path to the shard of a protein, whether it exists or not"""
+        return op.join(self.store_dir, protein_id)
+
+    def _get_group_path(self, protein_id, group):
+        return op.join(self.get_shard_dir(protein_id), '{}.pckl'.format(group))
+
+    def read_index(self, protein_id):
+        """Read the index of a protein's shard.
+
+        Args:
+            protein_id (str): Protein ID
+
+        Returns:
+            dict: Group names to the list of attributes stored in them
+
+        """
+        if protein_id not in self:
+            raise ValueError('{}: protein not in store {}'.format(protein_id, self.store_dir))
+        with open(op.join(self.get_shard_dir(protein_id), self.INDEX_FILE)) as f:
+            return json.load(f)['groups']
+
+    def _write(self, outfile, write_function):
+        """Write a file through a temporary file, so a shard is never left with a partially written file"""
+        tmp_file = '{}.tmp{}'.format(outfile, os.getpid())
+        try:
+            write_function(tmp_file)
+            os.replace(tmp_file, outfile)
+        finally:
+            if op.exists(tmp_file):
+                os.remove(tmp_file)
+
+    def save(self, protein, groups=None):
+        """Save a Protein to the store.
+
+        Args:
+            protein (Protein, ProteinProxy): Protein to save. Only the loaded groups of a ProteinProxy are saved, the
+                groups which were never loaded are unchanged in the store.
+            groups (str, list): Groups to save, all loaded groups if not set
+
+        Returns:
+            str: Path to the protein's shard
+
+        """
+        if groups:
+            groups = ssbio.utils.force_list(groups)
+            if isinstance(protein, ProteinProxy):
+                protein.load(groups)
+        elif isinstance(protein, ProteinProxy):
+            groups = protein.loaded_groups
+        else:
+            groups = list(PROTEIN_ATTRIBUTE_GROUPS) + [ANNOTATIONS_GROUP]
+
+        attributes = {k: v for k, v in protein.__dict__.items() if not k.startswith(ProteinProxy.INTERNAL_PREFIX)}
+
+        shard_dir = ssbio.utils.make_dir(self.get_shard_dir(protein.id))
+        index = self.read_index(protein.id) if protein.id in self else {}
+
+        for group in groups:
+            group_attributes = OrderedDict((k, v) for k, v in attributes.items() if get_attribute_group(k) == group)
+            self._write(self._get_group_path(protein.id, group),
+                        lambda x: ssbio.io.save_pickle(group_attributes, x, protocol=self.protocol))
+            index[group] = list(group_attributes)
+
+        def write_index(outfile):
+            with open(outfile, 'w') as f:
+                json.dump({'id': protein.id, 'groups': index}, f, indent=1)
+        self._write(op.join(shard_dir, self.INDEX_FILE), write_index)
+
+        log.debug('{}: saved groups {} to protein store'.format(protein.id, groups))
+        return shard_dir
+
+    def load_group(self, protein_id, group):
+        """Load the attributes of a protein in one group.
+
+        Args:
+            protein_id (str): Protein ID
+            group (str): Name of the group
+
+        Returns:
+            dict: Attribute names to their values, empty if the group was never saved
+
+        """
+        group_path = self._get_group_path(protein_id, group)
+        if not op.exists(group_path):
+            return {}
+        return ssbio.io.load_pickle(group_path)
+
+    def load(self, protein_id):
+        """Load a Protein with all of its attributes.
+
+        Args:
+            protein_id (str): Protein ID
+
+        Returns:
+            Protein: Protein object
+
+        """
+        protein = Protein.__new__(Protein)
+        for group in self.read_index(protein_id):
+            protein.__dict__.update(self.load_group(protein_id, group))
+        return protein
+
+    def get_proxy(self, protein_id):
+        """Get a Protein which loads its attributes from the store when they are first used.
+
+        Args:
+            protein_id (str): Protein ID
+
+        Returns:
+            ProteinProxy: Protein object with no groups loaded
+
+        """
+        return ProteinProxy(store=self, ident=protein_id)
+
+
+class ProteinProxy(Protein):
+
+    """Protein stored in a :class:`ProteinStore`, which loads each group of attributes the first time one of them is
+    used, and can unload them again to free memory.
+
+    A ProteinProxy is a Protein and can be used anywhere one is. Saving it to the store only writes the groups which
+    were loaded.
+
+    Args:
+        store (ProteinStore): Store the protein was saved in
+        ident (str): Protein ID
+
+    """
+
+    INTERNAL_PREFIX = '_ProteinProxy__'
+    """str: Prefix of the attributes used to track the store and loaded groups, which are not Protein attributes"""
+
+    def __init__(self, store, ident):
+        self.__dict__[self.INTERNAL_PREFIX + 'store'] = store
+        self.__dict__[self.INTERNAL_PREFIX + 'loaded'] = []
+        self.__dict__[self.INTERNAL_PREFIX + 'groups'] = list(store.read_index(ident))
+        self.__dict__['id'] = ident
+
+    def __getattr__(self, name):
+        # Only called for attributes which are not set, load their group if it was not loaded yet
+        if name.startswith('__') or name.startswith(self.INTERNAL_PREFIX) or self.INTERNAL_PREFIX + 'store' not in self.__dict__:
+            raise AttributeError(name)
+        group = get_attribute_group(name)
+        if group in self.__loaded or group not in self.__groups:
+            raise AttributeError('{}: Protein has no attribute {}'.format(self.__dict__['id'], name))
+        self.load(group)
+        if name not in self.__dict__:
+            raise AttributeError('{}: Protein has no attribute {}'.format(self.__dict__['id'], name))
+        return self.__dict__[name]
+
+    def __setattr__(self, name, value):
+        # Load the rest of the group first, so it is saved together
+        if self.INTERNAL_PREFIX + 'store' in self.__dict__ and not name.startswith(self.INTERNAL_PREFIX) and name != 'id':
+            if get_attribute_group(name) not in self.__loaded:
+                self.load(get_attribute_group(name))
+        Protein.__setattr__(self, name, value)
+
+    def __repr__(self):
+        return '<{} {} at 0x{:x}, loaded groups: {}>'.format(self.__class__.__name__, self.__dict__['id'], id(self),
+                                                              self.__loaded)
+
+    @property
+    def store(self):
+        """ProteinStore: Store the protein is loaded from"""
+        return self.__store
+
+    @property
+    def loaded_groups(self):
+        """list: Groups of attributes which are loaded"""
+        return list(self.__loaded)
+
+    def load(self, groups=None):
+        """Load groups of attributes from the store, if they are not loaded yet.
+
+        Args:
+            groups (str, list): Groups to load, all groups if not set
+
+        """
+        groups = ssbio.utils.force_list(groups) if groups else list(PROTEIN_ATTRIBUTE_GROUPS) + [ANNOTATIONS_GROUP]
+        for group in groups:
+            if group in self.__loaded:
+                continue
+            self.__loaded.append(group)
+            if group in self.__groups:
+                self.__dict__.update(self.__store.load_group(self.__dict__['id'], group))
+                log.debug('{}: loaded group {} from protein store'.format(self.__dict__['id'], group))
+
+    def unload(self, groups=None, save=False):
+        """Unload groups of attributes to free memory, they are loaded again from the store when next used.
+
+        Args:
+            groups (str, list): Groups to unload, all loaded groups if not set
+            save (bool): If the groups should be saved to the store first, otherwise changes to them are lost
+
+        """
+        groups = ssbio.utils.force_list(groups) if groups else self.loaded_groups
+        groups = [x for x in groups if x in self.__loaded]
+        if save and groups:
+            self.__store.save(self, groups=groups)
+            self.__dict__[self.INTERNAL_PREFIX + 'groups'] = list(self.__store.read_index(self.__dict__['id']))
+
+        for k in [k for k in self.__dict__ if not k.startswith(self.INTERNAL_PREFIX) and k != 'id']:
+            if get_attribute_group(k) in groups:
+                del self.__dict__[k]
+        for group in groups:
+            self.__loaded.remove(group)
+
+    def save(self, groups=None):
+        """Save loaded groups of attributes to the store.
+
+        Args:
+            groups (str, list): Groups to save, all loaded groups if not set
+
+        Returns:
+            str: Path to the protein's shard
+
+        """
+        shard_dir = self.__store.save(self, groups=groups)
+        self.__dict__[self.INTERNAL_PREFIX + 'groups'] = list(self.__store.read_index(self.__dict__['id']))
+        return shard_dir
+
+    def to_protein(self):
+        """Load all groups of attributes into a plain Protein object, detached from the store.
+
+        Returns:
+            Protein: Protein object
+
+        """
+        self.load()
+        protein = Protein.__new__(Protein)
+        protein.__dict__.update({k: v for k, v in self.__dict__.items() if not k.startswith(self.INTERNAL_PREFIX)})
+        return protein
+
+    def __json_encode__(self):
+        return self.to_protein().__json_encode__()
+
+    def __json_decode__(self, **attrs):
+        # Proxies are saved to JSON with all groups loaded, load them back as plain Proteins
+        self.__class__ = Protein
+        self.__dict__.update(attrs)
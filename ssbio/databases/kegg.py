@@ -3,21 +3,25 @@ KEGGProp
 ===========
 """
 
-import io
 import logging
 import os.path as op
 from collections import defaultdict
 
+import requests
 from bioservices import KEGG
 from slugify import Slugify
 
 import ssbio.utils
+from ssbio.io.download import get_download_manager
 from ssbio.protein.sequence.seqprop import SeqProp
 
 log = logging.getLogger(__name__)
 custom_slugify = Slugify(safe_chars='-_')
 bs_kegg = KEGG()
 
+KEGG_REST_URL = 'http://rest.kegg.jp'
+"""str: Base link of the KEGG REST service"""
+
 
 class KEGGProp(SeqProp):
     def __init__(self, seq, id, name='<unknown name>', description='<unknown description>',
@@ -71,6 +75,46 @@ class KEGGProp(SeqProp):
             log.warning('{}: no metadata file available'.format(self.id))
 
 
+def _kegg_download(gene_id, outdir=None, option=None):
+    """Get the KEGG REST link of a metadata (option None) or FASTA (option ``aaseq``) file, and the path it is saved to"""
+    if not outdir:
+        outdir = ''
+
+    # Replace colon with dash in the KEGG gene ID
+    if option == 'aaseq':
+        outfile = op.join(outdir, '{}.faa'.format(custom_slugify(gene_id)))
+        link = '{}/get/{}/aaseq'.format(KEGG_REST_URL, gene_id)
+    else:
+        outfile = op.join(outdir, '{}.kegg'.format(custom_slugify(gene_id)))
+        link = '{}/get/{}'.format(KEGG_REST_URL, gene_id)
+
+    return link, outfile
+
+
+def download_kegg_files(gene_ids, outdirs=None, force_rerun=False):
+    """Download the FASTA and metadata files of many KEGG IDs at once.
+
+    Args:
+        gene_ids (list): KEGG gene IDs (with organism code), i.e. "eco:1244"
+        outdirs (str, list): Output directory, or list of output directories for each KEGG ID
+        force_rerun (bool): If files should be downloaded again even if they exist
+
+    Returns:
+        list: Tuples of the paths to the FASTA and metadata files of each KEGG ID, None if a file is not available
+
+    """
+    if not isinstance(outdirs, list):
+        outdirs = [outdirs] * len(gene_ids)
+
+    downloads = []
+    for gene_id, outdir in zip(gene_ids, outdirs):
+        downloads.append(_kegg_download(gene_id, outdir=outdir, option='aaseq'))
+        downloads.append(_kegg_download(gene_id, outdir=outdir, option=None))
+
+    files = get_download_manager().fetch_many(downloads, force_rerun=force_rerun)
+    return list(zip(files[0::2], files[1::2]))
+
+
 def download_kegg_gene_metadata(gene_id, outdir=None, force_rerun=False):
     """Download the KEGG flatfile for a KEGG ID and return the path.
 
@@ -82,20 +126,14 @@ def download_kegg_gene_metadata(gene_id, outdir=None, force_rerun=False):
         Path to metadata file
 
     """
-    if not outdir:
-        outdir = ''
-
-    # Replace colon with dash in the KEGG gene ID
-    outfile = op.join(outdir, '{}.kegg'.format(custom_slugify(gene_id)))
+    link, outfile = _kegg_download(gene_id, outdir=outdir, option=None)
 
     if ssbio.utils.force_rerun(flag=force_rerun, outfile=outfile):
-        raw_text = bs_kegg.get("{}".format(gene_id))
-        if raw_text == 404:
+        try:
+            get_download_manager().fetch(link, outfile, force_rerun=force_rerun)
+        except requests.HTTPError:
             return
 
-        with io.open(outfile, mode='wt', encoding='utf-8') as f:
-            f.write(raw_text)
-
         log.debug('{}: downloaded KEGG metadata file'.format(outfile))
     else:
         log.debug('{}: KEGG metadata file already exists'.format(outfile))
@@ -157,19 +195,14 @@ def download_kegg_aa_seq(gene_id, outdir=None, force_rerun=False):
         Path to FASTA file
 
     """
-    if not outdir:
-        outdir = ''
-
-    outfile = op.join(outdir, '{}.faa'.format(custom_slugify(gene_id)))
+    link, outfile = _kegg_download(gene_id, outdir=outdir, option='aaseq')
 
     if ssbio.utils.force_rerun(flag=force_rerun, outfile=outfile):
-        raw_text = bs_kegg.get("{}".format(gene_id), option='aaseq')
-        if raw_text == 404:
+        try:
+            get_download_manager().fetch(link, outfile, force_rerun=force_rerun)
+        except requests.HTTPError:
             return
 
-        with io.open(outfile, mode='wt', encoding='utf-8') as f:
-           f.write(raw_text)
-
         log.debug('{}: downloaded KEGG FASTA file'.format(outfile))
     else:
         log.debug('{}: KEGG FASTA file already exists'.format(outfile))
@@ -3,22 +3,23 @@ PDBProp
 =======
 """
 
-import gzip
 import json
 import logging
 import os.path as op
-import mmtf
 import os
 from cobra.core import DictList
 import pandas as pd
-import requests
 import deprecation
 from Bio.PDB import PDBList
 from lxml import etree
 from six.moves.urllib_error import URLError
-from six.moves.urllib.request import urlopen, urlretrieve
 
 import ssbio.databases.pisa as pisa
+from ssbio.databases.pdb_header import read_mmcif_header, read_mmtf_header
+from ssbio.databases.pdb_mirror import get_pdb_mirror, set_pdb_mirror
+from ssbio.databases.pdb_properties import PDBPropertyStore, download_property_report
+from ssbio.databases.sifts import get_sifts_mapping
+from ssbio.io.download import get_download_manager
 import ssbio.utils
 from ssbio.protein.structure.structprop import StructProp
 
@@ -61,6 +62,9 @@ class PDBProp(StructProp):
         """Download a structure file from the PDB, specifying an output directory and a file type. Optionally download
         the mmCIF header file and parse data from it to store within this object.
 
+        If a PDB mirror is set (see :func:`~ssbio.databases.pdb_mirror.set_pdb_mirror`) and contains the file, the
+        structure is loaded from the mirror in place and nothing is downloaded.
+
         Args:
             outdir (str): Path to output directory
             file_type (str): ``pdb``, ``mmCif``, ``xml``, ``mmtf`` - file type for files downloaded from the PDB
@@ -72,30 +76,58 @@ class PDBProp(StructProp):
                                            custom_error_text='Please set file type to be downloaded from the PDB: '
                                                              'pdb, mmCif, xml, or mmtf')
 
-        # XTODO: check if outfile exists using ssbio.utils.force_rerun, pdblist seems to take long if it exists
-        # I know why - it's because we're renaming the ent to pdb. need to have mapping from file type to final extension
-        # Then check if file exists, if not then download again
-        p = PDBList()
-        with ssbio.utils.suppress_stdout():
-            structure_file = p.retrieve_pdb_file(pdb_code=self.id, pdir=outdir, file_format=file_type, overwrite=force_rerun)
-        if not op.exists(structure_file):
-            log.debug('{}: {} file not available'.format(self.id, file_type))
-            raise URLError('{}.{}: file not available to download'.format(self.id, file_type))
-        else:
-            log.debug('{}: {} file saved'.format(self.id, file_type))
+        mirror = get_pdb_mirror()
+        mirror_file = mirror.get_path(self.id, file_type)
+        structure_file = _structure_file_download(self.id, file_type, outdir)[1]
+
+        if mirror_file:
+            structure_file = mirror_file
+            log.debug('{}: {} file loaded from PDB mirror'.format(self.id, file_type))
+        elif ssbio.utils.force_rerun(flag=force_rerun, outfile=structure_file):
+            mirror.check_network(self.id, file_type)
+            p = PDBList()
+            with ssbio.utils.suppress_stdout():
+                downloaded_file = p.retrieve_pdb_file(pdb_code=self.id, pdir=outdir, file_format=file_type, overwrite=force_rerun)
+            if not op.exists(downloaded_file):
+                log.debug('{}: {} file not available'.format(self.id, file_type))
+                raise URLError('{}.{}: file not available to download'.format(self.id, file_type))
 
             # Rename .ent files to .pdb
-            if file_type == 'pdb':
-                new_name = structure_file.replace('pdb', '').replace('ent', 'pdb')
-                os.rename(structure_file, new_name)
-                structure_file = new_name
+            if downloaded_file != structure_file:
+                os.rename(downloaded_file, structure_file)
+            log.debug('{}: {} file saved'.format(self.id, file_type))
+        else:
+            log.debug('{}: {} file already saved'.format(self.id, file_type))
+
+        self.load_structure_path(structure_file, file_type)
+        if load_header_metadata and file_type == 'mmtf':
+            self.update(parse_mmtf_header(structure_file))
+        if load_header_metadata and file_type != 'mmtf':
+            self.update(parse_mmcif_header(download_mmcif_header(pdb_id=self.id, outdir=outdir, force_rerun=force_rerun)))
+
 
-            self.load_structure_path(structure_file, file_type)
-            if load_header_metadata and file_type == 'mmtf':
-                self.update(parse_mmtf_header(structure_file))
-            if load_header_metadata and file_type != 'mmtf':
-                self.update(parse_mmcif_header(download_mmcif_header(pdb_id=self.id, outdir=outdir, force_rerun=force_rerun)))
+    def load_property_store_metadata(self, store=None):
+        """Load the resolution, experimental method and release date of this PDB ID from the local table of PDB
+        properties, without downloading any header files.
 
+        Args:
+            store (PDBPropertyStore): Property store to use, if not set the store from :func:`get_property_store` is
+                used
+
+        """
+        if not store:
+            store = get_property_store()
+
+        props = store.get_properties(self.id)
+        if props.empty:
+            log.debug('{}: not in PDB property table'.format(self.id))
+            return
+
+        props = props.iloc[0]
+        self.resolution = _clean_resolution(self.id, props['resolution'])
+        self.release_date = _clean_release_date(self.id, props['releaseDate'])
+        if pd.notnull(props['experimentalTechnique']):
+            self.experimental_method = props['experimentalTechnique']
 
     def get_pisa_complex_predictions(self, outdir, existing_pisa_multimer_xml=None):
         if not existing_pisa_multimer_xml:
@@ -113,46 +145,93 @@ class PDBProp(StructProp):
         for x in self.__dict__.keys():
             if x == 'pdb_title' or x == 'description':
                 sanitized = ssbio.utils.force_string(getattr(self, x)).replace('#', '-')
+            elif x == '_spatial_index':
+                continue
             else:
                 to_return.update({x: getattr(self, x)})
         return to_return
 
 
 def parse_mmtf_header(infile):
-    """Parse an MMTF file and return basic header-like information.
+    """Parse an MMTF file and return basic header-like information, without decoding any atom coordinates.
 
     Args:
-        infile (str): Path to MMTF file
+        infile (str): Path to MMTF file, which may be compressed
 
     Returns:
         dict: Dictionary of parsed header
 
-    Todo:
-        - Can this be sped up by not parsing the 3D coordinate info somehow?
-        - OR just store the sequences when this happens since it is already being parsed.
+    """
+    return read_mmtf_header(infile, metadata_only=True)
+
+_STRUCTURE_FILE_EXTENSIONS = {'pdb': 'pdb', 'mmcif': 'cif', 'xml': 'xml', 'mmtf': 'mmtf'}
+
+
+def _structure_file_download(pdb_id, file_type, outdir=''):
+    """Get the RCSB PDB link of a structure file, and the path it is saved to by PDBProp.download_structure_file"""
+    pdb_id = pdb_id.lower()
+    extension = _STRUCTURE_FILE_EXTENSIONS[file_type.lower()]
+    outfile = op.join(outdir, '{}.{}'.format(pdb_id, extension))
+
+    if extension == 'mmtf':
+        download_link = 'http://mmtf.rcsb.org/v1.0/full/{}'.format(pdb_id)
+    else:
+        download_link = 'https://files.rcsb.org/download/{}.{}.gz'.format(pdb_id, extension)
+
+    return download_link, outfile
+
+
+def _mmcif_header_download(pdb_id, outdir=''):
+    """Get the RCSB PDB link of a mmCIF header file, and the path it is saved to"""
+    pdb_id = pdb_id.lower()
+    download_link = 'http://files.rcsb.org/header/{}.cif'.format(pdb_id)
+    return download_link, op.join(outdir, '{}.header.cif'.format(pdb_id))
+
+
+def download_structure_files(pdb_ids, outdirs, file_type, header_files=False, force_rerun=False):
+    """Download the structure files of many PDB IDs at once, to the same paths as
+    :meth:`PDBProp.download_structure_file` so they are loaded from there. Files in the PDB mirror (see
+    :func:`~ssbio.databases.pdb_mirror.set_pdb_mirror`) are not downloaded, their paths in the mirror are returned.
+
+    Args:
+        pdb_ids (list): PDB IDs
+        outdirs (str, list): Output directory, or list of output directories for each PDB ID
+        file_type (str): ``pdb``, ``mmCif``, ``xml``, ``mmtf`` - file type for files downloaded from the PDB
+        header_files (bool): If the mmCIF header files should also be downloaded
+        force_rerun (bool): If files should be downloaded again even if they exist
+
+    Returns:
+        list: Paths to the structure files of each PDB ID, None if a file could not be downloaded
 
     """
-    infodict = {}
+    if not isinstance(outdirs, list):
+        outdirs = [outdirs] * len(pdb_ids)
+
+    mirror = get_pdb_mirror()
+    structure_files = [mirror.get_path(p, file_type) for p in pdb_ids]
+    to_download = [(i, p, outdir) for i, (p, outdir) in enumerate(zip(pdb_ids, outdirs)) if not structure_files[i]]
+    if to_download and not mirror.allow_network:
+        log.warning('{} structure files not in PDB mirror and network access is disabled'.format(len(to_download)))
+        return structure_files
+
+    downloads = [dict(zip(('url', 'outfile'), _structure_file_download(p, file_type, outdir)), decompress=True)
+                 for i, p, outdir in to_download]
+    if header_files:
+        downloads.extend(_mmcif_header_download(p, outdir) for p, outdir in zip(pdb_ids, outdirs)
+                         if not mirror.get_path(p, 'mmcif'))
+
+    downloaded = get_download_manager().fetch_many(downloads, force_rerun=force_rerun)
+    for (i, p, outdir), outfile in zip(to_download, downloaded):
+        structure_files[i] = outfile
+    return structure_files
 
-    mmtf_decoder = mmtf.parse(infile)
-    infodict['date'] = mmtf_decoder.deposition_date
-    infodict['release_date'] = mmtf_decoder.release_date
-    try:
-        infodict['experimental_method'] = [x.decode() for x in mmtf_decoder.experimental_methods]
-    except AttributeError:
-        infodict['experimental_method'] = [x for x in mmtf_decoder.experimental_methods]
-    infodict['resolution'] = mmtf_decoder.resolution
-    infodict['description'] = mmtf_decoder.title
-
-    group_name_exclude = ['HOH']
-    chem_comp_type_exclude = ['l-peptide linking', 'peptide linking']
-    chemicals = list(set([mmtf_decoder.group_list[idx]['groupName'] for idx in mmtf_decoder.group_type_list if mmtf_decoder.group_list[idx]['chemCompType'].lower() not in chem_comp_type_exclude and mmtf_decoder.group_list[idx]['groupName'] not in group_name_exclude]))
-    infodict['chemicals'] = chemicals
-    return infodict
 
 def download_mmcif_header(pdb_id, outdir='', force_rerun=False):
     """Download a mmCIF header file from the RCSB PDB by ID.
 
+    If the PDB mirror contains the full mmCIF file of the PDB ID, the path to that file is returned instead, it can be
+    parsed by :func:`parse_mmcif_header` in the same way.
+
     Args:
         pdb_id: PDB ID
         outdir: Optional output directory, default is current working directory
@@ -165,14 +244,16 @@ def download_mmcif_header(pdb_id, outdir='', force_rerun=False):
     # TODO: keep an eye on https://github.com/biopython/biopython/pull/943 Biopython PR#493 for functionality of this
     # method in biopython. extra file types have not been added to biopython download yet
 
-    pdb_id = pdb_id.lower()
-    file_type = 'cif'
-    folder = 'header'
-    outfile = op.join(outdir, '{}.header.{}'.format(pdb_id, file_type))
+    mirror = get_pdb_mirror()
+    mirror_file = mirror.get_path(pdb_id, 'mmcif')
+    if mirror_file:
+        return mirror_file
+
+    download_link, outfile = _mmcif_header_download(pdb_id, outdir)
 
     if ssbio.utils.force_rerun(flag=force_rerun, outfile=outfile):
-        download_link = 'http://files.rcsb.org/{}/{}.{}'.format(folder, pdb_id, file_type)
-        urlretrieve(download_link, outfile)
+        mirror.check_network(pdb_id, 'mmcif')
+        get_download_manager().fetch(download_link, outfile, force_rerun=force_rerun)
         log.debug('{}: saved header file'.format(outfile))
     else:
         log.debug('{}: header file already saved'.format(outfile))
@@ -181,82 +262,19 @@ def download_mmcif_header(pdb_id, outdir='', force_rerun=False):
 
 
 def parse_mmcif_header(infile):
-    """Parse a couple important fields from the mmCIF file format with some manual curation of ligands.
+    """Parse a couple important fields from the mmCIF file format with some manual curation of ligands. Only the
+    header categories are read, atom coordinates are skipped.
 
     If you want full access to the mmCIF file just use the MMCIF2Dict class in Biopython.
 
     Args:
-        infile: Path to mmCIF file
+        infile: Path to mmCIF file, which may be compressed
 
     Returns:
         dict: Dictionary of parsed header
 
     """
-    from Bio.PDB.MMCIF2Dict import MMCIF2Dict
-
-    newdict = {}
-    try:
-        mmdict = MMCIF2Dict(infile)
-    except ValueError as e:
-        log.exception(e)
-        return newdict
-
-    chemical_ids_exclude = ['HOH']
-    chemical_types_exclude = ['l-peptide linking','peptide linking']
-
-    if '_struct.title' in mmdict:
-        newdict['pdb_title'] = mmdict['_struct.title']
-    else:
-        log.debug('{}: No title field'.format(infile))
-
-    if '_struct.pdbx_descriptor' in mmdict:
-        newdict['description'] = mmdict['_struct.pdbx_descriptor']
-    else:
-        log.debug('{}: no description field'.format(infile))
-
-    if '_pdbx_database_status.recvd_initial_deposition_date' in mmdict:
-        newdict['date'] = mmdict['_pdbx_database_status.recvd_initial_deposition_date']
-    elif '_database_PDB_rev.date' in mmdict:
-        newdict['date'] = mmdict['_database_PDB_rev.date']
-    else:
-        log.debug('{}: no date field'.format(infile))
-
-    if '_exptl.method' in mmdict:
-        newdict['experimental_method'] = mmdict['_exptl.method']
-    else:
-        log.debug('{}: no experimental method field'.format(infile))
-
-    # TODO: refactor how to get resolutions based on experimental method
-    if '_refine.ls_d_res_high' in mmdict:
-        try:
-            if isinstance(mmdict['_refine.ls_d_res_high'], list):
-                newdict['resolution'] = [float(x) for x in mmdict['_refine.ls_d_res_high']]
-            else:
-                newdict['resolution'] = float(mmdict['_refine.ls_d_res_high'])
-        except:
-            try:
-                newdict['resolution'] = float(mmdict['_em_3d_reconstruction.resolution'])
-            except:
-                log.debug('{}: no resolution field'.format(infile))
-    else:
-        log.debug('{}: no resolution field'.format(infile))
-
-    if '_chem_comp.id' in mmdict:
-        chemicals_filtered = ssbio.utils.filter_list_by_indices(mmdict['_chem_comp.id'],
-                                                            ssbio.utils.not_find(mmdict['_chem_comp.type'],
-                                                                           chemical_types_exclude,
-                                                                           case_sensitive=False))
-        chemicals_fitered = ssbio.utils.filter_list(chemicals_filtered, chemical_ids_exclude, case_sensitive=True)
-        newdict['chemicals'] = chemicals_fitered
-    else:
-        log.debug('{}: no chemical composition field'.format(infile))
-
-    if '_entity_src_gen.pdbx_gene_src_scientific_name' in mmdict:
-        newdict['taxonomy_name'] = mmdict['_entity_src_gen.pdbx_gene_src_scientific_name']
-    else:
-        log.debug('{}: no organism field'.format(infile))
-
-    return newdict
+    return read_mmcif_header(infile, metadata_only=True)
 
 
 def download_sifts_xml(pdb_id, outdir='', force_rerun=False):
@@ -268,18 +286,22 @@ def download_sifts_xml(pdb_id, outdir='', force_rerun=False):
         force_rerun (bool): If the file should be downloaded again even if it exists
 
     Returns:
-        str: Path to downloaded file
+        str: Path to downloaded file, or to the file in the PDB mirror if it contains it
 
     """
+    mirror = get_pdb_mirror()
+    mirror_file = mirror.get_path(pdb_id, 'sifts')
+    if mirror_file:
+        return mirror_file
+
     baseURL = 'ftp://ftp.ebi.ac.uk/pub/databases/msd/sifts/xml/'
     filename = '{}.xml.gz'.format(pdb_id.lower())
 
     outfile = op.join(outdir, filename.split('.')[0] + '.sifts.xml')
 
     if ssbio.utils.force_rerun(flag=force_rerun, outfile=outfile):
-        response = urlopen(baseURL + filename)
-        with open(outfile, 'wb') as f:
-            f.write(gzip.decompress(response.read()))
+        mirror.check_network(pdb_id, 'sifts')
+        get_download_manager().fetch(baseURL + filename, outfile, force_rerun=force_rerun, decompress=True)
 
     return outfile
 
@@ -302,48 +324,15 @@ def map_uniprot_resnum_to_pdb(uniprot_resnum, chain_id, sifts_file):
             is_observed (bool): Indicates if the 3D structure actually shows the residue
 
     """
-    # Load the xml with lxml
-    parser = etree.XMLParser(ns_clean=True)
-    tree = etree.parse(sifts_file, parser)
-    root = tree.getroot()
-
-    my_pdb_resnum = None
-
-    # TODO: "Engineered_Mutation is also a possible annotation, need to figure out what to do with that
-    my_pdb_annotation = False
-
-    # Find the right chain (entities in the xml doc)
-    ent = './/{http://www.ebi.ac.uk/pdbe/docs/sifts/eFamily.xsd}entity'
-    for chain in root.findall(ent):
-        # TODO: IMPORTANT - entityId is not the chain ID!!! it is just in alphabetical order!
-        if chain.attrib['entityId'] == chain_id:
-            # Find the "crossRefDb" tag that has the attributes dbSource="UniProt" and  dbResNum="your_resnum_here"
-            # Then match it to the crossRefDb dbResNum that has the attribute dbSource="PDBresnum"
-
-            # Check if uniprot + resnum even exists in the sifts file (it won't if the pdb doesn't contain the residue)
-            ures = './/{http://www.ebi.ac.uk/pdbe/docs/sifts/eFamily.xsd}crossRefDb[@dbSource="UniProt"][@dbResNum="%s"]' % uniprot_resnum
-            my_uniprot_residue = chain.findall(ures)
-            if len(my_uniprot_residue) == 1:
-                # Get crossRefDb dbSource="PDB"
-                parent = my_uniprot_residue[0].getparent()
-                pres = './/{http://www.ebi.ac.uk/pdbe/docs/sifts/eFamily.xsd}crossRefDb[@dbSource="PDB"]'
-                my_pdb_residue = parent.findall(pres)
-                my_pdb_resnum = int(my_pdb_residue[0].attrib['dbResNum'])
-
-                # Get <residueDetail dbSource="PDBe" property="Annotation">
-                # Will be Not_Observed if it is not seen in the PDB
-                anno = './/{http://www.ebi.ac.uk/pdbe/docs/sifts/eFamily.xsd}residueDetail[@dbSource="PDBe"][@property="Annotation"]'
-                my_pdb_annotation = parent.findall(anno)
-                if len(my_pdb_annotation) == 1:
-                    my_pdb_annotation = my_pdb_annotation[0].text
-                    if my_pdb_annotation == 'Not_Observed':
-                        my_pdb_annotation = False
-                else:
-                    my_pdb_annotation = True
-            else:
-                return None, False
+    try:
+        mapped = get_sifts_mapping(sifts_file).map_uniprot_to_pdb(chain_id, uniprot_resnum).iloc[0]
+    except ValueError:
+        return None, False
 
-    return my_pdb_resnum, my_pdb_annotation
+    if pd.isnull(mapped['pdb_resnum']):
+        return None, False
+
+    return int(mapped['pdb_resnum']), bool(mapped['is_observed'])
 
 
 def best_structures(uniprot_id, outname=None, outdir=None, seq_ident_cutoff=0.0, force_rerun=False):
@@ -407,8 +396,8 @@ def best_structures(uniprot_id, outname=None, outdir=None, seq_ident_cutoff=0.0,
     # Otherwise run the web request
     else:
         # TODO: add a checker for a cached file of uniprot -> PDBs - can be generated within gempro pipeline and stored
-        response = requests.get('https://www.ebi.ac.uk/pdbe/api/mappings/best_structures/{}'.format(uniprot_id),
-                                data={'key': 'value'})
+        response = get_download_manager().request('https://www.ebi.ac.uk/pdbe/api/mappings/best_structures/{}'.format(uniprot_id),
+                                                  data={'key': 'value'})
         if response.status_code == 404:
             log.debug('{}: 404 returned, probably no structures available.'.format(uniprot_id))
             raw_data = {uniprot_id: {}}
@@ -440,6 +429,40 @@ def blast_pdb_df(blast_results):
     return pd.DataFrame.from_records(blast_results, columns=cols)
 
 
+_PROPERTY_STORE = None
+
+
+def set_property_store(db_path=None, source=None):
+    """Set the local table of PDB properties used by :func:`get_resolution`, :func:`get_release_date` and related
+    functions.
+
+    Args:
+        db_path (str): Path to the SQLite database file to store the table in, reused between sessions. If not set,
+            the table is kept in memory and built again for every session.
+        source (str): Path to a local CSV file of the RCSB custom report to build the table from. If not set, the
+            report is downloaded from the RCSB PDB when first needed.
+
+    Returns:
+        PDBPropertyStore: the new property store
+
+    """
+    global _PROPERTY_STORE
+    _PROPERTY_STORE = PDBPropertyStore(db_path=db_path, source=source)
+    return _PROPERTY_STORE
+
+
+def get_property_store():
+    """Get the local table of PDB properties, the table is downloaded when it is first queried.
+
+    Returns:
+        PDBPropertyStore: the current property store
+
+    """
+    if _PROPERTY_STORE is None:
+        return set_property_store()
+    return _PROPERTY_STORE
+
+
 def _property_table():
     """Download the PDB -> resolution table directly from the RCSB PDB REST service.
 
@@ -449,57 +472,93 @@ def _property_table():
         Pandas DataFrame: table of structureId as the index, resolution and experimentalTechnique as the columns
 
     """
-    url = 'http://www.rcsb.org/pdb/rest/customReport.csv?pdbids=*&customReportColumns=structureId,resolution,experimentalTechnique,releaseDate&service=wsfile&format=csv'
-    r = requests.get(url)
-    p = pd.read_csv(StringIO(r.text)).set_index('structureId')
-    return p
+    return download_property_report()
+
+
+def _clean_resolution(pdb_id, resolution):
+    if pd.isnull(resolution):
+        log.debug('{}: no resolution available, probably not an X-ray crystal structure'.format(pdb_id))
+        return float('inf')
+    return resolution
+
+
+def _clean_release_date(pdb_id, release_date):
+    if pd.isnull(release_date):
+        log.debug('{}: no release date available'.format(pdb_id))
+        return None
+    return release_date
 
 
 def get_resolution(pdb_id):
-    """Quick way to get the resolution of a PDB ID using the table of results from the REST service
+    """Quick way to get the resolution of a PDB ID using the local table of PDB properties
 
     Returns infinity if the resolution is not available.
 
     Returns:
         float: resolution of a PDB ID in Angstroms
 
-    TODO:
-        - Unit test
-
     """
-
-    pdb_id = pdb_id.upper()
-    if pdb_id not in _property_table().index:
+    props = get_property_store().get_properties(pdb_id)
+    if props.empty:
         raise ValueError('PDB ID not in property table')
-    else:
-        resolution = _property_table().ix[pdb_id, 'resolution']
-        if pd.isnull(resolution):
-            log.debug('{}: no resolution available, probably not an X-ray crystal structure')
-            resolution = float('inf')
 
-    return resolution
+    return _clean_resolution(pdb_id, props.iloc[0]['resolution'])
+
+
+def get_resolutions(pdb_ids):
+    """Get the resolutions of a list of PDB IDs at once using the local table of PDB properties
+
+    Resolutions are infinity if not available. PDB IDs not in the table are left out.
+
+    Args:
+        pdb_ids (list): List of PDB IDs
+
+    Returns:
+        dict: PDB IDs (upper case) and their resolutions in Angstroms
+
+    """
+    props = get_property_store().get_properties(pdb_ids)
+    missing = set(x.upper() for x in pdb_ids).difference(props.index)
+    if missing:
+        log.debug('{}: PDB IDs not in property table'.format(sorted(missing)))
+
+    return {x: _clean_resolution(x, y) for x, y in props['resolution'].items()}
 
 
 def get_release_date(pdb_id):
-    """Quick way to get the release date of a PDB ID using the table of results from the REST service
+    """Quick way to get the release date of a PDB ID using the local table of PDB properties
 
     Returns None if the release date is not available.
 
     Returns:
-        str: Organism of a PDB ID
+        str: Release date of a PDB ID
 
     """
-
-    pdb_id = pdb_id.upper()
-    if pdb_id not in _property_table().index:
+    props = get_property_store().get_properties(pdb_id)
+    if props.empty:
         raise ValueError('PDB ID not in property table')
-    else:
-        release_date = _property_table().ix[pdb_id, 'releaseDate']
-        if pd.isnull(release_date):
-            log.debug('{}: no release date available')
-            release_date = None
 
-    return release_date
+    return _clean_release_date(pdb_id, props.iloc[0]['releaseDate'])
+
+
+def get_release_dates(pdb_ids):
+    """Get the release dates of a list of PDB IDs at once using the local table of PDB properties
+
+    Release dates are None if not available. PDB IDs not in the table are left out.
+
+    Args:
+        pdb_ids (list): List of PDB IDs
+
+    Returns:
+        dict: PDB IDs (upper case) and their release dates
+
+    """
+    props = get_property_store().get_properties(pdb_ids)
+    missing = set(x.upper() for x in pdb_ids).difference(props.index)
+    if missing:
+        log.debug('{}: PDB IDs not in property table'.format(sorted(missing)))
+
+    return {x: _clean_release_date(x, y) for x, y in props['releaseDate'].items()}
 
 
 def get_num_bioassemblies(pdb_id, cache=False, outdir=None, force_rerun=False):
@@ -534,7 +593,7 @@ def get_num_bioassemblies(pdb_id, cache=False, outdir=None, force_rerun=False):
 
     if ssbio.utils.force_rerun(force_rerun, outfile):
         page = 'https://www.rcsb.org/pdb/rest/bioassembly/nrbioassemblies?structureId={}'.format(pdb_id)
-        req = requests.get(page)
+        req = get_download_manager().request(page)
 
         if req.status_code == 200:
             response = req.text
@@ -631,11 +690,6 @@ def get_bioassembly_info(pdb_id, biomol_num, cache=False, outdir=None, force_rer
 
 
 def download_biomol(pdb_id, biomol_num, outdir, file_type='pdb', force_rerun=False):
-    import zlib
-    from six.moves.urllib_error import URLError
-    from six.moves.urllib.request import urlopen
-    import contextlib
-
     ssbio.utils.make_dir(outdir)
     server_folder = pdb_id[1:3]
 
@@ -658,10 +712,7 @@ def download_biomol(pdb_id, biomol_num, outdir, file_type='pdb', force_rerun=Fal
     if ssbio.utils.force_rerun(flag=force_rerun, outfile=outfile):
         download_link = op.join(server, server_filename)
         try:
-            with contextlib.closing(urlopen(download_link)) as f:
-                decompressed_data = zlib.decompress(f.read(), 16 + zlib.MAX_WBITS)
-                with open(op.join(outdir, local_filename), 'wb') as f:
-                    f.write(decompressed_data)
+            get_download_manager().fetch(download_link, outfile, force_rerun=force_rerun, decompress=True)
         except URLError as e:
             print(e)
             return None
@@ -700,6 +751,14 @@ def download_structure(pdb_id, file_type, outdir='', only_header=False, force_re
     if file_type not in file_types:
         raise ValueError('Invalid file type, must be either: pdb, pdb.gz, cif, cif.gz, xml.gz, mmtf, mmtf.gz')
 
+    # Files in the PDB mirror are read in place, the full mmCIF file also serves as the header
+    mirror = get_pdb_mirror()
+    mirror_type = {'pdb': 'pdb', 'cif': 'mmcif', 'mmcif': 'mmcif', 'xml': 'xml', 'mmtf': 'mmtf'}[file_type.split('.')[0]]
+    if not only_header or mirror_type == 'mmcif':
+        mirror_file = mirror.get_path(pdb_id, mirror_type)
+        if mirror_file:
+            return mirror_file
+
     if file_type == 'mmtf':
         file_type = 'mmtf.gz'
 
@@ -719,13 +778,14 @@ def download_structure(pdb_id, file_type, outdir='', only_header=False, force_re
         outfile = op.join(outdir, '{}.{}'.format(pdb_id, file_type))
 
     if ssbio.utils.force_rerun(flag=force_rerun, outfile=outfile):
+        mirror.check_network(pdb_id, file_type)
         if file_type == 'mmtf.gz' or file_type == 'mmtf':
             mmtf_api = '1.0'
             download_link = 'http://mmtf.rcsb.org/v{}/full/{}.mmtf.gz'.format(mmtf_api, pdb_id)
         else:
             download_link = 'http://files.rcsb.org/{}/{}.{}'.format(folder, pdb_id, file_type)
 
-        urlretrieve(download_link, outfile)
+        get_download_manager().fetch(download_link, outfile, force_rerun=force_rerun)
 
         if gzipped:
             outfile = ssbio.utils.gunzip_file(infile=outfile,
@@ -0,0 +1,283 @@
+"""
+PDB Header Parsing
+==================
+"""
+
+import logging
+from collections import OrderedDict
+
+import msgpack
+from Bio.PDB.MMCIF2Dict import MMCIF2Dict
+from mmtf.codecs import decode_array
+
+import ssbio.utils
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+log = logging.getLogger(__name__)
+
+
+MMCIF_HEADER_CATEGORIES = ['_struct', '_pdbx_database_status', '_database_PDB_rev', '_exptl', '_refine',
+                           '_em_3d_reconstruction', '_chem_comp', '_entity_src_gen', '_entity', '_entity_poly']
+"""list: mmCIF categories read by :func:`read_mmcif_header`, all other categories (i.e. atom coordinates) are skipped
+without being tokenized"""
+
+
+def read_structure_header(infile, file_type=None, metadata_only=False):
+    """Read the header of an MMTF or mmCIF file without parsing its atom coordinates.
+
+    Args:
+        infile (str): Path to MMTF or mmCIF file, which may be compressed
+        file_type (str): ``mmtf`` or ``mmCif``, guessed from the file extension if not set
+        metadata_only (bool): If only the metadata should be returned, without entities and chain sequences
+
+    Returns:
+        dict: Dictionary of parsed header, see :func:`read_mmtf_header` and :func:`read_mmcif_header`
+
+    """
+    if not file_type:
+        file_type = ssbio.utils.split_folder_and_path(ssbio.utils.strip_compressed_extension(infile))[2]
+    file_type = file_type.lower().lstrip('.')
+
+    if file_type == 'mmtf':
+        return read_mmtf_header(infile, metadata_only=metadata_only)
+    elif file_type in ['mmcif', 'cif']:
+        return read_mmcif_header(infile, metadata_only=metadata_only)
+    else:
+        raise ValueError('{}: unsupported file type, header can only be read from MMTF or mmCIF files'.format(file_type))
+
+
+def _add_entities(newdict, entities):
+    """Store entities and the chain to entity mapping and sequence of polymer chains in a parsed header"""
+    newdict['entities'] = entities
+    newdict['chain_entities'] = OrderedDict()
+    newdict['chain_sequences'] = OrderedDict()
+    for entity in entities:
+        if entity['type'] != 'polymer':
+            continue
+        for chain_id in entity['chains']:
+            newdict['chain_entities'][chain_id] = entity['id']
+            newdict['chain_sequences'][chain_id] = entity['sequence']
+
+
+def read_mmtf_header(infile, metadata_only=False):
+    """Read the header of an MMTF file, decoding only the fields which are needed and none of the atom coordinates.
+
+    Args:
+        infile (str): Path to MMTF file, which may be compressed
+        metadata_only (bool): If only the metadata should be returned, without entities and chain sequences
+
+    Returns:
+        dict: Dictionary of parsed header, with the keys ``date``, ``release_date``, ``experimental_method``,
+        ``resolution``, ``description`` and ``chemicals``, and unless ``metadata_only`` is set:
+
+            * ``entities``: list of dictionaries with the ``id``, ``type``, ``description``, ``sequence`` and
+              ``chains`` of each entity
+            * ``chain_entities``: dictionary of polymer chain IDs (of the first model) to their entity ID
+            * ``chain_sequences``: dictionary of polymer chain IDs to their full entity sequence
+
+    """
+    with ssbio.utils.open_compressed(infile, 'rb') as f:
+        data = msgpack.unpackb(f.read(), raw=False)
+
+    infodict = {}
+    infodict['date'] = data.get('depositionDate')
+    infodict['release_date'] = data.get('releaseDate')
+    infodict['experimental_method'] = [x.decode() if isinstance(x, bytes) else x for x in data.get('experimentalMethods', [])]
+    infodict['resolution'] = data.get('resolution')
+    infodict['description'] = data.get('title')
+
+    group_list = data['groupList']
+    group_name_exclude = ['HOH']
+    chem_comp_type_exclude = ['l-peptide linking', 'peptide linking']
+    chemicals = list(set([group_list[idx]['groupName'] for idx in decode_array(data['groupTypeList']) if group_list[idx]['chemCompType'].lower() not in chem_comp_type_exclude and group_list[idx]['groupName'] not in group_name_exclude]))
+    infodict['chemicals'] = chemicals
+
+    if metadata_only:
+        return infodict
+
+    # Only chains of the first model, entities list chain indices of all models
+    chain_names = list(decode_array(data['chainNameList']))
+    if data.get('chainsPerModel'):
+        chain_names = chain_names[:data['chainsPerModel'][0]]
+
+    entities = []
+    for i, entity in enumerate(data.get('entityList', [])):
+        chains = [chain_names[x] for x in entity['chainIndexList'] if x < len(chain_names)]
+        entities.append({'id': str(i + 1),
+                         'type': entity['type'],
+                         'description': entity.get('description') or None,
+                         'sequence': entity.get('sequence', ''),
+                         'chains': list(OrderedDict.fromkeys(chains))})
+    _add_entities(infodict, entities)
+
+    return infodict
+
+
+def read_mmcif_categories(infile, categories):
+    """Read only some categories of an mmCIF file into a dictionary, like Biopython's ``MMCIF2Dict``.
+
+    The lines of other categories are skipped without being tokenized, so reading the header categories of a large
+    structure takes a fraction of the time of reading the whole file.
+
+    Args:
+        infile (str): Path to mmCIF file, which may be compressed
+        categories (list): Names of categories to read, i.e. ``['_entity', '_exptl']``
+
+    Returns:
+        dict: Dictionary of mmCIF tags to their list of values, for the first data block of the file
+
+    """
+    categories = set(categories)
+    lines = []
+    keep = False
+    in_loop_header = False
+    in_text_field = False
+
+    with ssbio.utils.open_compressed(infile) as f:
+        for line in f:
+            # Multi-line text fields start and end with a semicolon at the start of a line
+            if line.startswith(';'):
+                in_text_field = not in_text_field
+                if keep:
+                    lines.append(line)
+                continue
+            if in_text_field:
+                if keep:
+                    lines.append(line)
+                continue
+
+            stripped = line.lstrip()
+            if stripped.startswith('data_'):
+                if lines:
+                    break
+                lines.append(line)
+            elif stripped.startswith('loop_'):
+                in_loop_header = True
+                keep = False
+            elif stripped.startswith('_'):
+                keep = stripped.split('.', 1)[0].split()[0] in categories
+                if keep and in_loop_header:
+                    lines.append('loop_\n')
+                in_loop_header = False
+                if keep:
+                    lines.append(line)
+            elif keep and not stripped.startswith('#'):
+                lines.append(line)
+
+    return MMCIF2Dict(StringIO(''.join(lines)))
+
+
+def _mmcif_values(mmdict, key):
+    """Get the values of an mmCIF tag as a list, with missing values (``?`` and ``.``) as None"""
+    values = mmdict.get(key, [])
+    if not isinstance(values, list):
+        values = [values]
+    return [None if x in ('?', '.') else x for x in values]
+
+
+def read_mmcif_header(infile, metadata_only=False):
+    """Parse a couple important fields from the mmCIF file format with some manual curation of ligands, reading only
+    the categories in ``MMCIF_HEADER_CATEGORIES``.
+
+    If you want full access to the mmCIF file just use the MMCIF2Dict class in Biopython.
+
+    Args:
+        infile (str): Path to mmCIF file, which may be compressed
+        metadata_only (bool): If only the metadata should be returned, without entities and chain sequences
+
+    Returns:
+        dict: Dictionary of parsed header, with the keys ``pdb_title``, ``description``, ``date``,
+        ``experimental_method``, ``resolution``, ``chemicals`` and ``taxonomy_name`` when the file has them, and
+        unless ``metadata_only`` is set the keys ``entities``, ``chain_entities`` and ``chain_sequences`` as in
+        :func:`read_mmtf_header`. Chains of non-polymer entities are not read from mmCIF files.
+
+    """
+    newdict = {}
+    try:
+        mmdict = read_mmcif_categories(infile, MMCIF_HEADER_CATEGORIES)
+    except ValueError as e:
+        log.exception(e)
+        return newdict
+
+    chemical_ids_exclude = ['HOH']
+    chemical_types_exclude = ['l-peptide linking','peptide linking']
+
+    if '_struct.title' in mmdict:
+        newdict['pdb_title'] = mmdict['_struct.title']
+    else:
+        log.debug('{}: No title field'.format(infile))
+
+    if '_struct.pdbx_descriptor' in mmdict:
+        newdict['description'] = mmdict['_struct.pdbx_descriptor']
+    else:
+        log.debug('{}: no description field'.format(infile))
+
+    if '_pdbx_database_status.recvd_initial_deposition_date' in mmdict:
+        newdict['date'] = mmdict['_pdbx_database_status.recvd_initial_deposition_date']
+    elif '_database_PDB_rev.date' in mmdict:
+        newdict['date'] = mmdict['_database_PDB_rev.date']
+    else:
+        log.debug('{}: no date field'.format(infile))
+
+    if '_exptl.method' in mmdict:
+        newdict['experimental_method'] = mmdict['_exptl.method']
+    else:
+        log.debug('{}: no experimental method field'.format(infile))
+
+    # TODO: refactor how to get resolutions based on experimental method
+    if '_refine.ls_d_res_high' in mmdict:
+        try:
+            if isinstance(mmdict['_refine.ls_d_res_high'], list):
+                newdict['resolution'] = [float(x) for x in mmdict['_refine.ls_d_res_high']]
+            else:
+                newdict['resolution'] = float(mmdict['_refine.ls_d_res_high'])
+        except:
+            try:
+                newdict['resolution'] = float(mmdict['_em_3d_reconstruction.resolution'])
+            except:
+                log.debug('{}: no resolution field'.format(infile))
+    else:
+        log.debug('{}: no resolution field'.format(infile))
+
+    if '_chem_comp.id' in mmdict:
+        chemicals_filtered = ssbio.utils.filter_list_by_indices(mmdict['_chem_comp.id'],
+                                                            ssbio.utils.not_find(mmdict['_chem_comp.type'],
+                                                                           chemical_types_exclude,
+                                                                           case_sensitive=False))
+        chemicals_fitered = ssbio.utils.filter_list(chemicals_filtered, chemical_ids_exclude, case_sensitive=True)
+        newdict['chemicals'] = chemicals_fitered
+    else:
+        log.debug('{}: no chemical composition field'.format(infile))
+
+    if '_entity_src_gen.pdbx_gene_src_scientific_name' in mmdict:
+        newdict['taxonomy_name'] = mmdict['_entity_src_gen.pdbx_gene_src_scientific_name']
+    else:
+        log.debug('{}: no organism field'.format(infile))
+
+    if metadata_only:
+        return newdict
+
+    polymers = {}
+    for entity_id, sequence, strand_ids in zip(_mmcif_values(mmdict, '_entity_poly.entity_id'),
+                                               _mmcif_values(mmdict, '_entity_poly.pdbx_seq_one_letter_code_can'),
+                                               _mmcif_values(mmdict, '_entity_poly.pdbx_strand_id')):
+        polymers[entity_id] = (''.join((sequence or '').split()),
+                               [x.strip() for x in strand_ids.split(',')] if strand_ids else [])
+
+    entities = []
+    for entity_id, entity_type, description in zip(_mmcif_values(mmdict, '_entity.id'),
+                                                   _mmcif_values(mmdict, '_entity.type'),
+                                                   _mmcif_values(mmdict, '_entity.pdbx_description')):
+        sequence, chains = polymers.get(entity_id, ('', []))
+        entities.append({'id': entity_id,
+                         'type': entity_type,
+                         'description': description,
+                         'sequence': sequence,
+                         'chains': chains})
+    _add_entities(newdict, entities)
+
+    return newdict
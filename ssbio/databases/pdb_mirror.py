@@ -0,0 +1,142 @@
+"""
+PDB Mirror
+==========
+"""
+
+import logging
+import os.path as op
+
+from six.moves.urllib_error import URLError
+
+log = logging.getLogger(__name__)
+
+
+WWPDB_LAYOUT = {'pdb': 'pdb/{mid}/pdb{pdb_id}.ent',
+                'mmcif': 'mmCIF/{mid}/{pdb_id}.cif',
+                'xml': 'XML/{mid}/{pdb_id}.xml',
+                'mmtf': 'mmtf/{mid}/{pdb_id}.mmtf',
+                'sifts': 'sifts/{mid}/{pdb_id}.xml'}
+"""dict: Paths of each file type in the wwPDB divided directory layout (``data/structures/divided``), relative to
+the mirror root. SIFTS files are expected in the same layout as the EBI ``split_xml`` directory."""
+
+COMPRESSED_EXTENSIONS = ['.gz', '']
+"""list: Extensions added to each path when looking for a file in the mirror, in order of preference"""
+
+
+class PDBMirror(object):
+
+    """Find structure and SIFTS files of PDB IDs in a local mirror of the PDB archive.
+
+    Paths are built from templates for each file type, formatted with ``pdb_id`` (the lowercase PDB ID) and ``mid``
+    (the middle two characters of the PDB ID, used to divide the archive into subdirectories). Relative templates are
+    joined to ``root_dir``, and both the gzipped and uncompressed name of each path are looked for. Files found in the
+    mirror are read in place, gzipped files are not decompressed to disk.
+
+    Args:
+        root_dir (str): Path to the root of the mirror, i.e. a copy of the wwPDB ``data/structures/divided``
+            directory. If not set, only absolute templates in ``layout`` are used.
+        layout (dict): File type (``pdb``, ``mmcif``, ``xml``, ``mmtf`` or ``sifts``) to a path template or a list
+            of path templates, overriding the templates of ``WWPDB_LAYOUT`` for those file types, i.e.
+            ``{'mmtf': '/data/mmtf/{mid}/{pdb_id}.mmtf'}``
+        allow_network (bool): If files that are not in the mirror may be downloaded from the PDB
+
+    """
+
+    def __init__(self, root_dir=None, layout=None, allow_network=True):
+        self.root_dir = root_dir
+        self.layout = dict(WWPDB_LAYOUT)
+        if layout:
+            self.layout.update({k.lower(): v for k, v in layout.items()})
+        self.allow_network = allow_network
+
+    def get_paths(self, pdb_id, file_type):
+        """Get all paths a file could have in the mirror, whether it exists or not.
+
+        Args:
+            pdb_id (str): PDB ID
+            file_type (str): ``pdb``, ``mmCif``, ``xml``, ``mmtf`` or ``sifts``
+
+        Returns:
+            list: Paths to look for the file at, in order of preference
+
+        """
+        file_type = file_type.lower()
+        if file_type not in self.layout:
+            raise ValueError('{}: unsupported file type, must be one of {}'.format(file_type, sorted(self.layout)))
+
+        templates = self.layout[file_type]
+        if not isinstance(templates, list):
+            templates = [templates]
+
+        pdb_id = pdb_id.lower()
+        paths = []
+        for template in templates:
+            path = template.format(pdb_id=pdb_id, mid=pdb_id[1:3])
+            if not op.isabs(path):
+                if not self.root_dir:
+                    continue
+                path = op.join(self.root_dir, path)
+            paths.extend(path + ext for ext in COMPRESSED_EXTENSIONS)
+        return paths
+
+    def get_path(self, pdb_id, file_type):
+        """Get the path to a file in the mirror.
+
+        Args:
+            pdb_id (str): PDB ID
+            file_type (str): ``pdb``, ``mmCif``, ``xml``, ``mmtf`` or ``sifts``
+
+        Returns:
+            str: Path to the file, or None if it is not in the mirror
+
+        """
+        for path in self.get_paths(pdb_id, file_type):
+            if op.isfile(path):
+                log.debug('{}: {} file found in PDB mirror at {}'.format(pdb_id, file_type, path))
+                return path
+        return None
+
+    def check_network(self, pdb_id, file_type):
+        """Check that a file which is not in the mirror may be downloaded.
+
+        Args:
+            pdb_id (str): PDB ID
+            file_type (str): Type of the file to be downloaded
+
+        Raises:
+            URLError: If network access is not allowed
+
+        """
+        if not self.allow_network:
+            raise URLError('{}.{}: file not in PDB mirror and network access is disabled'.format(pdb_id, file_type))
+
+
+_PDB_MIRROR = PDBMirror()
+
+
+def set_pdb_mirror(root_dir=None, layout=None, allow_network=True):
+    """Set the PDB mirror used to find structure and SIFTS files before downloading them.
+
+    Args:
+        root_dir (str): Path to the root of the mirror, see :class:`PDBMirror`
+        layout (dict): Path templates for each file type, see :class:`PDBMirror`
+        allow_network (bool): If files that are not in the mirror may be downloaded from the PDB
+
+    Returns:
+        PDBMirror: The new PDB mirror
+
+    """
+    global _PDB_MIRROR
+    _PDB_MIRROR = PDBMirror(root_dir=root_dir, layout=layout, allow_network=allow_network)
+    return _PDB_MIRROR
+
+
+def get_pdb_mirror():
+    """Get the PDB mirror used to find structure and SIFTS files before downloading them.
+
+    Returns:
+        PDBMirror: The current PDB mirror, which finds no files and allows downloads unless set with
+        :func:`set_pdb_mirror`
+
+    """
+    return _PDB_MIRROR
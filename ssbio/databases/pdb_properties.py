@@ -0,0 +1,192 @@
+"""
+PDB Property Store
+==================
+"""
+
+import datetime
+import logging
+import os.path as op
+import sqlite3
+import threading
+
+import pandas as pd
+
+from ssbio.io.download import get_download_manager
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+log = logging.getLogger(__name__)
+
+
+PROPERTY_REPORT_URL = 'http://www.rcsb.org/pdb/rest/customReport.csv?pdbids=*&customReportColumns=structureId,resolution,experimentalTechnique,releaseDate&service=wsfile&format=csv'
+"""str: URL of the RCSB custom report of properties for every entry in the PDB"""
+
+PROPERTY_COLUMNS = ['resolution', 'experimentalTechnique', 'releaseDate']
+"""list: Properties stored for each PDB ID, named as in the RCSB custom report"""
+
+SCHEMA_VERSION = 1
+"""int: Version of the layout of the database file, files written with another version are rebuilt"""
+
+# SQLite limits the number of variables in a single query
+_MAX_QUERY_IDS = 900
+
+
+def download_property_report():
+    """Download the table of properties for every PDB ID from the RCSB PDB REST service.
+
+    See the other fields that you can get here: http://www.rcsb.org/pdb/results/reportField.do
+
+    Returns:
+        Pandas DataFrame: table of structureId as the index, resolution, experimentalTechnique and releaseDate as the
+        columns
+
+    """
+    r = get_download_manager().request(PROPERTY_REPORT_URL)
+    return pd.read_csv(StringIO(r.text)).set_index('structureId')
+
+
+class PDBPropertyStore(object):
+
+    """Local table of properties of PDB entries, indexed by PDB ID.
+
+    The table is built once from the RCSB bulk custom report, or from a local copy of it, and saved in an SQLite
+    database so lookups of any number of PDB IDs do not need to go back to the PDB. The database records the schema
+    version, source and build date of the table - rebuild it with :meth:`build` to get newly released entries.
+
+    Args:
+        db_path (str): Path to the SQLite database file. If not set, the table is kept in memory for this session.
+        source (str): Path to a local CSV file of the custom report to build the table from. If not set, the report
+            is downloaded from the RCSB PDB.
+
+    """
+
+    def __init__(self, db_path=None, source=None):
+        self.db_path = db_path
+        self.source = source
+        self._conn = None
+        self._lock = threading.RLock()
+
+    @property
+    def conn(self):
+        """sqlite3.Connection: Connection to the database, opened when first used"""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path if self.db_path else ':memory:', check_same_thread=False)
+            self._conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        return self._conn
+
+    @property
+    def metadata(self):
+        """dict: Schema version, source and build date of the stored table, empty if the table is not built"""
+        with self._lock:
+            return dict(self.conn.execute('SELECT key, value FROM meta').fetchall())
+
+    @property
+    def is_built(self):
+        """bool: If the table is stored with the current schema version"""
+        return self.metadata.get('schema_version') == str(SCHEMA_VERSION)
+
+    def build(self, source=None, force_rerun=False):
+        """Build the table of properties from the RCSB custom report.
+
+        Args:
+            source (str, DataFrame): Path to a local CSV file of the custom report, or the report as a DataFrame. If
+                not set, the source of this store is used.
+            force_rerun (bool): If the table should be built again even if it is already stored
+
+        """
+        with self._lock:
+            if self.is_built and not force_rerun:
+                log.debug('PDB property table already built from {}'.format(self.metadata['source']))
+                return
+
+            if source is None:
+                source = self.source
+
+            if isinstance(source, pd.DataFrame):
+                report = source
+                source_name = 'DataFrame'
+            elif source:
+                report = pd.read_csv(source).set_index('structureId')
+                source_name = op.abspath(source)
+            else:
+                log.info('Downloading PDB property table from the RCSB PDB...')
+                report = download_property_report()
+                source_name = PROPERTY_REPORT_URL
+
+            # The report has a row for every chain, properties are the same for all chains of an entry
+            report = report[~report.index.duplicated(keep='first')]
+            report = report.reindex(columns=PROPERTY_COLUMNS)
+            report = report.astype(object).where(pd.notnull(report), None)
+            rows = [(str(pdb_id).upper(),) + tuple(values) for pdb_id, values in zip(report.index, report.values)]
+
+            with self.conn:
+                self.conn.execute('DROP TABLE IF EXISTS properties')
+                self.conn.execute('CREATE TABLE properties (structureId TEXT PRIMARY KEY, resolution REAL, '
+                                  'experimentalTechnique TEXT, releaseDate TEXT)')
+                self.conn.executemany('INSERT OR IGNORE INTO properties VALUES (?, ?, ?, ?)', rows)
+                self.conn.execute('DELETE FROM meta')
+                self.conn.executemany('INSERT INTO meta VALUES (?, ?)',
+                                      [('schema_version', str(SCHEMA_VERSION)),
+                                       ('source', source_name),
+                                       ('built', datetime.datetime.now().isoformat())])
+            log.debug('Stored properties of {} PDB entries'.format(len(self)))
+
+    def get_properties(self, pdb_ids):
+        """Get the properties of PDB IDs, building the table first if needed.
+
+        Args:
+            pdb_ids (str, list): PDB ID or list of PDB IDs
+
+        Returns:
+            Pandas DataFrame: table of the PDB IDs found as the index, properties as the columns, in the order of
+            ``pdb_ids``. IDs not in the table are left out.
+
+        """
+        if isinstance(pdb_ids, str):
+            pdb_ids = [pdb_ids]
+        pdb_ids = [x.upper() for x in pdb_ids]
+
+        with self._lock:
+            self.build()
+            records = []
+            unique_ids = list(dict.fromkeys(pdb_ids))
+            for i in range(0, len(unique_ids), _MAX_QUERY_IDS):
+                chunk = unique_ids[i:i + _MAX_QUERY_IDS]
+                query = 'SELECT * FROM properties WHERE structureId IN ({})'.format(','.join('?' * len(chunk)))
+                records.extend(self.conn.execute(query, chunk).fetchall())
+
+        found = pd.DataFrame.from_records(records, columns=['structureId'] + PROPERTY_COLUMNS).set_index('structureId')
+        return found.reindex([x for x in pdb_ids if x in found.index])
+
+    def __contains__(self, pdb_id):
+        with self._lock:
+            self.build()
+            return self.conn.execute('SELECT 1 FROM properties WHERE structureId = ?',
+                                     (pdb_id.upper(),)).fetchone() is not None
+
+    def __len__(self):
+        with self._lock:
+            if not self.is_built:
+                return 0
+            return self.conn.execute('SELECT COUNT(*) FROM properties').fetchone()[0]
+
+    def close(self):
+        """Close the connection to the database"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def __getstate__(self):
+        # Connections and locks cannot be pickled, in-memory tables are built again from the source when needed
+        state = self.__dict__.copy()
+        state['_conn'] = None
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
@@ -1,6 +1,6 @@
 from os import path as op
 
-import requests
+from ssbio.io.download import get_download_manager
 from lxml import etree
 
 import ssbio.utils
@@ -37,7 +37,7 @@ def blast_pdb(seq, outfile='', outdir='', evalue=0.0001, seq_ident_cutoff=0.0, l
         # Load the BLAST XML results if force_rerun=True
         page = 'http://www.rcsb.org/pdb/rest/getBlastPDB1?sequence={}&eCutOff={}&maskLowComplexity=yes&matrix=BLOSUM62&outputFormat=XML'.format(
                         seq, evalue)
-        req = requests.get(page)
+        req = get_download_manager().request(page)
         if req.status_code == 200:
             response = req.text
 
@@ -3,7 +3,7 @@ PISA
 ===========
 """
 
-import requests
+from ssbio.io.download import get_download_manager
 from collections import defaultdict
 from copy import deepcopy
 import ssbio.utils
@@ -68,7 +68,7 @@ def download_pisa_multimers_xml(pdb_ids, save_single_xml_files=True, outdir=None
         for l in split_list:
             pdbs = ','.join(l)
             all_pisa_link = 'http://www.ebi.ac.uk/pdbe/pisa/cgi-bin/multimers.pisa?{}'.format(pdbs)
-            r = requests.get(all_pisa_link)
+            r = get_download_manager().request(all_pisa_link)
 
             # Parse PISA file and save individual XML files
             parser = etree.XMLParser(ns_clean=True)
@@ -92,9 +92,7 @@ def download_pisa_multimers_xml(pdb_ids, save_single_xml_files=True, outdir=None
             filename = op.join(outdir, '{}_multimers.pisa.xml'.format(pdbs))
 
             if ssbio.utils.force_rerun(flag=force_rerun, outfile=filename):
-                r = requests.get(all_pisa_link)
-                with open(filename, 'w') as f:
-                    f.write(r.text)
+                get_download_manager().fetch(all_pisa_link, filename, force_rerun=force_rerun)
                 log.debug('Downloaded PISA results')
             else:
                 log.debug('PISA results already downloaded')
@@ -216,10 +214,7 @@ def parse_pisa_multimers_xml(pisa_multimers_xml, download_structures=False, outd
                         if ssbio.utils.force_rerun(flag=force_rerun, outfile=filename):
                             download_structure_link = 'http://www.ebi.ac.uk/pdbe/pisa/cgi-bin/multimer.pdb?{}'.format(
                                 ident)
-                            r = requests.get(download_structure_link)
-
-                            with open(filename, 'w') as f:
-                                f.write(r.text)
+                            get_download_manager().fetch(download_structure_link, filename, force_rerun=force_rerun)
 
                             log.debug('{}: downloaded structure file'.format(ident))
                         else:
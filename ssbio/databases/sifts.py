@@ -0,0 +1,303 @@
+"""
+SIFTS Residue Mapping
+=====================
+"""
+
+import functools
+import logging
+import os.path as op
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from lxml import etree
+
+import ssbio.utils
+
+log = logging.getLogger(__name__)
+
+
+_SIFTS_NS = '{http://www.ebi.ac.uk/pdbe/docs/sifts/eFamily.xsd}'
+_ENTITY = _SIFTS_NS + 'entity'
+_RESIDUE = _SIFTS_NS + 'residue'
+_CROSSREFDB = _SIFTS_NS + 'crossRefDb'
+_RESIDUEDETAIL = _SIFTS_NS + 'residueDetail'
+
+SIFTS_ARRAYS_VERSION = 1
+"""int: Version of the layout of saved SIFTS arrays, files saved with another version are parsed again"""
+
+
+def _split_pdb_resnum(pdb_resnum):
+    """Split a SIFTS PDB residue number such as ``52A`` into its number and insertion code"""
+    if pdb_resnum is None or pdb_resnum == 'null':
+        return None, ' '
+    if pdb_resnum[-1].isalpha():
+        return int(pdb_resnum[:-1]), pdb_resnum[-1]
+    return int(pdb_resnum), ' '
+
+
+def parse_sifts_xml(sifts_file):
+    """Parse the residue mappings of a SIFTS XML file into arrays for each chain, reading the file only once.
+
+    Args:
+        sifts_file (str): Path to the SIFTS XML file, which may be gzipped
+
+    Returns:
+        SIFTSMapping: Residue mappings of all chains in the file
+
+    """
+    chains = OrderedDict()
+    entity_id = None
+    residues = None
+
+    # Gzipped files (i.e. from a PDB mirror) are decompressed while they are parsed
+    with ssbio.utils.open_compressed(sifts_file, 'rb') as f:
+        for event, elem in etree.iterparse(f, events=('start', 'end'), tag=(_ENTITY, _RESIDUE)):
+            if elem.tag == _ENTITY:
+                if event == 'start':
+                    # TODO: IMPORTANT - entityId is not the chain ID!!! it is just in alphabetical order!
+                    entity_id = elem.attrib['entityId']
+                    residues = chains.setdefault(entity_id, [])
+                else:
+                    elem.clear()
+                continue
+
+            if event == 'start':
+                continue
+
+            uniprot_resnum = None
+            pdb_resnum = None
+            annotations = []
+            for child in elem:
+                if child.tag == _CROSSREFDB:
+                    db_source = child.attrib.get('dbSource')
+                    if db_source == 'UniProt' and uniprot_resnum is None:
+                        uniprot_resnum = int(child.attrib['dbResNum'])
+                    elif db_source == 'PDB' and pdb_resnum is None:
+                        pdb_resnum = child.attrib.get('dbResNum')
+                elif child.tag == _RESIDUEDETAIL:
+                    if child.attrib.get('dbSource') == 'PDBe' and child.attrib.get('property') == 'Annotation':
+                        annotations.append(child.text)
+
+            pdb_resnum, pdb_icode = _split_pdb_resnum(pdb_resnum)
+            residues.append((uniprot_resnum, pdb_resnum, pdb_icode, 'Not_Observed' not in annotations))
+
+            # Free parsed residues as we go, the rest of the tree is not needed
+            elem.clear()
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+
+    mapping = SIFTSMapping()
+    for entity_id, residues in chains.items():
+        mapping.add_chain(entity_id,
+                          uniprot_resnums=[-1 if x[0] is None else x[0] for x in residues],
+                          has_uniprot=[x[0] is not None for x in residues],
+                          pdb_resnums=[-1 if x[1] is None else x[1] for x in residues],
+                          pdb_icodes=[x[2] for x in residues],
+                          has_pdb=[x[1] is not None for x in residues],
+                          is_observed=[x[3] for x in residues])
+    return mapping
+
+
+def sifts_arrays_path(sifts_file):
+    """Get the path of the arrays saved for a SIFTS XML file, next to the XML file"""
+    sifts_file = ssbio.utils.strip_compressed_extension(sifts_file)
+    if sifts_file.endswith('.xml'):
+        return sifts_file[:-len('.xml')] + '.npz'
+    return sifts_file + '.npz'
+
+
+def load_sifts_mapping(sifts_file, force_rerun=False):
+    """Load the residue mappings of a SIFTS XML file.
+
+    The XML file is parsed once and the mappings are saved as arrays next to it (``1kf6.sifts.xml`` is saved as
+    ``1kf6.sifts.npz``), which are loaded instead of the XML file as long as they are newer than it.
+
+    Args:
+        sifts_file (str): Path to the SIFTS XML file
+        force_rerun (bool): If the XML file should be parsed again even if the saved arrays exist
+
+    Returns:
+        SIFTSMapping: Residue mappings of all chains in the file
+
+    """
+    arrays_file = sifts_arrays_path(sifts_file)
+
+    if not ssbio.utils.force_rerun(flag=force_rerun, outfile=arrays_file) and \
+            op.getmtime(arrays_file) >= op.getmtime(sifts_file):
+        mapping = SIFTSMapping.load(arrays_file)
+        if mapping is not None:
+            return mapping
+
+    mapping = parse_sifts_xml(sifts_file)
+    try:
+        mapping.save(arrays_file)
+    except (IOError, OSError):
+        log.debug('{}: unable to save parsed SIFTS arrays'.format(arrays_file))
+    return mapping
+
+
+@functools.lru_cache(maxsize=256)
+def _load_sifts_mapping_cached(sifts_file, mtime):
+    return load_sifts_mapping(sifts_file)
+
+
+def get_sifts_mapping(sifts_file):
+    """Get the residue mappings of a SIFTS XML file, keeping recently used mappings in memory so repeated lookups in
+    the same file do not load it again.
+
+    Args:
+        sifts_file (str): Path to the SIFTS XML file
+
+    Returns:
+        SIFTSMapping: Residue mappings of all chains in the file
+
+    """
+    sifts_file = op.abspath(sifts_file)
+    return _load_sifts_mapping_cached(sifts_file, op.getmtime(sifts_file))
+
+
+class SIFTSMapping(object):
+
+    """Residue level mappings between UniProt and PDB residue numbers from a SIFTS file, stored as arrays for each
+    chain so that many residues can be mapped at once.
+
+    Each chain stores, for every residue in the SIFTS file, the UniProt residue number, the PDB residue number and
+    insertion code, and if the residue is observed in the structure. Residues without a UniProt or PDB residue number
+    are flagged in the ``has_uniprot`` and ``has_pdb`` arrays.
+
+    """
+
+    _FIELDS = ['uniprot_resnums', 'has_uniprot', 'pdb_resnums', 'pdb_icodes', 'has_pdb', 'is_observed']
+
+    def __init__(self):
+        self.chains = OrderedDict()
+        """OrderedDict: Dictionary of chain IDs and dictionaries of their residue arrays"""
+        self._uniprot_index = {}
+        self._pdb_index = {}
+
+    def add_chain(self, chain_id, uniprot_resnums, has_uniprot, pdb_resnums, pdb_icodes, has_pdb, is_observed):
+        """Store the residue arrays of a chain"""
+        self.chains[chain_id] = {'uniprot_resnums': np.asarray(uniprot_resnums, dtype=np.int32),
+                                 'has_uniprot': np.asarray(has_uniprot, dtype=bool),
+                                 'pdb_resnums': np.asarray(pdb_resnums, dtype=np.int32),
+                                 'pdb_icodes': np.asarray(pdb_icodes, dtype='U1'),
+                                 'has_pdb': np.asarray(has_pdb, dtype=bool),
+                                 'is_observed': np.asarray(is_observed, dtype=bool)}
+        self._uniprot_index.pop(chain_id, None)
+        self._pdb_index.pop(chain_id, None)
+
+    def _get_chain(self, chain_id):
+        if chain_id not in self.chains:
+            raise ValueError('{}: chain not in SIFTS mapping'.format(chain_id))
+        return self.chains[chain_id]
+
+    def _get_uniprot_index(self, chain_id):
+        """Index of UniProt residue numbers to positions in the chain arrays, ambiguous residue numbers are left out"""
+        if chain_id not in self._uniprot_index:
+            chain = self._get_chain(chain_id)
+            positions = np.flatnonzero(chain['has_uniprot'])
+            resnums = pd.Series(chain['uniprot_resnums'][positions])
+            unique = ~resnums.duplicated(keep=False).values
+            self._uniprot_index[chain_id] = (pd.Index(resnums.values[unique]), positions[unique])
+        return self._uniprot_index[chain_id]
+
+    def _get_pdb_index(self, chain_id):
+        """Index of PDB residue numbers and insertion codes to positions in the chain arrays"""
+        if chain_id not in self._pdb_index:
+            chain = self._get_chain(chain_id)
+            positions = np.flatnonzero(chain['has_pdb'])
+            keys = pd.MultiIndex.from_arrays([chain['pdb_resnums'][positions], chain['pdb_icodes'][positions]])
+            unique = ~keys.duplicated(keep='first')
+            self._pdb_index[chain_id] = (keys[unique], positions[unique])
+        return self._pdb_index[chain_id]
+
+    def map_uniprot_to_pdb(self, chain_id, uniprot_resnums):
+        """Map UniProt residue numbers to PDB residue numbers of a chain.
+
+        Args:
+            chain_id (str): Chain ID (entity ID in the SIFTS file)
+            uniprot_resnums (int, list): UniProt residue number or list of residue numbers
+
+        Returns:
+            Pandas DataFrame: table of the UniProt residue numbers as the index, and the columns ``pdb_resnum``
+            (missing if not mapped), ``pdb_icode`` and ``is_observed``
+
+        """
+        uniprot_resnums = np.atleast_1d(np.asarray(uniprot_resnums, dtype=np.int64))
+        chain = self._get_chain(chain_id)
+        index, positions = self._get_uniprot_index(chain_id)
+
+        found = index.get_indexer(uniprot_resnums)
+        mapped = found >= 0
+        rows = positions[found[mapped]]
+        mapped[mapped] = chain['has_pdb'][rows]
+        rows = positions[found[mapped]]
+
+        pdb_resnums = np.zeros(len(uniprot_resnums), dtype=np.int64)
+        pdb_resnums[mapped] = chain['pdb_resnums'][rows]
+        pdb_icodes = np.full(len(uniprot_resnums), ' ', dtype='U1')
+        pdb_icodes[mapped] = chain['pdb_icodes'][rows]
+        is_observed = np.zeros(len(uniprot_resnums), dtype=bool)
+        is_observed[mapped] = chain['is_observed'][rows]
+
+        return pd.DataFrame({'pdb_resnum': pd.arrays.IntegerArray(pdb_resnums, ~mapped), 'pdb_icode': pdb_icodes, 'is_observed': is_observed},
+                            index=pd.Index(uniprot_resnums, name='uniprot_resnum'))
+
+    def map_pdb_to_uniprot(self, chain_id, pdb_resnums, pdb_icodes=None):
+        """Map PDB residue numbers of a chain to UniProt residue numbers.
+
+        Args:
+            chain_id (str): Chain ID (entity ID in the SIFTS file)
+            pdb_resnums (int, list): PDB residue number or list of residue numbers
+            pdb_icodes (str, list): Insertion codes of the residues, blank if not set
+
+        Returns:
+            Pandas DataFrame: table of the PDB residue numbers as the index, and the columns ``uniprot_resnum``
+            (missing if not mapped) and ``is_observed``
+
+        """
+        pdb_resnums = np.atleast_1d(np.asarray(pdb_resnums, dtype=np.int64))
+        if pdb_icodes is None:
+            pdb_icodes = np.full(len(pdb_resnums), ' ', dtype='U1')
+        else:
+            pdb_icodes = np.atleast_1d(np.asarray(pdb_icodes, dtype='U1'))
+            pdb_icodes[pdb_icodes == ''] = ' '
+
+        chain = self._get_chain(chain_id)
+        index, positions = self._get_pdb_index(chain_id)
+
+        found = index.get_indexer(pd.MultiIndex.from_arrays([pdb_resnums, pdb_icodes]))
+        mapped = found >= 0
+        rows = positions[found[mapped]]
+        mapped[mapped] = chain['has_uniprot'][rows]
+        rows = positions[found[mapped]]
+
+        uniprot_resnums = np.zeros(len(pdb_resnums), dtype=np.int64)
+        uniprot_resnums[mapped] = chain['uniprot_resnums'][rows]
+        is_observed = np.zeros(len(pdb_resnums), dtype=bool)
+        is_observed[mapped] = chain['is_observed'][rows]
+
+        return pd.DataFrame({'uniprot_resnum': pd.arrays.IntegerArray(uniprot_resnums, ~mapped), 'is_observed': is_observed},
+                            index=pd.Index(pdb_resnums, name='pdb_resnum'))
+
+    def save(self, outfile):
+        """Save the residue arrays of all chains to a numpy ``.npz`` file"""
+        arrays = {'version': np.array(SIFTS_ARRAYS_VERSION), 'chain_ids': np.array(list(self.chains), dtype='U')}
+        for i, chain in enumerate(self.chains.values()):
+            for field in self._FIELDS:
+                arrays['{}_{}'.format(i, field)] = chain[field]
+        np.savez(outfile, **arrays)
+
+    @classmethod
+    def load(cls, infile):
+        """Load residue arrays saved with :meth:`save`, or return None if they were saved with another version"""
+        with np.load(infile) as arrays:
+            if int(arrays['version']) != SIFTS_ARRAYS_VERSION:
+                log.debug('{}: saved SIFTS arrays are an old version'.format(infile))
+                return None
+
+            mapping = cls()
+            for i, chain_id in enumerate(arrays['chain_ids']):
+                mapping.add_chain(str(chain_id), **{x: arrays['{}_{}'.format(i, x)] for x in cls._FIELDS})
+        return mapping
@@ -8,6 +8,7 @@ import shutil
 import logging
 import requests
 import ssbio.utils
+from ssbio.io.download import get_download_manager
 import os.path as op
 from collections import defaultdict
 
@@ -122,15 +123,12 @@ class SWISSMODEL():
             outfile = op.join(outdir, ident + '.pdb')
 
             if ssbio.utils.force_rerun(flag=force_rerun, outfile=outfile):
-                response = requests.get(entry['url'])
-
-                if response.status_code == 404:
-                    log.error('{}: 404 returned, no model available.'.format(ident))
+                try:
+                    get_download_manager().fetch(entry['url'], outfile, force_rerun=force_rerun)
+                except requests.HTTPError as e:
+                    log.error('{}: {} returned, no model available.'.format(ident, e.response.status_code))
 
                 else:
-                    with open(outfile, 'w') as f:
-                        f.write(response.text)
-
                     log.debug('{}: downloaded homology model'.format(ident))
                     downloaded.append(outfile)
             else:
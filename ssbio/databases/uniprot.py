@@ -8,18 +8,17 @@ import re
 import warnings
 import bioservices
 import pandas as pd
-import requests
 from collections import defaultdict
 from dateutil.parser import parse as dateparse
 import ssbio.utils
 from BCBio import GFF
+from ssbio.io.download import get_download_manager
 from ssbio.protein.sequence.seqprop import SeqProp
 
 try:
     from StringIO import StringIO
 except ImportError:
     from io import StringIO
-from six.moves.urllib.request import urlretrieve
 from Bio import SeqIO
 
 import logging
@@ -415,7 +414,8 @@ def uniprot_ec(uniprot_id):
     Returns:
 
     """
-    r = requests.post('http://www.uniprot.org/uniprot/?query=%s&columns=ec&format=tab' % uniprot_id)
+    r = get_download_manager().request('http://www.uniprot.org/uniprot/?query=%s&columns=ec&format=tab' % uniprot_id,
+                                       method='POST')
     ec = r.content.decode('utf-8').splitlines()[1]
 
     if len(ec) == 0:
@@ -436,7 +436,7 @@ def uniprot_sites(uniprot_id):
 
     """
 
-    r = requests.post('http://www.uniprot.org/uniprot/%s.gff' % uniprot_id)
+    r = get_download_manager().request('http://www.uniprot.org/uniprot/%s.gff' % uniprot_id, method='POST')
     gff = StringIO(r.content.decode('utf-8'))
 
     feats = list(GFF.parse(gff))
@@ -458,6 +458,35 @@ def uniprot_sites(uniprot_id):
     # return gff_df
 
 
+def _uniprot_file_download(uniprot_id, filetype, outdir=''):
+    """Get the link of a UniProt file, and the path it is saved to"""
+    my_file = '{}.{}'.format(uniprot_id, filetype)
+    return 'http://www.uniprot.org/uniprot/{}'.format(my_file), op.join(outdir, my_file)
+
+
+def download_uniprot_files(uniprot_ids, filetypes, outdirs='', force_rerun=False):
+    """Download UniProt files for many UniProt IDs at once.
+
+    Args:
+        uniprot_ids (list): Valid UniProt IDs
+        filetypes (list): File types to download for each ID - txt, fasta, xml, rdf, or gff
+        outdirs (str, list): Output directory, or list of output directories for each UniProt ID
+        force_rerun (bool): If files should be downloaded again even if they exist
+
+    Returns:
+        list: Dictionaries of file types and paths to the files of each UniProt ID, None if a file could not be
+        downloaded
+
+    """
+    if not isinstance(outdirs, list):
+        outdirs = [outdirs] * len(uniprot_ids)
+
+    downloads = [_uniprot_file_download(u, filetype, outdir=outdir or '')
+                 for u, outdir in zip(uniprot_ids, outdirs) for filetype in filetypes]
+    files = iter(get_download_manager().fetch_many(downloads, force_rerun=force_rerun))
+    return [{filetype: next(files) for filetype in filetypes} for _ in uniprot_ids]
+
+
 def download_uniprot_file(uniprot_id, filetype, outdir='', force_rerun=False):
     """Download a UniProt file for a UniProt ID/ACC
 
@@ -471,12 +500,10 @@ def download_uniprot_file(uniprot_id, filetype, outdir='', force_rerun=False):
 
     """
 
-    my_file = '{}.{}'.format(uniprot_id, filetype)
-    url = 'http://www.uniprot.org/uniprot/{}'.format(my_file)
-    outfile = op.join(outdir, my_file)
+    url, outfile = _uniprot_file_download(uniprot_id, filetype, outdir=outdir)
 
     if ssbio.utils.force_rerun(flag=force_rerun, outfile=outfile):
-        urlretrieve(url, outfile)
+        get_download_manager().fetch(url, outfile, force_rerun=force_rerun)
 
     return outfile
 
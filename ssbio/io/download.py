@@ -0,0 +1,348 @@
+"""
+Download Manager
+================
+"""
+
+import gzip
+import logging
+import os
+import os.path as op
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from six.moves.urllib.parse import urlparse
+from six.moves.urllib_error import URLError
+from six.moves.urllib.request import urlopen
+
+log = logging.getLogger(__name__)
+
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+"""tuple: HTTP status codes of responses which are retried"""
+
+_RETRY_EXCEPTIONS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+
+_GZIP_MAGIC = b'\x1f\x8b'
+
+
+class DownloadError(requests.HTTPError, URLError):
+
+    """Error raised when the server returns an error status code for a file download.
+
+    Subclasses both ``requests.HTTPError`` and ``URLError``, so it is caught by code written for either.
+
+    """
+
+    def __str__(self):
+        return str(self.reason)
+
+
+def _raise_for_status(url, response):
+    if response.status_code >= 400:
+        raise DownloadError('{}: request error {}'.format(url, response.status_code), response=response)
+
+
+class DownloadManager(object):
+
+    """Make web requests and download files through a shared pool of connections.
+
+    All requests go through one ``requests`` session, so connections to a server are kept alive and reused. The
+    number of simultaneous requests to each host is limited, as is the rate of requests to each host. Failed requests
+    (connection errors, timeouts and the status codes in ``RETRY_STATUS_CODES``) are retried with exponential backoff,
+    and files are streamed to disk and resumed from where they stopped if a download is interrupted.
+
+    Args:
+        max_workers (int): Number of downloads run at the same time by :meth:`fetch_many`
+        max_per_host (int): Number of requests sent to the same host at the same time
+        min_interval (float): Minimum number of seconds between the start of requests to the same host
+        host_min_intervals (dict): Minimum number of seconds between requests for specific hosts, overriding
+            ``min_interval``, i.e. ``{'www.uniprot.org': 0.5}``
+        max_retries (int): Number of times a failed request is retried
+        backoff_factor (float): Seconds to wait before the first retry, doubled for every following retry
+        timeout (float): Seconds to wait for the server to respond
+        chunk_size (int): Size in bytes of the chunks written to disk when streaming a file
+
+    """
+
+    def __init__(self, max_workers=8, max_per_host=4, min_interval=0.0, host_min_intervals=None, max_retries=5,
+                 backoff_factor=0.5, timeout=60, chunk_size=1024 * 1024):
+        self.max_workers = max_workers
+        self.max_per_host = max_per_host
+        self.min_interval = min_interval
+        self.host_min_intervals = host_min_intervals or {}
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+
+        self._session = None
+        self._lock = threading.Lock()
+        self._host_slots = {}
+        self._host_next_request = {}
+
+    @property
+    def session(self):
+        """requests.Session: Session shared by all requests, created when first used"""
+        with self._lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=16, pool_maxsize=max(self.max_workers, self.max_per_host))
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._session = session
+        return self._session
+
+    def _host_slot(self, host):
+        with self._lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self._host_slots[host]
+
+    def _wait_for_rate_limit(self, host):
+        interval = self.host_min_intervals.get(host, self.min_interval)
+        if not interval:
+            return
+        with self._lock:
+            now = time.time()
+            start = max(now, self._host_next_request.get(host, now))
+            self._host_next_request[host] = start + interval
+        if start > now:
+            time.sleep(start - now)
+
+    def _backoff(self, url, attempt, response=None):
+        """Wait before retrying a request, as long as the server asks for if it sent a Retry-After header"""
+        wait = self.backoff_factor * (2 ** attempt)
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after and retry_after.isdigit():
+                wait = max(wait, int(retry_after))
+        log.debug('{}: retrying request in {:.1f} seconds'.format(url, wait))
+        time.sleep(wait)
+
+    def _send(self, url, method, attempt_fn):
+        """Run a request with the host's concurrency and rate limits, retrying it if it fails.
+
+        ``attempt_fn`` sends the request and returns the response, responses with a status code in
+        ``RETRY_STATUS_CODES`` are retried.
+
+        """
+        host = urlparse(url).netloc
+        slot = self._host_slot(host)
+
+        for attempt in range(self.max_retries + 1):
+            response = None
+            try:
+                with slot:
+                    self._wait_for_rate_limit(host)
+                    response = attempt_fn()
+                    if response.status_code not in RETRY_STATUS_CODES:
+                        return response
+                    response.close()
+            except _RETRY_EXCEPTIONS as e:
+                if attempt == self.max_retries:
+                    raise
+                log.debug('{}: {} request failed ({})'.format(url, method, e))
+
+            if attempt < self.max_retries:
+                self._backoff(url, attempt, response)
+
+        return response
+
+    def request(self, url, method='GET', **kwargs):
+        """Make a web request, with retries for failed requests.
+
+        Args:
+            url (str): Link of the request
+            method (str): HTTP method, ``GET`` or ``POST``
+            **kwargs: Other arguments of :meth:`requests.Session.request`, i.e. ``params``, ``data`` or ``headers``
+
+        Returns:
+            requests.Response: Response of the server, error status codes are not raised
+
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        return self._send(url, method, lambda: self.session.request(method, url, **kwargs))
+
+    def fetch(self, url, outfile, force_rerun=False, decompress=False):
+        """Download a file, streaming it to disk.
+
+        The file is written to ``outfile`` with a ``.part`` extension while downloading, and only moved to
+        ``outfile`` once it is complete. If a download is interrupted, the next attempt (or the next call with the
+        same outfile) asks the server for the rest of the file only.
+
+        Args:
+            url (str): Link to the file
+            outfile (str): Path to output file
+            force_rerun (bool): If the file should be downloaded again even if it exists
+            decompress (bool): If the downloaded file should be decompressed if it is gzipped
+
+        Returns:
+            str: Path to downloaded file
+
+        Raises:
+            DownloadError: If the server returns an error status code
+
+        """
+        if not force_rerun and op.isfile(outfile):
+            log.debug('{}: file already exists'.format(outfile))
+            return outfile
+
+        partfile = outfile + '.part'
+        if force_rerun and op.exists(partfile):
+            os.remove(partfile)
+
+        if urlparse(url).scheme in ('http', 'https'):
+            self._fetch_http(url, partfile)
+        else:
+            self._fetch_urlopen(url, partfile)
+
+        with open(partfile, 'rb') as f:
+            is_gzipped = f.read(2) == _GZIP_MAGIC
+
+        if decompress and is_gzipped:
+            with gzip.open(partfile, 'rb') as f_in, open(outfile, 'wb') as f_out:
+                shutil.copyfileobj(f_in, f_out, self.chunk_size)
+            os.remove(partfile)
+        else:
+            os.replace(partfile, outfile)
+
+        log.debug('{}: downloaded {}'.format(outfile, url))
+        return outfile
+
+    def _fetch_http(self, url, partfile):
+        def attempt():
+            offset = op.getsize(partfile) if op.exists(partfile) else 0
+            # Ask for the raw bytes, byte ranges of a compressed transfer could not be resumed
+            headers = {'Accept-Encoding': 'identity'}
+            if offset:
+                headers['Range'] = 'bytes={}-'.format(offset)
+
+            response = self.session.get(url, stream=True, headers=headers, timeout=self.timeout)
+            if response.status_code == 416:
+                # The partial file is no longer valid for the file on the server, start again
+                response.close()
+                os.remove(partfile)
+                return attempt()
+            if response.status_code in RETRY_STATUS_CODES:
+                return response
+            _raise_for_status(url, response)
+
+            mode = 'ab' if offset and response.status_code == 206 else 'wb'
+            with open(partfile, mode) as f:
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    f.write(chunk)
+            return response
+
+        _raise_for_status(url, self._send(url, 'GET', attempt))
+
+    def _fetch_urlopen(self, url, partfile):
+        """Download a file from a server that is not HTTP (i.e. FTP), without connection pooling or resuming"""
+        host = urlparse(url).netloc
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self._host_slot(host):
+                    self._wait_for_rate_limit(host)
+                    response = urlopen(url, timeout=self.timeout)
+                    try:
+                        with open(partfile, 'wb') as f:
+                            shutil.copyfileobj(response, f, self.chunk_size)
+                    finally:
+                        response.close()
+                return
+            except (IOError, OSError) as e:
+                if attempt == self.max_retries:
+                    raise
+                log.debug('{}: request failed ({})'.format(url, e))
+                self._backoff(url, attempt)
+
+    def fetch_many(self, downloads, force_rerun=False, raise_errors=False):
+        """Download many files at the same time.
+
+        Args:
+            downloads (list): List of ``(url, outfile)`` tuples, or of dictionaries with the keys ``url``,
+                ``outfile`` and optionally ``decompress``
+            force_rerun (bool): If files should be downloaded again even if they exist
+            raise_errors (bool): If a failed download should raise its error, otherwise failed downloads are logged
+                and returned as None
+
+        Returns:
+            list: Paths to downloaded files, in the same order as ``downloads``. Files requested more than once are
+            downloaded once.
+
+        """
+        downloads = [x if isinstance(x, dict) else {'url': x[0], 'outfile': x[1]} for x in downloads]
+
+        def fetch_one(download):
+            try:
+                return self.fetch(download['url'], download['outfile'], force_rerun=force_rerun,
+                                  decompress=download.get('decompress', False))
+            except (requests.RequestException, IOError, OSError) as e:
+                if raise_errors:
+                    raise
+                log.error('{}: unable to download file ({})'.format(download['url'], e))
+                return None
+
+        # The same file may be requested more than once, only download it once
+        unique = list(dict((x['outfile'], x) for x in reversed(downloads)).values())[::-1]
+
+        if len(unique) <= 1 or self.max_workers <= 1:
+            results = [fetch_one(x) for x in unique]
+        else:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                results = list(executor.map(fetch_one, unique))
+
+        results = {x['outfile']: result for x, result in zip(unique, results)}
+        return [results[x['outfile']] for x in downloads]
+
+    def close(self):
+        """Close all pooled connections"""
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def __getstate__(self):
+        # Sessions and locks cannot be pickled, they are created again when needed
+        state = self.__dict__.copy()
+        state['_session'] = None
+        state['_host_slots'] = {}
+        state['_host_next_request'] = {}
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+_DOWNLOAD_MANAGER = DownloadManager()
+
+
+def set_download_manager(**kwargs):
+    """Set the download manager used by the ssbio database functions.
+
+    Args:
+        **kwargs: Arguments of :class:`DownloadManager`
+
+    Returns:
+        DownloadManager: The new download manager
+
+    """
+    global _DOWNLOAD_MANAGER
+    _DOWNLOAD_MANAGER.close()
+    _DOWNLOAD_MANAGER = DownloadManager(**kwargs)
+    return _DOWNLOAD_MANAGER
+
+
+def get_download_manager():
+    """Get the download manager used by the ssbio database functions.
+
+    Returns:
+        DownloadManager: The current download manager
+
+    """
+    return _DOWNLOAD_MANAGER
@@ -19,6 +19,7 @@ import ssbio.protein.sequence.properties.residues
 import ssbio.protein.sequence.utils.alignment
 import ssbio.protein.sequence.utils.blast
 import ssbio.protein.sequence.utils.fasta
+import ssbio.protein.sequence.utils.kmer_index
 from ssbio import utils
 from ssbio.core.object import Object
 from ssbio.pipeline.gempro import GEMPRO
@@ -252,10 +253,12 @@ class ATLAS(Object):
     def get_orthology_matrix(self, pid_cutoff=None, bitscore_cutoff=None, evalue_cutoff=None, filter_condition='OR',
                              remove_strains_with_no_orthology=True,
                              remove_strains_with_no_differences=False,
-                             remove_genes_not_in_base_model=True):
+                             remove_genes_not_in_base_model=True, prefilter=False):
         """Create the orthology matrix by finding best bidirectional BLAST hits. Genes = rows, strains = columns
 
-        Runs run_makeblastdb, run_bidirectional_blast, and calculate_bbh for protein sequences.
+        Runs run_makeblastdb, run_bidirectional_blast, and calculate_bbh for protein sequences. With ``prefilter``,
+        proteins which are clear orthologs by their shared k-mers are paired without BLAST, see
+        :func:`~ssbio.protein.sequence.utils.blast.calculate_bbh_with_prefilter`.
 
         Args:
             pid_cutoff (float): Minimum percent identity between BLAST hits to filter for in the range [0, 100]
@@ -269,6 +272,10 @@ class ATLAS(Object):
                 differences may be on the sequence level.
             remove_genes_not_in_base_model (bool): Remove genes from the orthology matrix which are not present in our
                 base model. This happens if we use a genome file for our model that has other genes in it.
+            prefilter (bool): Only BLAST the proteins whose orthologs are not clear from their shared k-mers with the
+                reference proteome. The PID, eVal and bitScore of the other pairs come from an in-process global
+                alignment with estimated scores, not BLAST, and the cutoffs are applied to those values. If False
+                (default), all proteins are BLASTed in both directions.
 
         Returns:
             DataFrame: Orthology matrix calculated from best bidirectional BLAST hits.
@@ -281,10 +288,22 @@ class ATLAS(Object):
 
         bbh_files = {}
 
+        # The reference proteome is indexed once for all strains
+        if prefilter:
+            reference_index = ssbio.protein.sequence.utils.kmer_index.KmerIndex(SeqIO.parse(r_file, 'fasta'))
+
         log.info('Running bidirectional BLAST and finding best bidirectional hits (BBH)...')
         for strain_gempro in tqdm(self.strains):
             g_file = strain_gempro.genome_path
 
+            if prefilter:
+                log.debug('{} vs {}: Finding BBHs with k-mer prefilter'.format(self.reference_gempro.id, strain_gempro.id))
+                bbh_files[strain_gempro.id] = ssbio.protein.sequence.utils.blast.calculate_bbh_with_prefilter(reference=r_file,
+                                                                                                             other_genome=g_file,
+                                                                                                             outdir=self.sequences_by_organism_dir,
+                                                                                                             reference_index=reference_index)
+                continue
+
             # Run bidirectional BLAST
             log.debug('{} vs {}: Running bidirectional BLAST'.format(self.reference_gempro.id, strain_gempro.id))
             r_vs_g, g_vs_r = ssbio.protein.sequence.utils.blast.run_bidirectional_blast(reference=r_file,
@@ -310,7 +329,7 @@ class ATLAS(Object):
                                                                                   outdir=self.data_dir)
 
         log.info('Saved orthology matrix at {}. See the "df_orthology_matrix" attribute.'.format(ortho_matrix))
-        self.df_orthology_matrix = pd.read_csv(ortho_matrix, index_col=0)
+        self.df_orthology_matrix = ssbio.protein.sequence.utils.blast.load_orthology_matrix(ortho_matrix)
 
         # Filter the matrix to genes only in our analysis, and also check for strains with no differences or no orthologous genes
         self._filter_orthology_matrix(remove_strains_with_no_orthology=remove_strains_with_no_orthology,
@@ -466,29 +485,30 @@ class ATLAS(Object):
             log.debug('{}: loading strain genome CDS file'.format(strain_gempro.genome_path))
             strain_sequences = SeqIO.index(strain_gempro.genome_path, 'fasta')
 
-        for strain_gene in strain_gempro.genes:
-            if strain_gene.functional:
-                if self._orthology_matrix_has_sequences:
-                    strain_gene_key = strain_gene.id
-                else:
-                    # Pull the gene ID of the strain from the orthology matrix
-                    strain_gene_key = self.df_orthology_matrix.loc[strain_gene.id, strain_gempro.id]
-                    log.debug('{}: original gene ID to be pulled from strain fasta file'.format(strain_gene_key))
-
-                # # Load into the base strain for comparisons
-                ref_gene = self.reference_gempro.genes.get_by_id(strain_gene.id)
-                new_id = '{}_{}'.format(strain_gene.id, strain_gempro.id)
-                if ref_gene.protein.sequences.has_id(new_id):
-                    log.debug('{}: sequence already loaded into reference model'.format(new_id))
-                    continue
-                ref_gene.protein.load_manual_sequence(seq=strain_sequences[strain_gene_key], ident=new_id,
-                                                      set_as_representative=False)
-                log.debug('{}: loaded sequence into reference model'.format(new_id))
-
-                # Load into the strain GEM-PRO
-                strain_gene.protein.load_manual_sequence(seq=strain_sequences[strain_gene_key], ident=new_id,
-                                                         set_as_representative=True)
-                log.debug('{}: loaded sequence into strain model'.format(new_id))
+        functional_genes = [x for x in strain_gempro.genes if x.functional]
+        if self._orthology_matrix_has_sequences:
+            strain_gene_keys = [x.id for x in functional_genes]
+        else:
+            # Pull the gene IDs of the strain from the orthology matrix
+            strain_gene_keys = ssbio.protein.sequence.utils.blast.lookup_orthologs(self.df_orthology_matrix,
+                                                                                   [x.id for x in functional_genes],
+                                                                                   strain_gempro.id)
+
+        for strain_gene, strain_gene_key in zip(functional_genes, strain_gene_keys):
+            # # Load into the base strain for comparisons
+            ref_gene = self.reference_gempro.genes.get_by_id(strain_gene.id)
+            new_id = '{}_{}'.format(strain_gene.id, strain_gempro.id)
+            if ref_gene.protein.sequences.has_id(new_id):
+                log.debug('{}: sequence already loaded into reference model'.format(new_id))
+                continue
+            ref_gene.protein.load_manual_sequence(seq=strain_sequences[strain_gene_key], ident=new_id,
+                                                  set_as_representative=False)
+            log.debug('{}: loaded sequence into reference model'.format(new_id))
+
+            # Load into the strain GEM-PRO
+            strain_gene.protein.load_manual_sequence(seq=strain_sequences[strain_gene_key], ident=new_id,
+                                                     set_as_representative=True)
+            log.debug('{}: loaded sequence into strain model'.format(new_id))
 
     def build_strain_specific_models(self, save_models=False):
         """Using the orthologous genes matrix, create and modify the strain specific models based on if orthologous
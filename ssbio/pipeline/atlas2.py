@@ -13,16 +13,19 @@ import json
 import ssbio.core.modelpro
 import ssbio.databases.ncbi
 import ssbio.databases.patric
+import ssbio.protein.sequence.properties.protein_analysis
 import ssbio.protein.sequence.properties.residues
 import ssbio.protein.sequence.utils.alignment
 import ssbio.protein.sequence.utils.blast
 import ssbio.protein.sequence.utils.fasta
+import ssbio.protein.sequence.utils.kmer_index
 from joblib import Parallel, delayed
 import ssbio.utils
 import ssbio.io
 from copy import deepcopy
 from ssbio.core.object import Object
 from ssbio.pipeline.gempro import GEMPRO
+from ssbio.protein.sequence.utils.sequence_store import SequenceStore
 from collections import defaultdict
 from more_itertools import locate
 
@@ -84,6 +87,9 @@ class ATLAS2(Object):
         self.df_orthology_matrix = pd.DataFrame()
         """DataFrame: Pandas Dataframe representation of the orthology matrix, containing strain FASTA sequence IDs"""
 
+        self.sequence_store = SequenceStore(op.join(self.sequences_dir, 'strain_sequences.db'))
+        """SequenceStore: Sequences of all strain genomes, keyed by strain ID and sequence ID"""
+
     @property
     def root_dir(self):
         """str: Directory where ATLAS project folder named after the attribute ``base_dir`` is located"""
@@ -163,13 +169,16 @@ class ATLAS2(Object):
 
     def get_orthology_matrix(self, outfile, sc, outdir=None,
                              pid_cutoff=None, bitscore_cutoff=None, evalue_cutoff=None,
-                             force_rerun=False):
+                             force_rerun=False, prefilter=False):
         """Create the orthology matrix by finding best bidirectional BLAST hits. Genes = rows, strains = columns
 
-        Runs run_makeblastdb, run_bidirectional_blast, and calculate_bbh for protein sequences.
+        Runs run_makeblastdb, run_bidirectional_blast, and calculate_bbh for protein sequences. With ``prefilter``,
+        proteins which are clear orthologs by their shared k-mers are paired without BLAST, see
+        :func:`~ssbio.protein.sequence.utils.blast.calculate_bbh_with_prefilter`.
 
         Args:
-            outfile (str): Filename with extension of the orthology matrix (ie. df_orthology.csv)
+            outfile (str): Filename with extension of the orthology matrix (ie. df_orthology.csv), which sets its file
+                type - ``csv``, or ``feather`` or ``parquet`` for a smaller file which loads faster
             outdir (str): Path to output of orthology matrix, default is ATLAS data_dir
             pid_cutoff (float): Minimum percent identity between BLAST hits to filter for in the range [0, 100]
             bitscore_cutoff (float): Minimum bitscore allowed between BLAST hits
@@ -182,6 +191,11 @@ class ATLAS2(Object):
                 differences may be on the sequence level.
             remove_genes_not_in_base_model (bool): Remove genes from the orthology matrix which are not present in our
                 base model. This happens if we use a genome file for our model that has other genes in it.
+            force_rerun (bool): If the orthology matrix should be created again even if the outfile exists
+            prefilter (bool): Only BLAST the proteins whose orthologs are not clear from their shared k-mers with the
+                reference proteome. The PID, eVal and bitScore of the other pairs come from an in-process global
+                alignment with estimated scores, not BLAST, and the cutoffs are applied to those values. If False
+                (default), all proteins are BLASTed in both directions.
 
         Returns:
             DataFrame: Orthology matrix calculated from best bidirectional BLAST hits.
@@ -197,11 +211,24 @@ class ATLAS2(Object):
                 raise ValueError('Please initialize SparkContext')
             ################################################################################################################
             # BIDIRECTIONAL BLAST
+            # The reference proteome is indexed once and sent to the workers with the function
+            reference_index = None
+            if prefilter:
+                reference_index = ssbio.protein.sequence.utils.kmer_index.KmerIndex(SeqIO.parse(self.reference_gempro.genome_path, 'fasta'))
+
             def run_bidirectional_blast(strain_id, strain_genome_path,
                                         r_file=self.reference_gempro.genome_path,
-                                        outdir2=self.sequences_by_organism_dir):
+                                        outdir2=self.sequences_by_organism_dir,
+                                        reference_index=reference_index):
                 import ssbio.protein.sequence.utils.blast
 
+                if reference_index is not None:
+                    bbh = ssbio.protein.sequence.utils.blast.calculate_bbh_with_prefilter(reference=r_file,
+                                                                                         other_genome=strain_genome_path,
+                                                                                         outdir=outdir2,
+                                                                                         reference_index=reference_index)
+                    return strain_id, bbh
+
                 # Run bidirectional BLAST
                 r_vs_g, g_vs_r = ssbio.protein.sequence.utils.blast.run_bidirectional_blast(reference=r_file,
                                                                                             other_genome=strain_genome_path,
@@ -235,7 +262,7 @@ class ATLAS2(Object):
                                                                                       force_rerun=force_rerun)
 
         log.info('Orthology matrix at {}. See the "df_orthology_matrix" attribute.'.format(ortho_matrix))
-        self.df_orthology_matrix = pd.read_csv(ortho_matrix, index_col=0)
+        self.df_orthology_matrix = ssbio.protein.sequence.utils.blast.load_orthology_matrix(ortho_matrix)
         self.df_orthology_matrix = self.df_orthology_matrix.rename_axis('gene').rename_axis("strain", axis="columns")
         ################################################################################################################
 
@@ -406,16 +433,32 @@ class ATLAS2(Object):
         for strain_id, gp_noseqs_path in result:
             self.strain_infodict[strain_id]['gp_noseqs_path'] = gp_noseqs_path
 
+    def build_sequence_store(self, force_rerun=False):
+        """Add the genome FASTA file of each strain to the sequence store, so its sequences can be looked up by ID
+        without indexing the FASTA file again. Genomes whose FASTA file did not change are not read again.
+
+        Args:
+            force_rerun (bool): If all genome FASTA files should be read again
+
+        """
+        for strain_id in self.strain_ids:
+            self.sequence_store.add_genome(strain_id, self.strain_infodict[strain_id]['genome_path'],
+                                           force_rerun=force_rerun)
+        log.info('{}: number of strain genomes in sequence store'.format(len(self.strain_ids)))
+
     def _load_sequences_to_strain(self, strain_id, force_rerun=False):
         """Load strain GEMPRO with functional genes defined, load sequences to it, save as new GEMPRO"""
         gp_seqs_path = op.join(self.model_dir, '{}_gp_withseqs.pckl'.format(strain_id))
 
         if ssbio.utils.force_rerun(flag=force_rerun, outfile=gp_seqs_path):
             gp_noseqs = ssbio.io.load_pickle(self.strain_infodict[strain_id]['gp_noseqs_path'])
-            strain_sequences = SeqIO.index(self.strain_infodict[strain_id]['genome_path'], 'fasta')
-            for strain_gene in gp_noseqs.functional_genes:
-                # Pull the gene ID of the strain from the orthology matrix
-                strain_gene_key = self.df_orthology_matrix.at[strain_gene.id, strain_id]
+            strain_sequences = self.sequence_store.get_genome(strain_id)
+            functional_genes = list(gp_noseqs.functional_genes)
+            # Pull the gene IDs of the strain from the orthology matrix
+            strain_gene_keys = ssbio.protein.sequence.utils.blast.lookup_orthologs(self.df_orthology_matrix,
+                                                                                   [x.id for x in functional_genes],
+                                                                                   strain_id)
+            for strain_gene, strain_gene_key in zip(functional_genes, strain_gene_keys):
                 # Load into the strain GEM-PRO
                 new_id = '{}_{}'.format(strain_gene.id, strain_id)
                 if strain_gene.protein.sequences.has_id(new_id):
@@ -429,6 +472,7 @@ class ATLAS2(Object):
     def load_sequences_to_strains(self, joblib=False, cores=1, force_rerun=False):
         """Wrapper function for _load_sequences_to_strain"""
         log.info('Loading sequences to strain GEM-PROs...')
+        self.build_sequence_store()
         if joblib:
             result = DictList(Parallel(n_jobs=cores)(delayed(self._load_sequences_to_strain)(s, force_rerun) for s in self.strain_ids))
         else:
@@ -447,18 +491,16 @@ class ATLAS2(Object):
             protein_pickle_path = self.gene_protein_pickles[g_id]
             protein_pickle = ssbio.io.load_pickle(protein_pickle_path)
 
-            for strain, info in self.strain_infodict.items():
-                strain_sequences = SeqIO.index(info['genome_path'], 'fasta')
-                strain_gene_functional = info['functional_genes'][g_id]
-                if strain_gene_functional:
-                    # Pull the gene ID of the strain from the orthology matrix
-                    strain_gene_key = self.df_orthology_matrix.at[g_id, strain]
-                    new_id = '{}_{}'.format(g_id, strain)
-                    if protein_pickle.sequences.has_id(new_id):
-                        continue
-                    protein_pickle.load_manual_sequence(seq=strain_sequences[strain_gene_key],
-                                                        ident=new_id,
-                                                        set_as_representative=False)
+            strains = [strain for strain, info in self.strain_infodict.items() if info['functional_genes'][g_id]]
+            # Pull the gene IDs of the strains from the orthology matrix
+            strain_gene_keys = ssbio.protein.sequence.utils.blast.lookup_orthologs(self.df_orthology_matrix, g_id, strains)
+            for strain, strain_gene_key in zip(strains, strain_gene_keys):
+                new_id = '{}_{}'.format(g_id, strain)
+                if protein_pickle.sequences.has_id(new_id):
+                    continue
+                protein_pickle.load_manual_sequence(seq=self.sequence_store.get_record(strain, strain_gene_key),
+                                                    ident=new_id,
+                                                    set_as_representative=False)
             protein_pickle.save_pickle(outfile=protein_seqs_pickle_path)
 
         return g_id, protein_seqs_pickle_path
@@ -466,6 +508,7 @@ class ATLAS2(Object):
     def load_sequences_to_reference(self, sc=None, force_rerun=False):
         """Wrapper for _load_sequences_to_reference_gene"""
         log.info('Loading sequences to reference GEM-PRO...')
+        self.build_sequence_store()
         from random import shuffle
         g_ids = [g.id for g in self.reference_gempro.functional_genes]
         shuffle(g_ids)
@@ -473,11 +516,12 @@ class ATLAS2(Object):
         def _load_sequences_to_reference_gene_sc(g_id, outdir=self.sequences_by_gene_dir,
                                                  g_to_pickle=self.gene_protein_pickles,
                                                  strain_infodict=self.strain_infodict,
+                                                 sequence_store=self.sequence_store,
                                                  orth_matrix=self.df_orthology_matrix, force_rerun=force_rerun):
             """Load orthologous strain sequences to reference Protein object, save as new pickle"""
             import ssbio.utils
             import ssbio.io
-            from Bio import SeqIO
+            import ssbio.protein.sequence.utils.blast
             import os.path as op
 
             protein_seqs_pickle_path = op.join(outdir, '{}_protein_withseqs.pckl'.format(g_id))
@@ -486,18 +530,16 @@ class ATLAS2(Object):
                 protein_pickle_path = g_to_pickle[g_id]
                 protein_pickle = ssbio.io.load_pickle(protein_pickle_path)
 
-                for strain, info in strain_infodict.items():
-                    strain_sequences = SeqIO.index(info['genome_path'], 'fasta')
-                    strain_gene_functional = info['functional_genes'][g_id]
-                    if strain_gene_functional:
-                        # Pull the gene ID of the strain from the orthology matrix
-                        strain_gene_key = orth_matrix.at[g_id, strain]
-                        new_id = '{}_{}'.format(g_id, strain)
-                        if protein_pickle.sequences.has_id(new_id):
-                            continue
-                        protein_pickle.load_manual_sequence(seq=strain_sequences[strain_gene_key],
-                                                            ident=new_id,
-                                                            set_as_representative=False)
+                strains = [strain for strain, info in strain_infodict.items() if info['functional_genes'][g_id]]
+                # Pull the gene IDs of the strains from the orthology matrix
+                strain_gene_keys = ssbio.protein.sequence.utils.blast.lookup_orthologs(orth_matrix, g_id, strains)
+                for strain, strain_gene_key in zip(strains, strain_gene_keys):
+                    new_id = '{}_{}'.format(g_id, strain)
+                    if protein_pickle.sequences.has_id(new_id):
+                        continue
+                    protein_pickle.load_manual_sequence(seq=sequence_store.get_record(strain, strain_gene_key),
+                                                        ident=new_id,
+                                                        set_as_representative=False)
                 protein_pickle.save_pickle(outfile=protein_seqs_pickle_path)
 
             return g_id, protein_seqs_pickle_path
@@ -557,7 +599,8 @@ class ATLAS2(Object):
         for g_id, protein_pickle in result:
             self.gene_protein_pickles[g_id] = protein_pickle
 
-    def _align_orthologous_gene_pairwise(self, g_id, gapopen=10, gapextend=0.5, engine='needle', parse=True, force_rerun=False):
+    def _align_orthologous_gene_pairwise(self, g_id, gapopen=10, gapextend=0.5, engine='needle', parse=True,
+                                         force_rerun=False, threads=1):
         """Align orthologous strain sequences to representative Protein sequence, save as new pickle"""
         protein_seqs_aln_pickle_path = op.join(self.sequences_by_gene_dir, '{}_protein_withseqs_dis_aln.pckl'.format(g_id))
 
@@ -577,14 +620,16 @@ class ATLAS2(Object):
             ssbio.utils.make_dir(alignment_dir)
             protein_pickle.pairwise_align_sequences_to_representative(gapopen=gapopen, gapextend=gapextend,
                                                                       engine=engine, outdir=alignment_dir,
-                                                                      parse=parse, force_rerun=force_rerun)
+                                                                      parse=parse, force_rerun=force_rerun,
+                                                                      threads=threads)
             protein_pickle.save_pickle(outfile=protein_seqs_aln_pickle_path)
 
         return g_id, protein_seqs_aln_pickle_path
 
     def align_orthologous_genes_pairwise(self, sc=None, joblib=False, cores=1, gapopen=10, gapextend=0.5,
-                                         engine='needle', parse=True, force_rerun=False):
-        """Wrapper for _align_orthologous_gene_pairwise"""
+                                         engine='needle', parse=True, force_rerun=False, threads=1):
+        """Wrapper for _align_orthologous_gene_pairwise, ``threads`` sets the number of strain alignments run at the
+        same time for each gene."""
         log.info('Aligning sequences to reference GEM-PRO...')
         from random import shuffle
         g_ids = [g.id for g in self.reference_gempro.functional_genes]
@@ -593,7 +638,7 @@ class ATLAS2(Object):
         def _align_orthologous_gene_pairwise_sc(g_id, g_to_pickle=self.gene_protein_pickles,
                                                 gapopen=gapopen, gapextend=gapextend, engine=engine, parse=parse,
                                                 outdir=self.sequences_by_gene_dir,
-                                                force_rerun=force_rerun):
+                                                force_rerun=force_rerun, threads=threads):
             """Align orthologous strain sequences to representative Protein sequence, save as new pickle"""
             import ssbio.utils
             import ssbio.io
@@ -615,7 +660,8 @@ class ATLAS2(Object):
                 ssbio.utils.make_dir(alignment_dir)
                 protein_pickle.pairwise_align_sequences_to_representative(gapopen=gapopen, gapextend=gapextend,
                                                                           engine=engine, outdir=alignment_dir,
-                                                                          parse=parse, force_rerun=force_rerun)
+                                                                          parse=parse, force_rerun=force_rerun,
+                                                                          threads=threads)
                 protein_pickle.save_pickle(outfile=protein_seqs_aln_pickle_path)
 
             return g_id, protein_seqs_aln_pickle_path
@@ -628,7 +674,7 @@ class ATLAS2(Object):
             for g in tqdm(g_ids):
                 result_raw.append(self._align_orthologous_gene_pairwise(g, gapopen=gapopen, gapextend=gapextend,
                                                                     engine=engine, parse=parse,
-                                                                    force_rerun=force_rerun))
+                                                                    force_rerun=force_rerun, threads=threads))
 
         result = [x for x in result_raw if x is not None]
         log.info('Storing paths to new Protein objects in self.gene_protein_pickles...')
@@ -638,6 +684,7 @@ class ATLAS2(Object):
     def loadseqstoref_alignorth(self, sc, start=None, end=None, force_rerun=False):
         from random import shuffle
         log.info('Loading sequences to reference GEM-PRO and aligning sequences...')
+        self.build_sequence_store()
 
         g_ids = [g.id for g in self.reference_gempro.functional_genes]
 
@@ -647,11 +694,11 @@ class ATLAS2(Object):
         shuffle(g_ids)
 
         def _do_all_shit(g_id, outdir=self.sequences_by_gene_dir, g_to_pickle=self.gene_protein_pickles,
-                         strain_infodict=self.strain_infodict,
+                         strain_infodict=self.strain_infodict, sequence_store=self.sequence_store,
                          orth_matrix=self.df_orthology_matrix, force_rerun=force_rerun):
             import ssbio.utils
             import ssbio.io
-            from Bio import SeqIO
+            import ssbio.protein.sequence.utils.blast
             import os.path as op
 
             protein_seqs_aln_pickle_path = op.join(outdir, '{}_protein_withseqs_aln.pckl'.format(g_id))
@@ -660,18 +707,16 @@ class ATLAS2(Object):
                 # protein_seqs_pickle_path = op.join(outdir, '{}_protein_withseqs.pckl'.format(g_id))
                 protein_pickle_path = g_to_pickle[g_id]
                 protein_pickle = ssbio.io.load_pickle(protein_pickle_path)
-                for strain, info in strain_infodict.items():
-                    strain_sequences = SeqIO.index(info['genome_path'], 'fasta')
-                    strain_gene_functional = info['functional_genes'][g_id]
-                    if strain_gene_functional:
-                        # Pull the gene ID of the strain from the orthology matrix
-                        strain_gene_key = orth_matrix.at[g_id, strain]
-                        new_id = '{}_{}'.format(g_id, strain)
-                        if protein_pickle.sequences.has_id(new_id):
-                            continue
-                        protein_pickle.load_manual_sequence(seq=strain_sequences[strain_gene_key],
-                                                            ident=new_id,
-                                                            set_as_representative=False)
+                strains = [strain for strain, info in strain_infodict.items() if info['functional_genes'][g_id]]
+                # Pull the gene IDs of the strains from the orthology matrix
+                strain_gene_keys = ssbio.protein.sequence.utils.blast.lookup_orthologs(orth_matrix, g_id, strains)
+                for strain, strain_gene_key in zip(strains, strain_gene_keys):
+                    new_id = '{}_{}'.format(g_id, strain)
+                    if protein_pickle.sequences.has_id(new_id):
+                        continue
+                    protein_pickle.load_manual_sequence(seq=sequence_store.get_record(strain, strain_gene_key),
+                                                        ident=new_id,
+                                                        set_as_representative=False)
                 # protein_pickle.save_pickle(outfile=protein_seqs_pickle_path)
 
                 # protein_seqs_dis_pickle_path = op.join(outdir, '{}_protein_withseqs_dis.pckl'.format(g_id))
@@ -746,6 +791,7 @@ def calculate_residue_counts_perstrain(protein_pickle_path, outdir, pdbflex_keys
         # Each strain gets a dictionary
         strain_to_infodict = defaultdict(dict)
 
+        strains_to_analyze = []
         for seqprop_to_analyze in protein.sequences:
             if seqprop_to_analyze.id == protein.representative_sequence.id:
                 strain_id = 'K12'
@@ -761,9 +807,12 @@ def calculate_residue_counts_perstrain(protein_pickle_path, outdir, pdbflex_keys
                 if aln.annotations['percent_identity'] < wt_pid_cutoff:
                     continue
 
-            ###### Calculate "all" properties ######
-            seqprop_to_analyze.get_biopython_pepstats()
+            strains_to_analyze.append((strain_id, seqprop_to_analyze))
+
+        ###### Calculate "all" properties, for all strains at once ######
+        ssbio.protein.sequence.properties.protein_analysis.get_biopython_pepstats_many([x[1] for x in strains_to_analyze])
 
+        for strain_id, seqprop_to_analyze in strains_to_analyze:
             # [ALL] aa_count
             if 'amino_acids_percent-biop' not in seqprop_to_analyze.annotations:  # May not run if weird amino acids in the sequence
                 log.warning('Protein {}, sequence {}: skipping, unable to run Biopython ProteinAnalysis'.format(protein.id,
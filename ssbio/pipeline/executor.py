@@ -0,0 +1,344 @@
+"""
+Executors
+=========
+"""
+
+import abc
+import logging
+import math
+import multiprocessing
+import signal
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from functools import partial
+
+import six
+
+from ssbio import utils
+
+if utils.is_ipynb():
+    from tqdm import tqdm_notebook as tqdm
+else:
+    from tqdm import tqdm
+
+log = logging.getLogger(__name__)
+
+
+class TaskTimeout(Exception):
+
+    """Error raised in a task which ran longer than the timeout of its executor"""
+
+
+class TaskError(object):
+
+    """Error raised by a task, captured so the other tasks keep running.
+
+    Only the type, message and traceback of the exception are kept, so errors can be sent back from other processes
+    even if the exception itself cannot be pickled.
+
+    Args:
+        error_type (str): Name of the exception class
+        message (str): Exception message
+        traceback (str): Formatted traceback of the exception
+
+    """
+
+    def __init__(self, error_type, message, traceback=None):
+        self.error_type = error_type
+        self.message = message
+        self.traceback = traceback
+
+    @classmethod
+    def from_exception(cls, e):
+        """Capture an exception which is being handled"""
+        return cls(type(e).__name__, str(e), traceback.format_exc())
+
+    def __str__(self):
+        return '{}: {}'.format(self.error_type, self.message)
+
+    def __repr__(self):
+        return '<TaskError {}>'.format(self)
+
+
+class TaskResult(object):
+
+    """Result of running a function on one item.
+
+    Args:
+        index (int): Index of the item in the list of items given to the executor
+        result (object): Return value of the function, None if it raised an error
+        error (TaskError): Error raised by the function, None if it ran without errors
+
+    """
+
+    def __init__(self, index, result=None, error=None):
+        self.index = index
+        self.result = result
+        self.error = error
+
+    @property
+    def ok(self):
+        """bool: If the function ran without errors"""
+        return self.error is None
+
+    def __repr__(self):
+        return '<TaskResult {}: {}>'.format(self.index, 'ok' if self.ok else self.error)
+
+
+def _raise_timeout(signum, frame):
+    raise TaskTimeout('task did not finish in time')
+
+
+def _call_with_timeout(function, item, timeout):
+    """Call a function on an item, interrupting it with ``TaskTimeout`` after ``timeout`` seconds.
+
+    Timeouts use the ``SIGALRM`` signal, which only interrupts the main thread of a process, so they are only enforced
+    there (in serial runs, process pool workers and Spark workers) and the function runs without a timeout otherwise.
+
+    """
+    if not timeout or not hasattr(signal, 'setitimer') or threading.current_thread() is not threading.main_thread():
+        return function(item)
+
+    previous_handler = signal.signal(signal.SIGALRM, _raise_timeout)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return function(item)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous_handler)
+
+
+def run_chunk(function, chunk, timeout=None):
+    """Run a function on a chunk of items, capturing the errors raised for each item.
+
+    Args:
+        function (callable): Function taking one item, must be picklable to run it in other processes
+        chunk (list): Tuples of the index and item to run the function on
+        timeout (float): Seconds each item can run for before it is stopped with a ``TaskTimeout`` error
+
+    Returns:
+        list: ``TaskResult`` of each item
+
+    """
+    results = []
+    for index, item in chunk:
+        try:
+            results.append(TaskResult(index, result=_call_with_timeout(function, item, timeout)))
+        except Exception as e:
+            results.append(TaskResult(index, error=TaskError.from_exception(e)))
+    return results
+
+
+@six.add_metaclass(abc.ABCMeta)
+class Executor(object):
+
+    """Run a function on a list of items, one task per item, capturing the errors of each task.
+
+    Subclasses decide where the tasks run. Items are scheduled in chunks, so many small tasks do not each pay the cost
+    of being sent to a worker.
+
+    Args:
+        chunksize (int): Number of items sent to a worker at once, set from the number of items and workers if not set
+        timeout (float): Seconds each task can run for before it is stopped, no timeout if not set
+        progress (bool): If a progress bar should be shown
+
+    """
+
+    in_place = True
+    """bool: If tasks run on the items themselves, otherwise they run on copies and changes must be merged back"""
+
+    def __init__(self, chunksize=None, timeout=None, progress=True):
+        self.chunksize = chunksize
+        self.timeout = timeout
+        self.progress = progress
+
+    def __repr__(self):
+        return '<{}>'.format(self.__class__.__name__)
+
+    @property
+    def num_workers(self):
+        """int: Number of tasks run at the same time"""
+        return 1
+
+    def _get_chunksize(self, num_items):
+        if self.chunksize:
+            return self.chunksize
+        # Four chunks per worker balances the load when tasks take different times
+        return max(1, int(math.ceil(num_items / float(self.num_workers * 4))))
+
+    @abc.abstractmethod
+    def _run_chunks(self, function, chunks, timeout):
+        """Run the chunks, yielding the list of ``TaskResult`` of each chunk as it finishes"""
+
+    def map(self, function, items, description=None):
+        """Run a function on all items.
+
+        Args:
+            function (callable): Function taking one item
+            items (list): Items to run the function on
+            description (str): Description shown on the progress bar
+
+        Returns:
+            list: ``TaskResult`` of each item, in the same order as ``items``
+
+        """
+        items = list(items)
+        chunksize = self._get_chunksize(len(items))
+        indexed = list(enumerate(items))
+        chunks = [indexed[i:i + chunksize] for i in range(0, len(indexed), chunksize)]
+
+        results = [None] * len(items)
+        with tqdm(total=len(items), desc=description, disable=not self.progress) as progress_bar:
+            for chunk_results in self._run_chunks(function, chunks, self.timeout):
+                for result in chunk_results:
+                    results[result.index] = result
+                progress_bar.update(len(chunk_results))
+
+        num_errors = sum(1 for x in results if not x.ok)
+        if num_errors:
+            log.debug('{}: {}/{} tasks raised errors'.format(self, num_errors, len(results)))
+        return results
+
+
+class Serial(Executor):
+
+    """Run tasks one after the other in the current process.
+
+    Args:
+        timeout (float): Seconds each task can run for before it is stopped, only enforced in the main thread
+        progress (bool): If a progress bar should be shown
+
+    """
+
+    def __init__(self, timeout=None, progress=True):
+        Executor.__init__(self, chunksize=1, timeout=timeout, progress=progress)
+
+    def _run_chunks(self, function, chunks, timeout):
+        for chunk in chunks:
+            yield run_chunk(function, chunk, timeout=timeout)
+
+
+class _PoolExecutor(Executor):
+
+    """Run tasks in a ``concurrent.futures`` pool"""
+
+    pool_class = None
+
+    def __init__(self, max_workers=None, chunksize=None, timeout=None, progress=True):
+        Executor.__init__(self, chunksize=chunksize, timeout=timeout, progress=progress)
+        self.max_workers = max_workers or multiprocessing.cpu_count()
+
+    def __repr__(self):
+        return '<{}: {} workers>'.format(self.__class__.__name__, self.max_workers)
+
+    @property
+    def num_workers(self):
+        return self.max_workers
+
+    def _run_chunks(self, function, chunks, timeout):
+        with self.pool_class(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(run_chunk, function, chunk, timeout): chunk for chunk in chunks}
+            for future in as_completed(futures):
+                try:
+                    yield future.result()
+                except Exception as e:
+                    # The chunk could not be run at all, i.e. the function could not be pickled or a worker died
+                    error = TaskError.from_exception(e)
+                    yield [TaskResult(index, error=error) for index, item in futures[future]]
+
+
+class ThreadPool(_PoolExecutor):
+
+    """Run tasks in a pool of threads in the current process.
+
+    Tasks run on the items themselves, so this suits tasks which spend their time waiting on web requests, files or
+    external programs. Threads cannot be interrupted, so ``timeout`` is not enforced.
+
+    Args:
+        max_workers (int): Number of threads, the number of CPUs if not set
+        chunksize (int): Number of items given to a thread at once
+        progress (bool): If a progress bar should be shown
+
+    """
+
+    pool_class = ThreadPoolExecutor
+
+    def __init__(self, max_workers=None, chunksize=None, progress=True):
+        _PoolExecutor.__init__(self, max_workers=max_workers, chunksize=chunksize, timeout=None, progress=progress)
+
+
+class ProcessPool(_PoolExecutor):
+
+    """Run tasks in a pool of processes on the current machine.
+
+    Items are pickled to the worker processes and the function runs on copies of them, so it must return what it
+    changed. The function must be picklable, i.e. a module level function or a ``functools.partial`` of one.
+
+    Args:
+        max_workers (int): Number of processes, the number of CPUs if not set
+        chunksize (int): Number of items sent to a process at once
+        timeout (float): Seconds each task can run for before it is stopped
+        progress (bool): If a progress bar should be shown
+
+    """
+
+    pool_class = ProcessPoolExecutor
+    in_place = False
+
+
+class Spark(Executor):
+
+    """Run tasks on a Spark cluster, one partition per chunk.
+
+    As for :class:`ProcessPool`, the function runs on copies of the items and must return what it changed.
+
+    Args:
+        sc (SparkContext): Spark context to run the tasks with
+        chunksize (int): Number of items in each partition
+        timeout (float): Seconds each task can run for before it is stopped
+        progress (bool): If a progress bar should be shown, it is only updated when all tasks are done
+
+    """
+
+    in_place = False
+
+    def __init__(self, sc, chunksize=None, timeout=None, progress=True):
+        Executor.__init__(self, chunksize=chunksize, timeout=timeout, progress=progress)
+        self.sc = sc
+
+    @property
+    def num_workers(self):
+        return self.sc.defaultParallelism
+
+    def _run_chunks(self, function, chunks, timeout):
+        if not chunks:
+            return []
+        rdd = self.sc.parallelize(chunks, len(chunks))
+        return rdd.map(partial(run_chunk, function, timeout=timeout)).collect()
+
+
+_DEFAULT_EXECUTOR = None
+
+
+def set_default_executor(executor=None):
+    """Set the executor used by pipeline stages which are not given one.
+
+    Args:
+        executor (Executor): Executor to use, unset to run stages serially again
+
+    """
+    global _DEFAULT_EXECUTOR
+    _DEFAULT_EXECUTOR = executor
+
+
+def get_default_executor():
+    """Get the executor used by pipeline stages which are not given one.
+
+    Returns:
+        Executor: The executor set with :func:`set_default_executor`, otherwise a :class:`Serial` executor
+
+    """
+    if _DEFAULT_EXECUTOR is None:
+        return Serial()
+    return _DEFAULT_EXECUTOR
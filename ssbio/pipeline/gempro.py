@@ -7,14 +7,16 @@ import logging
 import os
 import os.path as op
 import shutil
+from collections import OrderedDict
 from copy import copy
+from functools import partial
 
 import pandas as pd
 from Bio import SeqIO
 from bioservices import KEGG
 from bioservices import UniProt
 from cobra.core import DictList
-from six.moves.urllib.error import HTTPError
+from six.moves.urllib.error import URLError
 from slugify import Slugify
 
 import ssbio.core.modelpro
@@ -31,8 +33,10 @@ from ssbio import utils
 from ssbio.core.genepro import GenePro
 from ssbio.core.modelpro import ModelPro
 from ssbio.core.object import Object
+from ssbio.core.protein_store import ProteinStore
 from ssbio.databases.kegg import KEGGProp
 from ssbio.databases.uniprot import UniProtProp
+from ssbio.pipeline.executor import Spark, get_default_executor
 from ssbio.protein.sequence.properties.scratch import SCRATCH
 
 if utils.is_ipynb():
@@ -49,6 +53,49 @@ bs_unip = UniProt()
 bs_kegg = KEGG()
 
 
+def _call_protein_method(protein, method_name, kwargs, return_value=False):
+    """Run a method of a Protein in a GEM-PRO stage, returning the Protein and optionally the method's return value"""
+    value = getattr(protein, method_name)(**kwargs)
+    return protein, value if return_value else None
+
+
+def _load_kegg(protein, kegg_mappings, kegg_organism_code, set_as_representative, force_rerun):
+    """Load the downloaded KEGG files of a Protein in the KEGG mapping stage"""
+    kegg_g, uniprot_id, kegg_seq_file, kegg_metadata_file = kegg_mappings[protein.id]
+    kegg_prop = protein.load_kegg(kegg_id=kegg_g, kegg_organism_code=kegg_organism_code,
+                                  kegg_seq_file=kegg_seq_file, kegg_metadata_file=kegg_metadata_file,
+                                  set_as_representative=set_as_representative, force_rerun=force_rerun)
+
+    # Update potentially old UniProt ID
+    kegg_prop.uniprot = uniprot_id
+    if protein.representative_sequence:
+        if protein.representative_sequence.kegg == kegg_prop.kegg:
+            protein.representative_sequence.uniprot = uniprot_id
+
+    log.debug('{}: loaded KEGG information for gene'.format(protein.id))
+
+    # Keep track of missing mappings - missing is defined by no available sequence
+    return protein, bool(kegg_prop.sequence_file)
+
+
+def _load_uniprot(protein, uniprot_files, set_as_representative, force_rerun):
+    """Load the downloaded UniProt files of a Protein in the UniProt mapping stage"""
+    num_mapped = 0
+    for mapped_uniprot, files in uniprot_files[protein.id]:
+        if not files['xml'] or not files['fasta']:
+            log.error('{}, {}: unable to complete web request'.format(protein.id, mapped_uniprot))
+            continue
+
+        uniprot_prop = protein.load_uniprot(uniprot_id=mapped_uniprot, uniprot_seq_file=files['fasta'],
+                                            uniprot_xml_file=files['xml'],
+                                            set_as_representative=set_as_representative,
+                                            force_rerun=force_rerun)
+
+        if uniprot_prop.sequence_file or uniprot_prop.metadata_file:
+            num_mapped += 1
+    return protein, num_mapped
+
+
 class GEMPRO(Object):
 
     """Generic class to represent all information for a GEM-PRO project.
@@ -123,6 +170,11 @@ class GEMPRO(Object):
         """str: Simple link to the filepath of the FASTA file containing all protein sequences"""
         self.model = None
         """Model: COBRApy model object"""
+        self.protein_store = None
+        """ProteinStore: Store of all genes' Proteins, set with ``save_protein_store`` or ``load_protein_store``"""
+        self.gene_errors = {}
+        """dict: Errors of the last run of each per-gene stage, as stage names to dictionaries of gene IDs to their
+        ``TaskError``"""
 
         # Create directories
         self._root_dir = None
@@ -336,10 +388,70 @@ class GEMPRO(Object):
 
         log.info('Added {} genes to GEM-PRO project'.format(len(self.genes)-orig_num_genes))
 
+    def _run_gene_stage(self, function, stage, genes=None, executor=None):
+        """Run a function on the Protein of each gene with an executor, capturing the errors of each gene and merging
+        the modified Proteins back into the genes.
+
+        Args:
+            function (callable): Function taking a Protein and returning a tuple of the modified Protein and a value,
+                must be picklable (a module level function or a ``functools.partial`` of one) to run it with a
+                ``ProcessPool`` or ``Spark`` executor
+            stage (str): Name of the stage, used as the key of its errors in ``gene_errors``
+            genes (list): Genes to run the function for, all genes if not set
+            executor (Executor): Executor to run the function with, see ``ssbio.pipeline.executor``. The default
+                executor (serial unless set with ``set_default_executor``) is used if not set.
+
+        Returns:
+            OrderedDict: Gene IDs to the value returned by the function, for genes which ran without errors
+
+        """
+        if genes is None:
+            genes = self.genes
+        if not executor:
+            executor = get_default_executor()
+
+        results = executor.map(function, [g.protein for g in genes], description=stage)
+
+        values = OrderedDict()
+        errors = OrderedDict()
+        for g, task in zip(genes, results):
+            if not task.ok:
+                errors[g.id] = task.error
+                log.error('{}: {} failed, {}'.format(g.id, stage, task.error))
+                log.debug(task.error.traceback)
+                continue
+            protein, value = task.result
+            # Proteins run in other processes are copies, replace the gene's Protein with the modified one
+            if protein is not g.protein:
+                g.protein = protein
+            values[g.id] = value
+
+        if not hasattr(self, 'gene_errors'):
+            self.gene_errors = {}
+        self.gene_errors[stage] = errors
+        if errors:
+            log.warning('{}/{}: number of genes with errors in {}. See the "gene_errors" attribute for the errors of '
+                        'each gene.'.format(len(errors), len(genes), stage))
+        return values
+
+    def _run_protein_method(self, method_name, genes=None, executor=None, return_value=False, **kwargs):
+        """Run a method of the Protein of each gene with an executor, see ``_run_gene_stage``"""
+        function = partial(_call_protein_method, method_name=method_name, kwargs=kwargs, return_value=return_value)
+        return self._run_gene_stage(function, stage=method_name, genes=genes, executor=executor)
+
     ####################################################################################################################
     ### SEQUENCE RELATED METHODS ###
+    @staticmethod
+    def _download_outdir(g, outdir, dir_attribute):
+        """Get the directory files of a gene are downloaded to, the gene's own directory if outdir is not set"""
+        if not outdir:
+            outdir = getattr(g.protein, dir_attribute)
+            if not outdir:
+                raise ValueError('Output directory must be specified')
+        return outdir
+
     def kegg_mapping_and_metadata(self, kegg_organism_code, custom_gene_mapping=None, outdir=None,
-                                  set_as_representative=False, force_rerun=False):
+                                  set_as_representative=False, force_rerun=False, executor=None):
         """Map all genes in the model to KEGG IDs using the KEGG service.
 
         Steps:
@@ -356,53 +468,43 @@ class GEMPRO(Object):
                 were not created initially
             set_as_representative (bool): If mapped KEGG IDs should be set as representative sequences
             force_rerun (bool): If you want to overwrite any existing mappings and files
+            executor (Executor): Executor to load the files of each gene with, see ``ssbio.pipeline.executor``
 
         """
 
         # First map all of the organism's KEGG genes to UniProt
         kegg_to_uniprot = ssbio.databases.kegg.map_kegg_all_genes(organism_code=kegg_organism_code, target_db='uniprot')
 
-        successfully_mapped_counter = 0
-
-        for g in tqdm(self.genes):
-            if custom_gene_mapping:
-                kegg_g = custom_gene_mapping[g.id]
+        # Download all FASTA and KEGG metadata files at once
+        to_download = OrderedDict()
+        for g in self.genes:
+            kegg_g = custom_gene_mapping[g.id] if custom_gene_mapping else g.id
+            if kegg_g in kegg_to_uniprot:
+                to_download[g.id] = (kegg_g, self._download_outdir(g, outdir, 'sequence_dir'))
             else:
-                kegg_g = g.id
-
-            if kegg_g not in kegg_to_uniprot:
                 log.debug('{}: unable to map to KEGG'.format(g.id))
-                continue
-
-            # Download both FASTA and KEGG metadata files
-            kegg_prop = g.protein.load_kegg(kegg_id=kegg_g, kegg_organism_code=kegg_organism_code,
-                                            download=True, outdir=outdir, set_as_representative=set_as_representative,
-                                            force_rerun=force_rerun)
-
-            # Update potentially old UniProt ID
-            if kegg_g in kegg_to_uniprot.keys():
-                kegg_prop.uniprot = kegg_to_uniprot[kegg_g]
-                if g.protein.representative_sequence:
-                    if g.protein.representative_sequence.kegg == kegg_prop.kegg:
-                        g.protein.representative_sequence.uniprot = kegg_to_uniprot[kegg_g]
-
-            # Keep track of missing mappings - missing is defined by no available sequence
-            if kegg_prop.sequence_file:
-                successfully_mapped_counter += 1
-
-            log.debug('{}: loaded KEGG information for gene'.format(g.id))
+        kegg_files = dict(zip(to_download.keys(), ssbio.databases.kegg.download_kegg_files(
+                ['{}:{}'.format(kegg_organism_code, x[0]) for x in to_download.values()], outdirs=[x[1] for x in to_download.values()],
+                force_rerun=force_rerun)))
+
+        # Load both FASTA and KEGG metadata files
+        kegg_mappings = {}
+        for g_id, (kegg_g, _) in to_download.items():
+            kegg_mappings[g_id] = (kegg_g, kegg_to_uniprot[kegg_g]) + tuple(kegg_files[g_id])
+        function = partial(_load_kegg, kegg_mappings=kegg_mappings, kegg_organism_code=kegg_organism_code,
+                           set_as_representative=set_as_representative, force_rerun=force_rerun)
+        mapped = self._run_gene_stage(function, stage='kegg_mapping_and_metadata',
+                                      genes=[self.genes.get_by_id(x) for x in to_download], executor=executor)
+        successfully_mapped_counter = sum(mapped.values())
 
         log.info('{}/{}: number of genes mapped to KEGG'.format(successfully_mapped_counter, len(self.genes)))
         log.info('Completed ID mapping --> KEGG. See the "df_kegg_metadata" attribute for a summary dataframe.')
 
     def kegg_mapping_and_metadata_parallelize(self, sc, kegg_organism_code, custom_gene_mapping=None, outdir=None,
                                               set_as_representative=False, force_rerun=False):
-        """Map all genes in the model to KEGG IDs using the KEGG service.
+        """Map all genes in the model to KEGG IDs using the KEGG service, loading the files of each gene with Spark.
 
-        Steps:
-            1. Download all metadata and sequence files in the sequences directory
-            2. Creates a KEGGProp object in the protein.sequences attribute
-            3. Returns a Pandas DataFrame of mapping results
+        Same as ``kegg_mapping_and_metadata`` with a ``Spark`` executor.
 
         Args:
             sc (SparkContext): Spark Context to parallelize this function
@@ -416,55 +518,9 @@ class GEMPRO(Object):
             force_rerun (bool): If you want to overwrite any existing mappings and files
 
         """
-
-        # First map all of the organism's KEGG genes to UniProt
-        kegg_to_uniprot = ssbio.databases.kegg.map_kegg_all_genes(organism_code=kegg_organism_code, target_db='uniprot')
-
-        # Parallelize the genes list
-        genes_rdd = sc.parallelize(self.genes)
-
-        # Write a sub-function to carry out the bulk of the original function
-        def gp_kegg_sc(g):
-            if custom_gene_mapping:
-                kegg_g = custom_gene_mapping[g.id]
-            else:
-                kegg_g = g.id
-
-            # Download both FASTA and KEGG metadata files
-            kegg_prop = g.protein.load_kegg(kegg_id=kegg_g, kegg_organism_code=kegg_organism_code,
-                                            download=True, outdir=outdir,
-                                            set_as_representative=set_as_representative,
-                                            force_rerun=force_rerun)
-
-            # Update potentially old UniProt ID
-            if kegg_g in kegg_to_uniprot.keys():
-                kegg_prop.uniprot = kegg_to_uniprot[kegg_g]
-                if g.protein.representative_sequence:
-                    if g.protein.representative_sequence.kegg == kegg_prop.kegg:
-                        g.protein.representative_sequence.uniprot = kegg_to_uniprot[kegg_g]
-
-            # Tracker for if it mapped successfully to KEGG
-            if kegg_prop.sequence_file:
-                success = True
-            else:
-                success = False
-
-            return g, success
-
-        # Run a map operation to execute the function on all items in the RDD
-        result = genes_rdd.map(gp_kegg_sc).collect()
-
-        # Copy the results over to the GEM-PRO object's genes using the GenePro function "copy_modified_gene"
-        # Also count how many genes mapped to KEGG
-        successfully_mapped_counter = 0
-        for modified_g, success in result:
-            original_gene = self.genes.get_by_id(modified_g.id)
-            original_gene.copy_modified_gene(modified_g)
-            if success:
-                successfully_mapped_counter += 1
-
-        log.info('{}/{}: number of genes mapped to KEGG'.format(successfully_mapped_counter, len(self.genes)))
-        log.info('Completed ID mapping --> KEGG. See the "df_kegg_metadata" attribute for a summary dataframe.')
+        self.kegg_mapping_and_metadata(kegg_organism_code=kegg_organism_code, custom_gene_mapping=custom_gene_mapping,
+                                       outdir=outdir, set_as_representative=set_as_representative,
+                                       force_rerun=force_rerun, executor=Spark(sc))
 
     @property
     def df_kegg_metadata(self):
@@ -503,7 +559,7 @@ class GEMPRO(Object):
         return list(set(kegg_missing))
 
     def uniprot_mapping_and_metadata(self, model_gene_source, custom_gene_mapping=None, outdir=None,
-                                     set_as_representative=False, force_rerun=False):
+                                     set_as_representative=False, force_rerun=False, executor=None):
         """Map all genes in the model to UniProt IDs using the UniProt mapping service.
         Also download all metadata and sequences.
 
@@ -523,6 +579,7 @@ class GEMPRO(Object):
                 were not created initially
             set_as_representative (bool): If mapped UniProt IDs should be set as representative sequences
             force_rerun (bool): If you want to overwrite any existing mappings and files
+            executor (Executor): Executor to load the files of each gene with, see ``ssbio.pipeline.executor``
 
         """
 
@@ -535,8 +592,19 @@ class GEMPRO(Object):
         # Map all IDs first to available UniProts
         genes_to_uniprots = bs_unip.mapping(fr=model_gene_source, to='ACC', query=genes_to_map)
 
-        successfully_mapped_counter = 0
-        for g in tqdm(self.genes):
+        # Download all metadata and sequence files at once
+        to_download = []
+        for g in self.genes:
+            uniprot_gene = custom_gene_mapping.get(g.id, g.id) if custom_gene_mapping else g.id
+            for mapped_uniprot in genes_to_uniprots.get(uniprot_gene, []):
+                to_download.append((mapped_uniprot, self._download_outdir(g, outdir, 'sequence_dir')))
+        uniprot_files = dict(zip(to_download, ssbio.databases.uniprot.download_uniprot_files(
+                [x[0] for x in to_download], filetypes=['xml', 'fasta'], outdirs=[x[1] for x in to_download],
+                force_rerun=force_rerun)))
+
+        # Load the files of all UniProt IDs mapped to each gene
+        gene_uniprot_files = OrderedDict()
+        for g in self.genes:
             if custom_gene_mapping and g.id in custom_gene_mapping.keys():
                 uniprot_gene = custom_gene_mapping[g.id]
             else:
@@ -546,18 +614,14 @@ class GEMPRO(Object):
                 log.debug('{}: unable to map to UniProt'.format(g.id))
                 continue
 
-            for mapped_uniprot in genes_to_uniprots[uniprot_gene]:
-                try:
-                    uniprot_prop = g.protein.load_uniprot(uniprot_id=mapped_uniprot, download=True, outdir=outdir,
-                                                          set_as_representative=set_as_representative,
-                                                          force_rerun=force_rerun)
-                except HTTPError as e:
-                    log.error('{}, {}: unable to complete web request'.format(g.id, mapped_uniprot))
-                    print(e)
-                    continue
+            gene_uniprot_files[g.id] = [(x, uniprot_files[(x, self._download_outdir(g, outdir, 'sequence_dir'))])
+                                        for x in genes_to_uniprots[uniprot_gene]]
 
-                if uniprot_prop.sequence_file or uniprot_prop.metadata_file:
-                    successfully_mapped_counter += 1
+        function = partial(_load_uniprot, uniprot_files=gene_uniprot_files,
+                           set_as_representative=set_as_representative, force_rerun=force_rerun)
+        mapped = self._run_gene_stage(function, stage='uniprot_mapping_and_metadata',
+                                      genes=[self.genes.get_by_id(x) for x in gene_uniprot_files], executor=executor)
+        successfully_mapped_counter = sum(mapped.values())
 
         log.info('{}/{}: number of genes mapped to UniProt'.format(successfully_mapped_counter, len(self.genes)))
         log.info('Completed ID mapping --> UniProt. See the "df_uniprot_metadata" attribute for a summary dataframe.')
@@ -589,7 +653,7 @@ class GEMPRO(Object):
                 uniprot_prop = gene.protein.load_uniprot(uniprot_id=u,
                                                          outdir=outdir, download=True,
                                                          set_as_representative=set_as_representative)
-            except HTTPError as e:
+            except URLError as e:
                 log.error('{}, {}: unable to complete web request'.format(g, u))
                 print(e)
                 continue
@@ -668,7 +732,7 @@ class GEMPRO(Object):
 
         log.info('Loaded in {} sequences'.format(len(gene_to_seq_dict)))
 
-    def set_representative_sequence(self, force_rerun=False):
+    def set_representative_sequence(self, force_rerun=False, executor=None):
         """Automatically consolidate loaded sequences (manual, UniProt, or KEGG) and set a single representative sequence.
 
         Manually set representative sequences override all existing mappings. UniProt mappings override KEGG mappings
@@ -676,18 +740,13 @@ class GEMPRO(Object):
 
         Args:
             force_rerun (bool): Set to True to recheck stored sequences
+            executor (Executor): Executor to run each gene with, see ``ssbio.pipeline.executor``
 
         """
 
         # TODO: rethink use of multiple database sources - may lead to inconsistency with genome sources
 
-        successfully_mapped_counter = 0
-        for g in tqdm(self.genes):
-            repseq = g.protein.set_representative_sequence(force_rerun=force_rerun)
-
-            if repseq:
-                if repseq.sequence_file:
-                    successfully_mapped_counter += 1
+        self._run_protein_method('set_representative_sequence', executor=executor, force_rerun=force_rerun)
 
         log.info('{}/{}: number of genes with a representative sequence'.format(len(self.genes_with_a_representative_sequence),
                                                                                 len(self.genes)))
@@ -749,28 +808,31 @@ class GEMPRO(Object):
         self.genome_path = outfile
         return self.genome_path
 
-    def get_sequence_properties(self, clean_seq=False, representatives_only=True):
+    def get_sequence_properties(self, clean_seq=False, representatives_only=True, executor=None):
         """Run Biopython ProteinAnalysis and EMBOSS pepstats to summarize basic statistics of all protein sequences.
         Results are stored in the protein's respective SeqProp objects at ``.annotations``
 
         Args:
             representative_only (bool): If analysis should only be run on the representative sequences
+            executor (Executor): Executor to run each gene with, see ``ssbio.pipeline.executor``
 
         """
-        for g in tqdm(self.genes):
-            g.protein.get_sequence_properties(clean_seq=clean_seq, representative_only=representatives_only)
+        self._run_protein_method('get_sequence_properties', executor=executor,
+                                 clean_seq=clean_seq, representative_only=representatives_only)
 
-    def get_sequence_sliding_window_properties(self, scale, window, representatives_only=True):
-        """Run Biopython ProteinAnalysis and EMBOSS pepstats to summarize basic statistics of all protein sequences.
-        Results are stored in the protein's respective SeqProp objects at ``.annotations``
+    def get_sequence_sliding_window_properties(self, scale, window, representatives_only=True, executor=None):
+        """Run Biopython ProteinAnalysis with a sliding window to calculate a given property for all protein sequences.
+        Results are stored in the protein's respective SeqProp objects at ``.letter_annotations``
 
         Args:
+            scale (str, list): Scale name, or a list of scale names
+            window (int, list): Sliding window size, or a list of sizes
             representative_only (bool): If analysis should only be run on the representative sequences
+            executor (Executor): Executor to run each gene with, see ``ssbio.pipeline.executor``
 
         """
-        for g in tqdm(self.genes):
-            g.protein.get_sequence_sliding_window_properties(scale=scale, window=window,
-                                                             representative_only=representatives_only)
+        self._run_protein_method('get_sequence_sliding_window_properties', executor=executor,
+                                 scale=scale, window=window, representative_only=representatives_only)
 
     def get_scratch_predictions(self, path_to_scratch, results_dir, scratch_basename='scratch', num_cores=1,
                                 exposed_buried_cutoff=25, custom_gene_mapping=None):
@@ -893,7 +955,7 @@ class GEMPRO(Object):
     ####################################################################################################################
     ### STRUCTURE RELATED METHODS ###
     def blast_seqs_to_pdb(self, seq_ident_cutoff=0, evalue=0.0001, all_genes=False, display_link=False,
-                          outdir=None, force_rerun=False):
+                          outdir=None, force_rerun=False, executor=None):
         """BLAST each representative protein sequence to the PDB. Saves raw BLAST results (XML files).
 
         Args:
@@ -905,30 +967,31 @@ class GEMPRO(Object):
             outdir (str): Path to output directory of downloaded files, must be set if GEM-PRO directories
                 were not created initially
             force_rerun (bool, optional): If existing BLAST results should not be used, set to True. Default is False
+            executor (Executor): Executor to run each gene with, see ``ssbio.pipeline.executor``
 
         """
-        counter = 0
-
-        for g in tqdm(self.genes_with_a_representative_sequence):
+        to_blast = []
+        for g in self.genes_with_a_representative_sequence:
             # If all_genes=False, BLAST only genes without a uniprot -> pdb mapping
             if g.protein.num_structures_experimental > 0 and not all_genes and not force_rerun:
                 log.debug('{}: skipping BLAST, {} experimental structures already mapped '
                           'and all_genes flag is False'.format(g.id,
                                                                g.protein.num_structures_experimental))
                 continue
+            to_blast.append(g)
 
-            # BLAST the sequence to the PDB
-            new_pdbs = g.protein.blast_representative_sequence_to_pdb(seq_ident_cutoff=seq_ident_cutoff,
-                                                                   evalue=evalue,
-                                                                   display_link=display_link,
-                                                                   outdir=outdir,
-                                                                   force_rerun=force_rerun)
+        # BLAST the sequence to the PDB
+        blasted = self._run_protein_method('blast_representative_sequence_to_pdb', genes=to_blast, executor=executor,
+                                           return_value=True, seq_ident_cutoff=seq_ident_cutoff, evalue=evalue,
+                                           display_link=display_link, outdir=outdir, force_rerun=force_rerun)
 
+        counter = 0
+        for g_id, new_pdbs in blasted.items():
             if new_pdbs:
                 counter += 1
-                log.debug('{}: {} PDBs BLASTed'.format(g.id, len(new_pdbs)))
+                log.debug('{}: {} PDBs BLASTed'.format(g_id, len(new_pdbs)))
             else:
-                log.debug('{}: no BLAST results'.format(g.id))
+                log.debug('{}: no BLAST results'.format(g_id))
 
         log.info('Completed sequence --> PDB BLAST. See the "df_pdb_blast" attribute for a summary dataframe.')
         log.info('{}: number of genes with additional structures added from BLAST'.format(counter))
@@ -949,7 +1012,7 @@ class GEMPRO(Object):
         else:
             return ssbio.utils.clean_df(df.set_index('gene'))
 
-    def map_uniprot_to_pdb(self, seq_ident_cutoff=0.0, outdir=None, force_rerun=False):
+    def map_uniprot_to_pdb(self, seq_ident_cutoff=0.0, outdir=None, force_rerun=False, executor=None):
         """Map all representative sequences' UniProt ID to PDB IDs using the PDBe "Best Structures" API.
         Will save a JSON file of the results to each protein's ``sequences`` folder.
 
@@ -961,6 +1024,7 @@ class GEMPRO(Object):
             seq_ident_cutoff (float): Sequence identity cutoff in decimal form
             outdir (str): Output directory to cache JSON results of search
             force_rerun (bool): Force re-downloading of JSON results if they already exist
+            executor (Executor): Executor to run each gene with, see ``ssbio.pipeline.executor``
 
         Returns:
             list: A rank-ordered list of PDBProp objects that map to the UniProt ID
@@ -979,21 +1043,21 @@ class GEMPRO(Object):
         log.info('Mapping UniProt IDs --> PDB IDs...')
         uniprots_to_pdbs = bs_unip.mapping(fr='ACC', to='PDB_ID', query=all_representative_uniprots)
 
-        counter = 0
-        # Now run the best_structures API for all genes
-        for g in tqdm(self.genes_with_a_representative_sequence):
+        to_map = []
+        for g in self.genes_with_a_representative_sequence:
             uniprot_id = g.protein.representative_sequence.uniprot
             if uniprot_id:
                 if '-' in uniprot_id:
                     uniprot_id = uniprot_id.split('-')[0]
                 if uniprot_id in uniprots_to_pdbs:
-                    best_structures = g.protein.map_uniprot_to_pdb(seq_ident_cutoff=seq_ident_cutoff, outdir=outdir, force_rerun=force_rerun)
-                    if best_structures:
-                        counter += 1
-                        log.debug('{}: {} PDBs mapped'.format(g.id, len(best_structures)))
+                    to_map.append(g)
                 else:
                     log.debug('{}, {}: no PDBs available'.format(g.id, uniprot_id))
 
+        # Now run the best_structures API for all genes
+        self._run_protein_method('map_uniprot_to_pdb', genes=to_map, executor=executor,
+                                 seq_ident_cutoff=seq_ident_cutoff, outdir=outdir, force_rerun=force_rerun)
+
         log.info('{}/{}: number of genes with at least one experimental structure'.format(len(self.genes_with_experimental_structures),
                                                                                           len(self.genes)))
         log.info('Completed UniProt --> best PDB mapping. See the "df_pdb_ranking" attribute for a summary dataframe.')
@@ -1159,7 +1223,7 @@ class GEMPRO(Object):
                                      seq_ident_cutoff=0.5, allow_missing_on_termini=0.2,
                                      allow_mutants=True, allow_deletions=False,
                                      allow_insertions=False, allow_unresolved=True, skip_large_structures=False,
-                                     clean=True, force_rerun=False):
+                                     clean=True, force_rerun=False, executor=None):
         """Set all representative structure for proteins from a structure in the structures attribute.
 
         Each gene can have a combination of the following, which will be analyzed to set a representative structure.
@@ -1177,9 +1241,10 @@ class GEMPRO(Object):
             struct_outdir (str): Path to output directory of structure files, must be set if GEM-PRO directories
                 were not created initially
             pdb_file_type (str): ``pdb``, ``mmCif``, ``xml``, ``mmtf`` - file type for files downloaded from the PDB
-            engine (str): ``biopython`` or ``needle`` - which pairwise alignment program to use.
+            engine (str): ``biopython``, ``needle``, or ``numpy`` - which pairwise alignment program to use.
                 ``needle`` is the standard EMBOSS tool to run pairwise alignments.
                 ``biopython`` is Biopython's implementation of needle. Results can differ!
+                ``numpy`` is an in-process implementation of needle, no alignment files are written.
             always_use_homology (bool): If homology models should always be set as the representative structure
             rez_cutoff (float): Resolution cutoff, in Angstroms (only if experimental structure)
             seq_ident_cutoff (float): Percent sequence identity cutoff, in decimal form
@@ -1196,27 +1261,29 @@ class GEMPRO(Object):
                 and not clean it. If you don't want this to happen, set this to true.
             clean (bool): If structures should be cleaned
             force_rerun (bool): If sequence to structure alignment should be rerun
+            executor (Executor): Executor to run each gene with, see ``ssbio.pipeline.executor``. For example,
+                ``ProcessPool(32)`` runs 32 genes at a time on the local machine.
 
         Todo:
             - Remedy large structure representative setting
 
         """
-        for g in tqdm(self.genes):
-            repstruct = g.protein.set_representative_structure(seq_outdir=seq_outdir,
-                                                               struct_outdir=struct_outdir,
-                                                               pdb_file_type=pdb_file_type,
-                                                               engine=engine,
-                                                               rez_cutoff=rez_cutoff,
-                                                               seq_ident_cutoff=seq_ident_cutoff,
-                                                               always_use_homology=always_use_homology,
-                                                               allow_missing_on_termini=allow_missing_on_termini,
-                                                               allow_mutants=allow_mutants,
-                                                               allow_deletions=allow_deletions,
-                                                               allow_insertions=allow_insertions,
-                                                               allow_unresolved=allow_unresolved,
-                                                               skip_large_structures=skip_large_structures,
-                                                               clean=clean,
-                                                               force_rerun=force_rerun)
+        self._run_protein_method('set_representative_structure', executor=executor,
+                                 seq_outdir=seq_outdir,
+                                 struct_outdir=struct_outdir,
+                                 pdb_file_type=pdb_file_type,
+                                 engine=engine,
+                                 rez_cutoff=rez_cutoff,
+                                 seq_ident_cutoff=seq_ident_cutoff,
+                                 always_use_homology=always_use_homology,
+                                 allow_missing_on_termini=allow_missing_on_termini,
+                                 allow_mutants=allow_mutants,
+                                 allow_deletions=allow_deletions,
+                                 allow_insertions=allow_insertions,
+                                 allow_unresolved=allow_unresolved,
+                                 skip_large_structures=skip_large_structures,
+                                 clean=clean,
+                                 force_rerun=force_rerun)
 
         log.info('{}/{}: number of genes with a representative structure'.format(len(self.genes_with_a_representative_structure),
                                                                                  len(self.genes)))
@@ -1228,38 +1295,22 @@ class GEMPRO(Object):
                                      allow_mutants=True, allow_deletions=False,
                                      allow_insertions=False, allow_unresolved=True, skip_large_structures=False,
                                      clean=True, force_rerun=False):
-        def set_repstruct(g, seq_outdir=seq_outdir, struct_outdir=struct_outdir,
-                          pdb_file_type=pdb_file_type, engine=engine,
-                          rez_cutoff=rez_cutoff, seq_ident_cutoff=seq_ident_cutoff,
-                          always_use_homology=always_use_homology,
-                          allow_missing_on_termini=allow_missing_on_termini,
-                          allow_mutants=allow_mutants, allow_deletions=allow_deletions,
-                          allow_insertions=allow_insertions, allow_unresolved=allow_unresolved,
-                          skip_large_structures=skip_large_structures,
-                          clean=clean, force_rerun=force_rerun):
-            g.protein.set_representative_structure(seq_outdir=seq_outdir, struct_outdir=struct_outdir,
-                          pdb_file_type=pdb_file_type, engine=engine,
-                          rez_cutoff=rez_cutoff, seq_ident_cutoff=seq_ident_cutoff,
-                          always_use_homology=always_use_homology,
-                          allow_missing_on_termini=allow_missing_on_termini,
-                          allow_mutants=allow_mutants, allow_deletions=allow_deletions,
-                          allow_insertions=allow_insertions, allow_unresolved=allow_unresolved,
-                          skip_large_structures=skip_large_structures,
-                          clean=clean, force_rerun=force_rerun)
-            return g
-
-        genes_rdd = sc.parallelize(self.genes)
-        result = genes_rdd.map(set_repstruct).collect()
-
-        # Copy the results over to the GEM-PRO object's genes using the GenePro function "copy_modified_gene"
-        # Also count how many genes mapped to KEGG
-        for modified_g in result:
-            original_gene = self.genes.get_by_id(modified_g.id)
-            original_gene.copy_modified_gene(modified_g)
+        """Set all representative structure for proteins with Spark, same as ``set_representative_structure`` with a
+        ``Spark`` executor.
 
-        log.info('{}/{}: number of genes with a representative structure'.format(len(self.genes_with_a_representative_structure),
-                                                                                 len(self.genes)))
-        log.info('See the "df_representative_structures" attribute for a summary dataframe.')
+        Args:
+            sc (SparkContext): Spark Context to parallelize this function
+
+        """
+        self.set_representative_structure(seq_outdir=seq_outdir, struct_outdir=struct_outdir,
+                                          pdb_file_type=pdb_file_type, engine=engine,
+                                          always_use_homology=always_use_homology, rez_cutoff=rez_cutoff,
+                                          seq_ident_cutoff=seq_ident_cutoff,
+                                          allow_missing_on_termini=allow_missing_on_termini,
+                                          allow_mutants=allow_mutants, allow_deletions=allow_deletions,
+                                          allow_insertions=allow_insertions, allow_unresolved=allow_unresolved,
+                                          skip_large_structures=skip_large_structures, clean=clean,
+                                          force_rerun=force_rerun, executor=Spark(sc))
 
     @property
     def df_representative_structures(self):
@@ -1333,7 +1384,7 @@ class GEMPRO(Object):
         log.info('Prepared I-TASSER modeling folders for {} genes in folder {}'.format(counter,
                                                                                        self.homology_models_dir))
 
-    def pdb_downloader_and_metadata(self, outdir=None, pdb_file_type=None, force_rerun=False):
+    def pdb_downloader_and_metadata(self, outdir=None, pdb_file_type=None, force_rerun=False, executor=None):
         """Download ALL mapped experimental structures to each protein's structures directory.
 
         Args:
@@ -1341,31 +1392,41 @@ class GEMPRO(Object):
                 desired
             pdb_file_type (str): Type of PDB file to download, if not already set or other format is desired
             force_rerun (bool): If files should be re-downloaded if they already exist
+            executor (Executor): Executor to load the metadata of each gene with, see ``ssbio.pipeline.executor``
 
         """
 
         if not pdb_file_type:
             pdb_file_type = self.pdb_file_type
 
-        counter = 0
-        for g in tqdm(self.genes):
-            pdbs = g.protein.pdb_downloader_and_metadata(outdir=outdir, pdb_file_type=pdb_file_type, force_rerun=force_rerun)
+        # Download all structure files at once, they are then loaded from the output directories
+        to_download = []
+        for g in self.genes:
+            for s in g.protein.get_experimental_structures():
+                to_download.append((s.id, self._download_outdir(g, outdir, 'structure_dir')))
+        ssbio.databases.pdb.download_structure_files([x[0] for x in to_download], outdirs=[x[1] for x in to_download],
+                                                     file_type=pdb_file_type, header_files=pdb_file_type != 'mmtf',
+                                                     force_rerun=force_rerun)
 
-            if pdbs:
-                counter += len(pdbs)
+        downloaded = self._run_protein_method('pdb_downloader_and_metadata', executor=executor, return_value=True,
+                                              outdir=outdir, pdb_file_type=pdb_file_type)
+        counter = sum(len(pdbs) for pdbs in downloaded.values() if pdbs)
 
         log.info('Updated PDB metadata dataframe. See the "df_pdb_metadata" attribute for a summary dataframe.')
         log.info('Saved {} structures total'.format(counter))
 
-    def download_all_pdbs(self, outdir=None, pdb_file_type=None, load_metadata=False, force_rerun=False):
+    def download_all_pdbs(self, outdir=None, pdb_file_type=None, load_metadata=False, force_rerun=False,
+                          executor=None):
         if not pdb_file_type:
             pdb_file_type = self.pdb_file_type
 
+        downloaded = self._run_protein_method('download_all_pdbs', executor=executor, return_value=True,
+                                              outdir=outdir, pdb_file_type=pdb_file_type,
+                                              load_metadata=load_metadata, force_rerun=force_rerun)
         all_structures = []
-        for g in tqdm(self.genes):
-            pdbs = g.protein.download_all_pdbs(outdir=outdir, pdb_file_type=pdb_file_type,
-                                               load_metadata=load_metadata, force_rerun=force_rerun)
-            all_structures.extend(pdbs)
+        for pdbs in downloaded.values():
+            if pdbs:
+                all_structures.extend(pdbs)
         return list(set(all_structures))
 
     @property
@@ -1408,7 +1469,7 @@ class GEMPRO(Object):
         else:
             return ssbio.utils.clean_df(df)
 
-    def get_dssp_annotations(self, representatives_only=True, force_rerun=False):
+    def get_dssp_annotations(self, representatives_only=True, force_rerun=False, executor=None):
         """Run DSSP on structures and store calculations.
 
         Annotations are stored in the protein structure's chain sequence at:
@@ -1417,34 +1478,25 @@ class GEMPRO(Object):
         Args:
             representative_only (bool): If analysis should only be run on the representative structure
             force_rerun (bool): If calculations should be rerun even if an output file exists
+            executor (Executor): Executor to run each gene with, see ``ssbio.pipeline.executor``
 
         """
-        for g in tqdm(self.genes):
-            g.protein.get_dssp_annotations(representative_only=representatives_only, force_rerun=force_rerun)
+        self._run_protein_method('get_dssp_annotations', executor=executor,
+                                 representative_only=representatives_only, force_rerun=force_rerun)
 
     def get_dssp_annotations_parallelize(self, sc, representatives_only=True, force_rerun=False):
-        """Run DSSP on structures and store calculations.
-
-        Annotations are stored in the protein structure's chain sequence at:
-        ``<chain_prop>.seq_record.letter_annotations['*-dssp']``
+        """Run DSSP on structures and store calculations, same as ``get_dssp_annotations`` with a ``Spark`` executor.
 
         Args:
+            sc (SparkContext): Spark Context to parallelize this function
             representative_only (bool): If analysis should only be run on the representative structure
             force_rerun (bool): If calculations should be rerun even if an output file exists
 
         """
-        genes_rdd = sc.parallelize(self.genes)
-
-        def get_dssp_annotation(g):
-            g.protein.get_dssp_annotations(representative_only=representatives_only, force_rerun=force_rerun)
-            return g
-
-        result = genes_rdd.map(get_dssp_annotation).collect()
-        for modified_g in result:
-            original_gene = self.genes.get_by_id(modified_g.id)
-            original_gene.copy_modified_gene(modified_g)
+        self.get_dssp_annotations(representatives_only=representatives_only, force_rerun=force_rerun,
+                                  executor=Spark(sc))
 
-    def get_msms_annotations(self, representatives_only=True, force_rerun=False):
+    def get_msms_annotations(self, representatives_only=True, force_rerun=False, executor=None):
         """Run MSMS on structures and store calculations.
 
         Annotations are stored in the protein structure's chain sequence at:
@@ -1453,34 +1505,26 @@ class GEMPRO(Object):
         Args:
             representative_only (bool): If analysis should only be run on the representative structure
             force_rerun (bool): If calculations should be rerun even if an output file exists
+            executor (Executor): Executor to run each gene with, see ``ssbio.pipeline.executor``
 
         """
-        for g in tqdm(self.genes):
-            g.protein.get_msms_annotations(representative_only=representatives_only, force_rerun=force_rerun)
+        self._run_protein_method('get_msms_annotations', executor=executor,
+                                 representative_only=representatives_only, force_rerun=force_rerun)
 
     def get_msms_annotations_parallelize(self, sc, representatives_only=True, force_rerun=False):
-        """Run MSMS on structures and store calculations.
-
-        Annotations are stored in the protein structure's chain sequence at:
-        ``<chain_prop>.seq_record.letter_annotations['*-msms']``
+        """Run MSMS on structures and store calculations, same as ``get_msms_annotations`` with a ``Spark`` executor.
 
         Args:
+            sc (SparkContext): Spark Context to parallelize this function
             representative_only (bool): If analysis should only be run on the representative structure
             force_rerun (bool): If calculations should be rerun even if an output file exists
 
         """
-        genes_rdd = sc.parallelize(self.genes)
-
-        def get_msms_annotation(g):
-            g.protein.get_msms_annotations(representative_only=representatives_only, force_rerun=force_rerun)
-            return g
-
-        result = genes_rdd.map(get_msms_annotation).collect()
-        for modified_g in result:
-            original_gene = self.genes.get_by_id(modified_g.id)
-            original_gene.copy_modified_gene(modified_g)
+        self.get_msms_annotations(representatives_only=representatives_only, force_rerun=force_rerun,
+                                  executor=Spark(sc))
 
-    def get_freesasa_annotations(self, include_hetatms=False, representatives_only=True, force_rerun=False):
+    def get_freesasa_annotations(self, include_hetatms=False, representatives_only=True, force_rerun=False,
+                                 executor=None):
         """Run freesasa on structures and store calculations.
 
         Annotations are stored in the protein structure's chain sequence at:
@@ -1490,53 +1534,39 @@ class GEMPRO(Object):
             include_hetatms (bool): If HETATMs should be included in calculations. Defaults to ``False``.
             representative_only (bool): If analysis should only be run on the representative structure
             force_rerun (bool): If calculations should be rerun even if an output file exists
+            executor (Executor): Executor to run each gene with, see ``ssbio.pipeline.executor``
 
         """
-        for g in tqdm(self.genes):
-            g.protein.get_freesasa_annotations(include_hetatms=include_hetatms,
-                                               representative_only=representatives_only,
-                                               force_rerun=force_rerun)
+        self._run_protein_method('get_freesasa_annotations', executor=executor,
+                                 include_hetatms=include_hetatms,
+                                 representative_only=representatives_only,
+                                 force_rerun=force_rerun)
 
     def get_freesasa_annotations_parallelize(self, sc, include_hetatms=False,
                                              representatives_only=True, force_rerun=False):
-        """Run freesasa on structures and store calculations.
-
-        Annotations are stored in the protein structure's chain sequence at:
-        ``<chain_prop>.seq_record.letter_annotations['*-freesasa']``
+        """Run freesasa on structures and store calculations, same as ``get_freesasa_annotations`` with a ``Spark``
+        executor.
 
         Args:
+            sc (SparkContext): Spark Context to parallelize this function
             include_hetatms (bool): If HETATMs should be included in calculations. Defaults to ``False``.
             representative_only (bool): If analysis should only be run on the representative structure
             force_rerun (bool): If calculations should be rerun even if an output file exists
 
         """
-        genes_rdd = sc.parallelize(self.genes)
-
-        def get_freesasa_annotation(g):
-            g.protein.get_freesasa_annotations(include_hetatms=include_hetatms,
-                                               representative_only=representatives_only,
-                                               force_rerun=force_rerun)
-            return g
+        self.get_freesasa_annotations(include_hetatms=include_hetatms, representatives_only=representatives_only,
+                                      force_rerun=force_rerun, executor=Spark(sc))
 
-        result = genes_rdd.map(get_freesasa_annotation).collect()
-        for modified_g in result:
-            original_gene = self.genes.get_by_id(modified_g.id)
-            original_gene.copy_modified_gene(modified_g)
-
-    def get_all_pdbflex_info(self):
-        counter = 0
+    def get_all_pdbflex_info(self, executor=None):
         logging.disable(logging.WARNING)
-        for g in tqdm(self.genes_with_a_representative_sequence):
-            try:
-                g.protein.get_all_pdbflex_info()
-                counter+=1
-            except Exception as e:
-                # log.exception(e)
-                continue
-        logging.disable(logging.NOTSET)
-        log.info('{}: successful PDB flex mappings'.format(counter))
-
-    def find_disulfide_bridges(self, representatives_only=True):
+        try:
+            mapped = self._run_protein_method('get_all_pdbflex_info', genes=self.genes_with_a_representative_sequence,
+                                              executor=executor)
+        finally:
+            logging.disable(logging.NOTSET)
+        log.info('{}: successful PDB flex mappings'.format(len(mapped)))
+
+    def find_disulfide_bridges(self, representatives_only=True, executor=None):
         """Run Biopython's disulfide bridge finder and store found bridges.
 
         Annotations are stored in the protein structure's chain sequence at:
@@ -1544,31 +1574,22 @@ class GEMPRO(Object):
 
         Args:
             representative_only (bool): If analysis should only be run on the representative structure
+            executor (Executor): Executor to run each gene with, see ``ssbio.pipeline.executor``
 
         """
-        for g in tqdm(self.genes):
-            g.protein.find_disulfide_bridges(representative_only=representatives_only)
+        self._run_protein_method('find_disulfide_bridges', executor=executor,
+                                 representative_only=representatives_only)
 
     def find_disulfide_bridges_parallelize(self, sc, representatives_only=True):
-        """Run Biopython's disulfide bridge finder and store found bridges.
-
-        Annotations are stored in the protein structure's chain sequence at:
-        ``<chain_prop>.seq_record.annotations['SSBOND-biopython']``
+        """Run Biopython's disulfide bridge finder and store found bridges, same as ``find_disulfide_bridges`` with a
+        ``Spark`` executor.
 
         Args:
+            sc (SparkContext): Spark Context to parallelize this function
             representative_only (bool): If analysis should only be run on the representative structure
 
         """
-        genes_rdd = sc.parallelize(self.genes)
-
-        def find_disulfide_bridges(g):
-            g.protein.find_disulfide_bridges(representative_only=representatives_only)
-            return g
-
-        result = genes_rdd.map(find_disulfide_bridges).collect()
-        for modified_g in result:
-            original_gene = self.genes.get_by_id(modified_g.id)
-            original_gene.copy_modified_gene(modified_g)
+        self.find_disulfide_bridges(representatives_only=representatives_only, executor=Spark(sc))
 
     ### END STRUCTURE RELATED METHODS ###
     ####################################################################################################################
@@ -1590,9 +1611,69 @@ class GEMPRO(Object):
         else:
             self.genes = self.model.genes
 
+    def save_protein_store(self, store_dir=None, unload=True):
+        """Save all Proteins to a protein store, with one shard per gene and each group of attributes (sequences,
+        structures, alignments, and annotations) stored separately.
+
+        With ``unload``, the protein attribute of every gene is replaced by a proxy which loads only the groups that are
+        used, so memory use is limited to the working set instead of every Protein. Call ``unload`` on a gene's
+        protein once done with it to free its memory again, and ``save`` to write back changes.
+
+        Args:
+            store_dir (str): Path to the directory of the protein store, ``protein_store`` in the data directory if
+                not set
+            unload (bool): If every gene's protein should be replaced by a proxy loading from the store
+
+        Returns:
+            ProteinStore: The protein store
+
+        """
+        if not store_dir:
+            if not self.data_dir:
+                raise ValueError('No root directory set, please specify a directory for the protein store')
+            store_dir = op.join(self.data_dir, 'protein_store')
+
+        store = ProteinStore(store_dir)
+        for g in tqdm(self.genes):
+            store.save(g.protein)
+            if unload:
+                g.protein = store.get_proxy(g.protein.id)
+        self.protein_store = store
+
+        log.info('Saved {} proteins to protein store at {}'.format(len(self.genes), store.store_dir))
+        return store
+
+    def load_protein_store(self, store_dir=None):
+        """Load Proteins from a protein store saved with ``save_protein_store``. Each gene's protein attribute is set
+        to a proxy which loads only the groups of attributes that are used.
+
+        Args:
+            store_dir (str): Path to the directory of the protein store, the last saved store if not set
+
+        Returns:
+            ProteinStore: The protein store
+
+        """
+        if store_dir:
+            store = ProteinStore(store_dir)
+        elif getattr(self, 'protein_store', None):
+            store = self.protein_store
+        else:
+            raise ValueError('No protein store saved, please specify a directory for the protein store')
+
+        counter = 0
+        for g in self.genes:
+            if g.id in store:
+                g.protein = store.get_proxy(g.id)
+                counter += 1
+        self.protein_store = store
+
+        log.info('{}/{}: number of genes loaded from protein store'.format(counter, len(self.genes)))
+        return store
+
     def save_protein_pickles_and_reset_protein(self):
         """Save all Proteins as pickle files -- currently development code for parallelization purposes. Also clears the
-        protein attribute in all genes!"""
+        protein attribute in all genes! See ``save_protein_store`` to store Proteins to be loaded back only as needed."""
         self.gene_protein_pickles = {}
         for g in tqdm(self.genes):
             if g.protein.representative_sequence:
@@ -0,0 +1,373 @@
+"""
+Batch Protein Analysis
+======================
+
+Computes the sequence properties of Biopython's ``ProteinAnalysis`` (see
+:func:`ssbio.protein.sequence.properties.residues.biopython_protein_analysis`) for many sequences at once. All
+sequences are encoded into one array, with the offsets of each sequence, and every property is computed for all of
+them with NumPy instead of one Python loop per sequence and property.
+"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+from Bio.Data import IUPACData
+from Bio.SeqUtils import IsoelectricPoint
+from Bio.SeqUtils import ProtParamData
+
+import ssbio.protein.sequence.properties.residues
+import ssbio.protein.sequence.utils
+import ssbio.utils
+
+log = logging.getLogger(__name__)
+
+
+AMINO_ACIDS = IUPACData.protein_letters
+"""str: The 20 standard amino acids, in the order of their codes in encoded sequences"""
+
+_OTHER = len(AMINO_ACIDS)
+_ENCODER = np.full(256, _OTHER, dtype=np.uint8)
+for _i, _aa in enumerate(AMINO_ACIDS):
+    _ENCODER[ord(_aa)] = _i
+
+_WATER = 18.0153
+_WEIGHTS = np.array([IUPACData.protein_weights[x] for x in AMINO_ACIDS])
+_GRAVY = np.array([ProtParamData.kd[x] for x in AMINO_ACIDS])
+_FLEXIBILITY = np.array([ProtParamData.Flex[x] for x in AMINO_ACIDS])
+_FLEXIBILITY_WEIGHTS = [0.25, 0.4375, 0.625, 0.8125, 1]
+_INSTABILITY = np.array([[ProtParamData.DIWV[x][y] for y in AMINO_ACIDS] for x in AMINO_ACIDS])
+
+
+def encode_sequences(seqs):
+    """Encode protein sequences into one array of amino acid codes, in the same way ``ProteinAnalysis`` reads them.
+
+    Sequences which are all lowercase are uppercased, as in ``ProteinAnalysis``. Letters other than the 20 standard
+    amino acids are encoded as ``len(AMINO_ACIDS)``.
+
+    Examples:
+        >>> codes, offsets = encode_sequences(['ACD', 'yw'])
+        >>> codes.tolist(), offsets.tolist()
+        ([0, 1, 2, 19, 18], [0, 3, 5])
+
+    Args:
+        seqs (list): Protein sequences, as strings, Seqs or SeqRecords
+
+    Returns:
+        tuple: Array of amino acid codes of all sequences, and array of the start of each sequence in it followed by the
+        total length
+
+    """
+    residues, offsets = _join_sequences(seqs)
+    return _ENCODER[residues], offsets
+
+
+def _join_sequences(seqs):
+    """Join sequences into one array of their ASCII letters, uppercasing the sequences which are all lowercase as
+    ``ProteinAnalysis`` does, and get the offsets of each sequence"""
+    seqs = [ssbio.protein.sequence.utils.cast_to_str(x) for x in seqs]
+    seqs = [x.upper() if x.islower() else x for x in seqs]
+    lengths = np.array([len(x) for x in seqs], dtype=np.int64)
+    offsets = np.concatenate(([0], np.cumsum(lengths)))
+    joined = ''.join(seqs).encode('ascii', 'replace')
+    return np.frombuffer(joined, dtype=np.uint8), offsets
+
+
+def _sums(values, starts):
+    """Sum the values of each sequence, given the starts of the sequences, which must all be non-empty"""
+    if not len(starts):
+        return np.zeros(0)
+    return np.add.reduceat(values, starts)
+
+
+def _select(pk, mask):
+    """Select the pK values of some sequences, if the pK differs between sequences"""
+    return pk[mask] if isinstance(pk, np.ndarray) else pk
+
+
+def _isoelectric_points(counts, nterm, cterm):
+    """Find the isoelectric point of each sequence with the same bisection as ``IsoelectricPoint.pi``, run on all
+    sequences at once"""
+    pos_pks = [np.full(len(counts), IsoelectricPoint.positive_pKs['Nterm'])]
+    neg_pks = [np.full(len(counts), IsoelectricPoint.negative_pKs['Cterm'])]
+    for aa, pk in IsoelectricPoint.pKnterminal.items():
+        pos_pks[0][nterm == AMINO_ACIDS.index(aa)] = pk
+    for aa, pk in IsoelectricPoint.pKcterminal.items():
+        neg_pks[0][cterm == AMINO_ACIDS.index(aa)] = pk
+
+    # Charged groups in the same order as IsoelectricPoint, so the charges are summed the same way
+    pos_content = [np.ones(len(counts))]
+    neg_content = [np.ones(len(counts))]
+    for aa, pk in IsoelectricPoint.positive_pKs.items():
+        if aa != 'Nterm':
+            pos_pks.append(pk)
+            pos_content.append(counts[:, AMINO_ACIDS.index(aa)].astype(float))
+    for aa, pk in IsoelectricPoint.negative_pKs.items():
+        if aa != 'Cterm':
+            neg_pks.append(pk)
+            neg_content.append(counts[:, AMINO_ACIDS.index(aa)].astype(float))
+
+    ph = np.full(len(counts), 7.775)
+    min_ = np.full(len(counts), 4.05)
+    max_ = np.full(len(counts), 12.)
+    active = max_ - min_ > 0.0001
+    while active.any():
+        positive_charge = np.zeros(active.sum())
+        for content, pk in zip(pos_content, pos_pks):
+            positive_charge += content[active] * (1.0 / (10 ** (ph[active] - _select(pk, active)) + 1.0))
+        negative_charge = np.zeros(active.sum())
+        for content, pk in zip(neg_content, neg_pks):
+            negative_charge += content[active] * (1.0 / (10 ** (_select(pk, active) - ph[active]) + 1.0))
+        charge = positive_charge - negative_charge
+        min_[active] = np.where(charge > 0.0, ph[active], min_[active])
+        max_[active] = np.where(charge > 0.0, max_[active], ph[active])
+        ph[active] = (min_[active] + max_[active]) / 2
+        active = max_ - min_ > 0.0001
+    return ph
+
+
+def batch_protein_analysis(seqs, ids=None):
+    """Compute the sequence properties of Biopython's ``ProteinAnalysis`` for many sequences at once.
+
+    The results are the same as :func:`~ssbio.protein.sequence.properties.residues.biopython_protein_analysis` run on
+    each sequence, up to floating point rounding in the sums over residues.
+
+    Examples:
+        >>> df = batch_protein_analysis({'a': 'MKTAYIAKQRQISFVKSHFSRQ', 'b': 'MKX'})
+        >>> df.index.tolist(), round(float(df.at['a', 'isoelectric_point-biop']), 2), df.at['a', 'amino_acids_content-biop']['K']
+        (['a'], 11.17, 3)
+
+    Args:
+        seqs (dict, list): Sequence IDs to sequences, or a list of sequences (strings, Seqs or SeqRecords)
+        ids (list): IDs of the sequences if ``seqs`` is a list, otherwise the IDs of SeqRecords or the list indices
+
+    Returns:
+        DataFrame: Sequence properties, indexed by sequence ID, with the keys of ``biopython_protein_analysis`` as the
+        columns. Sequences which ``ProteinAnalysis`` cannot analyse - those which are empty or have letters other than
+        the 20 standard amino acids - are left out.
+
+    """
+    if isinstance(seqs, dict):
+        ids = list(seqs.keys())
+        seqs = list(seqs.values())
+    else:
+        seqs = list(seqs)
+        if ids is None:
+            ids = [getattr(x, 'id', i) for i, x in enumerate(seqs)]
+    ids = list(ids)
+
+    codes, offsets = encode_sequences(seqs)
+    starts, ends = offsets[:-1], offsets[1:]
+    lengths = ends - starts
+    seq_idx = np.repeat(np.arange(len(lengths)), lengths)
+
+    counts = np.bincount(seq_idx * (_OTHER + 1) + codes,
+                         minlength=len(lengths) * (_OTHER + 1)).reshape(len(lengths), _OTHER + 1)
+    valid = (lengths > 0) & (counts[:, _OTHER] == 0)
+    if not valid.all():
+        log.debug('{} sequences are empty or have non-standard amino acids, not analysed'.format((~valid).sum()))
+
+    # Keep only the valid sequences
+    keep = valid[seq_idx]
+    codes = codes[keep]
+    counts = counts[valid, :_OTHER]
+    lengths = lengths[valid]
+    starts = np.concatenate(([0], np.cumsum(lengths)))[:-1]
+    ends = starts + lengths
+    ids = [x for x, v in zip(ids, valid) if v]
+
+    float_lengths = lengths.astype(float)
+    percents = counts / float_lengths[:, None]
+
+    def percent_sum(letters):
+        total = 0
+        for aa in letters:
+            total = total + percents[:, AMINO_ACIDS.index(aa)]
+        return total
+
+    molecular_weight = _sums(_WEIGHTS[codes], starts) - (lengths - 1) * _WATER
+    gravy = _sums(_GRAVY[codes], starts) / float_lengths
+
+    # Dipeptides are the pairs of residues which are both in the same sequence
+    dipeptide = np.zeros(len(codes), dtype=float)
+    if len(codes):
+        dipeptide[:-1] = _INSTABILITY[codes[:-1], codes[1:]]
+        dipeptide[ends - 1] = 0.
+    instability = (10.0 / float_lengths) * _sums(dipeptide, starts)
+
+    # Flexibility of windows of 9 residues, as ProteinAnalysis computes it, starting at each residue which has one
+    flex = _FLEXIBILITY[codes]
+    window_size = 9
+    num_windows = np.maximum(lengths - window_size, 0)
+    window_starts = np.repeat(starts, num_windows) + (np.arange(num_windows.sum()) -
+                                                      np.repeat(np.cumsum(num_windows) - num_windows, num_windows))
+    scores = np.zeros(len(window_starts))
+    for j in range(window_size // 2):
+        scores += (flex[window_starts + j] + flex[window_starts + window_size - j - 1]) * _FLEXIBILITY_WEIGHTS[j]
+    scores += flex[window_starts + window_size // 2 + 1]
+    scores /= 5.25
+    flexibility = np.split(scores, np.cumsum(num_windows)[:-1]) if len(num_windows) else []
+
+    isoelectric_point = _isoelectric_points(counts, nterm=codes[starts], cterm=codes[ends - 1])
+
+    helix = percent_sum('VIYFWL')
+    turn = percent_sum('NPGS')
+    strand = percent_sum('EMAL')
+
+    count_dicts = [dict(zip(AMINO_ACIDS, x)) for x in counts.tolist()]
+    percent_dicts = [dict(zip(AMINO_ACIDS, x)) for x in percents.tolist()]
+
+    return pd.DataFrame({'amino_acids_content-biop': count_dicts,
+                         'amino_acids_percent-biop': percent_dicts,
+                         'length-biop': lengths,
+                         'monoisotopic-biop': False,
+                         'molecular_weight-biop': molecular_weight,
+                         'aromaticity-biop': percent_sum('YWF'),
+                         'instability_index-biop': instability,
+                         'flexibility-biop': [x.tolist() for x in flexibility],
+                         'isoelectric_point-biop': isoelectric_point,
+                         'gravy-biop': gravy,
+                         'percent_helix_naive-biop': helix,
+                         'percent_turn_naive-biop': turn,
+                         'percent_strand_naive-biop': strand},
+                        index=pd.Index(ids, dtype=object),
+                        columns=['amino_acids_content-biop', 'amino_acids_percent-biop', 'length-biop',
+                                 'monoisotopic-biop', 'molecular_weight-biop', 'aromaticity-biop',
+                                 'instability_index-biop', 'flexibility-biop', 'isoelectric_point-biop', 'gravy-biop',
+                                 'percent_helix_naive-biop', 'percent_turn_naive-biop', 'percent_strand_naive-biop'])
+
+
+def get_biopython_pepstats_many(seqprops, clean_seq=False):
+    """Run :meth:`~ssbio.protein.sequence.seqprop.SeqProp.get_biopython_pepstats` on many SeqProps at once, computing
+    their properties with :func:`batch_protein_analysis`.
+
+    Args:
+        seqprops (list): SeqProp objects, those without a sequence are skipped
+        clean_seq (bool): If ``X`` and ``U`` characters should be removed from the sequences first
+
+    Returns:
+        DataFrame: Sequence properties, indexed by SeqProp ID, as returned by :func:`batch_protein_analysis`
+
+    """
+    seqprops = [x for x in seqprops if x.seq]
+    if clean_seq:
+        seqs = [x.seq_str.replace('X', '').replace('U', '') for x in seqprops]
+    else:
+        seqs = [x.seq_str for x in seqprops]
+
+    # Analyse by position, SeqProp IDs are not always unique
+    df = batch_protein_analysis(seqs, ids=range(len(seqprops)))
+    records = df.to_dict('records')
+    for i, pepstats in zip(df.index, records):
+        seqprops[i].annotations.update(pepstats)
+
+    for i in sorted(set(range(len(seqprops))) - set(df.index)):
+        log.error('{}: unable to run ProteinAnalysis module, empty sequence or unknown amino acid'.format(seqprops[i].id))
+
+    df.index = pd.Index([seqprops[i].id for i in df.index], dtype=object)
+    return df
+
+
+def _scale_profiles(values, known, starts, lengths, window):
+    """Compute the scale profile of a window over all sequences, with the same sums as ``ProteinAnalysis.protein_scale``
+    run on each sequence, and pad each profile with ``inf`` to the length of its sequence"""
+    # Window weights of protein_scale with the default edge of 1.0
+    weights = [1.0] * (window // 2)
+    sum_of_weights = sum(weights) * 2 + 1
+
+    # Scores of the windows starting at every residue, windows crossing into the next sequence are dropped below
+    num_starts = max(len(values) - window + 1, 0)
+    scores = np.zeros(num_starts)
+    for j in range(window // 2):
+        front = slice(j, j + num_starts)
+        back = slice(window - j - 1, window - j - 1 + num_starts)
+        # Residues not in the scale are skipped in pairs, as protein_scale does
+        scores += np.where(known[front] & known[back], weights[j] * values[front] + weights[j] * values[back], 0.)
+    middle = slice(window // 2, window // 2 + num_starts)
+    scores += np.where(known[middle], values[middle], 0.)
+    scores /= sum_of_weights
+
+    # Place the windows of each sequence between its padding
+    padding = window // 2
+    num_windows = np.maximum(lengths - window + 1, 0)
+    profile_lengths = num_windows + 2 * padding
+    profile_starts = np.concatenate(([0], np.cumsum(profile_lengths)))
+    profiles = np.full(profile_starts[-1], np.inf)
+
+    window_idx = np.arange(num_windows.sum()) - np.repeat(np.cumsum(num_windows) - num_windows, num_windows)
+    profiles[np.repeat(profile_starts[:-1] + padding, num_windows) + window_idx] = scores[np.repeat(starts, num_windows) + window_idx]
+    return np.split(profiles, profile_starts[1:-1]) if len(lengths) else []
+
+
+def batch_protein_scale(seqs, scales, windows, custom_scale_dict=None):
+    """Compute sliding window profiles of amino acid scales for many sequences, scales and windows at once.
+
+    Sequences are encoded once, each scale is mapped over all residues with a lookup table, and each window is slid
+    over all sequences together as a convolution. The profiles are the same as those of
+    :func:`~ssbio.protein.sequence.properties.residues.biopython_protein_scale`, including the ``inf`` padding at the
+    ends of each sequence.
+
+    Examples:
+        >>> profiles = batch_protein_scale(['MKTAYIAK', 'AILV'], scales='kd_hydrophobicity', windows=3)
+        >>> [float(round(x, 3)) for x in profiles[('kd_hydrophobicity', 3)][1]]
+        [inf, 3.367, 4.167, inf]
+
+    Args:
+        seqs (list): Protein sequences, as strings, Seqs or SeqRecords
+        scales (str, list): Scale names - ``kd_hydrophobicity``, ``bulkiness`` or ``custom``
+        windows (int, list): Sliding window sizes
+        custom_scale_dict (dict): One letter amino acid codes to their values, for the ``custom`` scale
+
+    Returns:
+        dict: Tuples of scale name and window size to the list of profiles of the sequences, each an array of the same
+        length as its sequence for odd window sizes
+
+    """
+    residues, offsets = _join_sequences(seqs)
+    starts = offsets[:-1]
+    lengths = offsets[1:] - starts
+
+    profiles = {}
+    for scale in ssbio.utils.force_list(scales):
+        scale_dict = ssbio.protein.sequence.properties.residues.get_protein_scale(scale,
+                                                                                  custom_scale_dict=custom_scale_dict)
+        table = np.full(256, np.nan)
+        for letter, value in scale_dict.items():
+            if len(letter) == 1 and ord(letter) < 256:
+                table[ord(letter)] = value
+        values = table[residues]
+        known = ~np.isnan(values)
+        values[~known] = 0.
+
+        for window in ssbio.utils.force_list(windows):
+            if window < 1:
+                raise ValueError('{}: window size must be at least 1'.format(window))
+            profiles[(scale, window)] = _scale_profiles(values, known, starts, lengths, window)
+    return profiles
+
+
+def get_sliding_window_properties_many(seqprops, scales, windows, custom_scale_dict=None):
+    """Run :meth:`~ssbio.protein.sequence.seqprop.SeqProp.get_sliding_window_properties` on many SeqProps, scales and
+    windows at once, computing the profiles with :func:`batch_protein_scale`.
+
+    Profiles are stored in the ``letter_annotations`` attribute of each SeqProp, as ``<scale>-window<window>-biop``.
+
+    Args:
+        seqprops (list): SeqProp objects, those without a sequence are skipped
+        scales (str, list): Scale names - ``kd_hydrophobicity``, ``bulkiness`` or ``custom``
+        windows (int, list): Sliding window sizes
+        custom_scale_dict (dict): One letter amino acid codes to their values, for the ``custom`` scale
+
+    """
+    seqprops = [x for x in seqprops if x.seq]
+    profiles = batch_protein_scale([x.seq_str for x in seqprops], scales=scales, windows=windows,
+                                   custom_scale_dict=custom_scale_dict)
+
+    for (scale, window), scale_profiles in profiles.items():
+        key = '{}-window{}-biop'.format(scale, window)
+        for seqprop, profile in zip(seqprops, scale_profiles):
+            try:
+                seqprop.letter_annotations[key] = profile.tolist()
+            except (TypeError, ValueError) as e:
+                # Even windows, or windows longer than the sequence, do not give one value per residue
+                log.error('{}: unable to store {} profile, {}'.format(seqprop.id, key, e))
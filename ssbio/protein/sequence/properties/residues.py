@@ -110,28 +110,45 @@ _human_readable_pepstats = {'A_percent-biop'                : '% Ala',
                             'mol_percent_acidic-pepstats'   : 'Molar % of acidic residues (B, D, E, Z)'}
 
 
-def biopython_protein_scale(inseq, scale, custom_scale_dict=None, window=7):
-    """Use Biopython to calculate properties using a sliding window over a sequence given a specific scale to use."""
+def get_protein_scale(scale, custom_scale_dict=None):
+    """Get the amino acid scale dictionary of a scale name.
+
+    Args:
+        scale (str): ``kd_hydrophobicity``, ``bulkiness``, or ``custom`` to use ``custom_scale_dict``
+        custom_scale_dict (dict): One letter amino acid codes to their values, for the ``custom`` scale
 
+    Returns:
+        dict: One letter amino acid codes to their values
+
+    """
     if scale == 'kd_hydrophobicity':
         scale_dict = kd_hydrophobicity_one
     elif scale == 'bulkiness':
         scale_dict = bulkiness_one
-    elif scale == 'custom':
+    elif scale == 'custom' and custom_scale_dict:
         scale_dict = custom_scale_dict
     else:
         raise ValueError('Scale not available')
+    return scale_dict
+
+
+def biopython_protein_scale(inseq, scale, custom_scale_dict=None, window=7):
+    """Use Biopython to calculate properties using a sliding window over a sequence given a specific scale to use.
+
+    See Also:
+        :func:`ssbio.protein.sequence.properties.protein_analysis.batch_protein_scale` to compute profiles for many
+        sequences, scales and windows at once.
+
+    """
+    scale_dict = get_protein_scale(scale, custom_scale_dict=custom_scale_dict)
 
     inseq = ssbio.protein.sequence.utils.cast_to_str(inseq)
     analysed_seq = ProteinAnalysis(inseq)
     result = analysed_seq.protein_scale(param_dict=scale_dict, window=window)
 
     # Correct list length by prepending and appending "inf" (result needs to be same length as sequence)
-    for i in range(window // 2):
-        result.insert(0, float("Inf"))
-        result.append(float("Inf"))
-
-    return result
+    padding = [float("Inf")] * (window // 2)
+    return padding + result + padding
 
 
 def biopython_protein_analysis(inseq):
@@ -150,6 +167,10 @@ def biopython_protein_analysis(inseq):
     TODO:
         Finish definitions of dictionary
 
+    See Also:
+        :func:`ssbio.protein.sequence.properties.protein_analysis.batch_protein_analysis` to compute these properties
+        for many sequences at once.
+
     """
 
     inseq = ssbio.protein.sequence.utils.cast_to_str(inseq)
@@ -173,9 +194,10 @@ def biopython_protein_analysis(inseq):
 
     # Separated secondary_structure_fraction into each definition
     # info_dict['secondary_structure_fraction-biop'] = analysed_seq.secondary_structure_fraction()
-    info_dict['percent_helix_naive-biop'] = analysed_seq.secondary_structure_fraction()[0]
-    info_dict['percent_turn_naive-biop'] = analysed_seq.secondary_structure_fraction()[1]
-    info_dict['percent_strand_naive-biop'] = analysed_seq.secondary_structure_fraction()[2]
+    helix, turn, strand = analysed_seq.secondary_structure_fraction()
+    info_dict['percent_helix_naive-biop'] = helix
+    info_dict['percent_turn_naive-biop'] = turn
+    info_dict['percent_strand_naive-biop'] = strand
 
     return info_dict
 
@@ -12,6 +12,8 @@ from copy import copy, deepcopy
 from slugify import Slugify
 import os
 import subprocess
+import threading
+from collections import OrderedDict
 from Bio import SeqIO
 from BCBio import GFF
 from Bio.Seq import Seq
@@ -25,6 +27,7 @@ import ssbio.utils
 import ssbio.protein.sequence.utils
 import ssbio.protein.sequence.utils.fasta
 import ssbio.protein.sequence.properties.residues
+import ssbio.protein.sequence.properties.protein_analysis
 
 custom_slugify = Slugify(safe_chars='-_.')
 log = logging.getLogger(__name__)
@@ -34,6 +37,79 @@ class SeqPropException(Exception):
     pass
 
 
+class _ParsedFileCache(object):
+
+    """Parsed contents of files, which are only parsed again if the file is modified or replaced.
+
+    Files are identified by their path, and checked with a single ``stat`` call on every access.
+
+    Args:
+        parser (function): Function which takes a file path and returns its parsed contents
+        max_items (int): Number of parsed files to keep in memory
+
+    """
+
+    def __init__(self, parser, max_items=10000):
+        self.parser = parser
+        self.max_items = max_items
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            raise OSError('{}: file does not exist'.format(path))
+        signature = (st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size)
+
+        with self._lock:
+            cached = self._items.get(path)
+            if cached and cached[0] == signature:
+                self._items.move_to_end(path)
+                self.hits += 1
+                return cached[1]
+
+        parsed = self.parser(path)
+
+        with self._lock:
+            self.misses += 1
+            self._items[path] = (signature, parsed)
+            self._items.move_to_end(path)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+        return parsed
+
+    def forget(self, path):
+        with self._lock:
+            self._items.pop(path, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+def _parse_fasta_file(path):
+    return SeqIO.read(path, 'fasta')
+
+
+def _parse_gff_file(path):
+    with open(path) as handle:
+        feats = list(GFF.parse(handle))
+        if len(feats) > 1:
+            log.warning('Too many sequences in GFF')
+            return None
+        return feats[0].features
+
+
+_SEQUENCE_FILES = _ParsedFileCache(_parse_fasta_file)
+_FEATURE_FILES = _ParsedFileCache(_parse_gff_file)
+
+
 class SeqProp(SeqRecord):
 
     """Generic class to represent information for a protein sequence.
@@ -130,12 +206,12 @@ class SeqProp(SeqRecord):
 
     @property
     def seq(self):
-        """Seq: Dynamically loaded Seq object from the sequence file"""
+        """Seq: Dynamically loaded Seq object from the sequence file. The file is only parsed again if it changes."""
 
         if self.sequence_file:
-            file_to_load = copy(self.sequence_path)
+            file_to_load = op.join(self.sequence_dir, self.sequence_file)
             log.debug('{}: reading sequence from sequence file {}'.format(self.id, file_to_load))
-            tmp_sr = SeqIO.read(file_to_load, 'fasta')
+            tmp_sr = _SEQUENCE_FILES.get(file_to_load)
             return tmp_sr.seq
 
         else:
@@ -178,13 +254,12 @@ class SeqProp(SeqRecord):
         """list: Get the features stored in memory or in the GFF file"""
 
         if self.feature_file:
-            log.debug('{}: reading features from feature file {}'.format(self.id, self.feature_path))
-            with open(self.feature_path) as handle:
-                feats = list(GFF.parse(handle))
-                if len(feats) > 1:
-                    log.warning('Too many sequences in GFF')
-                else:
-                    return feats[0].features
+            file_to_load = op.join(self.feature_dir, self.feature_file)
+            log.debug('{}: reading features from feature file {}'.format(self.id, file_to_load))
+            feats = _FEATURE_FILES.get(file_to_load)
+            if feats is not None:
+                # Copy the list, so the stored features are not added to or removed from
+                return list(feats)
 
         else:
             return self._features
@@ -271,17 +346,22 @@ class SeqProp(SeqRecord):
                 self.sequence_dir = op.dirname(fasta_path)
             self.sequence_file = op.basename(fasta_path)
 
-            tmp_sr = SeqIO.read(fasta_path, 'fasta')
+            # Parse the file again in case it was rewritten within the resolution of its modification time
+            file_to_load = op.join(self.sequence_dir, self.sequence_file)
+            _SEQUENCE_FILES.forget(file_to_load)
+            tmp_sr = _SEQUENCE_FILES.get(file_to_load)
+
+            # The parsed SeqRecord is shared, so copy anything that could be modified
             if self.name == '<unknown name>':
                 self.name = tmp_sr.name
             if self.description == '<unknown description>':
                 self.description = tmp_sr.description
             if not self.dbxrefs:
-                self.dbxrefs = tmp_sr.dbxrefs
+                self.dbxrefs = copy(tmp_sr.dbxrefs)
             if not self.features:
-                self.features = tmp_sr.features
+                self.features = copy(tmp_sr.features)
             if not self.annotations:
-                self.annotations = tmp_sr.annotations
+                self.annotations = copy(tmp_sr.annotations)
             if not self.letter_annotations:
                 self.letter_annotations = tmp_sr.letter_annotations
 
@@ -372,17 +452,15 @@ class SeqProp(SeqRecord):
                 self.feature_dir = op.dirname(gff_path)
             self.feature_file = op.basename(gff_path)
 
+            # Parse the file again in case it was rewritten within the resolution of its modification time
+            _FEATURE_FILES.forget(op.join(self.feature_dir, self.feature_file))
+
     def feature_path_unset(self):
         """Copy features to memory and remove the association of the feature file."""
         if not self.feature_file:
             raise IOError('No feature file to unset')
 
-        with open(self.feature_path) as handle:
-            feats = list(GFF.parse(handle))
-            if len(feats) > 1:
-                log.warning('Too many sequences in GFF')
-            else:
-                tmp = feats[0].features
+        tmp = deepcopy(self.features)
 
         self.feature_dir = None
         self.feature_file = None
@@ -693,7 +771,10 @@ class SeqProp(SeqRecord):
     def get_sliding_window_properties(self, scale, window):
         """Run a property calculator given a sliding window size
 
-        Stores statistics in the ``letter_annotations`` attribute.
+        Stores statistics in the ``letter_annotations`` attribute. Profiles are computed with
+        :func:`~ssbio.protein.sequence.properties.protein_analysis.batch_protein_scale`, use
+        :func:`~ssbio.protein.sequence.properties.protein_analysis.get_sliding_window_properties_many` to compute them
+        for many sequences at once.
 
         Todo:
             - Add and document all scales available to set
@@ -706,16 +787,13 @@ class SeqProp(SeqRecord):
             #     seq = self.seq_str
 
             try:
-                prop = ssbio.protein.sequence.properties.residues.biopython_protein_scale(self.seq_str,
-                                                                                          scale=scale,
-                                                                                          window=window)
-            except KeyError as e:
-                log.error('{}: unable to run ProteinAnalysis module, unknown amino acid {}'.format(self.id, e))
-                return
+                profiles = ssbio.protein.sequence.properties.protein_analysis.batch_protein_scale([self.seq_str],
+                                                                                                  scales=scale,
+                                                                                                  windows=window)
             except ValueError as e:
                 log.error('{}: unable to run ProteinAnalysis module, {}'.format(self.id, e))
                 return
-            self.letter_annotations['{}-window{}-biop'.format(scale, window)] = prop
+            self.letter_annotations['{}-window{}-biop'.format(scale, window)] = profiles[(scale, window)][0].tolist()
         else:
             raise ValueError('{}: no sequence available, unable to run ProteinAnalysis'.format(self.id))
 
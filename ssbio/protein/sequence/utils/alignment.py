@@ -3,12 +3,15 @@ Sequence Alignment
 ==================
 """
 
+import copy
 import logging
+import multiprocessing
+import os
 import os.path as op
 import subprocess
 import tempfile
-from collections import defaultdict
-from itertools import count, groupby
+from collections import defaultdict, OrderedDict
+from multiprocessing.pool import ThreadPool
 import numpy as np
 import pandas as pd
 from Bio import AlignIO
@@ -17,31 +20,71 @@ from Bio.Align import MultipleSeqAlignment
 from Bio.SubsMat import MatrixInfo as matlist
 import ssbio.utils
 import ssbio.protein.sequence.utils
+from ssbio.protein.sequence.utils.alignment_cache import AlignmentCache
 
 # Quiet the SettingWithCopyWarning when converting dtypes in get_deletions/mutations methods
 pd.options.mode.chained_assignment = None
 
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
 log = logging.getLogger(__name__)
 
+# Alignment results shared by all calls to pairwise_sequence_alignment, in memory only until set_alignment_cache is used
+_ALIGNMENT_CACHE = AlignmentCache()
+
+
+def set_alignment_cache(db_path=None, max_memory_items=10000):
+    """Set the cache used to store the results of pairwise_sequence_alignment.
+
+    Args:
+        db_path (str): Path to a SQLite database file to store alignments in across runs and processes. If not set,
+            alignments are only cached in memory.
+        max_memory_items (int): Number of alignments to keep in memory
+
+    Returns:
+        AlignmentCache: The new alignment cache
+
+    """
+    global _ALIGNMENT_CACHE
+    _ALIGNMENT_CACHE = AlignmentCache(db_path=db_path, max_memory_items=max_memory_items)
+    return _ALIGNMENT_CACHE
+
+
+def get_alignment_cache():
+    """Get the cache used to store the results of pairwise_sequence_alignment.
+
+    Returns:
+        AlignmentCache: The current alignment cache
+
+    """
+    return _ALIGNMENT_CACHE
+
 
 def pairwise_sequence_alignment(a_seq, b_seq, engine, a_seq_id=None, b_seq_id=None,
                                 gapopen=10, gapextend=0.5,
-                                outfile=None, outdir=None, force_rerun=False):
+                                outfile=None, outdir=None, force_rerun=False, use_cache=True):
     """Run a global pairwise sequence alignment between two sequence strings.
 
     Args:
         a_seq (str, Seq, SeqRecord, SeqProp): Reference sequence
         b_seq (str, Seq, SeqRecord, SeqProp): Sequence to be aligned to reference
-        engine (str): `biopython` or `needle` - which pairwise alignment program to use
+        engine (str): `biopython`, `needle`, or `numpy` - which pairwise alignment program to use. `numpy` runs an
+            in-process affine gap Needleman-Wunsch alignment with the same scoring scheme as `needle`
         a_seq_id (str): Reference sequence ID. If not set, is "a_seq"
         b_seq_id (str): Sequence to be aligned ID. If not set, is "b_seq"
-        gapopen (int): Only for `needle` - Gap open penalty is the score taken away when a gap is created
-        gapextend (float): Only for `needle` - Gap extension penalty is added to the standard gap penalty for each 
-            base or residue in the gap
-        outfile (str): Only for `needle` - name of output file. If not set, is {id_a}_{id_b}_align.txt
+        gapopen (int): Only for `needle` and `numpy` - Gap open penalty is the score taken away when a gap is created
+        gapextend (float): Only for `needle` and `numpy` - Gap extension penalty is added to the standard gap penalty
+            for each base or residue in the gap
+        outfile (str): Only for `needle` - name of output file. If not set, no file is written and the alignment is
+            parsed directly from the output of needle.
         outdir (str): Only for `needle` - Path to output directory. Default is the current directory.
-        force_rerun (bool): Only for `needle` - Default False, set to True if you want to rerun the alignment 
-            if outfile exists.
+        force_rerun (bool): Default False, set to True if you want to rerun the alignment if outfile exists or if it
+            is stored in the alignment cache.
+        use_cache (bool): If the alignment cache should be checked before running the alignment, and updated after.
+            Cached alignments are found by their sequences, so no alignment files are written for cache hits.
 
     Returns:
         MultipleSeqAlignment: Biopython object to represent an alignment
@@ -49,7 +92,7 @@ def pairwise_sequence_alignment(a_seq, b_seq, engine, a_seq_id=None, b_seq_id=No
     """
     engine = engine.lower()
 
-    if engine not in ['biopython', 'needle']:
+    if engine not in ['biopython', 'needle', 'numpy']:
         raise ValueError('{}: invalid engine'.format(engine))
 
     if not a_seq_id:
@@ -60,6 +103,32 @@ def pairwise_sequence_alignment(a_seq, b_seq, engine, a_seq_id=None, b_seq_id=No
     a_seq = ssbio.protein.sequence.utils.cast_to_str(a_seq)
     b_seq = ssbio.protein.sequence.utils.cast_to_str(b_seq)
 
+    cache = _ALIGNMENT_CACHE if use_cache else None
+
+    if cache is not None and not force_rerun:
+        cached = cache.get(a_seq, b_seq, engine, gapopen, gapextend)
+        if cached:
+            log.debug('{}_{}: alignment loaded from cache'.format(a_seq_id, b_seq_id))
+            a_aln, b_aln, annotations = cached
+            a = ssbio.protein.sequence.utils.cast_to_seq_record(a_aln, id=a_seq_id)
+            b = ssbio.protein.sequence.utils.cast_to_seq_record(b_aln, id=b_seq_id)
+            return MultipleSeqAlignment([a, b], annotations=annotations)
+
+    alignment = _run_pairwise_sequence_alignment(a_seq=a_seq, b_seq=b_seq, engine=engine,
+                                                 a_seq_id=a_seq_id, b_seq_id=b_seq_id,
+                                                 gapopen=gapopen, gapextend=gapextend,
+                                                 outfile=outfile, outdir=outdir, force_rerun=force_rerun)
+
+    if cache is not None:
+        cache.set(a_seq, b_seq, engine, gapopen, gapextend,
+                  str(alignment[0].seq), str(alignment[1].seq), alignment.annotations)
+
+    return alignment
+
+
+def _run_pairwise_sequence_alignment(a_seq, b_seq, engine, a_seq_id, b_seq_id, gapopen, gapextend,
+                                     outfile, outdir, force_rerun):
+    """Run a global pairwise sequence alignment with the given engine, see pairwise_sequence_alignment"""
     if engine == 'biopython':
         # TODO: allow different matrices? needle uses blosum62 by default, how to change that?
         # TODO: how to define gap open/extend when using matrix in biopython global alignment?
@@ -78,19 +147,35 @@ def pairwise_sequence_alignment(a_seq, b_seq, engine, a_seq_id=None, b_seq_id=No
 
         return alignment
 
-    if engine == 'needle':
-        alignment_file = run_needle_alignment(seq_a=a_seq, seq_b=b_seq, gapopen=gapopen, gapextend=gapextend,
-                                              write_outfile=True,  # Has to be true, AlignIO parses files on disk
-                                              outdir=outdir, outfile=outfile, force_rerun=force_rerun)
-        log.debug('Needle alignment at {}'.format(alignment_file))
+    if engine == 'numpy':
+        a_aln, b_aln, score = run_numpy_alignment(seq_a=a_seq, seq_b=b_seq, gapopen=gapopen, gapextend=gapextend)
 
-        if not op.exists(alignment_file):
-            raise ValueError('{}: needle alignment file does not exist'.format(alignment_file))
+        a = ssbio.protein.sequence.utils.cast_to_seq_record(a_aln, id=a_seq_id)
+        b = ssbio.protein.sequence.utils.cast_to_seq_record(b_aln, id=b_seq_id)
+        alignment = MultipleSeqAlignment([a, b], annotations={'score': score})
+        alignment.annotations.update(get_needle_style_statistics(a_aln, b_aln))
 
-        # Use AlignIO to parse the needle alignment, alignments[0] is the first alignment (the only one in pairwise)
-        # alignments = list(AlignIO.parse(alignment_file, "emboss"))
-        # alignment = alignments[0]
-        alignment = needle_statistics_alignio(alignment_file)
+        return alignment
+
+    if engine == 'needle':
+        if outfile:
+            alignment_file = run_needle_alignment(seq_a=a_seq, seq_b=b_seq, gapopen=gapopen, gapextend=gapextend,
+                                                  write_outfile=True,
+                                                  outdir=outdir, outfile=outfile, force_rerun=force_rerun)
+            log.debug('Needle alignment at {}'.format(alignment_file))
+
+            if not op.exists(alignment_file):
+                raise ValueError('{}: needle alignment file does not exist'.format(alignment_file))
+
+            # Use AlignIO to parse the needle alignment, alignments[0] is the first alignment (the only one in pairwise)
+            # alignments = list(AlignIO.parse(alignment_file, "emboss"))
+            # alignment = alignments[0]
+            alignment = needle_statistics_alignio(alignment_file)
+        else:
+            # No output file requested, parse the alignment straight from needle's stdout
+            needle_output = run_needle_alignment(seq_a=a_seq, seq_b=b_seq, gapopen=gapopen, gapextend=gapextend,
+                                                 write_outfile=False)
+            alignment = needle_statistics_alignio(StringIO(needle_output))
 
         # Rename the sequence IDs
         alignment[0].id = a_seq_id
@@ -110,6 +195,357 @@ def pairwise_sequence_alignment(a_seq, b_seq, engine, a_seq_id=None, b_seq_id=No
         return alignment
 
 
+def _pairwise_sequence_alignment_worker(kwargs):
+    """Run a single pairwise alignment from a dictionary of arguments, returning a tuple of the alignment and None, or
+    None and the error message if it fails to run"""
+    try:
+        return pairwise_sequence_alignment(**kwargs), None
+    except ValueError as e:
+        return None, str(e)
+
+
+def pairwise_sequence_alignment_many(a_seq, b_seqs, engine, a_seq_id=None,
+                                     gapopen=10, gapextend=0.5,
+                                     outdir=None, force_rerun=False, processes=1, threads=1, use_cache=True):
+    """Run global pairwise sequence alignments between a reference sequence and many other sequences.
+
+    Identical sequences in ``b_seqs`` are only aligned once, and the alignment is copied to every ID that shares the
+    sequence. This makes aligning to homo-oligomeric structures cost one alignment per unique chain sequence.
+
+    Args:
+        a_seq (str, Seq, SeqRecord, SeqProp): Reference sequence
+        b_seqs (dict): Dictionary of sequence IDs to sequences (str, Seq, SeqRecord, SeqProp) to be aligned to the
+            reference
+        engine (str): `biopython`, `needle`, or `numpy` - which pairwise alignment program to use
+        a_seq_id (str): Reference sequence ID. If not set, is "a_seq"
+        gapopen (int): Only for `needle` and `numpy` - Gap open penalty is the score taken away when a gap is created
+        gapextend (float): Only for `needle` and `numpy` - Gap extension penalty is added to the standard gap penalty
+            for each base or residue in the gap
+        outdir (str): Only for `needle` - Path to output directory. Default is the current directory. Output files are
+            named {a_seq_id}_{b_seq_id}.needle, after the first ID seen for each unique sequence.
+        force_rerun (bool): Only for `needle` - Default False, set to True if you want to rerun the alignment
+            if outfile exists.
+        processes (int): Number of processes to run the unique alignments across
+        threads (int): Number of threads to run the unique alignments across, if ``processes`` is 1. Best suited for
+            the `needle` engine, where each thread waits on its own needle subprocess.
+        use_cache (bool): If the alignment cache should be checked before running the alignments, and updated after
+
+    Returns:
+        dict: Dictionary of sequence IDs to their MultipleSeqAlignment. IDs whose alignment failed to run are logged
+        as errors and not included.
+
+    """
+    if not a_seq_id:
+        a_seq_id = 'a_seq'
+
+    a_seq = ssbio.protein.sequence.utils.cast_to_str(a_seq)
+
+    # Group IDs by their sequence, keeping the input order
+    seq_to_ids = OrderedDict()
+    for b_seq_id, b_seq in b_seqs.items():
+        b_seq = ssbio.protein.sequence.utils.cast_to_str(b_seq)
+        seq_to_ids.setdefault(b_seq, []).append(b_seq_id)
+
+    log.debug('{}: running {} unique alignments for {} sequences'.format(a_seq_id, len(seq_to_ids), len(b_seqs)))
+
+    tasks = []
+    for b_seq, b_seq_ids in seq_to_ids.items():
+        tasks.append(dict(a_seq=a_seq, b_seq=b_seq, engine=engine, a_seq_id=a_seq_id, b_seq_id=b_seq_ids[0],
+                          gapopen=gapopen, gapextend=gapextend,
+                          outfile='{}_{}.needle'.format(a_seq_id, b_seq_ids[0]), outdir=outdir,
+                          force_rerun=force_rerun, use_cache=use_cache))
+
+    if processes > 1 and len(tasks) > 1:
+        pool = multiprocessing.Pool(processes=min(processes, len(tasks)))
+        try:
+            results = pool.map(_pairwise_sequence_alignment_worker, tasks)
+        finally:
+            pool.close()
+            pool.join()
+
+        # Results cached in the worker processes are lost, store them in this process' cache as well
+        if use_cache:
+            for task, (alignment, error) in zip(tasks, results):
+                if alignment is not None:
+                    _ALIGNMENT_CACHE.set(a_seq, task['b_seq'], engine, gapopen, gapextend,
+                                         str(alignment[0].seq), str(alignment[1].seq), alignment.annotations)
+    elif threads > 1 and len(tasks) > 1:
+        pool = ThreadPool(processes=min(threads, len(tasks)))
+        try:
+            results = pool.map(_pairwise_sequence_alignment_worker, tasks)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        results = [_pairwise_sequence_alignment_worker(t) for t in tasks]
+
+    alignments = OrderedDict()
+    for (alignment, error), b_seq_ids in zip(results, seq_to_ids.values()):
+        if alignment is None:
+            for b_seq_id in b_seq_ids:
+                log.error('{}: alignment to {} failed to run, {}'.format(b_seq_id, a_seq_id, error))
+            continue
+        alignments[b_seq_ids[0]] = alignment
+        for b_seq_id in b_seq_ids[1:]:
+            copied = copy.deepcopy(alignment)
+            copied[1].id = b_seq_id
+            alignments[b_seq_id] = copied
+
+    # Return in the order given
+    return OrderedDict((b_seq_id, alignments[b_seq_id]) for b_seq_id in b_seqs if b_seq_id in alignments)
+
+
+# Residue alphabet of the EMBOSS EBLOSUM62 matrix, unknown characters are scored as X
+_BLOSUM62_ALPHABET = 'ARNDCQEGHILKMFPSTWYVBZX*'
+_BLOSUM62_MATRIX = None
+_BLOSUM62_ENCODER = None
+
+
+def _get_blosum62():
+    """Get the BLOSUM62 matrix as a square array, and a byte lookup table to encode sequences into its indices"""
+    global _BLOSUM62_MATRIX, _BLOSUM62_ENCODER
+
+    if _BLOSUM62_MATRIX is None:
+        size = len(_BLOSUM62_ALPHABET)
+        matrix = np.full((size, size), -4, dtype=np.float64)
+        for (x, y), score in matlist.blosum62.items():
+            matrix[_BLOSUM62_ALPHABET.index(x), _BLOSUM62_ALPHABET.index(y)] = score
+            matrix[_BLOSUM62_ALPHABET.index(y), _BLOSUM62_ALPHABET.index(x)] = score
+        matrix[size - 1, size - 1] = 1
+
+        encoder = np.full(256, _BLOSUM62_ALPHABET.index('X'), dtype=np.intp)
+        for i, letter in enumerate(_BLOSUM62_ALPHABET):
+            encoder[ord(letter)] = i
+            encoder[ord(letter.lower())] = i
+
+        _BLOSUM62_MATRIX = matrix
+        _BLOSUM62_ENCODER = encoder
+
+    return _BLOSUM62_MATRIX, _BLOSUM62_ENCODER
+
+
+def _encode_blosum62(seq):
+    """Encode a sequence string into an array of BLOSUM62 matrix indices"""
+    _, encoder = _get_blosum62()
+    return encoder[np.frombuffer(seq.encode('ascii', 'replace'), dtype=np.uint8)]
+
+
+def run_numpy_alignment(seq_a, seq_b, gapopen=10, gapextend=0.5):
+    """Run an in-process global alignment of two sequences, using the same scoring scheme as EMBOSS needle.
+
+    This is an affine gap Needleman-Wunsch alignment (Gotoh) with the BLOSUM62 matrix, where a gap of length N costs
+    ``gapopen + (N - 1) * gapextend`` and gaps at either end of the alignment are not penalized (the needle default).
+    The dynamic programming matrices are filled one row at a time with NumPy, and gaps running along a row are
+    resolved with a running maximum instead of a Python loop.
+
+    Examples:
+        >>> run_numpy_alignment('MAEYTLPDLDWDYGALEPHISGQINELHHSKHHATYVKGANDAVAKLEEA',
+        ...                     'XAEYTLPDLDWDYGALEPHISGQINELYHSKHHANDVKGANDAVAKLEEA')[2]
+        245.0
+
+    Args:
+        seq_a (str, Seq, SeqRecord): Reference sequence
+        seq_b (str, Seq, SeqRecord): Sequence to be aligned to reference
+        gapopen (float): Gap open penalty is the score taken away when a gap is created
+        gapextend (float): Gap extension penalty is added to the standard gap penalty for each residue in the gap
+
+    Returns:
+        tuple: (aligned reference sequence string, aligned sequence string, alignment score)
+
+    """
+    seq_a = ssbio.protein.sequence.utils.cast_to_str(seq_a)
+    seq_b = ssbio.protein.sequence.utils.cast_to_str(seq_b)
+
+    if gapextend > gapopen:
+        raise ValueError('Gap extension penalty must not be larger than the gap open penalty')
+
+    n = len(seq_a)
+    m = len(seq_b)
+
+    if n == 0 or m == 0:
+        return seq_a + '-' * m, '-' * n + seq_b, 0.
+
+    matrix, _ = _get_blosum62()
+    a_enc = _encode_blosum62(seq_a)
+    b_enc = _encode_blosum62(seq_b)
+
+    # State scores for the previous and current rows
+    # M - residues aligned, X - residue in A against a gap, Y - gap in A against a residue in B
+    ninf = -np.inf
+    cols = np.arange(m + 1, dtype=np.float64)
+
+    prev_m = np.full(m + 1, ninf)
+    prev_m[0] = 0.
+    prev_x = np.full(m + 1, ninf)
+    prev_y = np.zeros(m + 1)
+    prev_y[0] = ninf
+
+    # End gaps are free - gaps in A running down the last column cost nothing
+    x_open = np.full(m, float(gapopen))
+    x_extend = np.full(m, float(gapextend))
+    x_open[-1] = 0.
+    x_extend[-1] = 0.
+
+    # Traceback pointers, for each cell: which state the M, X, and Y states came from (0: M, 1: X, 2: Y)
+    m_ptr = np.zeros((n + 1, m + 1), dtype=np.int8)
+    x_ptr = np.zeros((n + 1, m + 1), dtype=np.int8)
+    y_ptr = np.zeros((n + 1, m + 1), dtype=np.int8)
+    x_ptr[1:, 0] = 1
+    y_ptr[0, 1:] = 2
+
+    for i in range(1, n + 1):
+        last_row = i == n
+        cur_m = np.empty(m + 1)
+        cur_x = np.empty(m + 1)
+        cur_y = np.empty(m + 1)
+        cur_m[0] = ninf
+        cur_x[0] = 0.
+        cur_y[0] = ninf
+
+        # Aligned residues, prefer the diagonal on ties
+        diag = np.vstack((prev_m[:-1], prev_x[:-1], prev_y[:-1]))
+        best = diag.argmax(axis=0)
+        cur_m[1:] = diag[best, np.arange(m)] + matrix[a_enc[i - 1], b_enc]
+        m_ptr[i, 1:] = best
+
+        # Residue in A against a gap, from the row above
+        vert = np.vstack((prev_m[1:] - x_open, prev_x[1:] - x_extend, prev_y[1:] - x_open))
+        best = vert.argmax(axis=0)
+        cur_x[1:] = vert[best, np.arange(m)]
+        x_ptr[i, 1:] = best
+
+        # Gap in A running along this row - Y[j] = max over k < j of (max(M[k], X[k]) - open - (j - k - 1) * extend)
+        y_open = 0. if last_row else float(gapopen)
+        y_extend = 0. if last_row else float(gapextend)
+        opened = np.maximum(cur_m, cur_x)
+        running = np.maximum.accumulate(opened[:-1] + cols[:-1] * y_extend)
+        cur_y[1:] = running - y_open - (cols[1:] - 1) * y_extend
+
+        # Pointers for the Y state, opening a new gap is preferred over extending one on ties
+        open_score = opened[:-1] - y_open
+        y_ptr[i, 1:] = np.where(open_score >= cur_y[1:], np.where(cur_m[:-1] >= cur_x[:-1], 0, 1), 2)
+
+        prev_m, prev_x, prev_y = cur_m, cur_x, cur_y
+
+    final = np.array([prev_m[m], prev_x[m], prev_y[m]])
+    state = int(final.argmax())
+    score = float(final[state])
+
+    # Trace back from the last cell
+    a_aln = []
+    b_aln = []
+    i, j = n, m
+    while i > 0 or j > 0:
+        if state == 0:
+            state = m_ptr[i, j]
+            a_aln.append(seq_a[i - 1])
+            b_aln.append(seq_b[j - 1])
+            i -= 1
+            j -= 1
+        elif state == 1:
+            state = x_ptr[i, j]
+            a_aln.append(seq_a[i - 1])
+            b_aln.append('-')
+            i -= 1
+        else:
+            state = y_ptr[i, j]
+            a_aln.append('-')
+            b_aln.append(seq_b[j - 1])
+            j -= 1
+
+    return ''.join(reversed(a_aln)), ''.join(reversed(b_aln)), score
+
+
+def get_needle_style_statistics(a_aln_seq, b_aln_seq):
+    """Get the identity, similarity, and gap statistics of an alignment in the format reported by needle.
+
+    Similar residues are aligned pairs with a positive BLOSUM62 score. All percentages are relative to the alignment
+    length.
+
+    Examples:
+        >>> stats = get_needle_style_statistics('AB-DE', 'ABCDF')
+        >>> stats['identity'], stats['percent_identity'], stats['gaps']
+        (3, 60.0, 1)
+
+    Args:
+        a_aln_seq (str): Aligned sequence string
+        b_aln_seq (str): Aligned sequence string
+
+    Returns:
+        dict: Number and percentage of identical, similar, and gapped positions
+
+    """
+    if len(a_aln_seq) != len(b_aln_seq):
+        raise ValueError('Sequence lengths not equal - was an alignment run?')
+
+    a_aln_seq = ssbio.protein.sequence.utils.cast_to_str(a_aln_seq)
+    b_aln_seq = ssbio.protein.sequence.utils.cast_to_str(b_aln_seq)
+
+    length = len(a_aln_seq)
+    if length == 0:
+        return {'identity': 0, 'percent_identity': 0., 'similarity': 0, 'percent_similarity': 0.,
+                'gaps': 0, 'percent_gaps': 0.}
+
+    a_bytes = np.frombuffer(a_aln_seq.encode('ascii', 'replace'), dtype=np.uint8)
+    b_bytes = np.frombuffer(b_aln_seq.encode('ascii', 'replace'), dtype=np.uint8)
+    gap = ord('-')
+
+    gapped = (a_bytes == gap) | (b_bytes == gap)
+    identical = (a_bytes == b_bytes) & ~gapped
+
+    matrix, encoder = _get_blosum62()
+    similar = (matrix[encoder[a_bytes], encoder[b_bytes]] > 0) & ~gapped
+
+    identity = int(identical.sum())
+    similarity = int(similar.sum())
+    gaps = int(gapped.sum())
+
+    return {'identity'          : identity,
+            'percent_identity'  : round(100. * identity / length, 1),
+            'similarity'        : similarity,
+            'percent_similarity': round(100. * similarity / length, 1),
+            'gaps'              : gaps,
+            'percent_gaps'      : round(100. * gaps / length, 1)}
+
+
+def get_alignment_score(a_aln_seq, b_aln_seq, gapopen=10, gapextend=0.5):
+    """Score an alignment with the BLOSUM62 matrix and affine gap penalties, counting gaps at the ends as well.
+
+    Examples:
+        >>> get_alignment_score('MKT--A', 'MKTYYA')
+        8.5
+
+    Args:
+        a_aln_seq (str): Aligned sequence string
+        b_aln_seq (str): Aligned sequence string
+        gapopen (float): Gap open penalty is the score taken away when a gap is created
+        gapextend (float): Gap extension penalty is added to the standard gap penalty for each residue in the gap
+
+    Returns:
+        float: Alignment score
+
+    """
+    if len(a_aln_seq) != len(b_aln_seq):
+        raise ValueError('Sequence lengths not equal - was an alignment run?')
+
+    a_aln_seq = ssbio.protein.sequence.utils.cast_to_str(a_aln_seq)
+    b_aln_seq = ssbio.protein.sequence.utils.cast_to_str(b_aln_seq)
+
+    a_bytes = np.frombuffer(a_aln_seq.encode('ascii', 'replace'), dtype=np.uint8)
+    b_bytes = np.frombuffer(b_aln_seq.encode('ascii', 'replace'), dtype=np.uint8)
+    gap = ord('-')
+    a_gap = a_bytes == gap
+    b_gap = b_bytes == gap
+    aligned = ~a_gap & ~b_gap
+
+    matrix, encoder = _get_blosum62()
+    score = matrix[encoder[a_bytes[aligned]], encoder[b_bytes[aligned]]].sum()
+
+    num_gaps = int((a_gap | b_gap).sum())
+    num_gap_opens = len(_runs(a_gap)[0]) + len(_runs(b_gap)[0])
+    return float(score - num_gap_opens * gapopen - (num_gaps - num_gap_opens) * gapextend)
+
+
 def run_needle_alignment(seq_a, seq_b, gapopen=10, gapextend=0.5, write_outfile=True,
                          outdir=None, outfile=None, force_rerun=False):
     """Run the needle alignment program for two strings and return the raw alignment result.
@@ -126,12 +562,14 @@ def run_needle_alignment(seq_a, seq_b, gapopen=10, gapextend=0.5, write_outfile=
         seq_b (str, Seq, SeqRecord): String representation of sequence to be aligned
         gapopen: Gap open penalty is the score taken away when a gap is created
         gapextend: Gap extension penalty is added to the standard gap penalty for each base or residue in the gap
+        write_outfile (bool): If the alignment should be written to a file, otherwise it is read from stdout
         outdir (str, optional): Path to output directory. Default is the current directory.
-        outfile (str, optional): Name of output file. If not set, is {id_a}_{id_b}_align.txt
+        outfile (str, optional): Name of output file. If not set, a unique temporary file is created.
         force_rerun (bool): Default False, set to True if you want to rerun the alignment if outfile exists.
 
     Returns:
-        str: Raw alignment result of the needle alignment in srspair format.
+        str: Path to the alignment file if ``write_outfile`` is True, otherwise the raw alignment result of the needle
+        alignment in srspair format.
 
     """
     # TODO: check if needle is installed and raise error if not
@@ -146,7 +584,10 @@ def run_needle_alignment(seq_a, seq_b, gapopen=10, gapextend=0.5, write_outfile=
         seq_b = ssbio.protein.sequence.utils.cast_to_str(seq_b)
 
         if not outfile:
-            outfile = op.join(tempfile.gettempdir(), 'temp_alignment.needle')
+            # Unique file per call, so concurrent alignments do not overwrite each other
+            handle, outfile = tempfile.mkstemp(suffix='.needle')
+            os.close(handle)
+            force_rerun = True
         else:
             outfile = op.join(outdir, outfile)
 
@@ -166,9 +607,9 @@ def run_needle_alignment(seq_a, seq_b, gapopen=10, gapextend=0.5, write_outfile=
         seq_b = ssbio.protein.sequence.utils.cast_to_str(seq_b)
 
         cmd = 'needle -auto -stdout -asequence=asis::{} -bsequence=asis::{} -gapopen={} -gapextend={}'.format(seq_a, seq_b, gapopen, gapextend)
-        command = subprocess.Popen(cmd, stdout=subprocess.PIPE, shell=True)
-        stdout = command.stdout.read()
-        return stdout
+        command = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=True)
+        stdout, err = command.communicate()
+        return stdout.decode('utf-8')
 
 
 def run_needle_alignment_on_files(id_a, faa_a, id_b, faa_b, gapopen=10, gapextend=0.5,
@@ -247,80 +688,223 @@ def get_percent_identity(a_aln_seq, b_aln_seq):
     return count / float((len(a_aln_seq) - gaps))
 
 
-def get_alignment_df(a_aln_seq, b_aln_seq, a_seq_id=None, b_seq_id=None):
-    """Summarize two alignment strings in a dataframe.
+# Column types of a pairwise alignment, the index of each type is its code in AlignmentColumns.types
+ALIGNMENT_COLUMN_TYPES = ('match', 'mutation', 'deletion', 'insertion', 'unresolved', 'gap')
+_MATCH, _MUTATION, _DELETION, _INSERTION, _UNRESOLVED, _GAP = range(len(ALIGNMENT_COLUMN_TYPES))
 
-    Args:
-        a_aln_seq (str): Aligned sequence string
-        b_aln_seq (str): Aligned sequence string
-        a_seq_id (str): Optional ID of a_seq
-        b_seq_id (str): Optional ID of b_aln_seq
 
-    Returns:
-        DataFrame: a per-residue level annotation of the alignment
+def _runs(mask):
+    """Get the start and end indices (inclusive) of each run of True values in a boolean array"""
+    edges = np.diff(np.concatenate(([0], mask.view(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1) - 1
+
+
+def _to_scalar(value):
+    """Convert a NumPy scalar to its Python equivalent"""
+    return value.item() if hasattr(value, 'item') else value
+
+
+def _deletion_regions(is_deletion, a_pos):
+    """Get deletion regions from a boolean array marking deletion columns and the reference residue numbers"""
+    deletions = []
+    for start, end in zip(*_runs(is_deletion)):
+        deletion_region = (_to_scalar(a_pos[start]), _to_scalar(a_pos[end]))
+        deletion_length = int(end - start + 1)
+        log.debug('Deletion of length {} at residues {}'.format(deletion_length, deletion_region))
+        deletions.append((deletion_region, deletion_length))
+    return deletions
+
+
+def _insertion_regions(is_insertion, a_pos):
+    """Get insertion regions from a boolean array marking insertion columns and the reference residue numbers
+
+    Regions are reported as the reference residues flanking the insertion, with (-1, 1) for an insertion at the
+    beginning and (X, Inf) for an insertion at the end of the reference sequence.
 
     """
-    if len(a_aln_seq) != len(b_aln_seq):
-        raise ValueError('Sequence lengths not equal - was an alignment run?')
+    insertions = []
+    last_column = len(is_insertion) - 1
+    for start, end in zip(*_runs(is_insertion)):
+        insertion_length = int(end - start + 1)
 
-    if not a_seq_id:
-        a_seq_id = 'a_seq'
-    if not b_seq_id:
-        b_seq_id = 'b_seq'
+        # Columns flanking the insertion, or the insertion column itself if it is at the beginning or end
+        a_pos_insertion_start = _to_scalar(a_pos[max(start - 1, 0)])
+        a_pos_insertion_end = _to_scalar(a_pos[min(end + 1, last_column)])
 
-    a_aln_seq = ssbio.protein.sequence.utils.cast_to_str(a_aln_seq)
-    b_aln_seq = ssbio.protein.sequence.utils.cast_to_str(b_aln_seq)
+        if np.isnan(a_pos_insertion_start) and a_pos_insertion_end == 1:
+            insertion_region = (-1, a_pos_insertion_end)
+            log.debug('Insertion of length {} at beginning'.format(insertion_length))
+        elif np.isnan(a_pos_insertion_end):
+            insertion_region = (a_pos_insertion_start, float('Inf'))
+            log.debug('Insertion of length {} at end'.format(insertion_length))
+        else:
+            insertion_region = (a_pos_insertion_start, a_pos_insertion_end)
+            log.debug('Insertion of length {} at residues {}'.format(insertion_length, insertion_region))
+
+        insertions.append((insertion_region, insertion_length))
+    return insertions
+
+
+class AlignmentColumns(object):
+
+    """Column-wise summary of a pairwise alignment, stored as NumPy arrays.
+
+    All column types, residue numbers, mutations, unresolved residues, deletions, and insertions are computed in a
+    single pass over the alignment when the object is created. Residue numbers are the running count of non-gap
+    characters in each sequence, and are NaN (or 0 in the integer arrays) where a sequence has a gap.
 
-    a_idx = 1
-    b_idx = 1
+    Examples:
+        >>> cols = AlignmentColumns('MKT-AYDE', 'MRTGAY--')
+        >>> cols.mutations
+        [('K', 2, 'R')]
+        >>> cols.deletions
+        [((6.0, 7.0), 2)]
+        >>> cols.insertions
+        [((3.0, 4.0), 1)]
+        >>> cols.map_a_to_b([1, 2, 4, 7])
+        {1: 1, 2: 2, 4: 5}
 
-    appender = []
+    Args:
+        a_aln_seq (str, Seq, SeqRecord): Aligned sequence string
+        b_aln_seq (str, Seq, SeqRecord): Aligned sequence string
 
-    for i, (a,b) in enumerate(zip(a_aln_seq, b_aln_seq)):
-        to_append = {}
+    """
 
-        if a == b and a != '-' and b != '-':
-            aa_flag = 'match'
-        elif a != b and a == '-' and b != '-':
-            aa_flag = 'insertion'
-        elif a != b and a != '-' and b == '-':
-            aa_flag = 'deletion'
-        elif a != b and a != '-' and b == 'X':
-            aa_flag = 'unresolved'
-        elif a != b and b != '-' and a == 'X':
-            aa_flag = 'unresolved'
-        elif a != b and a != '-' and b != '-':
-            aa_flag = 'mutation'
+    def __init__(self, a_aln_seq, b_aln_seq):
+        if len(a_aln_seq) != len(b_aln_seq):
+            raise ValueError('Sequence lengths not equal - was an alignment run?')
+
+        self.a_aln_seq = ssbio.protein.sequence.utils.cast_to_str(a_aln_seq)
+        self.b_aln_seq = ssbio.protein.sequence.utils.cast_to_str(b_aln_seq)
+
+        a_bytes = np.frombuffer(self.a_aln_seq.encode('ascii', 'replace'), dtype=np.uint8)
+        b_bytes = np.frombuffer(self.b_aln_seq.encode('ascii', 'replace'), dtype=np.uint8)
+        gap = ord('-')
+        unknown = ord('X')
+
+        self.a_gap = a_bytes == gap
+        """ndarray: If the first sequence has a gap in each column"""
+        self.b_gap = b_bytes == gap
+        """ndarray: If the second sequence has a gap in each column"""
+
+        a_res = ~self.a_gap
+        b_res = ~self.b_gap
+        aligned = a_res & b_res
+        different = a_bytes != b_bytes
+
+        types = np.full(len(a_bytes), _GAP, dtype=np.int8)
+        types[aligned & ~different] = _MATCH
+        types[aligned & different] = _MUTATION
+        types[aligned & different & ((a_bytes == unknown) | (b_bytes == unknown))] = _UNRESOLVED
+        types[a_res & self.b_gap] = _DELETION
+        types[self.a_gap & b_res] = _INSERTION
+        self.types = types
+        """ndarray: Code of the column type, an index of ``ALIGNMENT_COLUMN_TYPES``"""
+
+        self.a_resnums = np.where(a_res, np.cumsum(a_res), 0)
+        """ndarray: Residue number of the first sequence in each column, 0 where it has a gap"""
+        self.b_resnums = np.where(b_res, np.cumsum(b_res), 0)
+        """ndarray: Residue number of the second sequence in each column, 0 where it has a gap"""
+
+        # Residue numbers as stored in the alignment DataFrame - floats with NaNs only if there are gaps
+        self.a_pos = self._resnums_with_nan(self.a_resnums, self.a_gap)
+        """ndarray: Residue number of the first sequence in each column, NaN where it has a gap"""
+        self.b_pos = self._resnums_with_nan(self.b_resnums, self.b_gap)
+        """ndarray: Residue number of the second sequence in each column, NaN where it has a gap"""
+
+        mutated = np.flatnonzero(types == _MUTATION)
+        self.mutations = [(self.a_aln_seq[i], int(self.a_resnums[i]), self.b_aln_seq[i]) for i in mutated]
+        """list: Mutations as tuples of (original_residue, resnum, mutated_residue)"""
+        self.unresolved = self.a_resnums[types == _UNRESOLVED].tolist()
+        """list: Residue numbers of the first sequence that are unresolved in the second"""
+        self.deletions = _deletion_regions(types == _DELETION, self.a_pos)
+        """list: Deletions as tuples of ((deletion_start_resnum, deletion_end_resnum), deletion_length)"""
+        self.insertions = _insertion_regions(types == _INSERTION, self.a_pos)
+        """list: Insertions as tuples of ((insertion_start_resnum, insertion_end_resnum), insertion_length)"""
+
+    @staticmethod
+    def _resnums_with_nan(resnums, is_gap):
+        if is_gap.any():
+            return np.where(is_gap, np.nan, resnums.astype(np.float64))
+        return resnums.astype(np.int64)
+
+    def __len__(self):
+        return len(self.types)
+
+    @property
+    def chain_index(self):
+        """list: For each residue of the first sequence, the residue number in the second sequence (NaN if gap)"""
+        return self.b_pos[~self.a_gap].tolist()
+
+    def map_a_to_b(self, resnums):
+        """Map residue numbers in the first sequence to residue numbers in the second sequence.
+
+        Args:
+            resnums (int, list): Residue number or numbers in the first sequence
+
+        Returns:
+            dict: Mapping of residue numbers, without the residues that are not aligned to a residue
+
+        """
+        resnums = np.asarray(ssbio.utils.force_list(resnums), dtype=np.int64)
+
+        a_to_b = np.zeros(int(self.a_resnums.max(initial=0)) + 1, dtype=np.int64)
+        a_to_b[self.a_resnums[~self.a_gap]] = self.b_resnums[~self.a_gap]
+
+        in_range = (resnums > 0) & (resnums < len(a_to_b))
+        mapped = np.zeros(len(resnums), dtype=np.int64)
+        mapped[in_range] = a_to_b[resnums[in_range]]
+
+        return dict((int(a), int(b)) for a, b in zip(resnums, mapped) if b > 0)
+
+    def to_df(self, a_seq_id=None, b_seq_id=None):
+        """Get the per-residue alignment DataFrame, see :func:`get_alignment_df`.
+
+        Args:
+            a_seq_id (str): Optional ID of a_seq
+            b_seq_id (str): Optional ID of b_seq
+
+        Returns:
+            DataFrame: a per-residue level annotation of the alignment
+
+        """
+        if not a_seq_id:
+            a_seq_id = 'a_seq'
+        if not b_seq_id:
+            b_seq_id = 'b_seq'
 
-        to_append['id_a'] = a_seq_id
-        to_append['id_b'] = b_seq_id
-        to_append['type'] = aa_flag
+        a_aa = np.array(list(self.a_aln_seq), dtype=object)
+        a_aa[self.a_gap] = np.nan
+        b_aa = np.array(list(self.b_aln_seq), dtype=object)
+        b_aa[self.b_gap] = np.nan
 
-        if aa_flag == 'match' or aa_flag == 'unresolved' or aa_flag == 'mutation':
-            to_append['id_a_aa'] = a
-            to_append['id_a_pos'] = int(a_idx)
-            to_append['id_b_aa'] = b
-            to_append['id_b_pos'] = int(b_idx)
-            a_idx += 1
-            b_idx += 1
+        cols = ['id_a', 'id_b', 'type', 'id_a_aa', 'id_a_pos', 'id_b_aa', 'id_b_pos']
+        alignment_df = pd.DataFrame(OrderedDict([('id_a', a_seq_id),
+                                                 ('id_b', b_seq_id),
+                                                 ('type', np.array(ALIGNMENT_COLUMN_TYPES, dtype=object)[self.types]),
+                                                 ('id_a_aa', a_aa),
+                                                 ('id_a_pos', self.a_pos),
+                                                 ('id_b_aa', b_aa),
+                                                 ('id_b_pos', self.b_pos)]),
+                                    index=pd.RangeIndex(len(self)), columns=cols)
 
-        if aa_flag == 'deletion':
-            to_append['id_a_aa'] = a
-            to_append['id_a_pos'] = int(a_idx)
-            a_idx += 1
+        return alignment_df
 
-        if aa_flag == 'insertion':
-            to_append['id_b_aa'] = b
-            to_append['id_b_pos'] = int(b_idx)
-            b_idx += 1
 
-        appender.append(to_append)
+def get_alignment_df(a_aln_seq, b_aln_seq, a_seq_id=None, b_seq_id=None):
+    """Summarize two alignment strings in a dataframe.
 
-    cols = ['id_a', 'id_b', 'type', 'id_a_aa', 'id_a_pos', 'id_b_aa', 'id_b_pos']
-    alignment_df = pd.DataFrame.from_records(appender, columns=cols)
-    alignment_df = alignment_df.fillna(value=np.nan)
+    Args:
+        a_aln_seq (str): Aligned sequence string
+        b_aln_seq (str): Aligned sequence string
+        a_seq_id (str): Optional ID of a_seq
+        b_seq_id (str): Optional ID of b_aln_seq
 
-    return alignment_df
+    Returns:
+        DataFrame: a per-residue level annotation of the alignment
+
+    """
+    return AlignmentColumns(a_aln_seq, b_aln_seq).to_df(a_seq_id=a_seq_id, b_seq_id=b_seq_id)
 
 
 def get_alignment_df_from_file(alignment_file, a_seq_id=None, b_seq_id=None):
@@ -336,7 +920,7 @@ def get_alignment_df_from_file(alignment_file, a_seq_id=None, b_seq_id=None):
 
     """
     alignments = list(AlignIO.parse(alignment_file, "emboss"))
-    alignment_df = pd.DataFrame(columns=['id_a', 'id_b', 'type', 'id_a_aa', 'id_a_pos', 'id_b_aa', 'id_b_pos'])
+    alignment_dfs = [pd.DataFrame(columns=['id_a', 'id_b', 'type', 'id_a_aa', 'id_a_pos', 'id_b_aa', 'id_b_pos'])]
 
     for alignment in alignments:
         if not a_seq_id:
@@ -346,10 +930,9 @@ def get_alignment_df_from_file(alignment_file, a_seq_id=None, b_seq_id=None):
             b_seq_id = list(alignment)[1].id
         b_seq = str(list(alignment)[1].seq)
 
-        df = get_alignment_df(a_seq, b_seq, a_seq_id, b_seq_id)
-        alignment_df = alignment_df.append(df).reset_index(drop=True)
+        alignment_dfs.append(get_alignment_df(a_seq, b_seq, a_seq_id, b_seq_id))
 
-    return alignment_df
+    return pd.concat(alignment_dfs).reset_index(drop=True)
 
 
 def get_mutations(aln_df):
@@ -364,13 +947,10 @@ def get_mutations(aln_df):
         list: Residue mutations
 
     """
-    mutation_df = aln_df[aln_df['type'] == 'mutation']
-    tuples = []
-    if not mutation_df.empty:
-        subset = mutation_df[['id_a_aa', 'id_a_pos', 'id_b_aa']]
-        subset['id_a_pos'] = subset['id_a_pos'].astype(int)
-        tuples = [tuple(x) for x in subset.values]
-    return tuples
+    is_mutation = (aln_df['type'] == 'mutation').values
+    return [(a, int(pos), b) for a, pos, b in zip(aln_df['id_a_aa'].values[is_mutation],
+                                                  aln_df['id_a_pos'].values[is_mutation],
+                                                  aln_df['id_b_aa'].values[is_mutation])]
 
 
 def get_unresolved(aln_df):
@@ -383,12 +963,8 @@ def get_unresolved(aln_df):
         list: Residue numbers that are mutated
 
     """
-    unresolved_df = aln_df[aln_df['type'] == 'unresolved']
-    unresolved = []
-    if not unresolved_df.empty:
-        unresolved_df['id_a_pos'] = unresolved_df['id_a_pos'].astype(int)
-        unresolved = unresolved_df.id_a_pos.tolist()
-    return unresolved
+    is_unresolved = (aln_df['type'] == 'unresolved').values
+    return aln_df['id_a_pos'].values[is_unresolved].astype(int).tolist()
 
 
 def get_deletions(aln_df):
@@ -408,33 +984,7 @@ def get_deletions(aln_df):
         list: A list of tuples with the format ((deletion_start_resnum, deletion_end_resnum), deletion_length)
 
     """
-
-    deletion_df = aln_df[aln_df['type'] == 'deletion']
-    if not deletion_df.empty:
-        deletion_df['id_a_pos'] = deletion_df['id_a_pos'].astype(int)
-    deletions = []
-
-    for k, g in groupby(deletion_df.index, key=lambda n, c=count(): n - next(c)):
-        tmp = list(g)
-        deletion_indices = (min(tmp), max(tmp))
-
-        deletion_start_ix = deletion_indices[0]
-        deletion_end_ix = deletion_indices[1]
-
-        deletion_length = deletion_end_ix - deletion_start_ix + 1
-
-        id_a_pos_deletion_start = aln_df.ix[deletion_start_ix].id_a_pos
-        id_a_pos_deletion_end = aln_df.ix[deletion_end_ix].id_a_pos
-
-        deletion_region = (id_a_pos_deletion_start, id_a_pos_deletion_end)
-
-        # Logging where the insertion is
-        log.debug('Deletion of length {} at residues {}'.format(deletion_length, deletion_region))
-
-        to_append = (deletion_region, deletion_length)
-        deletions.append(to_append)
-
-    return deletions
+    return _deletion_regions((aln_df['type'] == 'deletion').values, aln_df['id_a_pos'].values)
 
 
 def get_insertions(aln_df):
@@ -458,53 +1008,7 @@ def get_insertions(aln_df):
         list: A list of tuples with the format ((insertion_start_resnum, insertion_end_resnum), insertion_length)
 
     """
-
-    insertion_df = aln_df[aln_df['type'] == 'insertion']
-    # if not insertion_df.empty: # don't need to do this for insertions
-    #     insertion_df['id_a_pos'] = insertion_df['id_a_pos'].astype(int)
-
-    insertions = []
-
-    for k, g in groupby(insertion_df.index, key=lambda n, c=count(): n - next(c)):
-        tmp = list(g)
-        insertion_indices = (min(tmp), max(tmp))
-
-        insertion_start = insertion_indices[0] - 1
-        insertion_end = insertion_indices[1] + 1
-
-        # Checking if insertion is at the beginning or end
-        if insertion_start < 0:
-            insertion_start = insertion_indices[0]
-            insertion_length = insertion_end - insertion_start
-        elif insertion_end >= len(aln_df):
-            insertion_end = insertion_indices[1]
-            insertion_length = insertion_end - insertion_start
-        else:
-            insertion_length = insertion_end - insertion_start - 1
-
-        id_a_pos_insertion_start = aln_df.ix[insertion_start].id_a_pos
-        id_a_pos_insertion_end = aln_df.ix[insertion_end].id_a_pos
-
-        # Checking if insertion is at the beginning or end
-        if np.isnan(id_a_pos_insertion_start) and id_a_pos_insertion_end == 1:
-            insertion_region = (-1, id_a_pos_insertion_end)
-        elif np.isnan(id_a_pos_insertion_end):
-            insertion_region = (id_a_pos_insertion_start, float('Inf'))
-        else:
-            insertion_region = (id_a_pos_insertion_start, id_a_pos_insertion_end)
-
-        # Logging where the insertion is
-        if insertion_region[0] == -1:
-            log.debug('Insertion of length {} at beginning'.format(insertion_length))
-        elif insertion_region[1] == float('Inf'):
-            log.debug('Insertion of length {} at end'.format(insertion_length))
-        else:
-            log.debug('Insertion of length {} at residues {}'.format(insertion_length, insertion_region))
-
-        to_append = (insertion_region, insertion_length)
-        insertions.append(to_append)
-
-    return insertions
+    return _insertion_regions((aln_df['type'] == 'insertion').values, aln_df['id_a_pos'].values.astype(np.float64))
 
 
 def map_resnum_a_to_resnum_b(resnums, a_aln, b_aln):
@@ -532,16 +1036,9 @@ def map_resnum_a_to_resnum_b(resnums, a_aln, b_aln):
     """
     resnums = ssbio.utils.force_list(resnums)
 
-    aln_df = get_alignment_df(a_aln, b_aln)
-
-    maps = aln_df[aln_df.id_a_pos.isin(resnums)]
+    mapping = AlignmentColumns(a_aln, b_aln).map_a_to_b(resnums)
 
-    able_to_map_to_b = maps[pd.notnull(maps.id_b_pos)]
-    successful_map_from_a = able_to_map_to_b.id_a_pos.values.tolist()
-
-    mapping = dict([(int(a), int(b)) for a,b in zip(able_to_map_to_b.id_a_pos, able_to_map_to_b.id_b_pos)])
-
-    cant_map = list(set(resnums).difference(successful_map_from_a))
+    cant_map = list(set(resnums).difference(mapping))
     if len(cant_map) > 0:
         log.warning('Unable to map residue numbers {} in first sequence to second'.format(cant_map))
 
@@ -572,11 +1069,11 @@ def pairwise_alignment_stats(reference_seq_aln, other_seq_aln):
     infodict['percent_identity'] = stats_percent_ident
 
     # Other alignment results
-    aln_df = get_alignment_df(a_aln_seq=reference_seq_aln, b_aln_seq=other_seq_aln)
-    infodict['deletions'] = get_deletions(aln_df)
-    infodict['insertions'] = get_insertions(aln_df)
-    infodict['mutations'] = get_mutations(aln_df)
-    infodict['unresolved'] = get_unresolved(aln_df)
+    columns = AlignmentColumns(reference_seq_aln, other_seq_aln)
+    infodict['deletions'] = columns.deletions
+    infodict['insertions'] = columns.insertions
+    infodict['mutations'] = columns.mutations
+    infodict['unresolved'] = columns.unresolved
 
     return infodict
 
@@ -645,21 +1142,28 @@ def needle_statistics_alignio(infile):
     """Reads in a needle alignment file and returns an AlignIO object with annotations
 
     Args:
-        infile (str): Alignment file name
+        infile (str, file): Alignment file name, or a file handle of needle output (i.e. read from stdout)
 
     Returns:
         AlignIO: annotated AlignIO object
 
     """
+    if hasattr(infile, 'read'):
+        needle_output = infile.read()
+    else:
+        with open(infile) as f:
+            needle_output = f.read()
 
-    alignments = list(AlignIO.parse(infile, "emboss"))
+    alignments = list(AlignIO.parse(StringIO(needle_output), "emboss"))
 
+    if not alignments:
+        raise ValueError('No alignment found in needle output')
     if len(alignments) > 1:
         raise ValueError('Alignment file contains more than one pairwise alignment')
 
     alignment = alignments[0]
 
-    with open(infile) as f:
+    with StringIO(needle_output) as f:
         line = f.readline()
 
         for i in range(len(alignments)):
@@ -0,0 +1,173 @@
+"""
+Alignment Cache
+===============
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+log = logging.getLogger(__name__)
+
+
+class AlignmentCache(object):
+
+    """Content-addressed store of pairwise alignment results.
+
+    Results are keyed on a hash of the two sequences, the alignment engine and the gap penalties, so the same pair of
+    sequences is never aligned twice, no matter what IDs they have. Lookups are first made in an in-memory LRU cache,
+    then in an optional SQLite database on disk which can be shared between processes and runs. The cache can be used
+    from multiple threads.
+
+    Examples:
+        >>> cache = AlignmentCache()
+        >>> cache.set('MKT', 'MRT', 'numpy', 10, 0.5, 'MKT', 'MRT', {'score': 9.0})
+        >>> cache.get('MKT', 'MRT', 'numpy', 10, 0.5)
+        ('MKT', 'MRT', {'score': 9.0})
+        >>> cache.get('MKT', 'MRT', 'needle', 10, 0.5) is None
+        True
+        >>> cache.get('mkt', 'mrt', 'numpy', 10, 0.5) is None
+        True
+
+    Args:
+        db_path (str): Path to the SQLite database file. If not set, results are only cached in memory.
+        max_memory_items (int): Number of results to keep in the in-memory LRU cache
+
+    """
+
+    def __init__(self, db_path=None, max_memory_items=10000):
+        self.db_path = db_path
+        self.max_memory_items = max_memory_items
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._connection = None
+        self._connection_pid = None
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def make_key(a_seq, b_seq, engine, gapopen, gapextend):
+        """Get the hash which identifies an alignment of two sequences with the given settings. Sequences are hashed
+        exactly as given, so the stored aligned strings always have the case of the sequences they are returned for."""
+        content = '\t'.join([engine.lower(), repr(float(gapopen)), repr(float(gapextend)), a_seq, b_seq])
+        return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+    def _get_connection(self):
+        """Get the SQLite connection, reopening it if this is a forked process"""
+        if not self.db_path:
+            return None
+
+        if self._connection is None or self._connection_pid != os.getpid():
+            self._connection = sqlite3.connect(self.db_path, timeout=60, check_same_thread=False)
+            self._connection.execute('CREATE TABLE IF NOT EXISTS alignments '
+                                     '(key TEXT PRIMARY KEY, a_aln TEXT, b_aln TEXT, annotations TEXT)')
+            self._connection.commit()
+            self._connection_pid = os.getpid()
+
+        return self._connection
+
+    def _remember(self, key, value):
+        self._memory.pop(key, None)
+        self._memory[key] = value
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def get(self, a_seq, b_seq, engine, gapopen, gapextend):
+        """Get a stored alignment result.
+
+        Args:
+            a_seq (str): Reference sequence
+            b_seq (str): Sequence aligned to reference
+            engine (str): Alignment engine
+            gapopen (float): Gap open penalty
+            gapextend (float): Gap extension penalty
+
+        Returns:
+            tuple: (aligned reference sequence string, aligned sequence string, dict of annotations), or None if the
+            alignment is not stored
+
+        """
+        key = self.make_key(a_seq, b_seq, engine, gapopen, gapextend)
+
+        with self._lock:
+            if key in self._memory:
+                value = self._memory.pop(key)
+                self._memory[key] = value
+                self.hits += 1
+                return value[0], value[1], dict(value[2])
+
+            connection = self._get_connection()
+            if connection is not None:
+                row = connection.execute('SELECT a_aln, b_aln, annotations FROM alignments WHERE key = ?',
+                                         (key,)).fetchone()
+                if row:
+                    value = (row[0], row[1], json.loads(row[2]))
+                    self._remember(key, value)
+                    self.hits += 1
+                    return value[0], value[1], dict(value[2])
+
+            self.misses += 1
+            return None
+
+    def set(self, a_seq, b_seq, engine, gapopen, gapextend, a_aln, b_aln, annotations):
+        """Store an alignment result.
+
+        Args:
+            a_seq (str): Reference sequence
+            b_seq (str): Sequence aligned to reference
+            engine (str): Alignment engine
+            gapopen (float): Gap open penalty
+            gapextend (float): Gap extension penalty
+            a_aln (str): Aligned reference sequence string
+            b_aln (str): Aligned sequence string
+            annotations (dict): Alignment annotations such as the score and percent identity
+
+        """
+        key = self.make_key(a_seq, b_seq, engine, gapopen, gapextend)
+        value = (a_aln, b_aln, dict(annotations))
+
+        with self._lock:
+            self._remember(key, value)
+
+            connection = self._get_connection()
+            if connection is not None:
+                try:
+                    connection.execute('INSERT OR REPLACE INTO alignments VALUES (?, ?, ?, ?)',
+                                       (key, a_aln, b_aln, json.dumps(value[2])))
+                    connection.commit()
+                except (TypeError, ValueError):
+                    log.debug('{}: unable to store alignment annotations on disk'.format(key))
+
+    def clear(self):
+        """Remove all stored alignments, from memory and disk"""
+        with self._lock:
+            self._memory.clear()
+            connection = self._get_connection()
+            if connection is not None:
+                connection.execute('DELETE FROM alignments')
+                connection.commit()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        with self._lock:
+            connection = self._get_connection()
+            if connection is not None:
+                return connection.execute('SELECT COUNT(*) FROM alignments').fetchone()[0]
+            return len(self._memory)
+
+    def __getstate__(self):
+        # SQLite connections and locks cannot be pickled, they are recreated when unpickled
+        state = self.__dict__.copy()
+        state['_connection'] = None
+        state['_connection_pid'] = None
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
@@ -5,9 +5,14 @@ Sequence BLAST
 
 import os
 import subprocess
+from collections import OrderedDict
+import numpy as np
 import pandas as pd
 import os.path as op
+from Bio import SeqIO
 from ssbio import utils
+import ssbio.protein.sequence.utils.alignment
+from ssbio.protein.sequence.utils.kmer_index import KmerIndex
 import logging
 try:
     from IPython.display import clear_output
@@ -177,7 +182,40 @@ def print_run_bidirectional_blast(reference, other_genome, dbtype, outdir):
                                   walltime='00:15:00', queue='regular')
 
 
-def calculate_bbh(blast_results_1, blast_results_2, r_name=None, g_name=None, outdir=''):
+_BLAST_COLS = ['gene', 'subject', 'PID', 'alnLength', 'mismatchCount', 'gapOpenCount', 'queryStart', 'queryEnd',
+               'subjectStart', 'subjectEnd', 'eVal', 'bitScore']
+
+
+def _best_hits(blast_df, sort_by):
+    """Get the best hit of each query gene in a DataFrame of BLAST results.
+
+    Hits are ranked by the ``sort_by`` columns in order, higher is better except for ``eVal``. Remaining ties are
+    broken by taking the first hit. Genes are returned in the order they first appear.
+
+    """
+    blast_df = blast_df[pd.notnull(blast_df.gene)]
+    ascending = [x == 'eVal' for x in sort_by]
+    best = blast_df.sort_values(sort_by, ascending=ascending, kind='mergesort').drop_duplicates('gene', keep='first')
+
+    gene_order = pd.Series(range(len(best)), index=pd.unique(blast_df.gene))
+    return best.iloc[gene_order[best.gene].values.argsort(kind='mergesort')]
+
+
+def _read_best_hits(blast_results, sort_by, chunksize=None):
+    """Read a BLAST outfmt 6 file and get the best hit of each query gene, optionally reading the file in chunks"""
+    if not chunksize:
+        return _best_hits(pd.read_csv(blast_results, sep='\t', names=_BLAST_COLS), sort_by)
+
+    # The best hit of each chunk keeps its original index, so the best of those is the overall best hit
+    chunk_best_hits = [_best_hits(chunk, sort_by) for chunk in pd.read_csv(blast_results, sep='\t', names=_BLAST_COLS,
+                                                                            chunksize=chunksize)]
+    if not chunk_best_hits:
+        return pd.DataFrame(columns=_BLAST_COLS)
+    return _best_hits(pd.concat(chunk_best_hits), sort_by)
+
+
+def calculate_bbh(blast_results_1, blast_results_2, r_name=None, g_name=None, outdir='', sort_by='PID',
+                  chunksize=None, force_rerun=False):
     """Calculate the best bidirectional BLAST hits (BBH) and save a dataframe of results.
 
     Args:
@@ -186,16 +224,17 @@ def calculate_bbh(blast_results_1, blast_results_2, r_name=None, g_name=None, ou
         r_name: Name of reference genome
         g_name: Name of other genome
         outdir: Directory where BLAST results are stored.
+        sort_by (str, list): Column or columns used to pick the best hit of a gene, in order of priority - any of
+            ``PID``, ``bitScore`` (higher is better) and ``eVal`` (lower is better). Remaining ties are broken by
+            taking the first hit in the file.
+        chunksize (int): Number of lines of the BLAST results files to read at a time, to limit memory use for large
+            files. If not set, the files are read at once.
+        force_rerun (bool): If the BBHs should be found again even if the outfile exists
 
     Returns:
         Path to Pandas DataFrame of the BBH results.
 
     """
-    # TODO: add force_rerun option
-
-    cols = ['gene', 'subject', 'PID', 'alnLength', 'mismatchCount', 'gapOpenCount', 'queryStart', 'queryEnd',
-            'subjectStart', 'subjectEnd', 'eVal', 'bitScore']
-
     if not r_name and not g_name:
         r_name = op.basename(blast_results_1).split('_vs_')[0]
         g_name = op.basename(blast_results_1).split('_vs_')[1].replace('_blast.out', '')
@@ -205,42 +244,476 @@ def calculate_bbh(blast_results_1, blast_results_2, r_name=None, g_name=None, ou
             log.warning('{} != {}'.format(r_name, r_name2))
 
     outfile = op.join(outdir, '{}_vs_{}_bbh.csv'.format(r_name, g_name))
-    if op.exists(outfile) and os.stat(outfile).st_size != 0:
+    if op.exists(outfile) and os.stat(outfile).st_size != 0 and not force_rerun:
         log.debug('{} vs {} BLAST BBHs already found at {}'.format(r_name, g_name, outfile))
         return outfile
 
-    bbh1 = pd.read_csv(blast_results_1, sep='\t', names=cols)
-    bbh2 = pd.read_csv(blast_results_2, sep='\t', names=cols)
-
-    out = pd.DataFrame()
+    sort_by = utils.force_list(sort_by)
     log.debug('Finding BBHs for {} vs. {}'.format(r_name, g_name))
 
-    for g in bbh1[pd.notnull(bbh1.gene)].gene.unique():
-        res = bbh1[bbh1.gene == g]
-        if len(res) == 0:
-            continue
-        best_hit = res.ix[res.PID.idxmax()].copy()
-        best_gene = best_hit.subject
-        res2 = bbh2[bbh2.gene == best_gene]
-        if len(res2) == 0:
-            continue
-        best_hit2 = res2.ix[res2.PID.idxmax()]
-        best_gene2 = best_hit2.subject
-        if g == best_gene2:
-            best_hit['BBH'] = '<=>'
-        else:
-            best_hit['BBH'] = '->'
-        out = pd.concat([out, pd.DataFrame(best_hit).transpose()])
+    best_hits_1 = _read_best_hits(blast_results_1, sort_by=sort_by, chunksize=chunksize)
+    best_hits_2 = _read_best_hits(blast_results_2, sort_by=sort_by, chunksize=chunksize)
+    best_subject_2 = pd.Series(best_hits_2.subject.values, index=best_hits_2.gene.values)
+
+    # Only keep genes whose best hit has hits in the other direction
+    out = best_hits_1[best_hits_1.subject.isin(best_subject_2.index)].copy()
+    if out.empty:
+        out = pd.DataFrame()
+    else:
+        reciprocal = out.gene.values == best_subject_2[out.subject].values
+        out['BBH'] = ['<=>' if x else '->' for x in reciprocal]
 
     out.to_csv(outfile)
     log.debug('{} vs {} BLAST BBHs saved at {}'.format(r_name, g_name, outfile))
     return outfile
 
 
+def run_blast(query, db, dbtype, outfile, force_rerun=False):
+    """BLAST a FASTA file against a BLAST database, saving the hits in tabular (outfmt 6) format.
+
+    Args:
+        query (str): Path to FASTA file of query sequences
+        db (str): Path to BLAST database, without the file extensions (see :func:`run_makeblastdb`)
+        dbtype (str): "nucl" or "prot" - what format the sequences are in
+        outfile (str): Path to BLAST output file
+        force_rerun (bool): If BLAST should be run even if the outfile exists
+
+    Returns:
+        str: Path to BLAST output file
+
+    """
+    if dbtype == 'nucl':
+        command = 'blastn'
+    elif dbtype == 'prot':
+        command = 'blastp'
+    else:
+        raise ValueError('dbtype must be "nucl" or "prot"')
+
+    if op.exists(outfile) and os.stat(outfile).st_size != 0 and not force_rerun:
+        log.debug('{}: BLAST already run'.format(outfile))
+        return outfile
+
+    cmd = '{} -query {} -db {} -outfmt 6 -out {}'.format(command, query, db, outfile)
+    log.debug('Running: {}'.format(cmd))
+    retval = subprocess.call(cmd, shell=True)
+    if retval == 0:
+        log.debug('BLASTed {} vs {}'.format(query, db))
+    else:
+        log.error('Error running {}, exit code {}'.format(command, retval))
+    return outfile
+
+
+_BLOSUM62_GAPPED_LAMBDA = 0.267
+_BLOSUM62_GAPPED_K = 0.041
+"""Karlin-Altschul parameters of BLOSUM62 with gapped alignments, used to estimate bit scores and E-values of hits
+confirmed by the in-process aligner"""
+
+
+def get_alignment_hit(gene, subject, gene_seq, subject_seq, db_length):
+    """Align two protein sequences with the in-process aligner and describe the result like a BLAST outfmt 6 hit.
+
+    The global alignment is trimmed to the region between the first and last aligned residues. The bit score and
+    E-value are estimated from the score of that region with the gapped BLOSUM62 Karlin-Altschul parameters, so they
+    are close to, but not the same as, the values BLAST would report.
+
+    Args:
+        gene (str): ID of the query sequence
+        subject (str): ID of the subject sequence
+        gene_seq (str): Query sequence
+        subject_seq (str): Subject sequence
+        db_length (int): Total length of the sequences searched, to estimate the E-value
+
+    Returns:
+        dict: BLAST outfmt 6 columns (see ``_BLAST_COLS``) to their values, None if no residues could be aligned
+
+    """
+    if gene_seq == subject_seq:
+        gene_aln, subject_aln = gene_seq, subject_seq
+    else:
+        gene_aln, subject_aln, _ = ssbio.protein.sequence.utils.alignment.run_numpy_alignment(gene_seq, subject_seq)
+
+    gene_bytes = np.frombuffer(gene_aln.encode('ascii', 'replace'), dtype=np.uint8)
+    subject_bytes = np.frombuffer(subject_aln.encode('ascii', 'replace'), dtype=np.uint8)
+    gap = ord('-')
+    aligned = np.flatnonzero((gene_bytes != gap) & (subject_bytes != gap))
+    if not len(aligned):
+        return None
+
+    first, last = aligned[0], aligned[-1] + 1
+    gene_gap = gene_bytes[first:last] == gap
+    subject_gap = subject_bytes[first:last] == gap
+    gapped = gene_gap | subject_gap
+    identical = (gene_bytes[first:last] == subject_bytes[first:last]) & ~gapped
+    length = last - first
+
+    gene_start = int((gene_bytes[:first] != gap).sum()) + 1
+    subject_start = int((subject_bytes[:first] != gap).sum()) + 1
+    gap_opens = int((gene_gap[1:] & ~gene_gap[:-1]).sum() + gene_gap[0] +
+                    (subject_gap[1:] & ~subject_gap[:-1]).sum() + subject_gap[0])
+
+    score = ssbio.protein.sequence.utils.alignment.get_alignment_score(gene_aln[first:last], subject_aln[first:last])
+    bit_score = (_BLOSUM62_GAPPED_LAMBDA * score - np.log(_BLOSUM62_GAPPED_K)) / np.log(2)
+
+    return {'gene'         : gene,
+            'subject'      : subject,
+            'PID'          : round(100. * identical.sum() / length, 3),
+            'alnLength'    : int(length),
+            'mismatchCount': int((~identical & ~gapped).sum()),
+            'gapOpenCount' : gap_opens,
+            'queryStart'   : gene_start,
+            'queryEnd'     : gene_start + int((~gene_gap).sum()) - 1,
+            'subjectStart' : subject_start,
+            'subjectEnd'   : subject_start + int((~subject_gap).sum()) - 1,
+            'eVal'         : float(len(gene_seq) * db_length * 2 ** -bit_score),
+            'bitScore'     : round(float(bit_score), 1)}
+
+
+def _best_kmer_partners(a_idx, b_idx, shared, ambiguity_ratio):
+    """For each sequence in ``a_idx``, get the ``b_idx`` sequence sharing the most k-mers with it, and if the runner-up
+    shares fewer than ``ambiguity_ratio`` times as many"""
+    order = np.lexsort((-shared, a_idx))
+    a_idx, b_idx, shared = a_idx[order], b_idx[order], shared[order]
+    firsts = np.flatnonzero(np.r_[True, a_idx[1:] != a_idx[:-1]])
+
+    runner_up = np.zeros(len(firsts), dtype=shared.dtype)
+    has_runner_up = firsts + 1 < len(a_idx)
+    has_runner_up[has_runner_up] &= a_idx[firsts[has_runner_up] + 1] == a_idx[firsts[has_runner_up]]
+    runner_up[has_runner_up] = shared[firsts[has_runner_up] + 1]
+
+    clear = runner_up < ambiguity_ratio * shared[firsts]
+    return dict(zip(a_idx[firsts][clear], b_idx[firsts][clear]))
+
+
+def prefilter_bbh(reference_index, reference_seqs, other_seqs, min_shared_fraction=0.3, ambiguity_ratio=0.8,
+                  min_percent_identity=90):
+    """Find best bidirectional hits between a reference and another proteome without BLAST, for proteins which are
+    clearly orthologous by their shared k-mers.
+
+    Each protein of the other proteome is paired with the reference protein it shares the most k-mers with. A pair is
+    only kept if each protein is the other's clear best partner (the runner-up shares fewer than ``ambiguity_ratio``
+    times as many k-mers), they share at least ``min_shared_fraction`` of the k-mers of the shorter protein, and their
+    alignment with the in-process aligner has at least ``min_percent_identity`` identity. All other proteins are left
+    for BLAST.
+
+    Args:
+        reference_index (KmerIndex): K-mer index of the reference proteome
+        reference_seqs (dict): Reference sequence IDs to sequence strings, in the order of the index
+        other_seqs (dict): Sequence IDs of the other proteome to sequence strings
+        min_shared_fraction (float): Minimum fraction of the k-mers of the shorter protein which must be shared
+        ambiguity_ratio (float): Maximum ratio of shared k-mers of the runner-up to the best partner
+        min_percent_identity (float): Minimum percent identity of the alignment to accept a pair
+
+    Returns:
+        DataFrame: BBHs of the reference genes, in the BBH format of :func:`calculate_bbh`
+
+    """
+    other_ids = list(other_seqs)
+    other_idx, ref_idx, shared = reference_index.count_shared_kmers(list(other_seqs.values()))
+
+    best_ref = _best_kmer_partners(other_idx, ref_idx, shared, ambiguity_ratio)
+    best_other = _best_kmer_partners(ref_idx, other_idx, shared, ambiguity_ratio)
+    pair_shared = dict(zip(zip(other_idx.tolist(), ref_idx.tolist()), shared.tolist()))
+
+    db_length = sum(len(x) for x in other_seqs.values())
+    hits = []
+    for o, r in sorted(best_ref.items(), key=lambda x: x[1]):
+        if best_other.get(r) != o:
+            continue
+        num_kmers = min(reference_index.num_kmers[r], max(len(other_seqs[other_ids[o]]) - reference_index.k + 1, 1))
+        if pair_shared[(o, r)] < min_shared_fraction * num_kmers:
+            continue
+
+        r_id = reference_index.ids[r]
+        hit = get_alignment_hit(r_id, other_ids[o], reference_seqs[r_id], other_seqs[other_ids[o]],
+                                db_length=db_length)
+        if hit and hit['PID'] >= min_percent_identity:
+            hits.append(hit)
+
+    df = pd.DataFrame(hits, columns=_BLAST_COLS)
+    df['BBH'] = '<=>'
+    return df
+
+
+def calculate_bbh_with_prefilter(reference, other_genome, outdir='', reference_index=None, k=5,
+                                 min_percent_identity=90, blast_unresolved=True, force_rerun=False):
+    """Find the best bidirectional hits (BBH) of two protein FASTA files, only running BLAST for the proteins whose
+    orthologs are not clear from their shared k-mers.
+
+    Pairs of proteins which are clear orthologs are found in-process with :func:`prefilter_bbh`. The proteins left
+    unresolved in each genome are then BLASTed against the whole other genome, and their BBHs found with
+    :func:`calculate_bbh`. When most proteins are nearly identical between strains, most of the BLAST searches of
+    :func:`run_bidirectional_blast` are skipped.
+
+    Args:
+        reference (str): Path to "reference" genome FASTA file, aka your "base strain"
+        other_genome (str): Path to other genome FASTA file
+        outdir (str): Path to folder where BLAST and BBH outputs should be placed
+        reference_index (KmerIndex): K-mer index of the reference genome, built if not given. Pass one to reuse it for
+            many genomes.
+        k (int): Length of the k-mers, if the index is built
+        min_percent_identity (float): Minimum percent identity to accept a pair without BLAST
+        blast_unresolved (bool): If the unresolved proteins should be BLASTed. If False, they have no BBHs.
+        force_rerun (bool): If the BBHs should be found again even if the outfile exists
+
+    Returns:
+        str: Path to the BBH csv file, in the same format as the output of :func:`calculate_bbh`
+
+    """
+    r_folder, r_name, r_ext = utils.split_folder_and_path(reference)
+    g_folder, g_name, g_ext = utils.split_folder_and_path(other_genome)
+
+    outfile = op.join(outdir, '{}_vs_{}_bbh.csv'.format(r_name, g_name))
+    if op.exists(outfile) and os.stat(outfile).st_size != 0 and not force_rerun:
+        log.debug('{} vs {} BBHs already found at {}'.format(r_name, g_name, outfile))
+        return outfile
+
+    reference_seqs = OrderedDict((x.id, str(x.seq)) for x in SeqIO.parse(reference, 'fasta'))
+    other_seqs = OrderedDict((x.id, str(x.seq)) for x in SeqIO.parse(other_genome, 'fasta'))
+    if reference_index is None:
+        reference_index = KmerIndex(reference_seqs, k=k)
+
+    bbh = prefilter_bbh(reference_index, reference_seqs, other_seqs, min_percent_identity=min_percent_identity)
+    resolved_ref = set(bbh.gene)
+    resolved_other = set(bbh.subject)
+    unresolved_ref = [x for x in reference_seqs if x not in resolved_ref]
+    unresolved_other = [x for x in other_seqs if x not in resolved_other]
+    log.debug('{} vs {}: {} BBHs found by prefilter, {} and {} proteins unresolved'.format(r_name, g_name, len(bbh),
+                                                                                           len(unresolved_ref),
+                                                                                           len(unresolved_other)))
+
+    # An unresolved protein can only be a BBH of another unresolved protein
+    if blast_unresolved and unresolved_ref and unresolved_other:
+        run_makeblastdb(infile=reference, dbtype='prot', outdir=r_folder)
+        run_makeblastdb(infile=other_genome, dbtype='prot', outdir=g_folder)
+
+        blast_files = []
+        for name, other_name, seqs, ids, db in [(r_name, g_name, reference_seqs, unresolved_ref, op.join(g_folder, g_name)),
+                                                (g_name, r_name, other_seqs, unresolved_other, op.join(r_folder, r_name))]:
+            # Query files are named by both genomes, many genomes can be run against the same reference at once
+            query_file = op.join(outdir, '{}_vs_{}_unresolved.faa'.format(name, other_name))
+            query = ''.join('>{}\n{}\n'.format(seq_id, seqs[seq_id]) for seq_id in ids)
+
+            # Previous BLAST results can only be reused for the same unresolved proteins
+            rerun_blast = force_rerun
+            previous_query = None
+            if op.exists(query_file):
+                with open(query_file) as f:
+                    previous_query = f.read()
+            if previous_query != query:
+                with open(query_file, 'w') as f:
+                    f.write(query)
+                rerun_blast = True
+
+            blast_files.append(run_blast(query=query_file, db=db, dbtype='prot', force_rerun=rerun_blast,
+                                         outfile=op.join(outdir, '{}_vs_{}_unresolved_blast.out'.format(name,
+                                                                                                       other_name))))
+
+        # The unresolved proteins were found again, so their BBHs are too
+        unresolved_bbh = calculate_bbh(blast_results_1=blast_files[0], blast_results_2=blast_files[1],
+                                       r_name=r_name, g_name='{}_unresolved'.format(g_name), outdir=outdir,
+                                       force_rerun=True)
+        unresolved_bbh = pd.read_csv(unresolved_bbh, index_col=0)
+        if 'BBH' in unresolved_bbh.columns:
+            bbh = pd.concat([bbh, unresolved_bbh], ignore_index=True)
+
+    bbh.to_csv(outfile)
+    log.debug('{} vs {} BBHs saved at {}'.format(r_name, g_name, outfile))
+    return outfile
+
+
+ORTHOLOGY_MATRIX_FILE_TYPES = ['csv', 'feather', 'parquet']
+"""list: File types an orthology matrix can be saved as. CSV files store the gene x strain matrix, Feather and Parquet
+files store the (gene, strain, ortholog) pairs of the matrix with dictionary encoded columns, and require ``pyarrow``"""
+
+
+def read_bbh_orthologs(genome_to_bbh_files, pid_cutoff=None, bitscore_cutoff=None, evalue_cutoff=None,
+                       filter_condition='AND'):
+    """Read the orthologous genes of many genomes from best bidirectional BLAST hits (BBH) outputs.
+
+    Args:
+        genome_to_bbh_files (dict): Mapping of genome names to the BBH csv output from the
+            :func:`~ssbio.protein.sequence.utils.blast.calculate_bbh` method
+        pid_cutoff (float): Minimum percent identity between BLAST hits to filter for in the range [0, 100]
+        bitscore_cutoff (float): Minimum bitscore allowed between BLAST hits
+        evalue_cutoff (float): Maximum E-value allowed between BLAST hits
+        filter_condition (str): ``AND`` or ``OR``, if hits must pass all cutoffs or any of them
+
+    Returns:
+        DataFrame: Orthologous gene pairs, with the columns ``gene`` (reference gene), ``strain`` (genome name) and
+        ``subject`` (gene of the genome), with the strain column as a categorical in the order of the genomes
+
+    """
+    if not pid_cutoff and not bitscore_cutoff and not evalue_cutoff:
+        log.warning('No cutoffs supplied, insignificant hits may be reported')
+
+    if filter_condition.upper() not in ['AND', 'OR']:
+        raise ValueError('{}: filter condition must be "AND" or "OR"'.format(filter_condition))
+
+    frames = []
+    for g_name, bbh_path in genome_to_bbh_files.items():
+        df_bbh = pd.read_csv(bbh_path, index_col=0)
+        if 'BBH' not in df_bbh.columns:
+            log.debug('{}: no BBHs'.format(g_name))
+            continue
+
+        # Only the cutoffs which are set are combined, all hits are kept if none are set
+        passes = []
+        if pid_cutoff:
+            passes.append(df_bbh.PID.values > pid_cutoff)
+        if evalue_cutoff:
+            passes.append(df_bbh.eVal.values < evalue_cutoff)
+        if bitscore_cutoff:
+            passes.append(df_bbh.bitScore.values > bitscore_cutoff)
+
+        keep = df_bbh.BBH.values == '<=>'
+        if passes:
+            if filter_condition.upper() == 'AND':
+                keep &= np.logical_and.reduce(passes)
+            else:
+                keep &= np.logical_or.reduce(passes)
+
+        frames.append(pd.DataFrame({'gene': df_bbh.gene.values[keep], 'strain': g_name,
+                                    'subject': df_bbh.subject.values[keep]}))
+
+    strains = pd.CategoricalDtype(list(genome_to_bbh_files))
+    if not frames:
+        return pd.DataFrame({'gene': pd.Series([], dtype=object), 'strain': pd.Series([], dtype=strains),
+                             'subject': pd.Series([], dtype=object)})
+
+    df_orthologs = pd.concat(frames, ignore_index=True)
+    df_orthologs['strain'] = df_orthologs.strain.astype(strains)
+    # Keep the first hit if a gene has more than one BBH in a genome
+    return df_orthologs.drop_duplicates(['gene', 'strain']).reset_index(drop=True)
+
+
+def pivot_orthology_matrix(df_orthologs):
+    """Pivot orthologous gene pairs into an orthology matrix in one step, by placing each pair at the category codes
+    of its gene and strain.
+
+    Args:
+        df_orthologs (DataFrame): Orthologous gene pairs, as returned by :func:`read_bbh_orthologs`
+
+    Returns:
+        DataFrame: Orthology matrix of reference genes (rows, sorted) x strains (columns, in the order of the strain
+        categories), with the gene of each strain orthologous to each reference gene, NaN if there is none
+
+    """
+    genes = pd.Categorical(df_orthologs.gene.astype(str))
+    strains = df_orthologs.strain
+    if not isinstance(strains.dtype, pd.CategoricalDtype):
+        strains = strains.astype('category')
+
+    matrix = np.full((len(genes.categories), len(strains.cat.categories)), np.nan, dtype=object)
+    matrix[genes.codes, strains.cat.codes.values] = np.asarray(df_orthologs.subject, dtype=object)
+
+    return pd.DataFrame(matrix, index=pd.Index(genes.categories, name='gene', dtype=object),
+                        columns=pd.Index(strains.cat.categories, dtype=object))
+
+
+def _orthology_matrix_file_type(path):
+    file_type = op.splitext(path)[1].lstrip('.').lower()
+    if file_type not in ORTHOLOGY_MATRIX_FILE_TYPES:
+        raise ValueError('{}: orthology matrix file type must be one of {}'.format(path, ORTHOLOGY_MATRIX_FILE_TYPES))
+    return file_type
+
+
+def save_orthology_matrix(df_orthology_matrix, outfile):
+    """Save an orthology matrix, in the format given by the file extension (see ``ORTHOLOGY_MATRIX_FILE_TYPES``).
+
+    Args:
+        df_orthology_matrix (DataFrame): Orthology matrix of reference genes x strains
+        outfile (str): Path to output file, ending in ``.csv``, ``.feather`` or ``.parquet``
+
+    Returns:
+        str: Path to the output file
+
+    """
+    file_type = _orthology_matrix_file_type(outfile)
+    if file_type == 'csv':
+        df_orthology_matrix.to_csv(outfile)
+        return outfile
+
+    # Store only the pairs which are in the matrix, with each column dictionary encoded
+    matrix = df_orthology_matrix.to_numpy(dtype=object)
+    gene_idx, strain_idx = np.nonzero(pd.notnull(matrix))
+    df_orthologs = pd.DataFrame({'gene': pd.Categorical.from_codes(gene_idx, df_orthology_matrix.index.astype(str)),
+                                 'strain': pd.Categorical.from_codes(strain_idx, df_orthology_matrix.columns.astype(str)),
+                                 'subject': pd.Categorical(matrix[gene_idx, strain_idx].astype(str))})
+    if file_type == 'feather':
+        df_orthologs.to_feather(outfile)
+    else:
+        df_orthologs.to_parquet(outfile, index=False)
+    return outfile
+
+
+def load_orthology_matrix(infile):
+    """Load an orthology matrix saved by :func:`create_orthology_matrix` or :func:`save_orthology_matrix`.
+
+    Args:
+        infile (str): Path to orthology matrix file, ending in ``.csv``, ``.feather`` or ``.parquet``
+
+    Returns:
+        DataFrame: Orthology matrix of reference genes x strains
+
+    """
+    file_type = _orthology_matrix_file_type(infile)
+    if file_type == 'csv':
+        return pd.read_csv(infile, index_col=0)
+    elif file_type == 'feather':
+        df_orthologs = pd.read_feather(infile)
+    else:
+        df_orthologs = pd.read_parquet(infile)
+
+    df = pivot_orthology_matrix(df_orthologs)
+    # Genes without any orthologs were stored as unused categories
+    if isinstance(df_orthologs.gene.dtype, pd.CategoricalDtype):
+        df = df.reindex(pd.Index(df_orthologs.gene.cat.categories, name='gene', dtype=object))
+    return df
+
+
+def lookup_orthologs(df_orthology_matrix, genes, strains):
+    """Look up the orthologous genes of many (reference gene, strain) pairs at once.
+
+    Examples:
+        >>> df = pd.DataFrame({'s1': ['a1', np.nan], 's2': ['a2', 'b2']}, index=['a', 'b'])
+        >>> lookup_orthologs(df, ['a', 'b', 'b', 'c'], ['s2', 's1', 's2', 's1']).tolist()
+        ['a2', None, 'b2', None]
+        >>> lookup_orthologs(df, ['a', 'b'], 's2').tolist()
+        ['a2', 'b2']
+
+    Args:
+        df_orthology_matrix (DataFrame): Orthology matrix of reference genes x strains
+        genes (str, list): Reference gene IDs
+        strains (str, list): Strain IDs, the same length as ``genes`` or a single strain for all genes
+
+    Returns:
+        ndarray: Gene of the strain orthologous to each reference gene, None if there is none or if the gene or strain
+        is not in the matrix
+
+    """
+    genes, strains = np.broadcast_arrays(np.atleast_1d(np.asarray(genes, dtype=object)),
+                                         np.atleast_1d(np.asarray(strains, dtype=object)))
+    gene_idx = df_orthology_matrix.index.get_indexer(genes)
+    strain_idx = df_orthology_matrix.columns.get_indexer(strains)
+    found = (gene_idx >= 0) & (strain_idx >= 0)
+
+    orthologs = np.full(len(genes), None, dtype=object)
+    if found.any():
+        # Only the columns of the strains asked for are converted to an array
+        used_strains = np.unique(strain_idx[found])
+        values = df_orthology_matrix.iloc[:, used_strains].to_numpy(dtype=object)
+        orthologs[found] = values[gene_idx[found], np.searchsorted(used_strains, strain_idx[found])]
+    orthologs[pd.isnull(orthologs)] = None
+    return orthologs
+
+
 def create_orthology_matrix(r_name, genome_to_bbh_files, pid_cutoff=None, bitscore_cutoff=None, evalue_cutoff=None,
-                            outname='', outdir='', force_rerun=False):
+                            filter_condition='AND', outname='', outdir='', force_rerun=False):
     """Create an orthology matrix using best bidirectional BLAST hits (BBH) outputs.
 
+    The BBHs of all genomes are read into one table of orthologous gene pairs and pivoted into the matrix at once, see
+    :func:`read_bbh_orthologs` and :func:`pivot_orthology_matrix`.
+
     Args:
         r_name (str): Name of the reference genome
         genome_to_bbh_files (dict): Mapping of genome names to the BBH csv output from the
@@ -248,12 +721,14 @@ def create_orthology_matrix(r_name, genome_to_bbh_files, pid_cutoff=None, bitsco
         pid_cutoff (float): Minimum percent identity between BLAST hits to filter for in the range [0, 100]
         bitscore_cutoff (float): Minimum bitscore allowed between BLAST hits
         evalue_cutoff (float): Maximum E-value allowed between BLAST hits
-        outname: Name of output file of orthology matrix
+        filter_condition (str): ``AND`` or ``OR``, if hits must pass all cutoffs or any of them
+        outname: Name of output file of orthology matrix, its extension sets the file type (see
+            ``ORTHOLOGY_MATRIX_FILE_TYPES``). Default is ``<r_name>_orthology.csv``.
         outdir: Path to output directory
         force_rerun (bool): Force recreation of the orthology matrix even if the outfile exists
 
     Returns:
-        str: Path to orthologous genes matrix.
+        str: Path to orthologous genes matrix, load it with :func:`load_orthology_matrix`
 
     """
     if outname:
@@ -265,33 +740,8 @@ def create_orthology_matrix(r_name, genome_to_bbh_files, pid_cutoff=None, bitsco
         log.info('{}: loaded existing orthology matrix'.format(outfile))
         return outfile
 
-    if not pid_cutoff and not bitscore_cutoff and not evalue_cutoff:
-        log.warning('No cutoffs supplied, insignificant hits may be reported')
-
-    if not pid_cutoff:
-        pid_cutoff = 0
-    if not bitscore_cutoff:
-        bitscore_cutoff = 0
-    if not evalue_cutoff:
-        evalue_cutoff = float('Inf')
-
-    out = pd.DataFrame()
-    for g_name, bbh_path in genome_to_bbh_files.items():
-
-        df_bbh = pd.read_csv(bbh_path, index_col=0)
-        bidirectional = df_bbh[df_bbh.BBH == '<=>']
-
-        data = bidirectional[(bidirectional.PID > pid_cutoff) & (bidirectional.eVal < evalue_cutoff) & (bidirectional.bitScore > bitscore_cutoff)]
-
-        data.index = data.gene
-        data2 = data[['subject']]
-        if out.empty:
-            out = data2
-            out = out.rename(columns={'subject': g_name})
-        else:
-            out = pd.merge(out, data2, left_index=True, right_index=True, how='outer')
-            out = out.rename(columns={'subject': g_name})
-
-    out.to_csv(outfile)
+    df_orthologs = read_bbh_orthologs(genome_to_bbh_files, pid_cutoff=pid_cutoff, bitscore_cutoff=bitscore_cutoff,
+                                      evalue_cutoff=evalue_cutoff, filter_condition=filter_condition)
+    save_orthology_matrix(pivot_orthology_matrix(df_orthologs), outfile)
     log.debug('{} orthologous genes saved at {}'.format(r_name, outfile))
     return outfile
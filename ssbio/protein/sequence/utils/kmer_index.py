@@ -0,0 +1,138 @@
+"""
+K-mer Index
+===========
+"""
+
+import logging
+
+import numpy as np
+
+import ssbio.protein.sequence.utils
+
+log = logging.getLogger(__name__)
+
+
+_KMER_ALPHABET_SIZE = 27
+"""int: Letters are encoded as 0-25 for A-Z and 26 for anything else, so k-mers of up to 13 letters fit in an int64"""
+
+
+def _encode(seq):
+    """Encode a sequence string into an array of letter codes"""
+    codes = np.frombuffer(seq.upper().encode('ascii', 'replace'), dtype=np.uint8).astype(np.int64) - ord('A')
+    codes[(codes < 0) | (codes > 25)] = 26
+    return codes
+
+
+def get_kmer_codes(seq, k=5):
+    """Get the unique k-mers of a sequence, encoded as integers.
+
+    Examples:
+        >>> len(get_kmer_codes('MKTAYMKTA', k=4))  # MKTA is found twice
+        5
+        >>> len(get_kmer_codes('MKT', k=4))
+        0
+
+    Args:
+        seq (str, Seq, SeqRecord): Protein sequence
+        k (int): Length of the k-mers
+
+    Returns:
+        ndarray: Sorted, unique integer codes of the k-mers in the sequence
+
+    """
+    if k < 1 or k > 13:
+        raise ValueError('{}: k-mer length must be between 1 and 13'.format(k))
+
+    seq = ssbio.protein.sequence.utils.cast_to_str(seq)
+    if len(seq) < k:
+        return np.array([], dtype=np.int64)
+
+    windows = np.lib.stride_tricks.sliding_window_view(_encode(seq), k)
+    powers = _KMER_ALPHABET_SIZE ** np.arange(k - 1, -1, -1, dtype=np.int64)
+    return np.unique(windows @ powers)
+
+
+class KmerIndex(object):
+
+    """Index of the k-mers in a set of protein sequences, to quickly count the k-mers they share with other sequences.
+
+    The unique k-mers of all indexed sequences are kept in one sorted array with the sequences each k-mer is found in,
+    so the k-mers of many query sequences can be looked up at once with a binary search.
+
+    Examples:
+        >>> index = KmerIndex({'a': 'MKTAYIAKQRQISFVKSHFSRQ', 'b': 'MSTNPKPQRKTKRNTNRRPQDV'}, k=5)
+        >>> query_idx, index_idx, shared = index.count_shared_kmers(['MKTAYIAKQRQISFVKSHFSRA'])
+        >>> [index.ids[x] for x in index_idx], shared.tolist()
+        (['a'], [17])
+
+    Args:
+        sequences (dict): Sequence IDs to their sequence strings, or a list of SeqRecords
+        k (int): Length of the k-mers
+
+    """
+
+    def __init__(self, sequences, k=5):
+        if isinstance(sequences, dict):
+            sequences = list(sequences.items())
+        else:
+            sequences = [(x.id, x) for x in sequences]
+
+        self.k = k
+        self.ids = [x[0] for x in sequences]
+        """list: IDs of the indexed sequences, in the order of their indices"""
+
+        kmers = [get_kmer_codes(x[1], k=k) for x in sequences]
+        self.num_kmers = np.array([len(x) for x in kmers], dtype=np.int64)
+        """ndarray: Number of unique k-mers in each indexed sequence"""
+
+        if not kmers:
+            all_codes = np.array([], dtype=np.int64)
+        else:
+            all_codes = np.concatenate(kmers)
+        seq_idx = np.repeat(np.arange(len(kmers)), self.num_kmers)
+
+        order = np.argsort(all_codes, kind='mergesort')
+        self._codes, starts = np.unique(all_codes[order], return_index=True)
+        self._offsets = np.append(starts, len(all_codes))
+        self._seq_idx = seq_idx[order]
+
+    def __repr__(self):
+        return '<KmerIndex: {} sequences, {} unique {}-mers>'.format(len(self.ids), len(self._codes), self.k)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def count_shared_kmers(self, sequences):
+        """Count the unique k-mers each query sequence shares with each indexed sequence.
+
+        Args:
+            sequences (list): Query sequence strings, Seqs or SeqRecords
+
+        Returns:
+            tuple: Arrays of the query sequence index, indexed sequence index, and number of shared k-mers, of every
+            pair of sequences sharing at least one k-mer, sorted by query and then indexed sequence
+
+        """
+        kmers = [get_kmer_codes(x, k=self.k) for x in sequences]
+        if not kmers or not len(self._codes):
+            empty = np.array([], dtype=np.int64)
+            return empty, empty, empty
+
+        query_codes = np.concatenate(kmers)
+        query_idx = np.repeat(np.arange(len(kmers)), [len(x) for x in kmers])
+
+        # Find the run of indexed sequences of each query k-mer
+        pos = np.searchsorted(self._codes, query_codes)
+        pos[pos == len(self._codes)] = 0
+        found = self._codes[pos] == query_codes
+        starts = self._offsets[pos[found]]
+        lengths = self._offsets[pos[found] + 1] - starts
+
+        # Expand the runs into one (query, indexed sequence) pair per shared k-mer
+        run_offsets = np.cumsum(lengths) - lengths
+        gather = np.repeat(starts - run_offsets, lengths) + np.arange(lengths.sum())
+        pair_query = np.repeat(query_idx[found], lengths)
+        pair_index = self._seq_idx[gather]
+
+        keys, shared = np.unique(pair_query * len(self.ids) + pair_index, return_counts=True)
+        return keys // len(self.ids), keys % len(self.ids), shared
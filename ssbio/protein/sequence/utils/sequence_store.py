@@ -0,0 +1,288 @@
+"""
+Sequence Store
+==============
+"""
+
+import logging
+import os
+import os.path as op
+import sqlite3
+import threading
+
+from Bio import SeqIO
+from Bio.Seq import Seq
+from Bio.SeqRecord import SeqRecord
+
+log = logging.getLogger(__name__)
+
+
+class SequenceStore(object):
+
+    """Persistent store of the protein sequences of many genomes, keyed by genome ID and sequence ID.
+
+    Each genome FASTA file is read once into a SQLite database, so sequences can then be looked up by key from any
+    process without parsing or indexing the FASTA file again. A genome is only read again if its FASTA file changed
+    (by size or modification time) since it was added.
+
+    Examples:
+        >>> store = SequenceStore('genomes.db')  # doctest: +SKIP
+        >>> store.add_genome('strain1', 'strain1.faa')  # doctest: +SKIP
+        >>> store.get_genome('strain1')['gene1'].seq  # doctest: +SKIP
+        Seq('MKT...')
+
+    Args:
+        db_path (str): Path to the SQLite database file, created if it does not exist
+
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._connection = None
+        self._connection_pid = None
+        self._lock = threading.RLock()
+
+    def __repr__(self):
+        return '<SequenceStore: {} genomes at {}>'.format(len(self.genome_ids), self.db_path)
+
+    def _get_connection(self):
+        """Get the SQLite connection, reopening it if this is a forked process"""
+        if self._connection is None or self._connection_pid != os.getpid():
+            self._connection = sqlite3.connect(self.db_path, timeout=60, check_same_thread=False)
+            self._connection.execute('CREATE TABLE IF NOT EXISTS genomes '
+                                     '(genome_id TEXT PRIMARY KEY, path TEXT, size INTEGER, mtime REAL, '
+                                     'num_sequences INTEGER)')
+            self._connection.execute('CREATE TABLE IF NOT EXISTS sequences '
+                                     '(genome_id TEXT, seq_id TEXT, description TEXT, seq TEXT, '
+                                     'PRIMARY KEY (genome_id, seq_id)) WITHOUT ROWID')
+            self._connection.commit()
+            self._connection_pid = os.getpid()
+        return self._connection
+
+    @property
+    def genome_ids(self):
+        """list: IDs of all genomes in the store"""
+        with self._lock:
+            return [x[0] for x in self._get_connection().execute('SELECT genome_id FROM genomes ORDER BY genome_id')]
+
+    def __contains__(self, genome_id):
+        with self._lock:
+            return self._get_connection().execute('SELECT 1 FROM genomes WHERE genome_id = ?',
+                                                  (genome_id,)).fetchone() is not None
+
+    def is_current(self, genome_id, fasta_file):
+        """Check if a genome is in the store and was added from the current version of a FASTA file.
+
+        Args:
+            genome_id (str): Genome ID
+            fasta_file (str): Path to the genome FASTA file
+
+        Returns:
+            bool: If the genome does not need to be added again
+
+        """
+        with self._lock:
+            row = self._get_connection().execute('SELECT path, size, mtime FROM genomes WHERE genome_id = ?',
+                                                 (genome_id,)).fetchone()
+        if not row or not op.exists(fasta_file):
+            return False
+        stat = os.stat(fasta_file)
+        return row[0] == op.abspath(fasta_file) and row[1] == stat.st_size and row[2] == stat.st_mtime
+
+    def add_genome(self, genome_id, fasta_file, force_rerun=False):
+        """Add the sequences of a genome FASTA file to the store, unless they were added already.
+
+        Args:
+            genome_id (str): Genome ID, i.e. a strain ID
+            fasta_file (str): Path to the genome FASTA file
+            force_rerun (bool): If the FASTA file should be read again even if it did not change
+
+        Returns:
+            int: Number of sequences in the genome
+
+        """
+        if not force_rerun and self.is_current(genome_id, fasta_file):
+            log.debug('{}: genome already in sequence store'.format(genome_id))
+            with self._lock:
+                return self._get_connection().execute('SELECT num_sequences FROM genomes WHERE genome_id = ?',
+                                                      (genome_id,)).fetchone()[0]
+
+        stat = os.stat(fasta_file)
+        rows = [(genome_id, record.id, record.description, str(record.seq))
+                for record in SeqIO.parse(fasta_file, 'fasta')]
+        if len(set(x[1] for x in rows)) != len(rows):
+            raise ValueError('{}: duplicate sequence IDs in FASTA file {}'.format(genome_id, fasta_file))
+
+        with self._lock:
+            connection = self._get_connection()
+            with connection:
+                connection.execute('DELETE FROM sequences WHERE genome_id = ?', (genome_id,))
+                connection.executemany('INSERT INTO sequences VALUES (?, ?, ?, ?)', rows)
+                connection.execute('INSERT OR REPLACE INTO genomes VALUES (?, ?, ?, ?, ?)',
+                                   (genome_id, op.abspath(fasta_file), stat.st_size, stat.st_mtime, len(rows)))
+
+        log.debug('{}: added {} sequences to sequence store'.format(genome_id, len(rows)))
+        return len(rows)
+
+    def remove_genome(self, genome_id):
+        """Remove a genome and its sequences from the store.
+
+        Args:
+            genome_id (str): Genome ID
+
+        """
+        with self._lock:
+            connection = self._get_connection()
+            with connection:
+                connection.execute('DELETE FROM sequences WHERE genome_id = ?', (genome_id,))
+                connection.execute('DELETE FROM genomes WHERE genome_id = ?', (genome_id,))
+
+    def get_seq_ids(self, genome_id):
+        """Get the IDs of all sequences of a genome.
+
+        Args:
+            genome_id (str): Genome ID
+
+        Returns:
+            list: Sequence IDs, in sorted order
+
+        """
+        with self._lock:
+            return [x[0] for x in self._get_connection().execute('SELECT seq_id FROM sequences WHERE genome_id = ? '
+                                                                 'ORDER BY seq_id', (genome_id,))]
+
+    def get_sequence(self, genome_id, seq_id):
+        """Get a sequence string.
+
+        Args:
+            genome_id (str): Genome ID
+            seq_id (str): Sequence ID
+
+        Returns:
+            str: Amino acid sequence
+
+        Raises:
+            KeyError: If the sequence is not in the store
+
+        """
+        with self._lock:
+            row = self._get_connection().execute('SELECT seq FROM sequences WHERE genome_id = ? AND seq_id = ?',
+                                                 (genome_id, seq_id)).fetchone()
+        if row is None:
+            raise KeyError('{}: sequence {} not in sequence store'.format(genome_id, seq_id))
+        return row[0]
+
+    def get_record(self, genome_id, seq_id):
+        """Get a sequence as a SeqRecord, like one from a ``SeqIO.index`` of the genome FASTA file.
+
+        Args:
+            genome_id (str): Genome ID
+            seq_id (str): Sequence ID
+
+        Returns:
+            SeqRecord: Sequence record with the ID and description from the FASTA file
+
+        Raises:
+            KeyError: If the sequence is not in the store
+
+        """
+        with self._lock:
+            row = self._get_connection().execute('SELECT description, seq FROM sequences '
+                                                 'WHERE genome_id = ? AND seq_id = ?', (genome_id, seq_id)).fetchone()
+        if row is None:
+            raise KeyError('{}: sequence {} not in sequence store'.format(genome_id, seq_id))
+        return SeqRecord(Seq(row[1]), id=seq_id, name=seq_id, description=row[0])
+
+    def get_sequences(self, keys):
+        """Get many sequence strings at once.
+
+        Args:
+            keys (list): Tuples of genome ID and sequence ID
+
+        Returns:
+            dict: Tuples of genome ID and sequence ID to their sequence string, keys not in the store are left out
+
+        """
+        keys = list(keys)
+        sequences = {}
+        with self._lock:
+            connection = self._get_connection()
+            # Stay under SQLite's limit of variables per query
+            for i in range(0, len(keys), 400):
+                chunk = keys[i:i + 400]
+                query = 'SELECT genome_id, seq_id, seq FROM sequences WHERE {}'.format(
+                        ' OR '.join(['(genome_id = ? AND seq_id = ?)'] * len(chunk)))
+                params = [x for key in chunk for x in key]
+                for genome_id, seq_id, seq in connection.execute(query, params):
+                    sequences[(genome_id, seq_id)] = seq
+        return sequences
+
+    def get_genome(self, genome_id):
+        """Get the sequences of one genome as a dictionary-like object, a replacement for ``SeqIO.index``.
+
+        Args:
+            genome_id (str): Genome ID
+
+        Returns:
+            GenomeSequences: Sequence IDs to SeqRecords, read from the store when accessed
+
+        """
+        if genome_id not in self:
+            raise ValueError('{}: genome not in sequence store {}'.format(genome_id, self.db_path))
+        return GenomeSequences(self, genome_id)
+
+    def __getstate__(self):
+        # SQLite connections and locks cannot be pickled, they are recreated when unpickled
+        state = self.__dict__.copy()
+        state['_connection'] = None
+        state['_connection_pid'] = None
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+
+class GenomeSequences(object):
+
+    """Sequences of one genome in a :class:`SequenceStore`, accessed like the dictionary returned by ``SeqIO.index``.
+
+    Args:
+        store (SequenceStore): Store the genome was added to
+        genome_id (str): Genome ID
+
+    """
+
+    def __init__(self, store, genome_id):
+        self.store = store
+        self.genome_id = genome_id
+
+    def __repr__(self):
+        return '<GenomeSequences: {} in {}>'.format(self.genome_id, self.store.db_path)
+
+    def __getitem__(self, seq_id):
+        return self.store.get_record(self.genome_id, seq_id)
+
+    def __contains__(self, seq_id):
+        try:
+            self.store.get_sequence(self.genome_id, seq_id)
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self):
+        return iter(self.store.get_seq_ids(self.genome_id))
+
+    def __len__(self):
+        return len(self.store.get_seq_ids(self.genome_id))
+
+    def keys(self):
+        """list: Sequence IDs of the genome"""
+        return self.store.get_seq_ids(self.genome_id)
+
+    def get(self, seq_id, default=None):
+        """Get a SeqRecord, or ``default`` if the sequence is not in the genome"""
+        try:
+            return self[seq_id]
+        except KeyError:
+            return default
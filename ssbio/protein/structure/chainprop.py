@@ -14,6 +14,10 @@ class ChainProp(Object):
 
         self.pdb_parent = pdb_parent
         self.seq_record = seq_record
+        self.entity_id = None
+        """str: ID of the entity of this chain, set from the structure file header"""
+        self.seqres = None
+        """str: Full sequence of the entity of this chain, including residues without coordinates"""
 
         if not self.description:
             self.description = 'Chain {} from PDB parent {}'.format(self.id, self.pdb_parent)
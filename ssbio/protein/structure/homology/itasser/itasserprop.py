@@ -171,7 +171,7 @@ class ITASSERProp(StructProp):
             if ssbio.utils.force_rerun(flag=force_rerun, outfile=new_model_path):
                 # Clean and save it
                 custom_clean = CleanPDB()
-                my_pdb = StructureIO(self.structure_path)
+                my_pdb = StructureIO(self.structure_path, use_cache=False)
                 new_model_path = my_pdb.write_pdb(custom_selection=custom_clean,
                                                   custom_name=rename_model_to,
                                                   out_dir=copy_to_dir,
@@ -13,9 +13,8 @@ from Bio.PDB.HSExposure import ExposureCN, HSExposureCA, HSExposureCB
 from Bio.Seq import Seq
 from Bio.SeqRecord import SeqRecord
 import numpy as np
-from Bio.PDB import Selection
-from Bio.PDB import NeighborSearch
 import ssbio.protein.sequence.utils
+from ssbio.protein.structure.utils.structurearrays import StructureArrays
 from ssbio.protein.structure.utils.structureio import StructureIO
 
 log = logging.getLogger(__name__)
@@ -28,7 +27,11 @@ def search_ss_bonds(model, threshold=3.0):
         Returns iterator with tuples of residues.
 
         ADAPTED FROM JOAO RODRIGUES' BIOPYTHON GSOC PROJECT (http://biopython.org/wiki/GSOC2010_Joao)
+
+        The model can also be a StructureArrays object, in which case all cysteine distances are calculated at once.
     """
+    if isinstance(model, StructureArrays):
+        return _search_ss_bonds_arrays(model, threshold=threshold)
 
     # Taken from http://docs.python.org/library/itertools.html
     # Python 2.4 does not include itertools.combinations
@@ -79,6 +82,37 @@ def search_ss_bonds(model, threshold=3.0):
     return infodict
 
 
+def _search_ss_bonds_arrays(arrays, threshold=3.0):
+    """Fast path of search_ss_bonds for StructureArrays"""
+    from scipy.spatial.distance import pdist
+
+    cysteines = np.flatnonzero(arrays.residue_names == 'CYS')
+    is_sg = (arrays.name == 'SG') & (arrays.resname == 'CYS')
+    sg_residues, first_sg = np.unique(arrays.residue_index[is_sg], return_index=True)
+    sg_atoms = np.flatnonzero(is_sg)[first_sg]
+
+    missing = np.setdiff1d(cysteines, sg_residues)
+    if len(missing) > 0:
+        log.error('{}: no SG atom found for cysteine residues {}'.format(arrays, [arrays.residue_id(x) for x in missing]))
+
+    infodict = {}
+    if len(sg_residues) < 2:
+        return infodict
+
+    # Condensed distance matrix is in the same order as all pairwise combinations
+    distances = pdist(arrays.coord[sg_atoms].astype(float))
+    first, second = np.triu_indices(len(sg_residues), k=1)
+    close = distances < threshold
+
+    if close.any():
+        infodict = defaultdict(list)
+        for i, j in zip(sg_residues[first[close]], sg_residues[second[close]]):
+            chain = arrays.chain_ids[arrays.residue_chain_index[i]]
+            infodict[chain].append((arrays.residue_id(i), arrays.residue_id(j)))
+
+    return infodict
+
+
 def residue_distances(res_1_num, res_1_chain, res_2_num, res_2_chain, model):
     """Distance between the last atom of 2 residues"""
 
@@ -120,29 +154,153 @@ def resname_in_proximity(resname, model, chains, resnums, threshold=5):
     return False
 
 
-def within(resnum, angstroms, chain_id, model, use_ca=False, custom_coord=None):
+class SpatialIndex(object):
+
+    """Atom coordinates of a Biopython Model, with a KD-tree for radius searches.
+
+    The coordinates of all atoms are stored in a single array, along with the index of the residue each atom belongs
+    to, so that many radius searches can be run against a model without unfolding it or rebuilding a
+    ``NeighborSearch`` every time. The KD-tree is only built when the first search is made.
+
+    The model can also be a StructureArrays object, in which case its arrays are used as they are and residues are
+    returned as (chain ID, residue ID) tuples.
+
+    Args:
+        model (Model, StructureArrays): Biopython Model object of a Structure, or StructureArrays
+        source (tuple): Identifier of where the model was loaded from, used to check if the index is out of date
+
+    """
+
+    def __init__(self, model, source=None):
+        self.model = model
+        """Model: Biopython Model object the index was built from"""
+        self.source = source
+        """tuple: Identifier of where the model was loaded from"""
+
+        if isinstance(model, StructureArrays):
+            self.residues = model.residue_full_ids()
+            self.atoms = None
+            self.atom_residue_index = model.residue_index
+            self.coords = model.coord
+            self._tree = None
+            return
+
+        self.residues = []
+        """list: Bio.PDB.Residue.Residue objects, in the order they appear in the model"""
+        self.atoms = []
+        """list: Bio.PDB.Atom.Atom objects, in the order they appear in the model"""
+        atom_residue_index = []
+
+        for residue in model.get_residues():
+            self.residues.append(residue)
+            for atom in residue:
+                self.atoms.append(atom)
+                atom_residue_index.append(len(self.residues) - 1)
+
+        self.atom_residue_index = np.array(atom_residue_index, dtype=np.int64)
+        """numpy.ndarray: Index in ``residues`` of each atom"""
+        self.coords = np.array([atom.get_coord() for atom in self.atoms], dtype='f').reshape(-1, 3)
+        """numpy.ndarray: XYZ coordinates of each atom"""
+
+        self._tree = None
+
+    def __len__(self):
+        return len(self.coords)
+
+    @property
+    def tree(self):
+        """scipy.spatial.cKDTree: KD-tree of the atom coordinates"""
+        if self._tree is None:
+            from scipy.spatial import cKDTree
+            self._tree = cKDTree(self.coords)
+        return self._tree
+
+    def search_atoms(self, centers, angstroms):
+        """Get the indices of atoms within a distance of one or many coordinates.
+
+        Args:
+            centers (list, numpy.ndarray): A single XYZ coordinate, or a list of them
+            angstroms (float): Radius of the search sphere
+
+        Returns:
+            numpy.ndarray, list: Sorted array of atom indices if a single coordinate was given, otherwise a list of
+            arrays, one per coordinate
+
+        """
+        centers = np.array(centers, dtype='f')
+        if len(self.coords) == 0:
+            empty = np.array([], dtype=np.int64)
+            return empty if centers.ndim == 1 else [empty for x in centers]
+
+        found = self.tree.query_ball_point(centers.astype(float), angstroms)
+        if centers.ndim == 1:
+            return np.sort(np.array(found, dtype=np.int64))
+        return [np.sort(np.array(x, dtype=np.int64)) for x in found]
+
+    def search_residues(self, centers, angstroms):
+        """Get the indices of residues with any atom within a distance of one or many coordinates.
+
+        Args:
+            centers (list, numpy.ndarray): A single XYZ coordinate, or a list of them
+            angstroms (float): Radius of the search sphere
+
+        Returns:
+            numpy.ndarray, list: Sorted array of residue indices if a single coordinate was given, otherwise a list of
+            arrays, one per coordinate
+
+        """
+        found = self.search_atoms(centers, angstroms)
+        if isinstance(found, np.ndarray):
+            return np.unique(self.atom_residue_index[found])
+        return [np.unique(self.atom_residue_index[x]) for x in found]
+
+    def residues_within(self, centers, angstroms):
+        """Get the residues with any atom within a distance of one or many coordinates.
+
+        Args:
+            centers (list, numpy.ndarray): A single XYZ coordinate, or a list of them
+            angstroms (float): Radius of the search sphere
+
+        Returns:
+            list: List of Bio.PDB.Residue.Residue objects if a single coordinate was given, otherwise a list of them per
+            coordinate
+
+        """
+        found = self.search_residues(centers, angstroms)
+        if isinstance(found, np.ndarray):
+            return [self.residues[i] for i in found]
+        return [[self.residues[i] for i in x] for x in found]
+
+
+def within(resnum, angstroms, chain_id, model, use_ca=False, custom_coord=None, spatial_index=None):
     """See: https://www.biostars.org/p/1816/ https://www.biostars.org/p/269579/
 
     Args:
         resnum (int):
         angstroms (float):
         chain_id (str):
-        model (Model):
+        model (Model, StructureArrays):
         use_ca (bool): If the alpha-carbon atom should be used for the search, otherwise use the last atom of the residue
         custom_coord (list): Custom XYZ coordinate to get within
+        spatial_index (SpatialIndex): Index of the model to search in, a new one is built if not provided
 
     Returns:
-        list: List of Bio.PDB.Residue.Residue objects
+        list: List of Bio.PDB.Residue.Residue objects, in the order they appear in the model. If the model is a
+        StructureArrays object, a list of (chain ID, residue ID) tuples.
 
     """
     # XTODO: documentation
     # TODO: should have separate method for within a normal residue (can use "resnum" with a int) or a custom coord,
     # where you don't need to specify resnum
-    atom_list = Selection.unfold_entities(model, 'A')
-    ns = NeighborSearch(atom_list)
+    if spatial_index is None:
+        spatial_index = SpatialIndex(model)
 
-    if custom_coord:  # a list of XYZ coord
+    if custom_coord is not None and len(custom_coord) > 0:  # a list of XYZ coord
         target_atom_coord = np.array(custom_coord, 'f')
+    elif isinstance(model, StructureArrays):
+        target_residue = model.get_residue_index(chain_id, resnum)
+        target_atom = model.get_atom_index(target_residue, 'CA' if use_ca else None)
+        target_atom_coord = model.coord[target_atom]
     else:
         target_residue = model[chain_id][resnum]
         if use_ca:
@@ -150,10 +308,8 @@ def within(resnum, angstroms, chain_id, model, use_ca=False, custom_coord=None):
         else:
             target_atom = target_residue.child_list[-1]
         target_atom_coord = np.array(target_atom.get_coord(), 'f')
-    neighbors = ns.search(target_atom_coord, angstroms)
-    residue_list = Selection.unfold_entities(neighbors, 'R')
 
-    return residue_list
+    return spatial_index.residues_within(target_atom_coord, angstroms)
 
 
 def get_structure_seqrecords(model):
@@ -164,7 +320,7 @@ def get_structure_seqrecords(model):
         - HETATMs. Currently written as an "X", or unknown amino acid.
 
     Args:
-        model: Biopython Model object of a Structure
+        model: Biopython Model object of a Structure, or StructureArrays
 
     Returns:
         list: List of SeqRecords
@@ -173,51 +329,75 @@ def get_structure_seqrecords(model):
 
     structure_seq_records = []
 
+    if isinstance(model, StructureArrays):
+        # Only standard amino acids are written out, filter them all at once
+        is_standard = np.isin(np.char.upper(model.residue_names), list(Polypeptide.d3_to_index.keys()))
+        for chain_index, chain_id in enumerate(model.chain_ids):
+            keep = np.flatnonzero(is_standard & (model.residue_chain_index == chain_index))
+            chain_seq, chain_resnums, chain_icodes = _structure_chain_seq(resnames=model.residue_names[keep],
+                                                                          resnums=model.residue_seqnums[keep].tolist(),
+                                                                          icodes=model.residue_icodes[keep].tolist())
+            chain_seq_record = SeqRecord(Seq(chain_seq, IUPAC.protein), id=chain_id)
+            chain_seq_record.letter_annotations['structure_resnums'] = chain_resnums
+            chain_seq_record.letter_annotations['structure_icodes'] = chain_icodes
+            structure_seq_records.append(chain_seq_record)
+        return structure_seq_records
+
     # Loop over each chain of the PDB
     for chain in model:
-        tracker = 0
-        chain_seq = ''
-        chain_resnums = []
+        # Double check if the residue name is a standard residue
+        # If it is not a standard residue (ie. selenomethionine),
+        # it will be filled in with an X on the next iteration)
+        residues = [res for res in chain.get_residues() if Polypeptide.is_aa(res, standard=True)]
+        chain_seq, chain_resnums, chain_icodes = _structure_chain_seq(resnames=[res.get_resname() for res in residues],
+                                                                      resnums=[res.id[1] for res in residues],
+                                                                      icodes=[res.id[2] for res in residues])
 
-        # Loop over the residues
-        for res in chain.get_residues():
-            # NOTE: you can get the residue number too
-            res_id = res.id
-            res_num = res_id[1]
-            res_icode = res_id[2]
+        chain_seq_record = SeqRecord(Seq(chain_seq, IUPAC.protein), id=chain.get_id())
+        chain_seq_record.letter_annotations['structure_resnums'] = chain_resnums
+        chain_seq_record.letter_annotations['structure_icodes'] = chain_icodes
+        structure_seq_records.append(chain_seq_record)
 
-            # Double check if the residue name is a standard residue
-            # If it is not a standard residue (ie. selenomethionine),
-            # it will be filled in with an X on the next iteration)
-            if Polypeptide.is_aa(res, standard=True):
-                end_tracker = res_num
-                res_aa_one = Polypeptide.three_to_one(res.get_resname())
+    return structure_seq_records
 
-                # Tracker to fill in X's
-                if end_tracker != (tracker + 1):
-                    if res_icode != ' ':
-                        chain_seq += res_aa_one
-                        chain_resnums.append(res_num)
-                        tracker = end_tracker + 1
-                        continue
-                    else:
-                        multiplier = (end_tracker - tracker - 1)
-                        chain_seq += 'X' * multiplier
-                        # Residue numbers for unresolved or nonstandard residues are Infinite
-                        chain_resnums.extend([float("Inf")] * multiplier)
 
+def _structure_chain_seq(resnames, resnums, icodes):
+    """Build a chain sequence from its standard residues, filling in X's for missing residue numbers
+
+    Returns:
+        tuple: chain sequence, list of residue numbers of each letter, list of insertion codes of each letter
+
+    """
+    tracker = 0
+    chain_seq = ''
+    chain_resnums = []
+    chain_icodes = []
+
+    for resname, res_num, res_icode in zip(resnames, resnums, icodes):
+        end_tracker = res_num
+        res_aa_one = Polypeptide.three_to_one(resname)
+
+        # Tracker to fill in X's
+        if end_tracker != (tracker + 1):
+            if res_icode != ' ':
                 chain_seq += res_aa_one
                 chain_resnums.append(res_num)
-                tracker = end_tracker
-
-            else:
+                chain_icodes.append(res_icode)
+                tracker = end_tracker + 1
                 continue
-
-        chain_seq_record = SeqRecord(Seq(chain_seq, IUPAC.protein), id=chain.get_id())
-        chain_seq_record.letter_annotations['structure_resnums'] = chain_resnums
-        structure_seq_records.append(chain_seq_record)
-
-    return structure_seq_records
+            else:
+                multiplier = (end_tracker - tracker - 1)
+                chain_seq += 'X' * multiplier
+                # Residue numbers for unresolved or nonstandard residues are Infinite
+                chain_resnums.extend([float("Inf")] * multiplier)
+                chain_icodes.extend([' '] * multiplier)
+
+        chain_seq += res_aa_one
+        chain_resnums.append(res_num)
+        chain_icodes.append(res_icode)
+        tracker = end_tracker
+
+    return chain_seq, chain_resnums, chain_icodes
 
 
 def get_structure_seqs(pdb_file, file_type):
@@ -18,6 +18,7 @@ import ssbio.protein.structure.properties.quality
 import ssbio.protein.structure.properties.freesasa as fs
 import ssbio.utils
 from ssbio.core.object import Object
+from ssbio.databases.pdb_header import read_structure_header
 from ssbio.protein.sequence.seqprop import SeqProp
 from ssbio.protein.structure.chainprop import ChainProp
 from ssbio.protein.structure.utils.structureio import StructureIO
@@ -88,6 +89,8 @@ class StructProp(Object):
         self.structure = None
         """Structure: Biopython Structure object, only used if ``store_in_memory`` option of ``parse_structure`` is set to True"""
 
+        self._spatial_index = None
+
     @property
     def structure_dir(self):
         if not self._structure_dir:
@@ -129,7 +132,8 @@ class StructProp(Object):
 
     def parse_structure(self, store_in_memory=False):
         """Read the 3D coordinates of a structure file and return it as a Biopython Structure object.
-        Also create ChainProp objects in the chains attribute for each chain in the first model.
+        Also create ChainProp objects in the chains attribute for each chain in the first model. Parsed structures are
+        cached by StructureIO, so parsing an unchanged file again returns the same Structure object.
 
         Args:
             store_in_memory (bool): If the Biopython Structure object should be stored in the attribute ``structure``.
@@ -161,6 +165,72 @@ class StructProp(Object):
 
             return structure
 
+    def parse_header(self):
+        """Read the metadata, entity sequences and chain to entity mapping of an MMTF or mmCIF structure file, without
+        parsing its 3D coordinates. Polymer chains are added to the ``chains`` attribute, with their entity ID and full
+        entity sequence stored in the ``entity_id`` and ``seqres`` attributes of each ChainProp. Use this instead of
+        ``parse_structure`` when only the chain sequences are needed, i.e. to rank structures or align sequences to
+        them before deciding which structures to parse.
+
+        Returns:
+            dict: Parsed header, see :func:`~ssbio.databases.pdb_header.read_structure_header`
+
+        """
+        if not self.structure_file:
+            log.error('{}: no structure file, unable to parse header'.format(self.id))
+            return None
+
+        header = read_structure_header(self.structure_path, self.file_type)
+
+        self.add_chain_ids(list(header['chain_entities']))
+        for chain_id, entity_id in header['chain_entities'].items():
+            chain = self.chains.get_by_id(chain_id)
+            chain.entity_id = entity_id
+            chain.seqres = header['chain_sequences'][chain_id]
+
+        # Also add all chains to self.mapped_chains ONLY if there are none specified
+        if not self.mapped_chains:
+            self.add_mapped_chain_ids(list(header['chain_entities']))
+
+        return header
+
+    def get_spatial_index(self):
+        """Get a SpatialIndex of the first model of this structure, for fast searches of residues within a distance.
+
+        The index is built the first time it is needed and kept until the structure changes, meaning another structure
+        is stored in the ``structure`` attribute, or the structure file is modified or replaced. Run
+        ``reset_spatial_index`` if atom coordinates are modified in place.
+
+        Returns:
+            SpatialIndex: Index of the atoms of the first model, or None if the structure could not be parsed
+
+        """
+        index = getattr(self, '_spatial_index', None)
+
+        if self.structure:
+            model = self.structure.first_model
+            if index is not None and index.model is model:
+                return index
+            source = None
+        else:
+            source = None
+            if self.structure_file:
+                source = (self.structure_path, self.file_type, op.getmtime(self.structure_path))
+                if index is not None and index.source == source:
+                    return index
+            parsed = self.parse_structure()
+            if not parsed:
+                return None
+            model = parsed.first_model
+
+        log.debug('{}: building spatial index of structure'.format(self.id))
+        self._spatial_index = ssbio.protein.structure.properties.residues.SpatialIndex(model, source=source)
+        return self._spatial_index
+
+    def reset_spatial_index(self):
+        """Remove the stored SpatialIndex, so it is rebuilt the next time it is needed"""
+        self._spatial_index = None
+
     def clean_structure(self, out_suffix='_clean', outdir=None, force_rerun=False,
                         remove_atom_alt=True, keep_atom_alt_id='A',remove_atom_hydrogen=True,  add_atom_occ=True,
                         remove_res_hetero=True, keep_chemicals=None, keep_res_only=None,
@@ -301,7 +371,7 @@ class StructProp(Object):
         else:
             exclude_attributes = []
 
-        exclude_attributes.extend(['mapped_chains', 'chains'])
+        exclude_attributes.extend(['mapped_chains', 'chains', '_spatial_index'])
 
         final_dict = {k: v for k, v in Object.get_dict(self, only_attributes=keys, exclude_attributes=exclude_attributes,
                                                        df_format=df_format).items()}
@@ -366,15 +436,13 @@ class StructProp(Object):
 
         """
         # XTODO: documentation, unit test
-        if self.structure:
-            parsed = self.structure
-        else:
-            parsed = self.parse_structure()
+        spatial_index = self.get_spatial_index()
 
         residue_list = ssbio.protein.structure.properties.residues.within(resnum=resnum, chain_id=chain_id,
-                                                                          model=parsed.first_model,
+                                                                          model=spatial_index.model,
                                                                           angstroms=angstroms, use_ca=use_ca,
-                                                                          custom_coord=custom_coord)
+                                                                          custom_coord=custom_coord,
+                                                                          spatial_index=spatial_index)
 
         if only_protein:
             filtered_residue_list = [x for x in residue_list if x.id[0] == ' ']
@@ -777,6 +845,24 @@ class StructProp(Object):
                 view.add_ball_and_stick(selection='{} and not hydrogen and {}'.format(to_show_chains, to_show_res),
                                         color=color, opacity=opacity_dict[x], scale=scale_dict[x])
 
+    def get_dict(self, only_attributes=None, exclude_attributes=None, df_format=False):
+        """get_dict method which does not return the stored spatial index. See ``Object.get_dict``."""
+        exclude_attributes = ssbio.utils.force_list(exclude_attributes) if exclude_attributes else []
+        exclude_attributes.append('_spatial_index')
+        return Object.get_dict(self, only_attributes=only_attributes, exclude_attributes=exclude_attributes,
+                               df_format=df_format)
+
+    def __getstate__(self):
+        # The spatial index is rebuilt when needed, don't save it
+        state = self.__dict__.copy()
+        state['_spatial_index'] = None
+        return state
+
+    def __json_encode__(self):
+        to_return = Object.__json_encode__(self)
+        to_return.pop('_spatial_index', None)
+        return to_return
+
     def __json_decode__(self, **attrs):
         for k, v in attrs.items():
             if k == 'chains':
@@ -144,7 +144,7 @@ def clean_pdb(pdb_file, out_suffix='_clean', outdir=None, force_rerun=False,
                                         outext='.pdb')
 
     if ssbio.utils.force_rerun(flag=force_rerun, outfile=outfile):
-        my_pdb = StructureIO(pdb_file)
+        my_pdb = StructureIO(pdb_file, use_cache=False)
         my_cleaner = CleanPDB(remove_atom_alt=remove_atom_alt,
                               remove_atom_hydrogen=remove_atom_hydrogen,
                               keep_atom_alt_id=keep_atom_alt_id,
@@ -222,7 +222,7 @@ if __name__ == '__main__':
 
         if ssbio.utils.force_rerun(flag=args.force, outfile=outfile):
 
-            my_pdb = StructureIO(pdb)
+            my_pdb = StructureIO(pdb, use_cache=False)
             my_cleaner = CleanPDB(remove_atom_alt=args.keepalt,
                                   remove_atom_hydrogen=args.keephydro,
                                   keep_atom_alt_id='A',
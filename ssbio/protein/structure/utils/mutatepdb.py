@@ -87,11 +87,11 @@ if __name__ == '__main__':
 
     mutations = parse_mutation_input(args.mutations)
 
-    my_pdb = StructureIO(args.infile)
+    my_pdb = StructureIO(args.infile, use_cache=False)
     if args.clean:
         my_cleaner = CleanPDB(keep_chains=[x[0] for x in mutations])
         my_clean_pdb = my_pdb.write_pdb(out_suffix='_clean', out_dir=tempfile.gettempdir(), custom_selection=my_cleaner)
-        my_pdb = StructureIO(my_clean_pdb)
+        my_pdb = StructureIO(my_clean_pdb, use_cache=False)
 
     my_mutation = MutatePDB(mutations)
     my_mutated_pdb = my_pdb.write_pdb(out_suffix=args.outsuffix, out_dir='mutated_pdbs', custom_selection=my_mutation)
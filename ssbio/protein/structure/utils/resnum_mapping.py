@@ -0,0 +1,208 @@
+"""
+Residue Number Mapping
+======================
+"""
+
+import logging
+
+import numpy as np
+
+import ssbio.protein.sequence.utils
+import ssbio.utils
+
+log = logging.getLogger(__name__)
+
+
+class ResnumMapping(object):
+
+    """Dense mapping between residue numbers of a sequence and residue numbers of a structure's chain, built once from
+    a parsed alignment so residue numbers can be mapped in batches without searching lists.
+
+    Three numberings are involved: sequence residue numbers (1-based positions in the sequence), chain indices (0-based
+    positions in the chain sequence of the structure, including X's for missing residues), and structure residue
+    numbers (the residue numbers in the structure file, with insertion codes). Every mapping method takes an array of
+    residue numbers and returns arrays of the same length, with unmapped residues marked instead of dropped.
+
+    Examples:
+        >>> mapping = ResnumMapping(chain_index=[float('nan'), 1, 2, 3], structure_resnums=[10, float('Inf'), 12],
+        ...                         seq='MKTA', chain_seq='KXA')
+        >>> mapping.map_seq_to_chain_index([1, 2, 3, 4]).tolist()
+        [-1, 0, 1, 2]
+        >>> resnums, icodes, is_mapped = mapping.map_seq_to_structure([1, 2, 3, 4])
+        >>> resnums[is_mapped].tolist()
+        [10, 12]
+        >>> mapping.map_structure_to_seq([10, 11, 12])[0].tolist()
+        [2, 0, 4]
+        >>> mapping.mismatches([2, 3, 4]).tolist()
+        [False, True, False]
+
+    Args:
+        chain_index (list): For each residue of the sequence, the 1-based position in the chain sequence it is aligned
+            to, NaN if it is not aligned (the ``<alignment_id>_chain_index`` letter annotation of a SeqProp)
+        structure_resnums (list): For each residue of the chain sequence, its residue number in the structure, Inf if
+            it has no coordinates (the ``structure_resnums`` letter annotation of a chain's SeqRecord)
+        seq (str, Seq, SeqRecord): Sequence, to check if mapped residues are the same
+        chain_seq (str, Seq, SeqRecord): Chain sequence, to check if mapped residues are the same
+        structure_icodes (list): For each residue of the chain sequence, its insertion code in the structure (the
+            ``structure_icodes`` letter annotation of a chain's SeqRecord), blank if not set
+
+    """
+
+    def __init__(self, chain_index, structure_resnums, seq=None, chain_seq=None, structure_icodes=None):
+        chain_index = np.asarray(chain_index, dtype=np.float64)
+        structure_resnums = np.asarray(structure_resnums, dtype=np.float64)
+        n_chain = len(structure_resnums)
+
+        # Sequence resnum -> 0-based chain index, -1 if not aligned (position 0 is unused)
+        is_aligned = ~np.isnan(chain_index)
+        seq_to_chain = np.full(len(chain_index) + 1, -1, dtype=np.int64)
+        seq_to_chain[1:][is_aligned] = chain_index[is_aligned].astype(np.int64) - 1
+        seq_to_chain[(seq_to_chain < -1) | (seq_to_chain >= n_chain)] = -1
+        self.seq_to_chain = seq_to_chain
+        """ndarray: Chain index of each sequence residue number (position 0 is unused), -1 if not aligned"""
+
+        # All chain arrays have an extra last element for chain index -1, so unmapped residues can be indexed too
+        # Chain index -> sequence resnum, 0 if not aligned, the first sequence residue is kept if there are several
+        chain_to_seq = np.zeros(n_chain + 1, dtype=np.int64)
+        seq_resnums = np.flatnonzero(seq_to_chain >= 0)[::-1]
+        chain_to_seq[seq_to_chain[seq_resnums]] = seq_resnums
+        self.chain_to_seq = chain_to_seq
+        """ndarray: Sequence residue number of each chain index, 0 if not aligned"""
+
+        self.chain_has_coords = np.append(np.isfinite(structure_resnums), False)
+        """ndarray: If each chain index has a residue with coordinates in the structure"""
+        self.chain_resnums = np.append(np.where(np.isfinite(structure_resnums), structure_resnums, 0), 0).astype(np.int64)
+        """ndarray: Structure residue number of each chain index, 0 if it has no coordinates"""
+        if structure_icodes is None:
+            structure_icodes = [' '] * n_chain
+        self.chain_icodes = np.append(np.asarray(structure_icodes, dtype='U1'), ' ')
+        """ndarray: Structure insertion code of each chain index"""
+
+        # Structure resnum -> chain index, sorted for binary search, keeping the first residue with each number as
+        # residues with insertion codes share it
+        with_coords = np.flatnonzero(self.chain_has_coords)
+        self._sorted_resnums, first = np.unique(self.chain_resnums[with_coords], return_index=True)
+        self._sorted_chain_index = with_coords[first]
+
+        self.seq_letters = self._letters(seq, prepend=True)
+        """ndarray: Sequence as bytes (position 0 is unused), or None if the sequence was not given"""
+        self.chain_letters = self._letters(chain_seq, prepend=False)
+        """ndarray: Chain sequence as bytes, or None if the chain sequence was not given"""
+
+    @staticmethod
+    def _letters(seq, prepend):
+        if seq is None:
+            return None
+        seq = ssbio.protein.sequence.utils.cast_to_str(seq)
+        return np.frombuffer((' ' + seq if prepend else seq + ' ').encode('ascii', 'replace'), dtype=np.uint8)
+
+    @staticmethod
+    def _as_array(resnums):
+        return np.atleast_1d(np.asarray(resnums, dtype=np.int64))
+
+    def __repr__(self):
+        return '<ResnumMapping: {} sequence residues, {} chain residues, {} aligned>'.format(len(self.seq_to_chain) - 1,
+                                                                                            len(self.chain_to_seq) - 1,
+                                                                                            int((self.seq_to_chain >= 0).sum()))
+
+    def map_seq_to_chain_index(self, resnums):
+        """Map sequence residue numbers to chain indices.
+
+        Args:
+            resnums (int, list, ndarray): Sequence residue numbers
+
+        Returns:
+            ndarray: 0-based chain index of each residue number, -1 if it is not aligned to the chain
+
+        """
+        resnums = self._as_array(resnums)
+        in_range = (resnums > 0) & (resnums < len(self.seq_to_chain))
+        return self.seq_to_chain[np.where(in_range, resnums, 0)]
+
+    def map_seq_to_structure(self, resnums):
+        """Map sequence residue numbers to structure residue numbers.
+
+        Args:
+            resnums (int, list, ndarray): Sequence residue numbers
+
+        Returns:
+            tuple: Arrays of the structure residue number and insertion code of each residue number, and if it was
+            mapped - a residue is not mapped if it is not aligned to the chain or has no coordinates in the structure
+
+        """
+        chain_index = self.map_seq_to_chain_index(resnums)
+        return self.chain_resnums[chain_index], self.chain_icodes[chain_index], self.chain_has_coords[chain_index]
+
+    def map_structure_to_chain_index(self, resnums):
+        """Map structure residue numbers to chain indices.
+
+        Args:
+            resnums (int, list, ndarray): Structure residue numbers, residues with insertion codes are not distinguished
+                and the first residue with a number is used
+
+        Returns:
+            ndarray: 0-based chain index of each residue number, -1 if it is not in the structure
+
+        """
+        resnums = self._as_array(resnums)
+        if not len(self._sorted_resnums):
+            return np.full(len(resnums), -1, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self._sorted_resnums, resnums), len(self._sorted_resnums) - 1)
+        found = self._sorted_resnums[positions] == resnums
+        return np.where(found, self._sorted_chain_index[positions], -1)
+
+    def map_structure_to_seq(self, resnums):
+        """Map structure residue numbers to sequence residue numbers.
+
+        Args:
+            resnums (int, list, ndarray): Structure residue numbers
+
+        Returns:
+            tuple: Arrays of the sequence residue number of each residue number (0 if it is not mapped), and if it
+            was mapped
+
+        """
+        seq_resnums = self.chain_to_seq[self.map_structure_to_chain_index(resnums)]
+        return seq_resnums, seq_resnums > 0
+
+    def mismatches(self, resnums):
+        """Check if sequence residues differ from the chain residues they are aligned to.
+
+        Args:
+            resnums (int, list, ndarray): Sequence residue numbers
+
+        Returns:
+            ndarray: If each residue is aligned to a different residue, False for residues which are not aligned or if
+            the sequences were not given
+
+        """
+        chain_index = self.map_seq_to_chain_index(resnums)
+        is_aligned = chain_index >= 0
+        if self.seq_letters is None or self.chain_letters is None:
+            return np.zeros(len(chain_index), dtype=bool)
+        seq_resnums = np.where(is_aligned, self._as_array(resnums), 0)
+        return is_aligned & (self.seq_letters[seq_resnums] != self.chain_letters[chain_index])
+
+
+def format_resnums(resnums, max_listed=10):
+    """Format residue numbers for a log message, listing only the first few.
+
+    Examples:
+        >>> format_resnums([1, 2, 3])
+        '1, 2, 3'
+        >>> format_resnums(range(20), max_listed=3)
+        '0, 1, 2 and 17 more'
+
+    Args:
+        resnums (list): Residue numbers, or any other items
+        max_listed (int): Maximum number of items to list
+
+    Returns:
+        str: Comma separated items
+
+    """
+    resnums = list(resnums)
+    listed = ', '.join(str(x) for x in resnums[:max_listed])
+    if len(resnums) > max_listed:
+        listed += ' and {} more'.format(len(resnums) - max_listed)
+    return listed
@@ -0,0 +1,234 @@
+"""
+Structure Cache
+===============
+"""
+
+import hashlib
+import logging
+import os
+import os.path as op
+import threading
+from collections import OrderedDict
+
+import ssbio.utils
+from ssbio.protein.structure.utils.structurearrays import StructureArrays
+
+log = logging.getLogger(__name__)
+
+
+class StructureCache(object):
+
+    """In-memory store of parsed structures, so the same structure file is not parsed again on every use.
+
+    Structures are keyed on the absolute path of the file, its modification time and its file type, so a file which
+    is changed on disk is parsed again. The least recently used structures are evicted once the total number of atoms
+    stored goes over the memory budget. The cache can be used from multiple threads.
+
+    Note that stored structures are shared between everything that loads them - if a structure is modified in place,
+    load it without the cache.
+
+    Args:
+        max_atoms (int): Memory budget of the cache, as the total number of atoms of all stored structures. Set to 0
+            to disable caching.
+
+    """
+
+    def __init__(self, max_atoms=500000):
+        self.max_atoms = max_atoms
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.n_atoms = 0
+        self._memory = OrderedDict()
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def make_key(structure_file, file_type):
+        """Get the key which identifies a structure file, and the file's modification time"""
+        path = op.abspath(structure_file)
+        return (path, file_type.lower()), op.getmtime(path)
+
+    def get(self, structure_file, file_type):
+        """Get a stored structure.
+
+        Args:
+            structure_file (str): Path to structure file
+            file_type (str): Type of structure file
+
+        Returns:
+            Structure: Biopython Structure object, or None if the structure is not stored or the file has changed
+
+        """
+        try:
+            key, mtime = self.make_key(structure_file, file_type)
+        except OSError:
+            return None
+
+        with self._lock:
+            if key in self._memory:
+                value = self._memory.pop(key)
+                if value[0] == mtime:
+                    self._memory[key] = value
+                    self.hits += 1
+                    return value[1]
+                log.debug('{}: file changed since it was parsed, removing from cache'.format(structure_file))
+                self.n_atoms -= value[2]
+
+            self.misses += 1
+            return None
+
+    def set(self, structure_file, file_type, structure):
+        """Store a parsed structure.
+
+        Args:
+            structure_file (str): Path to structure file
+            file_type (str): Type of structure file
+            structure (Structure): Biopython Structure object
+
+        """
+        try:
+            key, mtime = self.make_key(structure_file, file_type)
+        except OSError:
+            return
+
+        n_atoms = sum(1 for x in structure.get_atoms())
+        if n_atoms > self.max_atoms:
+            log.debug('{}: structure is larger than the cache memory budget, not storing'.format(structure_file))
+            return
+
+        with self._lock:
+            if key in self._memory:
+                self.n_atoms -= self._memory.pop(key)[2]
+            self._memory[key] = (mtime, structure, n_atoms)
+            self.n_atoms += n_atoms
+
+            while self.n_atoms > self.max_atoms:
+                evicted = self._memory.popitem(last=False)
+                self.n_atoms -= evicted[1][2]
+                self.evictions += 1
+                log.debug('{}: evicted structure from cache'.format(evicted[0][0]))
+
+    def clear(self):
+        """Remove all stored structures"""
+        with self._lock:
+            self._memory.clear()
+            self.n_atoms = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        """Get the number of hits, misses and evictions, and the number of structures and atoms stored.
+
+        Returns:
+            dict: Cache statistics
+
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'structures': len(self._memory), 'atoms': self.n_atoms}
+
+    def __len__(self):
+        return len(self._memory)
+
+    def __getstate__(self):
+        # Locks cannot be pickled, and parsed structures are not worth sending to other processes
+        state = self.__dict__.copy()
+        state['_memory'] = OrderedDict()
+        state['n_atoms'] = 0
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+
+class StructureArraysStore(object):
+
+    """On-disk store of structures in ssbio's binary format (see :meth:`StructureArrays.save`), so a structure file is
+    parsed once and then memory-mapped in milliseconds every time it is used again, by any process.
+
+    Each structure file is stored in ``cache_dir`` under a name made from its file name and a hash of its absolute
+    path and file type. The size and modification time of the structure file are recorded when it is stored, and a
+    stored structure is only used while they are unchanged.
+
+    Args:
+        cache_dir (str): Path to the directory to store files in, created if it does not exist
+        mmap (bool): If stored structures should be memory-mapped instead of read into memory
+
+    """
+
+    EXTENSION = '.arrays'
+    """str: Extension of stored files"""
+
+    def __init__(self, cache_dir, mmap=True):
+        self.cache_dir = ssbio.utils.make_dir(cache_dir)
+        self.mmap = mmap
+
+    def get_path(self, structure_file, file_type):
+        """Get the path a structure file is stored at.
+
+        Args:
+            structure_file (str): Path to structure file
+            file_type (str): Type of structure file
+
+        Returns:
+            str: Path to the stored file, whether it exists or not
+
+        """
+        path = op.abspath(structure_file)
+        digest = hashlib.sha1('{}:{}'.format(path, file_type.lower()).encode('utf-8')).hexdigest()[:16]
+        return op.join(self.cache_dir, '{}.{}{}'.format(op.basename(path), digest, self.EXTENSION))
+
+    @staticmethod
+    def _source_metadata(structure_file, file_type):
+        """Information identifying the version of a structure file which was stored"""
+        stat = os.stat(structure_file)
+        return {'source': op.abspath(structure_file), 'file_type': file_type.lower(),
+                'source_size': stat.st_size, 'source_mtime': stat.st_mtime}
+
+    def get(self, structure_file, file_type):
+        """Load a stored structure.
+
+        Args:
+            structure_file (str): Path to structure file
+            file_type (str): Type of structure file
+
+        Returns:
+            StructureArrays: Columnar representation of the first model, or None if the structure is not stored or the
+            structure file has changed
+
+        """
+        stored = self.get_path(structure_file, file_type)
+        if not op.exists(stored):
+            return None
+
+        try:
+            header = StructureArrays.read_header(stored)
+            if header['metadata'] != self._source_metadata(structure_file, file_type):
+                log.debug('{}: file changed since it was stored, parsing again'.format(structure_file))
+                return None
+            return StructureArrays.load(stored, mmap=self.mmap)
+        except (ValueError, KeyError, IOError, OSError) as e:
+            log.debug('{}: unable to load stored structure ({})'.format(stored, e))
+            return None
+
+    def set(self, structure_file, file_type, arrays):
+        """Store a parsed structure.
+
+        Args:
+            structure_file (str): Path to structure file
+            file_type (str): Type of structure file
+            arrays (StructureArrays): Columnar representation of the first model
+
+        Returns:
+            str: Path to the stored file, or None if it could not be written
+
+        """
+        try:
+            return arrays.save(self.get_path(structure_file, file_type),
+                               metadata=self._source_metadata(structure_file, file_type))
+        except (IOError, OSError) as e:
+            log.debug('{}: unable to store structure ({})'.format(structure_file, e))
+            return None
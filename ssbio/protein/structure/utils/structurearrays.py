@@ -0,0 +1,615 @@
+"""
+Structure Arrays
+================
+"""
+
+import json
+import logging
+import os
+import os.path as op
+import struct
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import ssbio.utils
+
+log = logging.getLogger(__name__)
+
+
+_RESIDUE_KEYS = ['chain', 'hetfield', 'resseq', 'icode']
+
+ARRAYS_FORMAT_VERSION = 1
+"""int: Version of the binary format written by ``StructureArrays.save``, files of another version are not loaded"""
+
+_ARRAYS_MAGIC = b'SSBIOARR'
+_ARRAYS_ALIGNMENT = 64
+_ARRAY_FIELDS = ['residue_chain_index', 'residue_names', 'residue_hetfields', 'residue_seqnums', 'residue_icodes',
+                 'residue_index', 'atom_start', 'coord', 'name', 'element', 'altloc', 'occupancy', 'bfactor']
+
+
+def _align(offset):
+    return -(-offset // _ARRAYS_ALIGNMENT) * _ARRAYS_ALIGNMENT
+
+
+class StructureArrays(object):
+
+    """Columnar representation of the first model of a structure, stored as NumPy arrays.
+
+    Atoms are ordered the same way as they are in a Biopython Model (by chain, then residue, then atom), and only the
+    selected location of disordered atoms is kept, the one with the highest occupancy. Atom level information is
+    stored in arrays of length ``n_atoms``, and residue level information in arrays of length ``n_residues``, linked
+    by ``residue_index`` and ``atom_start``. Per-atom views of residue level information are available as the
+    properties ``resname``, ``hetfield``, ``resseq``, ``icode`` and ``chain_index``.
+
+    Load StructureArrays directly from a structure file with ``from_pdb``, ``from_mmcif`` or ``from_mmtf`` (or
+    ``ssbio.protein.structure.utils.structureio.read_structure_arrays``), or convert a Biopython Model with
+    ``from_model``. Convert back to a Biopython Structure with ``to_structure``. Save to ssbio's binary format with
+    ``save``, and memory-map it again with ``load``.
+
+    Args:
+        chain_ids (list): Chain IDs, in order
+        residue_chain_index (numpy.ndarray): Index in ``chain_ids`` of each residue
+        residue_names (numpy.ndarray): Residue name of each residue
+        residue_hetfields (numpy.ndarray): Hetero flag of each residue, as in Biopython residue IDs
+        residue_seqnums (numpy.ndarray): Residue number of each residue
+        residue_icodes (numpy.ndarray): Insertion code of each residue
+        residue_index (numpy.ndarray): Index of the residue each atom belongs to
+        coord (numpy.ndarray): XYZ coordinates of each atom
+        name (numpy.ndarray): Name of each atom
+        element (numpy.ndarray): Element of each atom
+        altloc (numpy.ndarray): Alternate location indicator of each atom
+        occupancy (numpy.ndarray): Occupancy of each atom
+        bfactor (numpy.ndarray): B-factor of each atom
+
+    """
+
+    def __init__(self, chain_ids, residue_chain_index, residue_names, residue_hetfields, residue_seqnums,
+                 residue_icodes, residue_index, coord, name, element, altloc, occupancy, bfactor):
+        self.chain_ids = list(chain_ids)
+        self.residue_chain_index = np.asarray(residue_chain_index, dtype=np.int64)
+        self.residue_names = np.asarray(residue_names, dtype='U3')
+        self.residue_hetfields = np.asarray(residue_hetfields, dtype='U5')
+        self.residue_seqnums = np.asarray(residue_seqnums, dtype=np.int64)
+        self.residue_icodes = np.asarray(residue_icodes, dtype='U1')
+
+        self.residue_index = np.asarray(residue_index, dtype=np.int64)
+        self.coord = np.asarray(coord, dtype='f').reshape(-1, 3)
+        self.name = np.asarray(name, dtype='U4')
+        self.element = np.asarray(element, dtype='U2')
+        self.altloc = np.asarray(altloc, dtype='U1')
+        self.occupancy = np.asarray(occupancy, dtype='f')
+        self.bfactor = np.asarray(bfactor, dtype='f')
+
+        # Atoms of a residue are contiguous, store where each residue starts
+        counts = np.bincount(self.residue_index, minlength=len(self.residue_names))
+        self.atom_start = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+        self.metadata = {}
+
+    def __len__(self):
+        return len(self.name)
+
+    def __repr__(self):
+        return '<StructureArrays: {} chains, {} residues, {} atoms>'.format(len(self.chain_ids), self.n_residues,
+                                                                           self.n_atoms)
+
+    @property
+    def n_atoms(self):
+        return len(self.name)
+
+    @property
+    def n_residues(self):
+        return len(self.residue_names)
+
+    @property
+    def resname(self):
+        """numpy.ndarray: Residue name of each atom"""
+        return self.residue_names[self.residue_index]
+
+    @property
+    def hetfield(self):
+        """numpy.ndarray: Hetero flag of each atom"""
+        return self.residue_hetfields[self.residue_index]
+
+    @property
+    def resseq(self):
+        """numpy.ndarray: Residue number of each atom"""
+        return self.residue_seqnums[self.residue_index]
+
+    @property
+    def icode(self):
+        """numpy.ndarray: Insertion code of each atom"""
+        return self.residue_icodes[self.residue_index]
+
+    @property
+    def chain_index(self):
+        """numpy.ndarray: Index in ``chain_ids`` of each atom"""
+        return self.residue_chain_index[self.residue_index]
+
+    def residue_id(self, index):
+        """Get the Biopython residue ID of a residue.
+
+        Args:
+            index (int): Index of the residue
+
+        Returns:
+            tuple: (hetero flag, residue number, insertion code)
+
+        """
+        return self.residue_hetfields[index], int(self.residue_seqnums[index]), self.residue_icodes[index]
+
+    def residue_full_ids(self):
+        """Get the chain ID and Biopython residue ID of all residues.
+
+        Returns:
+            list: List of (chain ID, (hetero flag, residue number, insertion code)) tuples
+
+        """
+        return [(self.chain_ids[c], (h, int(r), i)) for c, h, r, i in zip(self.residue_chain_index,
+                                                                          self.residue_hetfields,
+                                                                          self.residue_seqnums,
+                                                                          self.residue_icodes)]
+
+    def get_residue_index(self, chain_id, resnum):
+        """Get the index of a residue, in the same way a residue is selected from a Biopython Chain.
+
+        Args:
+            chain_id (str): Chain ID
+            resnum (int, tuple): Residue number, or Biopython residue ID
+
+        Returns:
+            int: Index of the residue
+
+        """
+        if chain_id not in self.chain_ids:
+            raise KeyError(chain_id)
+
+        if isinstance(resnum, tuple):
+            hetfield, seqnum, icode = resnum
+        else:
+            hetfield, seqnum, icode = ' ', resnum, ' '
+
+        found = np.flatnonzero((self.residue_chain_index == self.chain_ids.index(chain_id)) &
+                               (self.residue_seqnums == seqnum) &
+                               (self.residue_hetfields == hetfield) &
+                               (self.residue_icodes == icode))
+        if len(found) == 0:
+            raise KeyError((hetfield, seqnum, icode))
+        return int(found[0])
+
+    def get_atom_index(self, residue_index, atom_name=None):
+        """Get the index of an atom of a residue.
+
+        Args:
+            residue_index (int): Index of the residue
+            atom_name (str): Name of the atom. If not set, the last atom of the residue is returned.
+
+        Returns:
+            int: Index of the atom
+
+        """
+        start, end = self.atom_start[residue_index], self.atom_start[residue_index + 1]
+        if atom_name is None:
+            if start == end:
+                raise KeyError('Residue has no atoms')
+            return int(end - 1)
+
+        found = np.flatnonzero(self.name[start:end] == atom_name)
+        if len(found) == 0:
+            raise KeyError(atom_name)
+        return int(start + found[0])
+
+    @classmethod
+    def from_model(cls, model):
+        """Convert a Biopython Model to StructureArrays.
+
+        Args:
+            model (Model): Biopython Model object of a Structure
+
+        Returns:
+            StructureArrays: Columnar representation of the model
+
+        """
+        chain_ids = []
+        residue_chain_index = []
+        residue_names = []
+        residue_hetfields = []
+        residue_seqnums = []
+        residue_icodes = []
+        residue_index = []
+        atoms = []
+
+        for chain in model:
+            chain_ids.append(chain.id)
+            for residue in chain:
+                hetfield, seqnum, icode = residue.id
+                residue_chain_index.append(len(chain_ids) - 1)
+                residue_names.append(residue.get_resname())
+                residue_hetfields.append(hetfield)
+                residue_seqnums.append(seqnum)
+                residue_icodes.append(icode)
+                for atom in residue:
+                    atoms.append(atom)
+                    residue_index.append(len(residue_names) - 1)
+
+        occupancy = [a.get_occupancy() for a in atoms]
+        occupancy = [np.nan if x is None else x for x in occupancy]
+
+        return cls(chain_ids=chain_ids, residue_chain_index=residue_chain_index, residue_names=residue_names,
+                   residue_hetfields=residue_hetfields, residue_seqnums=residue_seqnums, residue_icodes=residue_icodes,
+                   residue_index=residue_index,
+                   coord=[a.get_coord() for a in atoms],
+                   name=[a.get_name() for a in atoms],
+                   element=[a.element for a in atoms],
+                   altloc=[a.get_altloc() for a in atoms],
+                   occupancy=occupancy,
+                   bfactor=[a.get_bfactor() for a in atoms])
+
+    @classmethod
+    def from_atom_records(cls, records):
+        """Build StructureArrays from a DataFrame of atom records, in the order they appear in a structure file.
+
+        Atoms are grouped into residues and chains by order of appearance, and of the alternate locations of an atom
+        only the one with the highest occupancy is kept.
+
+        Args:
+            records (DataFrame): Atom records with the columns ``chain``, ``hetfield``, ``resseq``, ``icode``,
+                ``resname``, ``name``, ``altloc``, ``element``, ``occupancy``, ``bfactor``, ``x``, ``y`` and ``z``
+
+        Returns:
+            StructureArrays: Columnar representation of the atom records
+
+        """
+        df = records.reset_index(drop=True)
+        df['position'] = np.arange(len(df))
+        df['chain_rank'] = df.groupby('chain', sort=False).ngroup()
+        df['residue_rank'] = df.groupby(_RESIDUE_KEYS, sort=False).ngroup()
+
+        # Of point mutations (residues with the same ID but different names), keep the last one, as Biopython does
+        resname_start = df.groupby(_RESIDUE_KEYS + ['resname'], sort=False)['position'].transform('min')
+        df = df[resname_start == resname_start.groupby(df['residue_rank']).transform('max')]
+
+        # Keep the alternate location of an atom with the highest occupancy, at the position of its first location
+        is_alt = (df['altloc'] != ' ').values
+        if is_alt.any():
+            alt = df[is_alt].copy()
+            atom_keys = _RESIDUE_KEYS + ['name']
+            alt['position'] = alt.groupby(atom_keys, sort=False)['position'].transform('min')
+            alt = alt.sort_values('occupancy', ascending=False, kind='mergesort').drop_duplicates(atom_keys)
+            df = pd.concat([df[~is_alt], alt])
+
+        # Order atoms by chain, then residue, in order of first appearance
+        df = df.sort_values(['position']).sort_values(['chain_rank', 'residue_rank'], kind='mergesort')
+
+        residue_rank = df['residue_rank'].values
+        new_residue = np.ones(len(df), dtype=bool)
+        new_residue[1:] = residue_rank[1:] != residue_rank[:-1]
+        residue_index = np.cumsum(new_residue) - 1
+        residues = df[new_residue]
+
+        chain_ids = list(pd.unique(residues['chain']))
+        residue_chain_index = pd.Index(chain_ids).get_indexer(residues['chain'])
+
+        return cls(chain_ids=chain_ids, residue_chain_index=residue_chain_index,
+                   residue_names=residues['resname'].values, residue_hetfields=residues['hetfield'].values,
+                   residue_seqnums=residues['resseq'].values, residue_icodes=residues['icode'].values,
+                   residue_index=residue_index,
+                   coord=df[['x', 'y', 'z']].values,
+                   name=df['name'].values,
+                   element=df['element'].values,
+                   altloc=df['altloc'].values,
+                   occupancy=df['occupancy'].values,
+                   bfactor=df['bfactor'].values)
+
+    @classmethod
+    def from_pdb(cls, structure_file):
+        """Load the first model of a PDB file, following the conventions of Biopython's PDBParser.
+
+        Args:
+            structure_file (str): Path to PDB file, which may be compressed
+
+        Returns:
+            StructureArrays: Columnar representation of the first model
+
+        """
+        lines = []
+        seen_model = False
+        with ssbio.utils.open_compressed(structure_file) as f:
+            for line in f:
+                record = line[:6]
+                if record == 'ATOM  ' or record == 'HETATM':
+                    lines.append(line.rstrip('\n').ljust(80))
+                elif record == 'ENDMDL':
+                    break
+                elif record == 'MODEL ':
+                    if seen_model:
+                        break
+                    seen_model = True
+
+        fullnames = [l[12:16] for l in lines]
+        names = [x.strip() if len(x.split()) == 1 else x for x in fullnames]
+        resnames = [l[17:20] for l in lines]
+        hetfields = [' ' if l[:6] == 'ATOM  ' else ('W' if r in ('HOH', 'WAT') else 'H_{}'.format(r))
+                     for l, r in zip(lines, resnames)]
+        elements = [l[76:78].strip().upper() for l in lines]
+
+        records = pd.DataFrame({'chain': [l[21] for l in lines],
+                                'hetfield': hetfields,
+                                'resseq': [int(l[22:26].split()[0]) for l in lines],
+                                'icode': [l[26] for l in lines],
+                                'resname': resnames,
+                                'name': names,
+                                'altloc': [l[16] for l in lines],
+                                'element': _assign_elements(elements, fullnames, names),
+                                'occupancy': pd.to_numeric(pd.Series([l[54:60] for l in lines], dtype=object),
+                                                           errors='coerce'),
+                                'bfactor': pd.to_numeric(pd.Series([l[60:66] for l in lines], dtype=object),
+                                                         errors='coerce').fillna(0.0),
+                                'x': [float(l[30:38]) for l in lines],
+                                'y': [float(l[38:46]) for l in lines],
+                                'z': [float(l[46:54]) for l in lines]})
+
+        log.debug('{}: loaded structure arrays'.format(op.basename(structure_file)))
+        return cls.from_atom_records(records)
+
+    @classmethod
+    def from_mmcif(cls, structure_file):
+        """Load the first model of an mmCIF file, following the conventions of ssbio's MMCIFParserFix.
+
+        Args:
+            structure_file (str): Path to mmCIF file, which may be compressed
+
+        Returns:
+            StructureArrays: Columnar representation of the first model
+
+        """
+        from ssbio.biopython.bp_mmcif2dict import MMCIF2DictFix
+        with ssbio.utils.open_compressed(structure_file) as f:
+            mmcif_dict = MMCIF2DictFix(f)
+
+        def column(key):
+            return np.asarray(mmcif_dict[key], dtype=object)
+
+        if '_atom_site.auth_seq_id' in mmcif_dict:
+            resseq = column('_atom_site.auth_seq_id')
+        else:
+            resseq = column('_atom_site.label_seq_id')
+
+        records = pd.DataFrame({'chain': column('_atom_site.auth_asym_id'),
+                                'hetfield': column('_atom_site.group_PDB'),
+                                'resseq': resseq.astype(np.int64),
+                                'icode': column('_atom_site.pdbx_PDB_ins_code'),
+                                'resname': column('_atom_site.label_comp_id'),
+                                'name': column('_atom_site.label_atom_id'),
+                                'altloc': column('_atom_site.label_alt_id'),
+                                'occupancy': column('_atom_site.occupancy').astype(float),
+                                'bfactor': column('_atom_site.B_iso_or_equiv').astype(float),
+                                'x': column('_atom_site.Cartn_x').astype(float),
+                                'y': column('_atom_site.Cartn_y').astype(float),
+                                'z': column('_atom_site.Cartn_z').astype(float)})
+        if '_atom_site.type_symbol' in mmcif_dict:
+            elements = [x.upper() for x in mmcif_dict['_atom_site.type_symbol']]
+        else:
+            elements = [''] * len(records)
+        records['element'] = _assign_elements(elements, records['name'].values, records['name'].values)
+
+        if '_atom_site.pdbx_PDB_model_num' in mmcif_dict:
+            model_num = column('_atom_site.pdbx_PDB_model_num')
+            records = records[model_num == model_num[0]]
+
+        records['hetfield'] = np.where(records['hetfield'] == 'HETATM', 'H_' + records['resname'], ' ')
+        records['icode'] = records['icode'].replace('?', ' ')
+        records['altloc'] = records['altloc'].replace('.', ' ')
+
+        log.debug('{}: loaded structure arrays'.format(op.basename(structure_file)))
+        return cls.from_atom_records(records)
+
+    @classmethod
+    def from_mmtf(cls, structure_file):
+        """Load the first model of an MMTF file, following the conventions of Biopython's MMTFParser.
+
+        Args:
+            structure_file (str): Path to MMTF file, which may be compressed
+
+        Returns:
+            StructureArrays: Columnar representation of the first model
+
+        """
+        from ssbio.protein.structure.utils.structureio import parse_mmtf
+        decoder = parse_mmtf(structure_file)
+
+        chain_types = {}
+        for entity in decoder.entity_list:
+            for chain_index in entity['chainIndexList']:
+                chain_types[chain_index] = {'polymer': ' ', 'non-polymer': 'H', 'water': 'W'}.get(entity['type'], ' ')
+
+        n_chains = decoder.chains_per_model[0] if len(decoder.chains_per_model) else 0
+
+        chain, hetfield, resseq, icode, resname, name, element = [], [], [], [], [], [], []
+        group_index = 0
+        for chain_index in range(n_chains):
+            for x in range(decoder.groups_per_chain[chain_index]):
+                group = decoder.group_list[decoder.group_type_list[group_index]]
+                group_hetfield = chain_types.get(chain_index, ' ')
+                if group_hetfield == 'H':
+                    group_hetfield = 'H_{}'.format(group['groupName'])
+                group_icode = decoder.ins_code_list[group_index]
+                for atom_name, atom_element in zip(group['atomNameList'], group['elementList']):
+                    chain.append(decoder.chain_name_list[chain_index])
+                    hetfield.append(group_hetfield)
+                    resseq.append(decoder.group_id_list[group_index])
+                    icode.append(' ' if group_icode == '\x00' else group_icode)
+                    resname.append(group['groupName'])
+                    name.append(atom_name)
+                    element.append(atom_element.upper())
+                group_index += 1
+
+        n_atoms = len(name)
+        altloc = [' ' if x == '\x00' else x for x in decoder.alt_loc_list[:n_atoms]]
+        records = pd.DataFrame({'chain': chain, 'hetfield': hetfield, 'resseq': resseq, 'icode': icode,
+                                'resname': resname, 'name': name, 'altloc': altloc, 'element': element,
+                                'occupancy': decoder.occupancy_list[:n_atoms],
+                                'bfactor': decoder.b_factor_list[:n_atoms],
+                                'x': decoder.x_coord_list[:n_atoms],
+                                'y': decoder.y_coord_list[:n_atoms],
+                                'z': decoder.z_coord_list[:n_atoms]})
+        log.debug('{}: loaded structure arrays'.format(op.basename(structure_file)))
+        return cls.from_atom_records(records)
+
+    def save(self, outfile, metadata=None):
+        """Save to ssbio's binary structure format, a small JSON header followed by the raw bytes of each array.
+
+        Arrays are aligned in the file so that :meth:`load` can memory-map them without reading or copying them. The
+        file is written under a temporary name and then moved to ``outfile``, so processes loading it never see a
+        partly written file.
+
+        Args:
+            outfile (str): Path to output file
+            metadata (dict): JSON serializable information to store in the header, i.e. the source structure file
+
+        Returns:
+            str: Path to output file
+
+        """
+        arrays = OrderedDict()
+        offset = 0
+        for field in _ARRAY_FIELDS:
+            array = np.ascontiguousarray(getattr(self, field))
+            arrays[field] = (array, {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset})
+            offset = _align(offset + array.nbytes)
+
+        header = json.dumps({'version': ARRAYS_FORMAT_VERSION,
+                             'chain_ids': self.chain_ids,
+                             'metadata': metadata if metadata is not None else self.metadata,
+                             'arrays': OrderedDict((k, v[1]) for k, v in arrays.items())}).encode('utf-8')
+        data_start = _align(len(_ARRAYS_MAGIC) + 8 + len(header))
+
+        tmpfile = '{}.{}.tmp'.format(outfile, os.getpid())
+        with open(tmpfile, 'wb') as f:
+            f.write(_ARRAYS_MAGIC)
+            f.write(struct.pack('<Q', len(header)))
+            f.write(header)
+            for array, info in arrays.values():
+                f.write(b'\0' * (data_start + info['offset'] - f.tell()))
+                f.write(array.tobytes())
+        os.replace(tmpfile, outfile)
+
+        return outfile
+
+    @staticmethod
+    def read_header(infile):
+        """Read the header of a file saved by :meth:`save`.
+
+        Args:
+            infile (str): Path to file
+
+        Returns:
+            dict: Header with the format ``version``, ``chain_ids``, ``metadata`` and the layout of the ``arrays``
+
+        """
+        with open(infile, 'rb') as f:
+            if f.read(len(_ARRAYS_MAGIC)) != _ARRAYS_MAGIC:
+                raise ValueError('{}: not an ssbio structure arrays file'.format(infile))
+            header_length = struct.unpack('<Q', f.read(8))[0]
+            header = json.loads(f.read(header_length).decode('utf-8'))
+        header['data_start'] = _align(len(_ARRAYS_MAGIC) + 8 + header_length)
+        return header
+
+    @classmethod
+    def load(cls, infile, mmap=True):
+        """Load StructureArrays saved by :meth:`save`.
+
+        Args:
+            infile (str): Path to file
+            mmap (bool): If the arrays should be memory-mapped (read-only) instead of read into memory. Pages of a
+                memory-mapped file are shared between all processes which load it.
+
+        Returns:
+            StructureArrays: Columnar representation of the first model, with the stored ``metadata``
+
+        """
+        header = cls.read_header(infile)
+        if header['version'] != ARRAYS_FORMAT_VERSION:
+            raise ValueError('{}: structure arrays file version {} is not supported'.format(infile, header['version']))
+
+        if mmap:
+            data = np.memmap(infile, dtype=np.uint8, mode='r')
+        else:
+            data = np.fromfile(infile, dtype=np.uint8)
+
+        loaded = cls.__new__(cls)
+        loaded.chain_ids = header['chain_ids']
+        loaded.metadata = header['metadata']
+        for field, info in header['arrays'].items():
+            dtype = np.dtype(info['dtype'])
+            start = header['data_start'] + info['offset']
+            nbytes = int(np.prod(info['shape'], dtype=np.int64)) * dtype.itemsize
+            setattr(loaded, field, data[start:start + nbytes].view(dtype).reshape(info['shape']))
+
+        log.debug('{}: loaded structure arrays'.format(op.basename(infile)))
+        return loaded
+
+    def to_structure(self, structure_id='ssbio_arrays'):
+        """Convert to a Biopython Structure with a single model.
+
+        Args:
+            structure_id (str): ID of the new Structure
+
+        Returns:
+            Structure: Biopython Structure object
+
+        """
+        from Bio.PDB.StructureBuilder import StructureBuilder
+
+        builder = StructureBuilder()
+        builder.init_structure(structure_id)
+        builder.init_model(0)
+        builder.init_seg(' ')
+
+        current_chain = None
+        for i in range(self.n_residues):
+            chain_id = self.chain_ids[self.residue_chain_index[i]]
+            if chain_id != current_chain:
+                builder.init_chain(chain_id)
+                current_chain = chain_id
+
+            hetfield = self.residue_hetfields[i]
+            if hetfield.startswith('H_'):
+                hetfield = 'H'
+            builder.init_residue(self.residue_names[i], hetfield, int(self.residue_seqnums[i]),
+                                 self.residue_icodes[i])
+
+            for j in range(self.atom_start[i], self.atom_start[i + 1]):
+                name = self.name[j]
+                fullname = name if len(name) == 4 else ' {:<3}'.format(name)
+                occupancy = None if np.isnan(self.occupancy[j]) else float(self.occupancy[j])
+                builder.init_atom(name, self.coord[j].copy(), float(self.bfactor[j]), occupancy, self.altloc[j],
+                                  fullname, element=self.element[j])
+
+        return builder.get_structure()
+
+
+def _assign_elements(elements, fullnames, names):
+    """Check the element of each atom, guessing it from the atom name if it is not valid, as Biopython's Atom does"""
+    from Bio.Data.IUPACData import atom_weights
+
+    guessed = {}
+    assigned = []
+    for element, fullname, name in zip(elements, fullnames, names):
+        if element.capitalize() in atom_weights:
+            assigned.append(element)
+            continue
+
+        if (fullname, name) not in guessed:
+            if fullname[0].isalpha() and not fullname[2:].isdigit():
+                putative_element = name.strip()
+            elif name[0].isdigit():
+                putative_element = name[1]
+            else:
+                putative_element = name[0]
+            guessed[(fullname, name)] = putative_element if putative_element.capitalize() in atom_weights else ''
+        assigned.append(guessed[(fullname, name)])
+
+    return assigned
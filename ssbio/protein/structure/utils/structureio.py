@@ -2,13 +2,18 @@ from Bio import PDB
 from Bio.PDB.PDBIO import PDBIO
 from Bio.PDB.PDBIO import Select
 from Bio.PDB.PDBParser import PDBParser
-from Bio.PDB.mmtf import MMTFParser
+from Bio.PDB.mmtf import MMTFParser, get_from_decoded
 from Bio.PDB.PDBExceptions import PDBConstructionWarning
 import os.path as op
 import logging
+import mmtf
+import msgpack
+from mmtf import MMTFDecoder
 import warnings
 import ssbio.utils
 from ssbio.biopython.bp_mmcifparser import MMCIFParserFix
+from ssbio.protein.structure.utils.structure_cache import StructureArraysStore, StructureCache
+from ssbio.protein.structure.utils.structurearrays import StructureArrays
 
 log = logging.getLogger(__name__)
 
@@ -16,6 +21,123 @@ cifp = MMCIFParserFix(QUIET=True)
 pdbp = PDBParser(PERMISSIVE=True, QUIET=True)
 mmtfp = MMTFParser()
 
+_STRUCTURE_CACHE = StructureCache()
+_STRUCTURE_STORE = None
+
+
+def set_structure_cache(max_atoms=500000):
+    """Set the cache used to store structures parsed by StructureIO.
+
+    Args:
+        max_atoms (int): Memory budget of the cache, as the total number of atoms of all stored structures. Set to 0
+            to disable caching.
+
+    Returns:
+        StructureCache: The new structure cache
+
+    """
+    global _STRUCTURE_CACHE
+    _STRUCTURE_CACHE = StructureCache(max_atoms=max_atoms)
+    return _STRUCTURE_CACHE
+
+
+def get_structure_cache():
+    """Get the cache used to store structures parsed by StructureIO.
+
+    Returns:
+        StructureCache: The current structure cache
+
+    """
+    return _STRUCTURE_CACHE
+
+
+def set_structure_store(cache_dir=None, mmap=True):
+    """Set the on-disk store of structures in ssbio's binary format, used by StructureIO and read_structure_arrays.
+
+    Once set, the first model of every structure file parsed is saved in the store, and memory-mapped from it
+    instead of being parsed again on every later load, in this or any other process using the same directory.
+
+    Args:
+        cache_dir (str): Path to the directory to store structures in. If not set, structures are not stored.
+        mmap (bool): If stored structures should be memory-mapped instead of read into memory
+
+    Returns:
+        StructureArraysStore: The new structure store, or None if it was unset
+
+    """
+    global _STRUCTURE_STORE
+    _STRUCTURE_STORE = StructureArraysStore(cache_dir, mmap=mmap) if cache_dir else None
+    return _STRUCTURE_STORE
+
+
+def get_structure_store():
+    """Get the on-disk store of structures in ssbio's binary format.
+
+    Returns:
+        StructureArraysStore: The current structure store, or None if structures are not stored
+
+    """
+    return _STRUCTURE_STORE
+
+
+def parse_mmtf(structure_file):
+    """Decode an MMTF file, decompressing it in memory if it is compressed (i.e. ``.mmtf.gz``).
+
+    Args:
+        structure_file (str): Path to MMTF file
+
+    Returns:
+        MMTFDecoder: Decoded MMTF data
+
+    """
+    if not ssbio.utils.is_compressed(structure_file):
+        return mmtf.parse(structure_file)
+
+    decoder = MMTFDecoder()
+    with ssbio.utils.open_compressed(structure_file, 'rb') as f:
+        decoder.decode_data(msgpack.unpackb(f.read(), raw=False))
+    return decoder
+
+
+def read_structure_arrays(structure_file, file_type=None):
+    """Load the first model of a structure file directly into StructureArrays, without building Biopython objects.
+
+    If a structure store is set (see ``set_structure_store``), the arrays are memory-mapped from it when the file
+    was loaded before, and saved to it otherwise.
+
+    Args:
+        structure_file (str): Path to PDB, mmCIF or MMTF file, which may be compressed
+        file_type (str): Type of structure file, guessed from the file extension if not set
+
+    Returns:
+        StructureArrays: Columnar representation of the first model
+
+    """
+    if not file_type or file_type in ssbio.utils.COMPRESSED_EXTENSIONS:
+        file_type = ssbio.utils.split_folder_and_path(ssbio.utils.strip_compressed_extension(structure_file))[2]
+    elif '.' not in file_type:
+        file_type = '.{}'.format(file_type)
+
+    if file_type.lower() not in ['.pdb', '.ent', '.mmcif', '.cif', '.mmtf']:
+        raise ValueError('{}: unsupported file type'.format(file_type))
+
+    store = _STRUCTURE_STORE
+    if store:
+        arrays = store.get(structure_file, file_type)
+        if arrays is not None:
+            return arrays
+
+    if file_type.lower() in ['.pdb', '.ent']:
+        arrays = StructureArrays.from_pdb(structure_file)
+    elif file_type.lower() in ['.mmcif', '.cif']:
+        arrays = StructureArrays.from_mmcif(structure_file)
+    else:
+        arrays = StructureArrays.from_mmtf(structure_file)
+
+    if store:
+        store.set(structure_file, file_type, arrays)
+    return arrays
+
 
 def as_protein(structure, filter_residues=True):
     """ Exposes methods in the Bio.Struct.Protein module.
@@ -34,20 +156,26 @@ class StructureIO(PDBIO):
 
     Loads the first model when there are multiple available.
     Also adds some logging methods.
+
+    Parsed structures are kept in a process-wide cache (see ``get_structure_cache``), so loading the same unchanged
+    file again does not parse it again. The cached Structure object is shared, set ``use_cache`` to False if it will
+    be modified in place. If a structure store is set (see ``set_structure_store``), the first model of a newly parsed
+    structure is also saved to it, and ``arrays`` is memory-mapped from it on later loads.
     """
 
     # XTODO: need to revamp this module to be clearer on what files are supported, how file path is parsed
     # (should explicitly define it)
-    def __init__(self, structure_file, file_type=None):
+    def __init__(self, structure_file, file_type=None, use_cache=True):
         PDBIO.__init__(self)
 
-        dirname, filename_without_extension, file_type2 = ssbio.utils.split_folder_and_path(structure_file)
+        # Compressed files are decompressed while they are parsed, the file type is the extension before .gz
+        dirname, filename_without_extension, file_type2 = ssbio.utils.split_folder_and_path(
+            ssbio.utils.strip_compressed_extension(structure_file))
         self.structure_file = structure_file
+        self._use_cache = use_cache
 
-        # Unzip the file if it is zipped
-        if file_type == '.gz':
-            unzipped = ssbio.utils.gunzip_file(structure_file, outdir=dirname)
-            dirname, filename_without_extension, file_type2 = ssbio.utils.split_folder_and_path(unzipped)
+        if file_type in ssbio.utils.COMPRESSED_EXTENSIONS:
+            file_type = None
 
         if not file_type:
             file_type = file_type2
@@ -55,21 +183,36 @@ class StructureIO(PDBIO):
             if '.' not in file_type:
                 file_type = '.{}'.format(file_type)
 
-        if file_type.lower() in ['.pdb', '.ent', '.mmcif', '.cif', '.mmtf']:
+        if file_type.lower() not in ['.pdb', '.ent', '.mmcif', '.cif', '.mmtf']:
+            raise ValueError('{}: unsupported file type'.format(file_type))
+        self._file_type = file_type
+
+        structure = None
+        parsed = False
+        if use_cache:
+            structure = _STRUCTURE_CACHE.get(structure_file, file_type)
+
+        if structure is None:
             # Load the structure
             if file_type.lower() == '.pdb' or file_type.lower() == '.ent':
-                structure = pdbp.get_structure(id='ssbio_pdb', file=structure_file)
+                with ssbio.utils.open_compressed(structure_file) as f:
+                    structure = pdbp.get_structure(id='ssbio_pdb', file=f)
             if file_type.lower() == '.mmcif' or file_type.lower() == '.cif':
                 with warnings.catch_warnings():
                     warnings.simplefilter('ignore', PDBConstructionWarning)
-                    structure = cifp.get_structure(structure_id='ssbio_cif', filename=structure_file)
+                    with ssbio.utils.open_compressed(structure_file) as f:
+                        structure = cifp.get_structure(structure_id='ssbio_cif', filename=f)
             if file_type.lower() == '.mmtf':
                 with warnings.catch_warnings():
                     warnings.simplefilter('ignore', PDBConstructionWarning)
-                    structure = mmtfp.get_structure(file_path=structure_file)
+                    structure = get_from_decoded(parse_mmtf(structure_file))
             log.debug('{}: parsed 3D coordinates of structure'.format(op.basename(structure_file)))
+            parsed = True
+
+            if use_cache and len(structure):
+                _STRUCTURE_CACHE.set(structure_file, file_type, structure)
         else:
-            raise ValueError('{}: unsupported file type'.format(file_type))
+            log.debug('{}: loaded 3D coordinates of structure from cache'.format(op.basename(structure_file)))
 
         self.set_structure(structure)
         try:
@@ -77,6 +220,33 @@ class StructureIO(PDBIO):
         except KeyError:
             raise KeyError('{}: no models contained in structure! Please check structure file contents.'.format(structure_file))
 
+        # Save newly parsed structures to the structure store
+        if parsed and _STRUCTURE_STORE and use_cache:
+            self._save_to_store()
+
+    def _save_to_store(self):
+        """Save the first model to the structure store as StructureArrays, unless it is stored already, and keep the
+        stored arrays as ``arrays``"""
+        self._arrays = _STRUCTURE_STORE.get(self.structure_file, self._file_type)
+        if self._arrays is None:
+            self._arrays = StructureArrays.from_model(self.first_model)
+            _STRUCTURE_STORE.set(self.structure_file, self._file_type, self._arrays)
+
+    @property
+    def arrays(self):
+        """StructureArrays: Columnar representation of the first model, converted when first used, or memory-mapped
+        from the structure store if it is set"""
+        if getattr(self, '_arrays', None) is None:
+            store = _STRUCTURE_STORE if getattr(self, '_use_cache', False) else None
+            self._arrays = None
+            if store:
+                self._arrays = store.get(self.structure_file, self._file_type)
+            if self._arrays is None:
+                self._arrays = StructureArrays.from_model(self.first_model)
+                if store:
+                    store.set(self.structure_file, self._file_type, self._arrays)
+        return self._arrays
+
     def write_pdb(self, custom_name='', out_suffix='', out_dir=None, custom_selection=None, force_rerun=False):
         """Write a new PDB file for the Structure's FIRST MODEL.
 
@@ -0,0 +1,39 @@
+import os.path as op
+import shutil
+import tempfile
+
+import pytest
+
+from ssbio.complex.oligomer import Oligomer, write_merged_bioassembly
+from ssbio.protein.structure.structprop import StructProp
+
+
+@pytest.fixture()
+def bioassembly(test_files_structures):
+    tempdir = tempfile.mkdtemp()
+    infile = op.join(tempdir, '1mot.pdb')
+    shutil.copy(op.join(test_files_structures, '1mot.pdb'), infile)
+    yield infile
+    shutil.rmtree(tempdir)
+
+
+def _first_model_chains(structure_path):
+    return [x.id for x in StructProp('1mot', structure_path=structure_path, file_type='pdb').parse_structure().first_model]
+
+
+def test_write_merged_bioassembly(bioassembly):
+    chains = _first_model_chains(bioassembly)
+    outpath = write_merged_bioassembly(bioassembly, outdir=op.dirname(bioassembly), outname='1mot_merged')
+    assert op.exists(outpath)
+    assert len(_first_model_chains(outpath)) > len(chains)
+
+    # Merging must not modify the structure shared through the structure cache
+    assert _first_model_chains(bioassembly) == chains
+
+
+def test_merge_models_in_memory(bioassembly):
+    chains = _first_model_chains(bioassembly)
+    oligomer = Oligomer('1mot', structure_path=bioassembly, file_type='pdb')
+    oligomer.merge_models(store_in_memory=True)
+    assert len(oligomer.structure.first_model) > len(chains)
+    assert _first_model_chains(bioassembly) == chains
@@ -51,6 +51,38 @@ def confusing_resnum_mapping(test_files_sequences, test_files_structures, test_f
                                   chain_id='A')
     return p
 
+def test_pairwise_align_sequences_to_representative_failed(test_files_outputs):
+    p = Protein(ident='P1', root_dir=test_files_outputs)
+    p.load_manual_sequence(seq='MSPRVGVTLSGRYRLQRLIATGG', ident='rep', set_as_representative=True)
+    p.load_manual_sequence(seq='MSPRVGVTLSGRYRLQRLIATGA', ident='strain')
+
+    with pytest.raises(ValueError, match='failed for strain'):
+        p.pairwise_align_sequences_to_representative(engine='invalid')
+    assert len(p.sequence_alignments) == 0
+
+    p.pairwise_align_sequences_to_representative(engine='numpy')
+    assert p.sequence_alignments.has_id('P1_strain')
+
+
+def test_get_seqres_candidate_chains(test_files_structures, test_files_outputs):
+    p = Protein(ident='GAPDH', root_dir=test_files_outputs)
+    gapdh = p.load_manual_sequence(seq='MGKVKVGVNGFGRIGRLVTRAAFNSGKVDIVAINDPFIDLNYMVYMFQYDSTHGKFHGTVKAENGKLVINGNPITIFQERDPSKIKWGDAGAEYVVESTGVFTTMEKAGAHLQGGAKRVIISAPSADAPMFVMGVNHEKYDNSLKIISNASCTTNCLAPLAKVIHDNFGIVEGLMTTVHAITATQKTVDGPSGKLWRDGRGALQNIIPASTGAAKAVGKVIPELNGKLTGMAFRVPTANVSVVDLTCRLEKPAKYDDIKKVVKQASEGPLKGILGYTEHQVVSSDFNSDTHSSTFDAGAGIALNDHFVKLISWYDNEFGYSNRVVDLMAHMASKE',
+                                   ident='gapdh', set_as_representative=True)
+    other = p.load_manual_sequence(seq='MSTNPKPQRKTKRNTNRRPQDVKFPGGGQIVGGVYLLPRRGPRLGVRATRKTSERSQPRGRRQPIPKARRPEGRTWAQPGYPWPLYGNEG',
+                                   ident='other')
+    cif = p.load_pdb(pdb_id='1u8f', pdb_file=op.join(test_files_structures, '1u8f.cif'), file_type='mmCif')
+
+    # Only the header is read, the structure is not parsed
+    assert p.get_seqres_candidate_chains(gapdh, cif, seq_ident_cutoff=0.9) == ['O', 'P', 'Q', 'R']
+    assert p.get_seqres_candidate_chains(gapdh, cif, seq_ident_cutoff=0.9, chains_to_check='Q') == ['Q']
+    assert p.get_seqres_candidate_chains(other, cif, seq_ident_cutoff=0.5) == []
+    assert cif.chains.get_by_id('O').seq_record is None
+
+    # Chain sequences of PDB files can only be found with a full parse
+    pdb = p.load_pdb(pdb_id='3bwm', pdb_file=op.join(test_files_structures, '3bwm.pdb'), file_type='pdb')
+    assert p.get_seqres_candidate_chains(gapdh, pdb) is None
+
+
 def test__map_seqprop_resnums_to_structprop_chain_index(test2, straightforward_resnum_mapping, confusing_resnum_mapping):
     assert test2._map_seqprop_resnums_to_structprop_chain_index(resnums=52, use_representatives=True) == {52: 1}
 
@@ -80,6 +112,34 @@ def test_map_structprop_resnums_to_seqprop_resnums(test2, straightforward_resnum
                                                                               use_representatives=True) == {0: 29, 1: 30, 167: 196}
 
 
+def test_get_resnum_mapping(test_files_sequences, test_files_structures, test_files_outputs):
+    p = Protein(ident='P08559', root_dir=test_files_outputs)
+    p.load_uniprot(uniprot_id='P08559',
+                   uniprot_seq_file=op.join(test_files_sequences, 'P08559.fasta'),
+                   uniprot_xml_file=op.join(test_files_sequences, 'P08559.xml'),
+                   download=False, set_as_representative=True)
+    p.load_pdb(pdb_id='3exf_bio1', mapped_chains=['A'], pdb_file=op.join(test_files_structures, '3exf_bio1.pdb'),
+               file_type='pdb', representative_chain='A', set_as_representative=True)
+    p.align_seqprop_to_structprop(seqprop=p.sequences.get_by_id('P08559'),
+                                  structprop=p.structures.get_by_id('3exf_bio1'),
+                                  chain_id='A', engine='numpy')
+
+    mapping = p.get_resnum_mapping(use_representatives=True)
+    assert p.sequence_alignments[0].annotations['resnum_mapping'] is mapping
+    assert mapping.map_seq_to_structure([29, 30, 196])[0].tolist() == [0, 1, 167]
+    assert mapping.map_structure_to_seq([0, 1, 167])[0].tolist() == [29, 30, 196]
+
+    assert p.map_seqprop_resnums_to_structprop_resnums(resnums=[1, 29, 30, 196],
+                                                       use_representatives=True) == {29: 0, 30: 1, 196: 167}
+    assert p.map_structprop_resnums_to_seqprop_resnums(resnums=[0, 1, 167, 1000],
+                                                       use_representatives=True) == {0: 29, 1: 30, 167: 196}
+
+    # Alignments parsed before the mapping was stored get it when first used
+    del p.sequence_alignments[0].annotations['resnum_mapping']
+    assert p._map_seqprop_resnums_to_structprop_chain_index(resnums=29, use_representatives=True) == {29: 0}
+    assert p.sequence_alignments[0].annotations['resnum_mapping'] is not mapping
+
+
 # import os.path as op
 # import unittest
 #
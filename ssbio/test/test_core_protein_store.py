@@ -0,0 +1,92 @@
+import os.path as op
+import pickle
+import shutil
+import tempfile
+
+import pytest
+
+from ssbio.core.protein import Protein
+from ssbio.core.protein_store import ProteinProxy, ProteinStore
+from ssbio.pipeline.gempro import GEMPRO
+
+
+@pytest.fixture()
+def store_tempdir():
+    """Temporary directory of the Protein and its store, removed after each test"""
+    tempdir = tempfile.mkdtemp()
+    yield tempdir
+    shutil.rmtree(tempdir)
+
+
+@pytest.fixture()
+def protein(store_tempdir, test_files_sequences, test_files_structures):
+    p = Protein(ident='P08559', root_dir=store_tempdir)
+    p.load_uniprot(uniprot_id='P08559',
+                   uniprot_seq_file=op.join(test_files_sequences, 'P08559.fasta'),
+                   uniprot_xml_file=op.join(test_files_sequences, 'P08559.xml'),
+                   download=False, set_as_representative=True)
+    p.load_pdb(pdb_id='3exf_bio1', mapped_chains=['A'], pdb_file=op.join(test_files_structures, '3exf_bio1.pdb'),
+               file_type='pdb', representative_chain='A', set_as_representative=True)
+    p.align_seqprop_to_structprop(seqprop=p.sequences.get_by_id('P08559'),
+                                  structprop=p.structures.get_by_id('3exf_bio1'),
+                                  chain_id='A', engine='numpy')
+    return p
+
+
+def test_protein_store(protein, store_tempdir):
+    store = ProteinStore(op.join(store_tempdir, 'store'))
+    store.save(protein)
+    assert store.ids == ['P08559']
+    assert sorted(store.read_index('P08559')) == ['alignments', 'annotations', 'sequences', 'structures']
+
+    proxy = store.get_proxy('P08559')
+    assert isinstance(proxy, Protein)
+    assert proxy.loaded_groups == []
+
+    # Only the groups which are used are loaded
+    assert proxy.representative_sequence.id == protein.representative_sequence.id
+    assert proxy.loaded_groups == ['sequences']
+    assert proxy.num_structures == protein.num_structures
+    assert proxy.loaded_groups == ['sequences', 'structures']
+    assert 'sequence_alignments' not in proxy.__dict__
+    assert proxy.map_seqprop_resnums_to_structprop_resnums(resnums=[29, 30], use_representatives=True) == {29: 0, 30: 1}
+    assert sorted(proxy.loaded_groups) == ['alignments', 'annotations', 'sequences', 'structures']
+
+    with pytest.raises(AttributeError):
+        proxy.not_an_attribute
+
+    # Unloaded groups are loaded again when used, changes are only kept if saved
+    proxy.unload()
+    assert proxy.loaded_groups == []
+    assert 'sequences' not in proxy.__dict__
+    proxy.description = 'changed'
+    proxy.unload(save=True)
+    assert proxy.loaded_groups == []
+    assert store.get_proxy('P08559').description == 'changed'
+    assert store.load('P08559').num_sequences == protein.num_sequences
+
+    # Proxies can be pickled with the groups they have loaded
+    proxy.sequences
+    unpickled = pickle.loads(pickle.dumps(proxy))
+    assert unpickled.loaded_groups == ['sequences']
+    assert unpickled.num_structures == protein.num_structures
+
+    plain = proxy.to_protein()
+    assert type(plain) is Protein
+    assert plain.representative_chain == 'A'
+
+
+def test_gempro_protein_store(store_tempdir):
+    gempro = GEMPRO(gem_name='test_store', root_dir=store_tempdir,
+                    genes_and_sequences={'b0001': 'MKRISTTITTTITITTGNGAG', 'b0002': 'MRVLKFGGTSVANAERFLRVADILESNARQ'},
+                    write_protein_fasta_files=False)
+    store = gempro.save_protein_store()
+    assert store.store_dir == op.join(gempro.data_dir, 'protein_store')
+    assert all(isinstance(g.protein, ProteinProxy) for g in gempro.genes)
+    assert str(gempro.genes.get_by_id('b0002').protein.representative_sequence.seq) == 'MRVLKFGGTSVANAERFLRVADILESNARQ'
+
+    other = GEMPRO(gem_name='test_store_other', root_dir=store_tempdir, genes_list=['b0001', 'b0003'])
+    other.load_protein_store(store.store_dir)
+    assert isinstance(other.genes.get_by_id('b0001').protein, ProteinProxy)
+    assert not isinstance(other.genes.get_by_id('b0003').protein, ProteinProxy)
+    assert other.genes.get_by_id('b0001').protein.num_sequences == 1
@@ -1,5 +1,10 @@
+import gzip
+import os
 import pytest
 import os.path as op
+import shutil
+import tempfile
+import ssbio.utils
 import ssbio.databases.pdb as pdb
 from six.moves.urllib_error import URLError
 
@@ -62,4 +67,102 @@ def test_download_biomol(pdb_ids_working, pdb_ids_obsolete, pdb_ids_false, test_
     #         pdb.download_biomol(pdb_id=obp, outdir=test_files_tempdir, force_rerun=True)
     for fp in pdb_ids_false:
         with pytest.raises(URLError):
-            pdb.download_biomol(pdb_id=fp, outdir=test_files_tempdir, force_rerun=True)
\ No newline at end of file
+            pdb.download_biomol(pdb_id=fp, outdir=test_files_tempdir, force_rerun=True)
+
+def test_property_store(test_files_tempdir):
+    report = op.join(test_files_tempdir, 'pdb_property_report.csv')
+    with open(report, 'w') as f:
+        f.write('structureId,chainId,resolution,experimentalTechnique,releaseDate\n'
+                '1KF6,A,2.7,X-RAY DIFFRACTION,2002-06-12\n'
+                '1KF6,B,2.7,X-RAY DIFFRACTION,2002-06-12\n'
+                '2K1M,A,,SOLUTION NMR,2008-05-20\n'
+                '1CBN,A,0.83,X-RAY DIFFRACTION,\n')
+
+    db_path = op.join(test_files_tempdir, 'pdb_properties.sqlite')
+    store = pdb.set_property_store(db_path=db_path, source=report)
+    store.build(force_rerun=True)
+    assert len(store) == 3
+    assert '1kf6' in store
+    assert store.metadata['source'] == op.abspath(report)
+
+    assert pdb.get_resolution('1kf6') == 2.7
+    assert pdb.get_resolution('2K1M') == float('inf')
+    assert pdb.get_release_date('1KF6') == '2002-06-12'
+    assert pdb.get_release_date('1CBN') is None
+    with pytest.raises(ValueError):
+        pdb.get_resolution('4XXX')
+
+    assert pdb.get_resolutions(['2k1m', '1kf6', '4xxx']) == {'2K1M': float('inf'), '1KF6': 2.7}
+    assert pdb.get_release_dates(['1CBN']) == {'1CBN': None}
+
+    # The stored table is reused without the source file
+    store.close()
+    reopened = pdb.set_property_store(db_path=db_path, source=op.join(test_files_tempdir, 'not_a_file.csv'))
+    assert reopened.is_built
+    assert pdb.get_resolutions(['1CBN']) == {'1CBN': 0.83}
+
+    prop = pdb.PDBProp('1kf6')
+    prop.load_property_store_metadata()
+    assert prop.resolution == 2.7
+    assert prop.experimental_method == 'X-RAY DIFFRACTION'
+    assert prop.release_date == '2002-06-12'
+
+    reopened.close()
+    pdb.set_property_store()
+
+
+def test_download_structure_file_existing(test_files_structures, test_files_tempdir):
+    # Files already downloaded are loaded without going to the PDB
+    outdir = op.join(test_files_tempdir, 'existing_structures')
+    ssbio.utils.make_dir(outdir)
+    shutil.copy(op.join(test_files_structures, '1kf6.pdb'), outdir)
+
+    prop = pdb.PDBProp('1KF6')
+    prop.download_structure_file(outdir=outdir, file_type='pdb', load_header_metadata=False)
+    assert prop.structure_path == op.join(outdir, '1kf6.pdb')
+
+
+def _gzip_into_mirror(infile, outfile):
+    os.makedirs(op.dirname(outfile))
+    with open(infile, 'rb') as f_in, gzip.open(outfile, 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out)
+
+
+def test_pdb_mirror(test_files_structures):
+    # A mirror in the wwPDB divided layout, gzipped files are read in place and nothing is downloaded
+    mirror_dir = tempfile.mkdtemp()
+    outdir = tempfile.mkdtemp()
+    _gzip_into_mirror(op.join(test_files_structures, '1kf6.pdb'), op.join(mirror_dir, 'pdb', 'kf', 'pdb1kf6.ent.gz'))
+    _gzip_into_mirror(op.join(test_files_structures, '1u8f.cif'), op.join(mirror_dir, 'mmCIF', 'u8', '1u8f.cif.gz'))
+    _gzip_into_mirror(op.join(test_files_structures, '1abc.sifts.xml'), op.join(mirror_dir, 'sifts', 'ab', '1abc.xml.gz'))
+
+    mirror = pdb.set_pdb_mirror(root_dir=mirror_dir, allow_network=False)
+    try:
+        assert mirror.get_path('1KF6', 'pdb') == op.join(mirror_dir, 'pdb', 'kf', 'pdb1kf6.ent.gz')
+        assert mirror.get_path('1KF6', 'mmcif') is None
+
+        prop = pdb.PDBProp('1KF6')
+        prop.download_structure_file(outdir=outdir, file_type='pdb', load_header_metadata=False)
+        assert prop.structure_path == mirror.get_path('1kf6', 'pdb')
+        prop.parse_structure()
+        assert [x.id for x in prop.chains] == ['A', 'B', 'C', 'D', 'M', 'N', 'O', 'P']
+
+        prop = pdb.PDBProp('1U8F')
+        prop.download_structure_file(outdir=outdir, file_type='mmCif', load_header_metadata=True)
+        assert prop.structure_path == mirror.get_path('1u8f', 'mmcif')
+        assert prop.experimental_method
+
+        sifts_file = pdb.download_sifts_xml('1abc', outdir=outdir)
+        assert sifts_file == op.join(mirror_dir, 'sifts', 'ab', '1abc.xml.gz')
+        assert pdb.map_uniprot_resnum_to_pdb(3, 'A', sifts_file) == (6, True)
+
+        # Files not in the mirror are not downloaded
+        assert pdb.download_structure_files(['1kf6', '4xxx'], outdirs=outdir, file_type='pdb') == \
+               [mirror.get_path('1kf6', 'pdb'), None]
+        with pytest.raises(URLError):
+            pdb.PDBProp('4XXX').download_structure_file(outdir=outdir, file_type='pdb', load_header_metadata=False)
+        assert not op.exists(op.join(outdir, '1kf6.pdb'))
+    finally:
+        pdb.set_pdb_mirror()
+        shutil.rmtree(mirror_dir)
+        shutil.rmtree(outdir)
@@ -0,0 +1,73 @@
+import os.path as op
+import shutil
+import tempfile
+
+import pytest
+from Bio.PDB.mmtf import MMTFIO
+
+import ssbio.databases.pdb as pdb
+import ssbio.databases.pdb_header as pdb_header
+from ssbio.protein.structure.structprop import StructProp
+from ssbio.protein.structure.utils.structureio import StructureIO
+
+
+@pytest.fixture(scope='module')
+def mmcif_file(test_files_structures):
+    return op.join(test_files_structures, '1u8f.cif')
+
+
+@pytest.fixture(scope='module')
+def mmtf_file(test_files_structures):
+    tmpdir = tempfile.mkdtemp()
+    outfile = op.join(tmpdir, '1kf6.mmtf')
+    io = MMTFIO()
+    io.set_structure(StructureIO(op.join(test_files_structures, '1kf6.pdb'), use_cache=False).structure)
+    io.save(outfile)
+    yield outfile
+    shutil.rmtree(tmpdir)
+
+
+def test_read_mmcif_categories(mmcif_file):
+    mmdict = pdb_header.read_mmcif_categories(mmcif_file, ['_entity', '_exptl'])
+    assert mmdict['_entity.id'] == ['1', '2', '3']
+    assert mmdict['_exptl.method'] == ['X-RAY DIFFRACTION']
+    assert not any(x.startswith('_atom_site') or x.startswith('_entity_poly') for x in mmdict)
+
+
+def test_read_mmcif_header(mmcif_file):
+    header = pdb_header.read_mmcif_header(mmcif_file)
+    assert header['experimental_method'] == ['X-RAY DIFFRACTION']
+    assert header['resolution'] == [1.75]
+    assert 'NAD' in header['chemicals']
+    assert [(x['id'], x['type'], x['chains']) for x in header['entities']] == [('1', 'polymer', ['O', 'P', 'Q', 'R']),
+                                                                              ('2', 'non-polymer', []),
+                                                                              ('3', 'water', [])]
+    assert list(header['chain_entities'].items()) == [('O', '1'), ('P', '1'), ('Q', '1'), ('R', '1')]
+    assert header['chain_sequences']['O'].startswith('MGKVKVGVNGFGRIGRLVTRAAFNSGKVDIVAINDPF')
+    assert '\n' not in header['chain_sequences']['O']
+
+    metadata = pdb.parse_mmcif_header(mmcif_file)
+    assert 'entities' not in metadata
+    assert metadata == {k: v for k, v in header.items() if k not in ['entities', 'chain_entities', 'chain_sequences']}
+
+
+def test_read_mmtf_header(mmtf_file):
+    header = pdb_header.read_structure_header(mmtf_file)
+    assert header['resolution'] == 2.7
+    assert header['release_date'] == '2002-03-13'
+    assert list(header['chain_entities']) == ['A', 'B', 'C', 'D', 'M', 'N', 'O', 'P']
+    assert header['chain_sequences']['A'].startswith('MQTFQADLAIVGAGGAGLRA')
+    assert header['entities'][1]['type'] == 'non-polymer'
+
+    with pytest.raises(ValueError):
+        pdb_header.read_structure_header(mmtf_file, file_type='pdb')
+
+
+def test_structprop_parse_header(mmcif_file):
+    prop = StructProp('1u8f', structure_path=mmcif_file, file_type='mmCif')
+    prop.parse_header()
+    assert [x.id for x in prop.chains] == ['O', 'P', 'Q', 'R']
+    assert prop.mapped_chains == ['O', 'P', 'Q', 'R']
+    assert prop.chains.get_by_id('P').entity_id == '1'
+    assert prop.chains.get_by_id('P').seqres.startswith('MGKVKVGVNGFGRIGRLVTR')
+    assert prop.chains.get_by_id('P').seq_record is None
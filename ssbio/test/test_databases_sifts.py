@@ -0,0 +1,53 @@
+import os.path as op
+import shutil
+
+import pytest
+
+import ssbio.databases.pdb as pdb
+import ssbio.databases.sifts as sifts
+
+
+@pytest.fixture(scope='module')
+def sifts_file(test_files_structures, test_files_tempdir):
+    outfile = op.join(test_files_tempdir, '1abc.sifts.xml')
+    shutil.copy(op.join(test_files_structures, '1abc.sifts.xml'), outfile)
+    return outfile
+
+
+def test_load_sifts_mapping(sifts_file):
+    mapping = sifts.load_sifts_mapping(sifts_file, force_rerun=True)
+    assert list(mapping.chains) == ['A', 'B']
+    assert op.isfile(op.join(op.dirname(sifts_file), '1abc.sifts.npz'))
+
+    loaded = sifts.load_sifts_mapping(sifts_file)
+    for chain_id, chain in mapping.chains.items():
+        for field, array in chain.items():
+            assert (loaded.chains[chain_id][field] == array).all()
+
+
+def test_map_uniprot_to_pdb(sifts_file):
+    mapped = sifts.get_sifts_mapping(sifts_file).map_uniprot_to_pdb('A', [1, 2, 3, 4, 5, 6, 100])
+    assert mapped.pdb_resnum.isnull().tolist() == [True, False, False, False, True, False, True]
+    assert mapped.pdb_resnum.dropna().tolist() == [5, 6, 6, 8]
+    assert mapped.pdb_icode.tolist() == [' ', ' ', ' ', 'A', ' ', ' ', ' ']
+    assert mapped.is_observed.tolist() == [False, False, True, True, False, True, False]
+
+
+def test_map_pdb_to_uniprot(sifts_file):
+    mapping = sifts.get_sifts_mapping(sifts_file)
+    mapped = mapping.map_pdb_to_uniprot('A', [5, 6, 6, 7, 99], ['', ' ', 'A', ' ', ' '])
+    assert mapped.uniprot_resnum.isnull().tolist() == [False, False, False, True, True]
+    assert mapped.uniprot_resnum.dropna().tolist() == [2, 3, 4]
+    assert mapped.is_observed.tolist() == [False, True, True, False, False]
+
+    assert mapping.map_pdb_to_uniprot('B', -2).uniprot_resnum.tolist() == [10]
+    with pytest.raises(ValueError):
+        mapping.map_pdb_to_uniprot('C', 1)
+
+
+def test_map_uniprot_resnum_to_pdb(sifts_file):
+    assert pdb.map_uniprot_resnum_to_pdb(2, 'A', sifts_file) == (5, False)
+    assert pdb.map_uniprot_resnum_to_pdb(3, 'A', sifts_file) == (6, True)
+    assert pdb.map_uniprot_resnum_to_pdb(11, 'B', sifts_file) == (-1, True)
+    assert pdb.map_uniprot_resnum_to_pdb(1, 'A', sifts_file) == (None, False)
+    assert pdb.map_uniprot_resnum_to_pdb(1, 'C', sifts_file) == (None, False)
@@ -0,0 +1,173 @@
+import gzip
+import os.path as op
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from six.moves.BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from six.moves.socketserver import ThreadingMixIn
+from six.moves.urllib_error import URLError
+
+from ssbio.io.download import DownloadError, DownloadManager
+
+
+class _StandInServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    """Serves the files in ``server.files``, supporting byte ranges. Paths in ``server.failures`` return a 503 error
+    that many times, and paths in ``server.truncate`` drop the connection halfway through the file once."""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.path, self.headers.get('Range')))
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        try:
+            time.sleep(server.delay)
+            self._respond()
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def _respond(self):
+        server = self.server
+        if server.failures.get(self.path, 0) > 0:
+            server.failures[self.path] -= 1
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        if self.path not in server.files:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        content = server.files[self.path]
+        start = 0
+        if self.headers.get('Range'):
+            start = int(self.headers.get('Range').split('=')[1].rstrip('-'))
+            self.send_response(206)
+        else:
+            self.send_response(200)
+        self.send_header('Content-Length', str(len(content) - start))
+        self.end_headers()
+
+        if self.path in server.truncate:
+            server.truncate.remove(self.path)
+            self.wfile.write(content[start:start + len(content) // 2])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(content[start:])
+
+
+class TestDownloadManager(unittest.TestCase):
+    """Unit tests for DownloadManager, against a local stand-in HTTP server"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = _StandInServer(('127.0.0.1', 0), _StandInHandler)
+        cls.server.lock = threading.Lock()
+        cls.thread = threading.Thread(target=cls.server.serve_forever)
+        cls.thread.daemon = True
+        cls.thread.start()
+        cls.url = 'http://127.0.0.1:{}'.format(cls.server.server_address[1])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.files = {'/a.txt': b'A' * 5000, '/b.txt': b'B' * 3000, '/c.txt.gz': gzip.compress(b'C' * 4000)}
+        self.server.failures = {}
+        self.server.truncate = set()
+        self.server.requests = []
+        self.server.delay = 0
+        self.server.active = 0
+        self.server.max_active = 0
+        self.outdir = tempfile.mkdtemp()
+        self.manager = DownloadManager(max_retries=3, backoff_factor=0, chunk_size=1024)
+
+    def tearDown(self):
+        self.manager.close()
+        shutil.rmtree(self.outdir)
+
+    def read(self, outfile):
+        with open(outfile, 'rb') as f:
+            return f.read()
+
+    def test_fetch(self):
+        outfile = self.manager.fetch(self.url + '/a.txt', op.join(self.outdir, 'a.txt'))
+        self.assertEqual(self.read(outfile), b'A' * 5000)
+        self.assertFalse(op.exists(outfile + '.part'))
+
+        # Existing files are not downloaded again unless forced
+        self.manager.fetch(self.url + '/a.txt', outfile)
+        self.assertEqual(len(self.server.requests), 1)
+        self.manager.fetch(self.url + '/a.txt', outfile, force_rerun=True)
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_fetch_decompress(self):
+        outfile = self.manager.fetch(self.url + '/c.txt.gz', op.join(self.outdir, 'c.txt'), decompress=True)
+        self.assertEqual(self.read(outfile), b'C' * 4000)
+
+    def test_fetch_retries(self):
+        self.server.failures['/a.txt'] = 2
+        outfile = self.manager.fetch(self.url + '/a.txt', op.join(self.outdir, 'a.txt'))
+        self.assertEqual(self.read(outfile), b'A' * 5000)
+        self.assertEqual(len(self.server.requests), 3)
+
+        self.server.failures['/b.txt'] = 10
+        with self.assertRaises(DownloadError):
+            self.manager.fetch(self.url + '/b.txt', op.join(self.outdir, 'b.txt'))
+        self.assertEqual(len(self.server.requests), 3 + 4)
+
+    def test_fetch_resumes(self):
+        self.server.truncate.add('/a.txt')
+        outfile = self.manager.fetch(self.url + '/a.txt', op.join(self.outdir, 'a.txt'))
+        self.assertEqual(self.read(outfile), b'A' * 5000)
+        # The second request only asks for the part of the file which was not written yet
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertIsNone(self.server.requests[0][1])
+        self.assertTrue(self.server.requests[1][1].startswith('bytes='))
+        self.assertGreater(int(self.server.requests[1][1].split('=')[1].rstrip('-')), 0)
+
+    def test_fetch_missing(self):
+        with self.assertRaises(URLError):
+            self.manager.fetch(self.url + '/missing.txt', op.join(self.outdir, 'missing.txt'))
+        self.assertEqual(self.manager.request(self.url + '/missing.txt').status_code, 404)
+
+    def test_fetch_many(self):
+        downloads = [(self.url + '/a.txt', op.join(self.outdir, 'a.txt')),
+                     (self.url + '/missing.txt', op.join(self.outdir, 'missing.txt')),
+                     {'url': self.url + '/c.txt.gz', 'outfile': op.join(self.outdir, 'c.txt'), 'decompress': True},
+                     (self.url + '/a.txt', op.join(self.outdir, 'a.txt'))]
+        files = self.manager.fetch_many(downloads)
+        self.assertEqual(files, [op.join(self.outdir, 'a.txt'), None, op.join(self.outdir, 'c.txt'),
+                                 op.join(self.outdir, 'a.txt')])
+        self.assertEqual(self.read(files[2]), b'C' * 4000)
+        self.assertEqual(len(self.server.requests), 3)
+
+        with self.assertRaises(DownloadError):
+            self.manager.fetch_many(downloads, raise_errors=True)
+
+    def test_per_host_limit(self):
+        self.server.delay = 0.1
+        manager = DownloadManager(max_workers=8, max_per_host=2, backoff_factor=0)
+        self.server.files.update({'/{}.txt'.format(i): b'X' * 100 for i in range(8)})
+        files = manager.fetch_many([(self.url + '/{}.txt'.format(i), op.join(self.outdir, '{}.txt'.format(i)))
+                                    for i in range(8)])
+        manager.close()
+        self.assertTrue(all(files))
+        self.assertEqual(self.server.max_active, 2)
@@ -0,0 +1,97 @@
+import shutil
+import tempfile
+import time
+
+import pytest
+
+from ssbio.pipeline.executor import Executor, Serial, ThreadPool, ProcessPool, TaskResult, run_chunk
+from ssbio.pipeline.gempro import GEMPRO
+
+
+def square(x):
+    if x < 0:
+        raise ValueError('{}: negative number'.format(x))
+    return x * x
+
+
+def protein_length(protein):
+    if protein.id == 'b3041':
+        raise ValueError('{}: failed'.format(protein.id))
+    return protein, len(protein.representative_sequence)
+
+
+def sleep(x):
+    time.sleep(x)
+    return x
+
+
+@pytest.fixture(params=[Serial(progress=False), ThreadPool(2, progress=False),
+                        ProcessPool(2, chunksize=3, progress=False)], ids=['serial', 'threads', 'processes'])
+def executor(request):
+    return request.param
+
+
+def test_incomplete_executor():
+    class Incomplete(Executor):
+        pass
+
+    # Executors which do not run their chunks fail when created, not when a stage is run
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_map(executor):
+    results = executor.map(square, [3, -1, 0, 5, -2, 4, 1])
+    assert [x.index for x in results] == list(range(7))
+    assert [x.result for x in results if x.ok] == [9, 0, 25, 16, 1]
+    assert [x.error.error_type for x in results if not x.ok] == ['ValueError', 'ValueError']
+    assert str(results[1].error) == 'ValueError: -1: negative number'
+    assert 'Traceback' in results[1].error.traceback
+
+
+def test_timeout():
+    for executor in [Serial(timeout=0.5, progress=False), ProcessPool(2, timeout=0.5, progress=False)]:
+        results = executor.map(sleep, [0, 5, 0.1])
+        assert [x.ok for x in results] == [True, False, True]
+        assert results[1].error.error_type == 'TaskTimeout'
+
+
+def test_run_chunk():
+    results = run_chunk(square, [(4, 2), (7, -3)])
+    assert all(isinstance(x, TaskResult) for x in results)
+    assert [(x.index, x.result, x.ok) for x in results] == [(4, 4, True), (7, None, False)]
+
+
+@pytest.fixture(scope='class')
+def gempro():
+    tmpdir = tempfile.mkdtemp()
+    yield GEMPRO(gem_name='test_executor', root_dir=tmpdir,
+                 genes_and_sequences={'b0870': 'MIDLRSDTVTRPSRAMLEAMMAAPVGDDVYGDDPTVNALQDYAAELSGKEAAIFLPTGTQANLVALLSHCERGEEYIVGQAAHNYLFEAGGAAVLGSIQPQPIDAAADGTLPLDKVAMKIKPDDIHFARTKLLSLENTHNGKVLPREYLKEAWEFTRERNLALHVDGARIFNAVVAYGCELKEITQYCDSFTICLSKGLGTPVGSLLVGNRDYIKRAIRWRKMTGGGMRQSGILAAAGIYALKNNVARLQEDHDNAAWMAEQLREAGADVMRQDTNMLFVRVGEENAAALGEYMKARNVLINASPIVRLVTHLDVSREQLAEVAAHWRAFLAR',
+                                      'b3041': 'MNQTLLSSFGTPFERVENALAALREGRGVMVLDDEDRENEGDMIFPAETATPEAINFMATHGRGLICTPLSIRFVQAKEAARLMANVVIDMMGLNVLSELEESSMAKLSHALHHAGLLKRRNDHDALPVIAGGFEIRVVA'})
+    shutil.rmtree(tmpdir)
+
+
+class TestGemproExecutor():
+    """Tests for running GEM-PRO stages with executors"""
+
+    def test_process_pool(self, gempro):
+        proteins_before = {g.id: g.protein for g in gempro.genes}
+        gempro.get_sequence_sliding_window_properties(scale='kd_hydrophobicity', window=7,
+                                                      executor=ProcessPool(2, progress=False))
+        for g in gempro.genes:
+            # Proteins modified in other processes are merged back into the genes
+            assert g.protein is not proteins_before[g.id]
+            assert 'kd_hydrophobicity-window7-biop' in g.protein.representative_sequence.letter_annotations
+        assert gempro.gene_errors['get_sequence_sliding_window_properties'] == {}
+
+    def test_gene_errors(self, gempro):
+        proteins_before = {g.id: g.protein for g in gempro.genes}
+        for executor in [Serial(progress=False), ThreadPool(2, progress=False), ProcessPool(2, progress=False)]:
+            # A gene whose stage fails does not stop the other genes
+            values = gempro._run_gene_stage(protein_length, stage='protein_length', executor=executor)
+            assert list(values) == ['b0870']
+            assert values['b0870'] == 333
+            assert list(gempro.gene_errors['protein_length']) == ['b3041']
+            assert gempro.gene_errors['protein_length']['b3041'].error_type == 'ValueError'
+        # Proteins are only replaced by the ones modified in other processes
+        assert gempro.genes.get_by_id('b3041').protein is proteins_before['b3041']
@@ -7,7 +7,7 @@ from Bio.Seq import Seq
 from Bio.Alphabet import IUPAC
 from Bio.SeqRecord import SeqRecord
 from Bio.SeqFeature import SeqFeature, FeatureLocation
-from ssbio.protein.sequence.seqprop import SeqProp
+from ssbio.protein.sequence.seqprop import SeqProp, _SEQUENCE_FILES
 
 @pytest.fixture(scope='class')
 def seq_str_example():
@@ -218,6 +218,37 @@ class TestSeqPropWithId():
         with pytest.raises(ValueError):
             seqprop_with_i.seq = 'THISWILLNOTBETHESEQ'
 
+    def test_sequence_file_memoized(self, tmpdir):
+        """Test that the sequence file is only parsed again when it changes"""
+        outpath = tmpdir.join('test_sequence_file_memoized.faa').strpath
+        SeqIO.write(SeqRecord(Seq('MKQHKAM'), id='first'), outpath, 'fasta')
+
+        sp = SeqProp(id='first', seq=None, sequence_path=outpath)
+        other_sp = SeqProp(id='other', seq=None, sequence_path=outpath)
+        hits, misses = _SEQUENCE_FILES.hits, _SEQUENCE_FILES.misses
+
+        # Reading the sequence again reuses the parsed file, which is shared between objects
+        assert sp.seq is sp.seq
+        assert sp.seq is other_sp.seq
+        assert sp.seq_str == 'MKQHKAM'
+        assert _SEQUENCE_FILES.misses == misses
+        assert _SEQUENCE_FILES.hits > hits
+
+        # Modifying an object does not modify the shared parsed SeqRecord it was loaded from
+        parsed = _SEQUENCE_FILES.get(outpath)
+        other_sp.dbxrefs.append('UniProtKB:P00001')
+        other_sp.features.append(SeqFeature(FeatureLocation(0, 3), type='test'))
+        other_sp.annotations['hello'] = 'world'
+        assert parsed.dbxrefs == []
+        assert parsed.features == []
+        assert parsed.annotations == {}
+        assert sp.dbxrefs == [] and sp.features == [] and sp.annotations == {}
+
+        # Rewriting the file parses it again and updates the sequence
+        SeqIO.write(SeqRecord(Seq('MKQHKAMIVA'), id='first'), outpath, 'fasta')
+        assert sp.seq_str == 'MKQHKAMIVA'
+        assert _SEQUENCE_FILES.misses == misses + 1
+
     def test_set_features(self, seqprop_with_i, features_loaded_from_file_example):
         """Test setting the features attribute in memory"""
         seqprop_with_i.features = features_loaded_from_file_example[:5]
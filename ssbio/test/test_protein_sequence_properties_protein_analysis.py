@@ -0,0 +1,83 @@
+import random
+import unittest
+
+import pytest
+
+from ssbio.protein.sequence.properties.protein_analysis import batch_protein_analysis, get_biopython_pepstats_many
+from ssbio.protein.sequence.properties.protein_analysis import batch_protein_scale, get_sliding_window_properties_many
+from ssbio.protein.sequence.properties.residues import biopython_protein_analysis, biopython_protein_scale
+from ssbio.protein.sequence.seqprop import SeqProp
+
+
+class TestBatchProteinAnalysis(unittest.TestCase):
+    """Unit tests for batch protein analysis
+    """
+
+    def setUp(self):
+        rng = random.Random(0)
+        self.seqs = {'seq{}'.format(i): ''.join(rng.choice('ACDEFGHIKLMNPQRSTVWY') for _ in range(rng.randint(1, 300)))
+                     for i in range(50)}
+        self.seqs.update({'lowercase': 'mktayiakqrqisfvkshfsrq', 'short': 'MK', 'terminal_pks': 'AKRHDECYE'})
+
+    def test_batch_protein_analysis(self):
+        df = batch_protein_analysis(dict(self.seqs, unknown='MKXA', empty=''))
+        # Sequences ProteinAnalysis fails on are left out
+        self.assertEqual(df.index.tolist(), list(self.seqs))
+
+        for seq_id, seq in self.seqs.items():
+            expected = biopython_protein_analysis(seq)
+            self.assertEqual(sorted(df.columns), sorted(expected))
+            for key, value in expected.items():
+                result = df.at[seq_id, key]
+                if isinstance(value, (dict, list)):
+                    self.assertEqual(len(result), len(value))
+                    if isinstance(value, dict):
+                        self.assertEqual(result, value)
+                    else:
+                        self.assertEqual(result, pytest.approx(value))
+                else:
+                    self.assertEqual(result, pytest.approx(value), msg='{} {}'.format(seq_id, key))
+
+    def test_get_biopython_pepstats_many(self):
+        seqprops = [SeqProp(id=seq_id, seq=seq) for seq_id, seq in self.seqs.items()]
+        seqprops.append(SeqProp(id='unknown', seq='MKUA'))
+        get_biopython_pepstats_many(seqprops)
+
+        seqprop = SeqProp(id='seq0', seq=self.seqs['seq0'])
+        seqprop.get_biopython_pepstats()
+        for key, value in seqprop.annotations.items():
+            self.assertEqual(seqprops[0].annotations[key], pytest.approx(value))
+        self.assertNotIn('length-biop', seqprops[-1].annotations)
+
+        # Removing X and U characters first
+        get_biopython_pepstats_many(seqprops[-1:], clean_seq=True)
+        self.assertEqual(seqprops[-1].annotations['length-biop'], 3)
+
+    def test_batch_protein_scale(self):
+        seqs = list(self.seqs.values()) + ['MKXAUZ*BTA', 'MKtaYIAK', 'M', '']
+        custom_scale_dict = {'A': 1.5, 'K': -2., 'T': 0.3}
+        profiles = batch_protein_scale(seqs, scales=['kd_hydrophobicity', 'bulkiness', 'custom'], windows=[2, 3, 7],
+                                       custom_scale_dict=custom_scale_dict)
+        self.assertEqual(len(profiles), 9)
+
+        for (scale, window), scale_profiles in profiles.items():
+            for seq, profile in zip(seqs, scale_profiles):
+                expected = biopython_protein_scale(seq, scale=scale, window=window, custom_scale_dict=custom_scale_dict)
+                self.assertEqual(profile.tolist(), pytest.approx(expected), msg='{} {} {}'.format(scale, window, seq))
+
+        with self.assertRaises(ValueError):
+            batch_protein_scale(seqs, scales='custom', windows=7)
+
+    def test_get_sliding_window_properties_many(self):
+        seqprops = [SeqProp(id=seq_id, seq=seq) for seq_id, seq in self.seqs.items()]
+        get_sliding_window_properties_many(seqprops, scales=['kd_hydrophobicity', 'bulkiness'], windows=[7, 21])
+
+        seqprop = SeqProp(id='seq0', seq=self.seqs['seq0'])
+        seqprop.get_sliding_window_properties(scale='bulkiness', window=21)
+        self.assertEqual(seqprops[0].letter_annotations['bulkiness-window21-biop'],
+                         seqprop.letter_annotations['bulkiness-window21-biop'])
+        self.assertEqual(len(seqprops[0].letter_annotations), 4)
+
+        # Profiles of even windows are one value short and are not stored
+        get_sliding_window_properties_many(seqprops, scales='kd_hydrophobicity', windows=4)
+        self.assertNotIn('kd_hydrophobicity-window4-biop', seqprops[0].letter_annotations)
@@ -1,4 +1,6 @@
 import os.path as op
+import shutil
+import tempfile
 import unittest
 
 from Bio.Align import MultipleSeqAlignment
@@ -35,6 +37,139 @@ class TestAlignment(unittest.TestCase):
         self.assertEqual(alignment2[1].seq, 'MSPRVGVTLSGRYRLQRLIATGGMGQVWEAVDNRLGRRVARRVAASSSAS')
         self.assertEqual(alignment2.annotations, {'score': 213.5, 'percent_gaps': 6.0, 'percent_similarity': 92.0, 'percent_identity': 90.0})
 
+    def test_pairwise_sequence_alignment_numpy(self):
+        base_id = 'a_test'
+        base = 'MSPRVGVTLSGRYRLQRLIATGGMGQVWEAVDNRLGRRVAVVASASA'
+        muts_id = 'b_test'
+        muts = 'MSPRVGVTLSGRYRLQRLIATGGMGQVWEAVDNRLGRRVARRVAASSSAS'
+
+        alignment = ssbio.protein.sequence.utils.alignment.pairwise_sequence_alignment(a_seq_id=base_id, a_seq=base,
+                                                                                       b_seq_id=muts_id, b_seq=muts,
+                                                                                       engine='numpy')
+        self.assertTrue(isinstance(alignment, MultipleSeqAlignment))
+        self.assertEqual(alignment[0].id, base_id)
+        self.assertEqual(alignment[0].seq, 'MSPRVGVTLSGRYRLQRLIATGGMGQVWEAVDNRLGRRVA--VVASASA-')
+        self.assertEqual(alignment[1].id, muts_id)
+        self.assertEqual(alignment[1].seq, 'MSPRVGVTLSGRYRLQRLIATGGMGQVWEAVDNRLGRRVARRVAASSSAS')
+        self.assertEqual(alignment.annotations, {'score': 213.5, 'identity': 45, 'percent_identity': 90.0,
+                                                 'similarity': 46, 'percent_similarity': 92.0,
+                                                 'gaps': 3, 'percent_gaps': 6.0})
+
+    def test_pairwise_sequence_alignment_many(self):
+        base = 'MSPRVGVTLSGRYRLQRLIATGGMGQVWEAVDNRLGRRVAVVASASA'
+        muts = 'MSPRVGVTLSGRYRLQRLIATGGMGQVWEAVDNRLGRRVARRVAASSSAS'
+        other = 'MSPRVGVTLSGRYRLQRLIATGG'
+
+        alignments = ssbio.protein.sequence.utils.alignment.pairwise_sequence_alignment_many(a_seq=base,
+                                                                                             a_seq_id='a_test',
+                                                                                             b_seqs={'s-A': muts,
+                                                                                                     's-B': other,
+                                                                                                     's-C': muts},
+                                                                                             engine='numpy')
+        self.assertEqual(list(alignments.keys()), ['s-A', 's-B', 's-C'])
+        for b_seq_id, alignment in alignments.items():
+            self.assertEqual(alignment[0].id, 'a_test')
+            self.assertEqual(alignment[1].id, b_seq_id)
+        self.assertEqual(alignments['s-A'][1].seq, alignments['s-C'][1].seq)
+        self.assertEqual(alignments['s-A'].annotations, alignments['s-C'].annotations)
+        self.assertEqual(alignments['s-B'][1].seq, 'MSPRVGVTLSGRYRLQRLIATGG------------------------')
+
+    def test_pairwise_sequence_alignment_many_failed(self):
+        base = 'MSPRVGVTLSGRYRLQRLIATGGMGQVWEAVDNRLGRRVAVVASASA'
+        with self.assertLogs('ssbio.protein.sequence.utils.alignment', level='ERROR') as logs:
+            alignments = ssbio.protein.sequence.utils.alignment.pairwise_sequence_alignment_many(a_seq=base,
+                                                                                                 a_seq_id='a_test',
+                                                                                                 b_seqs={'s-A': base,
+                                                                                                         's-B': base},
+                                                                                                 engine='invalid')
+        self.assertEqual(alignments, {})
+        # Each ID sharing the failed sequence is logged
+        self.assertEqual(len(logs.records), 2)
+        self.assertIn('s-B: alignment to a_test failed to run', logs.output[1])
+
+    def test_run_numpy_alignment_matches_needle_file(self):
+        """Test if the in-process alignment reproduces a stored needle alignment
+
+        """
+        needle_file = op.join('test_files', 'sequences', 'P9WGE7_1gn3_A_align.txt')
+        needle_aln = ssbio.protein.sequence.utils.alignment.needle_statistics_alignio(needle_file)
+        a_aln = str(needle_aln[0].seq)
+        b_aln = str(needle_aln[1].seq)
+
+        test_a, test_b, score = ssbio.protein.sequence.utils.alignment.run_numpy_alignment(a_aln.replace('-', ''),
+                                                                                           b_aln.replace('-', ''))
+        self.assertEqual(test_a, a_aln)
+        self.assertEqual(test_b, b_aln)
+        self.assertEqual(score, needle_aln.annotations['score'])
+
+        stats = ssbio.protein.sequence.utils.alignment.get_needle_style_statistics(test_a, test_b)
+        for k, v in stats.items():
+            self.assertEqual(v, needle_aln.annotations[k])
+
+    def test_needle_statistics_alignio_handle(self):
+        """Test if needle output can be parsed from a file handle, as done when reading needle's stdout
+
+        """
+        needle_file = op.join('test_files', 'sequences', 'P9WGE7_1gn3_A_align.txt')
+        from_file = ssbio.protein.sequence.utils.alignment.needle_statistics_alignio(needle_file)
+        with open(needle_file) as f:
+            from_handle = ssbio.protein.sequence.utils.alignment.needle_statistics_alignio(f)
+
+        self.assertEqual(from_handle[0].seq, from_file[0].seq)
+        self.assertEqual(from_handle[1].seq, from_file[1].seq)
+        self.assertEqual(from_handle.annotations, from_file.annotations)
+
+    def test_alignment_columns(self):
+        a_aln = '--MKTAYIAK-QRQISFVKSHFSRQ'
+        b_aln = 'MSMRTAY--KLQRQXSFVKSHFS--'
+
+        cols = ssbio.protein.sequence.utils.alignment.AlignmentColumns(a_aln, b_aln)
+        aln_df = ssbio.protein.sequence.utils.alignment.get_alignment_df(a_aln, b_aln)
+
+        self.assertEqual(aln_df['type'].tolist()[:6], ['insertion', 'insertion', 'match', 'mutation', 'match', 'match'])
+        self.assertEqual(cols.mutations, [('K', 2, 'R')])
+        self.assertEqual(cols.unresolved, [12])
+        self.assertEqual(cols.deletions, [((6.0, 7.0), 2), ((21.0, 22.0), 2)])
+        self.assertEqual(cols.insertions, [((-1, 1.0), 2), ((8.0, 9.0), 1)])
+        self.assertEqual(cols.map_a_to_b([1, 6, 9, 23]), {1: 3, 9: 10})
+
+        self.assertEqual(cols.mutations, ssbio.protein.sequence.utils.alignment.get_mutations(aln_df))
+        self.assertEqual(cols.unresolved, ssbio.protein.sequence.utils.alignment.get_unresolved(aln_df))
+        self.assertEqual(cols.deletions, ssbio.protein.sequence.utils.alignment.get_deletions(aln_df))
+        self.assertEqual(cols.insertions, ssbio.protein.sequence.utils.alignment.get_insertions(aln_df))
+
+    def test_alignment_cache(self):
+        base = 'MSPRVGVTLSGRYRLQRLIATGGMGQVWEAVDNRLGRRVAVVASASA'
+        muts = 'MSPRVGVTLSGRYRLQRLIATGGMGQVWEAVDNRLGRRVARRVAASSSAS'
+
+        tempdir = tempfile.mkdtemp()
+        db_path = op.join(tempdir, 'alignments.db')
+        try:
+            cache = ssbio.protein.sequence.utils.alignment.set_alignment_cache(db_path=db_path)
+            alignment = ssbio.protein.sequence.utils.alignment.pairwise_sequence_alignment(a_seq_id='a1', a_seq=base,
+                                                                                           b_seq_id='b1', b_seq=muts,
+                                                                                           engine='numpy')
+            self.assertEqual((cache.hits, cache.misses), (0, 1))
+
+            # Same sequences with different IDs are loaded from the cache
+            cached = ssbio.protein.sequence.utils.alignment.pairwise_sequence_alignment(a_seq_id='a2', a_seq=base,
+                                                                                        b_seq_id='b2', b_seq=muts,
+                                                                                        engine='numpy')
+            self.assertEqual((cache.hits, cache.misses), (1, 1))
+            self.assertEqual(cached[0].id, 'a2')
+            self.assertEqual(cached[1].id, 'b2')
+            self.assertEqual(cached[1].seq, alignment[1].seq)
+            self.assertEqual(cached.annotations, alignment.annotations)
+
+            # A new cache using the same file finds the alignment on disk
+            cache = ssbio.protein.sequence.utils.alignment.set_alignment_cache(db_path=db_path)
+            ssbio.protein.sequence.utils.alignment.pairwise_sequence_alignment(a_seq=base, b_seq=muts, engine='numpy')
+            self.assertEqual((cache.hits, cache.misses), (1, 0))
+            self.assertEqual(len(cache), 1)
+        finally:
+            ssbio.protein.sequence.utils.alignment.set_alignment_cache()
+            shutil.rmtree(tempdir)
+
     def test_run_needle_alignment_on_files(self):
         """Test if needle alignment runs correctly on 2 input files
 
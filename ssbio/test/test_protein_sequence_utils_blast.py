@@ -0,0 +1,193 @@
+import os.path as op
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+import pytest
+
+import ssbio.protein.sequence.utils.blast
+
+
+class TestBlast(unittest.TestCase):
+    """Unit tests for BLAST utilities"""
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+
+        r_vs_g = [['r1', 'g1', 90.0, 100, 0, 0, 1, 100, 1, 100, 1e-50, 200.0],
+                  ['r1', 'g2', 95.0, 100, 0, 0, 1, 100, 1, 100, 1e-40, 150.0],
+                  ['r2', 'g1', 99.0, 100, 0, 0, 1, 100, 1, 100, 1e-60, 210.0],
+                  ['r3', 'g3', 50.0, 100, 0, 0, 1, 100, 1, 100, 1e-10, 50.0],
+                  ['r1', 'g3', 95.0, 100, 0, 0, 1, 100, 1, 100, 1e-45, 160.0]]
+        g_vs_r = [['g1', 'r2', 99.0, 100, 0, 0, 1, 100, 1, 100, 1e-60, 210.0],
+                  ['g2', 'r1', 95.0, 100, 0, 0, 1, 100, 1, 100, 1e-40, 150.0],
+                  ['g1', 'r1', 90.0, 100, 0, 0, 1, 100, 1, 100, 1e-50, 200.0]]
+
+        self.blast_results_1 = op.join(self.tempdir, 'R_vs_G_blast.out')
+        self.blast_results_2 = op.join(self.tempdir, 'G_vs_R_blast.out')
+        pd.DataFrame(r_vs_g).to_csv(self.blast_results_1, sep='\t', header=False, index=False)
+        pd.DataFrame(g_vs_r).to_csv(self.blast_results_2, sep='\t', header=False, index=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def _bbh(self, **kwargs):
+        outfile = ssbio.protein.sequence.utils.blast.calculate_bbh(self.blast_results_1, self.blast_results_2,
+                                                                   outdir=self.tempdir, **kwargs)
+        bbh = pd.read_csv(outfile, index_col=0)
+        shutil.move(outfile, outfile + '.old')
+        return bbh
+
+    def test_calculate_bbh(self):
+        bbh = self._bbh()
+        # r3's best hit has no hits in the other direction, ties in PID go to the first hit
+        self.assertEqual(bbh.gene.tolist(), ['r1', 'r2'])
+        self.assertEqual(bbh.subject.tolist(), ['g2', 'g1'])
+        self.assertEqual(bbh.BBH.tolist(), ['<=>', '<=>'])
+        self.assertEqual(bbh.index.tolist(), [1, 2])
+
+        # Reading in chunks gives the same results
+        self.assertTrue(bbh.equals(self._bbh(chunksize=2)))
+
+    def test_calculate_bbh_force_rerun(self):
+        outfile = op.join(self.tempdir, 'R_vs_G_bbh.csv')
+        pd.DataFrame({'gene': ['stale']}).to_csv(outfile)
+        ssbio.protein.sequence.utils.blast.calculate_bbh(self.blast_results_1, self.blast_results_2,
+                                                         outdir=self.tempdir)
+        self.assertEqual(pd.read_csv(outfile, index_col=0).gene.tolist(), ['stale'])
+
+        ssbio.protein.sequence.utils.blast.calculate_bbh(self.blast_results_1, self.blast_results_2,
+                                                         outdir=self.tempdir, force_rerun=True)
+        self.assertEqual(pd.read_csv(outfile, index_col=0).gene.tolist(), ['r1', 'r2'])
+
+    def test_calculate_bbh_sort_by(self):
+        bbh = self._bbh(sort_by='bitScore')
+        self.assertEqual(bbh.subject.tolist(), ['g1', 'g1'])
+        self.assertEqual(bbh.BBH.tolist(), ['->', '<=>'])
+
+        # r1's best hit is now g3, which has no hits in the other direction
+        bbh = self._bbh(sort_by=['PID', 'eVal'])
+        self.assertEqual(bbh.gene.tolist(), ['r2'])
+
+    def _bbh_files(self):
+        bbh_files = {}
+        for strain, rows in [('s1', [['r1', 'g1', 90.0, 1e-50, 200.0, '<=>'], ['r2', 'g2', 40.0, 1e-5, 30.0, '<=>']]),
+                             ('s2', [['r2', 'h2', 95.0, 1e-60, 210.0, '<=>'], ['r3', 'h3', 99.0, 1e-60, 210.0, '->']]),
+                             ('s3', [['r1', 'k1', 85.0, 1e-40, 180.0, '<=>']])]:
+            bbh_files[strain] = op.join(self.tempdir, '{}_bbh.csv'.format(strain))
+            pd.DataFrame(rows, columns=['gene', 'subject', 'PID', 'eVal', 'bitScore', 'BBH']).to_csv(bbh_files[strain])
+        return bbh_files
+
+    def test_create_orthology_matrix(self):
+        bbh_files = self._bbh_files()
+        outfile = ssbio.protein.sequence.utils.blast.create_orthology_matrix('ref', bbh_files, pid_cutoff=50,
+                                                                             outdir=self.tempdir)
+        df = ssbio.protein.sequence.utils.blast.load_orthology_matrix(outfile)
+        self.assertEqual(df.columns.tolist(), ['s1', 's2', 's3'])
+        self.assertEqual(df.index.tolist(), ['r1', 'r2'])
+        self.assertEqual(df.at['r1', 's1'], 'g1')
+        self.assertEqual(df.at['r1', 's3'], 'k1')
+        self.assertEqual(df.at['r2', 's2'], 'h2')
+        self.assertTrue(pd.isnull(df.at['r1', 's2']))
+        self.assertTrue(pd.isnull(df.at['r2', 's1']))
+
+        # Hits passing any cutoff are kept with the OR filter condition
+        outfile = ssbio.protein.sequence.utils.blast.create_orthology_matrix('ref', bbh_files, pid_cutoff=50,
+                                                                             evalue_cutoff=1e-3, filter_condition='OR',
+                                                                             outname='ref_or.csv', outdir=self.tempdir)
+        df = ssbio.protein.sequence.utils.blast.load_orthology_matrix(outfile)
+        self.assertEqual(df.at['r2', 's1'], 'g2')
+
+        orthologs = ssbio.protein.sequence.utils.blast.lookup_orthologs(df, ['r1', 'r2', 'r1', 'r9'],
+                                                                        ['s3', 's2', 's2', 's1'])
+        self.assertEqual(orthologs.tolist(), ['k1', 'h2', None, None])
+
+    def test_read_bbh_orthologs_cutoffs(self):
+        bbh_files = self._bbh_files()
+        read = ssbio.protein.sequence.utils.blast.read_bbh_orthologs
+
+        # A single cutoff is applied with the OR filter condition, not passed by the cutoffs which are not set
+        df = read(bbh_files, pid_cutoff=50, filter_condition='OR')
+        self.assertEqual(df.subject.tolist(), ['g1', 'h2', 'k1'])
+        self.assertTrue(df.equals(read(bbh_files, pid_cutoff=50, filter_condition='AND')))
+
+        # All reciprocal hits are kept if no cutoffs are set
+        self.assertEqual(read(bbh_files).subject.tolist(), ['g1', 'g2', 'h2', 'k1'])
+
+    def test_orthology_matrix_file_types(self):
+        pytest.importorskip('pyarrow')
+        bbh_files = self._bbh_files()
+        df_csv = ssbio.protein.sequence.utils.blast.load_orthology_matrix(
+                ssbio.protein.sequence.utils.blast.create_orthology_matrix('ref', bbh_files, outdir=self.tempdir))
+        for ext in ['feather', 'parquet']:
+            outfile = ssbio.protein.sequence.utils.blast.create_orthology_matrix('ref', bbh_files,
+                                                                                 outname='ref.{}'.format(ext),
+                                                                                 outdir=self.tempdir)
+            df = ssbio.protein.sequence.utils.blast.load_orthology_matrix(outfile)
+            self.assertTrue(df.fillna('').equals(df_csv.fillna('')))
+
+    def test_get_alignment_hit(self):
+        hit = ssbio.protein.sequence.utils.blast.get_alignment_hit('r1', 'g1', 'MKTAYIAKQRQISFVKSHFSRQ',
+                                                                   'GGMKTAYIAKQRQISFVKSHWSRQ', db_length=1000)
+        self.assertEqual((hit['gene'], hit['subject'], hit['alnLength'], hit['mismatchCount'], hit['gapOpenCount']),
+                         ('r1', 'g1', 22, 1, 0))
+        self.assertEqual((hit['queryStart'], hit['queryEnd'], hit['subjectStart'], hit['subjectEnd']), (1, 22, 3, 24))
+        self.assertAlmostEqual(hit['PID'], 95.455)
+        self.assertTrue(hit['bitScore'] > 40)
+        self.assertTrue(hit['eVal'] < 1e-5)
+
+    def test_calculate_bbh_with_prefilter(self):
+        ref = {'r1': 'MKTAYIAKQRQISFVKSHFSRQLEERLGLIEVQAPILSRVGDGTQDNLSGAEKAVQVKVKALPDAQFEVVHSLAKWKRQTLGQHDFSAGEGLYTHMKALRPDEDRLSPLHSVYVDQWDWERVMGDGERQFSTLKSTVEAIWAGIKATEAAVSEEFGLAPFLPDQIHFVHSQELLSRYPDLDAKGRERAIAKDLGAVFLVGIGGKLSDGHRHDVRAPDYDDWSTPSELGHAGLNGDILVWNPVLEDAFELSSMGIRVDADTLKHQLALTGDEDRLELEWHQALLRGEMPQTIGGGIGQSRLTMLLLQLPHIGQVQAGVWPAACRESVPALL',
+               'r2': 'MSTNPKPQRKTKRNTNRRPQDVKFPGGGQIVGGVYLLPRRGPRLGVRATRKTSERSQPRGRRQPIPKARRPEGRTWAQPGYPWPLYGNEGLGWAGWLLSPRGSRPSWGPTDPRRRSRNLGKVIDTLTCGFADLMGYIPLVGAPLGGAARALAHGVRVLEDGVNYATGNLPGCSFSIFLLALLSCLTIPASA',
+               'r3': 'MIDLRSDTVTRPSRAMLEAMMAAPVGDDVYGDDPTVNALQDYAAELSGKEAAIFLPTGTQANLVALLSHCERGEEYIVGQAAHNYLFEAGGAAVLGSIQPQPIDAAADGTLPLDKVAMKIKPDDIHFARTKLLSLENTHNGKVLPREYLKEAWEFTRERNLALHVDGARIFNAVVAYGCELKEITQYCDSFTICLSKGLGTPVGSLLVGNRDYIKRAIRWRKMTGGGMRQSGILAAAGIYALKNNVARLQEDHDNAAWMAEQLREAGADVMRQDTNMLFVRVGEENAAALGEYMKARNVLINASPIVRLVTHLDVSREQLAEVAAHWRAFLAR'}
+        other = {'g1': ref['r1'][:100] + 'W' + ref['r1'][101:],
+                 'g3': ref['r3'],
+                 # Too different from r2 to be paired without BLAST
+                 'g2': ''.join('A' if i % 3 == 0 else x for i, x in enumerate(ref['r2'])),
+                 'g4': 'MNQTLLSSFGTPFERVENALAALREGRGVMVLDDEDRENEGDMIFPAETATPEAINFMATHGRGLICTPLSIRFVQAKEAA'}
+
+        files = {}
+        for name, seqs in [('ref', ref), ('strain', other)]:
+            files[name] = op.join(self.tempdir, '{}.faa'.format(name))
+            with open(files[name], 'w') as f:
+                for seq_id, seq in seqs.items():
+                    f.write('>{}\n{}\n'.format(seq_id, seq))
+
+        outfile = ssbio.protein.sequence.utils.blast.calculate_bbh_with_prefilter(files['ref'], files['strain'],
+                                                                                  outdir=self.tempdir,
+                                                                                  blast_unresolved=False)
+        self.assertEqual(op.basename(outfile), 'ref_vs_strain_bbh.csv')
+        bbh = pd.read_csv(outfile, index_col=0)
+        self.assertEqual(bbh.columns.tolist(), ['gene', 'subject', 'PID', 'alnLength', 'mismatchCount', 'gapOpenCount',
+                                                'queryStart', 'queryEnd', 'subjectStart', 'subjectEnd', 'eVal',
+                                                'bitScore', 'BBH'])
+        self.assertEqual(bbh.gene.tolist(), ['r1', 'r3'])
+        self.assertEqual(bbh.subject.tolist(), ['g1', 'g3'])
+        self.assertEqual(bbh.PID.tolist(), [round(100 * 329 / 330., 3), 100.0])
+        self.assertEqual(bbh.BBH.tolist(), ['<=>', '<=>'])
+
+        # The BBH file can be used to create the orthology matrix
+        df = ssbio.protein.sequence.utils.blast.load_orthology_matrix(
+                ssbio.protein.sequence.utils.blast.create_orthology_matrix('ref', {'strain': outfile}, pid_cutoff=90,
+                                                                           outdir=self.tempdir))
+        self.assertEqual(df.strain.to_dict(), {'r1': 'g1', 'r3': 'g3'})
+
+        # Unresolved proteins are BLASTed, with query files named by both genomes. BLAST results of the same
+        # unresolved proteins are reused, and stale BBHs of the unresolved proteins are replaced.
+        for name, other_name, seqs in [('ref', 'strain', {'r2': ref['r2']}),
+                                       ('strain', 'ref', {'g2': other['g2'], 'g4': other['g4']})]:
+            with open(op.join(self.tempdir, '{}_vs_{}_unresolved.faa'.format(name, other_name)), 'w') as f:
+                f.write(''.join('>{}\n{}\n'.format(seq_id, seq) for seq_id, seq in seqs.items()))
+            hit = [list(seqs)[0], 'r2' if name == 'strain' else 'g2', 95.0, 100, 0, 0, 1, 100, 1, 100, 1e-50, 200.0]
+            pd.DataFrame([hit]).to_csv(op.join(self.tempdir, '{}_vs_{}_unresolved_blast.out'.format(name, other_name)),
+                                       sep='\t', header=False, index=False)
+        pd.DataFrame({'gene': ['r3'], 'subject': ['g4'], 'BBH': ['<=>']}).to_csv(
+                op.join(self.tempdir, 'ref_vs_strain_unresolved_bbh.csv'))
+
+        outfile = ssbio.protein.sequence.utils.blast.calculate_bbh_with_prefilter(files['ref'], files['strain'],
+                                                                                  outdir=self.tempdir,
+                                                                                  force_rerun=True)
+        bbh = pd.read_csv(outfile, index_col=0)
+        self.assertEqual(bbh.gene.tolist(), ['r1', 'r3', 'r2'])
+        self.assertEqual(bbh.subject.tolist(), ['g1', 'g3', 'g2'])
@@ -0,0 +1,38 @@
+import unittest
+
+import numpy as np
+
+from ssbio.protein.sequence.utils.kmer_index import KmerIndex, get_kmer_codes
+
+
+class TestKmerIndex(unittest.TestCase):
+    """Unit tests for KmerIndex
+    """
+
+    def setUp(self):
+        self.seqs = {'r1': 'MKTAYIAKQRQISFVKSHFSRQLEERLGLIEVQ',
+                     'r2': 'MSTNPKPQRKTKRNTNRRPQDVKFPGGGQIVGG',
+                     'r3': 'MKTAYIAKQRQISFVKSHFSRQ'}
+        self.index = KmerIndex(self.seqs, k=4)
+
+    def test_get_kmer_codes(self):
+        self.assertEqual(len(get_kmer_codes('MKTAYIAKQR', k=4)), 7)
+        # Lowercase and unknown letters are encoded consistently
+        self.assertEqual(get_kmer_codes('mktay', k=5).tolist(), get_kmer_codes('MKTAY', k=5).tolist())
+        self.assertEqual(get_kmer_codes('MKTA*', k=5).tolist(), get_kmer_codes('MKTA-', k=5).tolist())
+        self.assertRaises(ValueError, get_kmer_codes, 'MKTAY', k=14)
+
+    def test_count_shared_kmers(self):
+        queries = ['MKTAYIAKQRQISFVKSHFSRQLEERLGLIEVQ', 'GGGGGGGG', 'MSTNPKPQRKTKRNTNRRPQDV']
+        query_idx, index_idx, shared = self.index.count_shared_kmers(queries)
+
+        # Same as counting the shared k-mers of each pair
+        expected = []
+        for q, query in enumerate(queries):
+            for i, seq_id in enumerate(self.index.ids):
+                num_shared = len(np.intersect1d(get_kmer_codes(query, k=4), get_kmer_codes(self.seqs[seq_id], k=4)))
+                if num_shared:
+                    expected.append((q, i, num_shared))
+        self.assertEqual(list(zip(query_idx.tolist(), index_idx.tolist(), shared.tolist())), expected)
+        self.assertEqual(self.index.num_kmers.tolist(), [30, 30, 19])
+        self.assertNotIn(1, query_idx.tolist())
@@ -0,0 +1,91 @@
+import multiprocessing
+import os
+import os.path as op
+import pickle
+import shutil
+import tempfile
+import unittest
+
+from Bio import SeqIO
+
+from ssbio.protein.sequence.utils.sequence_store import SequenceStore
+
+
+def _get_sequence(args):
+    store, genome_id, seq_id = args
+    return store.get_sequence(genome_id, seq_id)
+
+
+class TestSequenceStore(unittest.TestCase):
+    """Unit tests for SequenceStore
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.fasta_files = {}
+        for strain, seqs in [('strain1', {'g1': 'MKTAYIAKQR', 'g2': 'MSTNPKPQRK'}),
+                             ('strain2', {'g1': 'MKTAYLAKQR', 'g3': 'MIDLRSDTVT'})]:
+            self.fasta_files[strain] = op.join(self.tmpdir, '{}.faa'.format(strain))
+            with open(self.fasta_files[strain], 'w') as f:
+                for seq_id, seq in seqs.items():
+                    f.write('>{} {} protein\n{}\n'.format(seq_id, strain, seq))
+        self.store = SequenceStore(op.join(self.tmpdir, 'sequences.db'))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_add_and_get(self):
+        self.assertEqual(self.store.add_genome('strain1', self.fasta_files['strain1']), 2)
+        self.assertEqual(self.store.add_genome('strain2', self.fasta_files['strain2']), 2)
+        self.assertEqual(self.store.genome_ids, ['strain1', 'strain2'])
+
+        self.assertEqual(self.store.get_sequence('strain2', 'g1'), 'MKTAYLAKQR')
+        self.assertRaises(KeyError, self.store.get_sequence, 'strain2', 'g2')
+        self.assertEqual(self.store.get_sequences([('strain1', 'g1'), ('strain2', 'g3'), ('strain2', 'g2')]),
+                         {('strain1', 'g1'): 'MKTAYIAKQR', ('strain2', 'g3'): 'MIDLRSDTVT'})
+
+        # Records are the same as from SeqIO.index
+        indexed = SeqIO.index(self.fasta_files['strain1'], 'fasta')
+        genome = self.store.get_genome('strain1')
+        self.assertEqual(sorted(genome), sorted(indexed))
+        self.assertIn('g2', genome)
+        self.assertNotIn('g3', genome)
+        for seq_id in indexed:
+            self.assertEqual(str(genome[seq_id].seq), str(indexed[seq_id].seq))
+            self.assertEqual(genome[seq_id].id, indexed[seq_id].id)
+            self.assertEqual(genome[seq_id].description, indexed[seq_id].description)
+        self.assertRaises(ValueError, self.store.get_genome, 'strain3')
+
+    def test_persistent(self):
+        self.store.add_genome('strain1', self.fasta_files['strain1'])
+        self.assertTrue(self.store.is_current('strain1', self.fasta_files['strain1']))
+
+        # Reopening the database does not need the FASTA file to be read again
+        reopened = SequenceStore(self.store.db_path)
+        self.assertIn('strain1', reopened)
+        self.assertEqual(reopened.get_sequence('strain1', 'g2'), 'MSTNPKPQRK')
+
+        # A changed FASTA file is read again
+        with open(self.fasta_files['strain1'], 'w') as f:
+            f.write('>g4\nMKKK\n')
+        os.utime(self.fasta_files['strain1'], (0, 0))
+        self.assertFalse(reopened.is_current('strain1', self.fasta_files['strain1']))
+        self.assertEqual(reopened.add_genome('strain1', self.fasta_files['strain1']), 1)
+        self.assertEqual(reopened.get_genome('strain1').keys(), ['g4'])
+
+        reopened.remove_genome('strain1')
+        self.assertNotIn('strain1', reopened)
+
+    def test_processes(self):
+        self.store.add_genome('strain1', self.fasta_files['strain1'])
+        self.store.add_genome('strain2', self.fasta_files['strain2'])
+        unpickled = pickle.loads(pickle.dumps(self.store))
+        self.assertEqual(unpickled.get_sequence('strain1', 'g1'), 'MKTAYIAKQR')
+
+        pool = multiprocessing.Pool(2)
+        try:
+            seqs = pool.map(_get_sequence, [(self.store, 'strain1', 'g2'), (self.store, 'strain2', 'g3')])
+        finally:
+            pool.close()
+            pool.join()
+        self.assertEqual(seqs, ['MSTNPKPQRK', 'MIDLRSDTVT'])
@@ -0,0 +1,81 @@
+import os.path as op
+import unittest
+
+from Bio.PDB import NeighborSearch
+from Bio.PDB import Selection
+
+import ssbio.protein.structure.properties.residues as residues
+from ssbio.protein.structure.structprop import StructProp
+from ssbio.protein.structure.utils.structureio import StructureIO, read_structure_arrays
+
+
+class TestSpatialIndex(unittest.TestCase):
+    """Unit tests for SpatialIndex and within
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.structure_path = op.join('test_files', 'structures', '1kf6.pdb')
+        cls.model = StructureIO(cls.structure_path).first_model
+
+    def test_search_residues_matches_neighborsearch(self):
+        index = residues.SpatialIndex(self.model)
+        ns = NeighborSearch(Selection.unfold_entities(self.model, 'A'))
+
+        centers = [self.model['A'][resnum].child_list[-1].get_coord() for resnum in (5, 100, 250, 400)]
+        batched = index.residues_within(centers, 8)
+        self.assertEqual(len(batched), len(centers))
+
+        for center, found in zip(centers, batched):
+            expected = Selection.unfold_entities(ns.search(center, 8), 'R')
+            self.assertEqual(set(r.get_full_id() for r in found), set(r.get_full_id() for r in expected))
+            self.assertEqual(found, index.residues_within(center, 8))
+
+    def test_within(self):
+        index = residues.SpatialIndex(self.model)
+        found = residues.within(resnum=100, angstroms=5, chain_id='A', model=self.model, spatial_index=index)
+        self.assertIn(self.model['A'][100], found)
+        self.assertEqual(found, residues.within(resnum=100, angstroms=5, chain_id='A', model=self.model))
+
+    def test_structprop_spatial_index(self):
+        sp = StructProp(ident='1kf6', structure_path=self.structure_path, file_type='pdb')
+        index = sp.get_spatial_index()
+        self.assertIs(sp.get_spatial_index(), index)
+        self.assertNotIn('_spatial_index', sp.get_dict())
+
+        polypep, resnums = sp.get_polypeptide_within(chain_id='A', resnum=100, angstroms=5, return_resnums=True)
+        self.assertIn(100, resnums)
+        self.assertIs(sp.get_spatial_index(), index)
+
+        # Storing a new structure invalidates the index
+        sp.structure = StructureIO(self.structure_path, use_cache=False)
+        new_index = sp.get_spatial_index()
+        self.assertIsNot(new_index, index)
+        self.assertIs(new_index.model, sp.structure.first_model)
+
+
+class TestStructureArraysFastPaths(unittest.TestCase):
+    """Unit tests for the StructureArrays fast paths of residue functions
+    """
+
+    def test_fast_paths_match_biopython(self):
+        for structure_file in ['1cbn.pdb', '1kf6.pdb']:
+            structure_path = op.join('test_files', 'structures', structure_file)
+            model = StructureIO(structure_path).first_model
+            arrays = read_structure_arrays(structure_path)
+
+            seqs = residues.get_structure_seqrecords(model)
+            fast_seqs = residues.get_structure_seqrecords(arrays)
+            self.assertEqual([(x.id, str(x.seq), x.letter_annotations['structure_resnums']) for x in seqs],
+                             [(x.id, str(x.seq), x.letter_annotations['structure_resnums']) for x in fast_seqs])
+
+            self.assertEqual(dict(residues.search_ss_bonds(model)), dict(residues.search_ss_bonds(arrays)))
+
+            found = residues.within(resnum=20, angstroms=6, chain_id='A', model=model)
+            fast_found = residues.within(resnum=20, angstroms=6, chain_id='A', model=arrays)
+            self.assertEqual([(x.get_parent().id, x.id) for x in found], fast_found)
+
+        self.assertEqual(dict(residues.search_ss_bonds(arrays)), {})
+        bonds = residues.search_ss_bonds(read_structure_arrays(op.join('test_files', 'structures', '1cbn.pdb')))
+        self.assertEqual(bonds['A'], [((' ', 3, ' '), (' ', 40, ' ')), ((' ', 4, ' '), (' ', 32, ' ')),
+                                      ((' ', 16, ' '), (' ', 26, ' '))])
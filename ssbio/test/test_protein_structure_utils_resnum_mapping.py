@@ -0,0 +1,43 @@
+import numpy as np
+
+from ssbio.protein.structure.properties.residues import _structure_chain_seq
+from ssbio.protein.structure.utils.resnum_mapping import ResnumMapping, format_resnums
+
+
+def test_resnum_mapping():
+    # Structure with a missing residue 3 and an insertion code residue 4A
+    chain_seq, structure_resnums, structure_icodes = _structure_chain_seq(resnames=['LYS', 'THR', 'ALA', 'GLY', 'SER'],
+                                                                          resnums=[1, 2, 4, 4, 5],
+                                                                          icodes=[' ', ' ', ' ', 'A', ' '])
+    assert chain_seq == 'KTXAGS'
+    assert structure_icodes == [' ', ' ', ' ', ' ', 'A', ' ']
+
+    # Sequence has an extra residue at the start, aligned as -KTXAGS / MKTLA-S
+    mapping = ResnumMapping(chain_index=[float('nan'), 1, 2, 3, 4, 6], structure_resnums=structure_resnums,
+                            seq='MKTLAS', chain_seq=chain_seq, structure_icodes=structure_icodes)
+
+    np.testing.assert_array_equal(mapping.map_seq_to_chain_index([0, 1, 2, 4, 6, 7]), [-1, -1, 0, 2, 5, -1])
+
+    resnums, icodes, is_mapped = mapping.map_seq_to_structure(np.arange(1, 7))
+    np.testing.assert_array_equal(is_mapped, [False, True, True, False, True, True])
+    np.testing.assert_array_equal(resnums[is_mapped], [1, 2, 4, 5])
+    assert icodes.tolist() == [' '] * 6
+
+    # 4 maps to the residue without an insertion code, 4A is not aligned to the sequence
+    seq_resnums, is_mapped = mapping.map_structure_to_seq([0, 1, 4, 5, 100])
+    np.testing.assert_array_equal(seq_resnums, [0, 2, 5, 6, 0])
+    np.testing.assert_array_equal(is_mapped, [False, True, True, True, False])
+    np.testing.assert_array_equal(mapping.map_structure_to_chain_index(4), [3])
+
+    # L4 is aligned to a missing residue
+    np.testing.assert_array_equal(mapping.mismatches([1, 2, 4, 5]), [False, False, True, False])
+    assert repr(mapping) == '<ResnumMapping: 6 sequence residues, 6 chain residues, 5 aligned>'
+
+
+def test_resnum_mapping_empty():
+    mapping = ResnumMapping(chain_index=[float('nan')] * 3, structure_resnums=[])
+    np.testing.assert_array_equal(mapping.map_seq_to_chain_index([1, 2, 3]), [-1, -1, -1])
+    assert not mapping.map_seq_to_structure([1, 2])[2].any()
+    assert not mapping.map_structure_to_seq([1, 2])[1].any()
+    assert not mapping.mismatches([1]).any()
+    assert format_resnums(range(1, 13), max_listed=2) == '1, 2 and 10 more'
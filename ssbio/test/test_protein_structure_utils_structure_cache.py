@@ -0,0 +1,113 @@
+import os
+import os.path as op
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+import ssbio.protein.structure.utils.structureio as structureio
+from ssbio.protein.structure.utils.structure_cache import StructureCache
+from ssbio.protein.structure.utils.structureio import StructureIO, read_structure_arrays
+
+
+class TestStructureCache(unittest.TestCase):
+    """Unit tests for StructureCache
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.structure_path = op.join(self.tmpdir, '1cbn.pdb')
+        shutil.copy(op.join('test_files', 'structures', '1cbn.pdb'), self.structure_path)
+        self.cache = structureio.set_structure_cache()
+
+    def tearDown(self):
+        structureio.set_structure_cache()
+        shutil.rmtree(self.tmpdir)
+
+    def test_structureio_cache(self):
+        first = StructureIO(self.structure_path)
+        second = StructureIO(self.structure_path, file_type='pdb')
+        self.assertIs(first.structure, second.structure)
+        self.assertEqual(self.cache.stats()['misses'], 1)
+        self.assertEqual(self.cache.stats()['hits'], 1)
+        self.assertEqual(self.cache.stats()['atoms'], len(list(first.structure.get_atoms())))
+
+        not_cached = StructureIO(self.structure_path, use_cache=False)
+        self.assertIsNot(not_cached.structure, first.structure)
+
+        # Modifying the file invalidates the stored structure
+        mtime = op.getmtime(self.structure_path)
+        os.utime(self.structure_path, (mtime + 10, mtime + 10))
+        third = StructureIO(self.structure_path)
+        self.assertIsNot(third.structure, first.structure)
+        self.assertEqual(self.cache.stats()['misses'], 2)
+        self.assertEqual(len(self.cache), 1)
+
+    def test_eviction(self):
+        structure = StructureIO(self.structure_path, use_cache=False).structure
+        n_atoms = len(list(structure.get_atoms()))
+        other_path = op.join(self.tmpdir, '1cbn_copy.pdb')
+        shutil.copy(self.structure_path, other_path)
+
+        cache = StructureCache(max_atoms=n_atoms)
+        cache.set(self.structure_path, '.pdb', structure)
+        cache.set(other_path, '.pdb', structure)
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.evictions, 1)
+        self.assertIsNone(cache.get(self.structure_path, '.pdb'))
+        self.assertIs(cache.get(other_path, '.pdb'), structure)
+
+
+class TestStructureArraysStore(unittest.TestCase):
+    """Unit tests for StructureArraysStore
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.structure_path = op.join(self.tmpdir, '1cbn.pdb')
+        shutil.copy(op.join('test_files', 'structures', '1cbn.pdb'), self.structure_path)
+        self.store = structureio.set_structure_store(op.join(self.tmpdir, 'store'))
+        structureio.set_structure_cache()
+
+    def tearDown(self):
+        structureio.set_structure_store()
+        structureio.set_structure_cache()
+        shutil.rmtree(self.tmpdir)
+
+    def test_read_structure_arrays_store(self):
+        self.assertIs(structureio.get_structure_store(), self.store)
+        stored_path = self.store.get_path(self.structure_path, '.pdb')
+        self.assertFalse(op.exists(stored_path))
+
+        parsed = read_structure_arrays(self.structure_path)
+        self.assertTrue(op.exists(stored_path))
+        loaded = read_structure_arrays(self.structure_path)
+        self.assertIsInstance(loaded.coord.base, np.memmap)
+        np.testing.assert_array_equal(loaded.coord, parsed.coord)
+        np.testing.assert_array_equal(loaded.name, parsed.name)
+
+        # Modifying the file invalidates the stored structure
+        mtime = op.getmtime(self.structure_path)
+        os.utime(self.structure_path, (mtime + 10, mtime + 10))
+        self.assertIsNone(self.store.get(self.structure_path, '.pdb'))
+        self.assertNotIsInstance(read_structure_arrays(self.structure_path).coord.base, np.memmap)
+        self.assertIsNotNone(self.store.get(self.structure_path, '.pdb'))
+
+    def test_structureio_store(self):
+        # Written when first parsed
+        first = StructureIO(self.structure_path)
+        self.assertIsNotNone(self.store.get(self.structure_path, '.pdb'))
+
+        # Memory-mapped when the structure is loaded again in another process
+        structureio.set_structure_cache()
+        second = StructureIO(self.structure_path)
+        self.assertIsInstance(second.arrays.coord.base, np.memmap)
+        np.testing.assert_array_equal(second.arrays.coord, first.arrays.coord)
+
+        # Not used for structures which may be modified
+        not_cached = StructureIO(self.structure_path, use_cache=False)
+        self.assertNotIsInstance(not_cached.arrays.coord.base, np.memmap)
+
+        structureio.set_structure_store()
+        self.assertIsNone(structureio.get_structure_store())
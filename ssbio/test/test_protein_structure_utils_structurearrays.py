@@ -0,0 +1,66 @@
+import os.path as op
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from ssbio.protein.structure.utils.structurearrays import StructureArrays
+from ssbio.protein.structure.utils.structureio import StructureIO, read_structure_arrays
+
+
+class TestStructureArrays(unittest.TestCase):
+    """Unit tests for StructureArrays
+    """
+
+    def assert_arrays_equal(self, arrays, other):
+        self.assertEqual(arrays.chain_ids, other.chain_ids)
+        for x in ['residue_chain_index', 'residue_names', 'residue_hetfields', 'residue_seqnums', 'residue_icodes',
+                  'residue_index', 'name', 'element', 'altloc']:
+            np.testing.assert_array_equal(getattr(arrays, x), getattr(other, x), err_msg=x)
+        for x in ['coord', 'occupancy', 'bfactor']:
+            np.testing.assert_allclose(getattr(arrays, x), getattr(other, x), err_msg=x)
+
+    def test_read_matches_biopython(self):
+        # 1cbn has alternate locations and point mutations, 1kf6 has HETATMs and waters
+        for structure_file in ['1cbn.pdb', '1kf6.pdb', '1u8f.cif']:
+            structure_path = op.join('test_files', 'structures', structure_file)
+            arrays = read_structure_arrays(structure_path)
+            from_biopython = StructureIO(structure_path, use_cache=False).arrays
+            self.assertEqual(arrays.n_atoms, len(list(StructureIO(structure_path).first_model.get_atoms())))
+            self.assert_arrays_equal(arrays, from_biopython)
+
+    def test_to_structure(self):
+        arrays = read_structure_arrays(op.join('test_files', 'structures', '1cbn.pdb'))
+        self.assertEqual(repr(arrays), '<StructureArrays: 1 chains, 47 residues, 644 atoms>')
+
+        structure = arrays.to_structure()
+        self.assert_arrays_equal(StructureArrays.from_model(structure[0]), arrays)
+
+        residue_index = arrays.get_residue_index('A', 22)
+        self.assertEqual(arrays.residue_id(residue_index), (' ', 22, ' '))
+        self.assertEqual(arrays.residue_names[residue_index], 'PRO')
+        self.assertEqual(arrays.name[arrays.get_atom_index(residue_index, 'CA')], 'CA')
+        with self.assertRaises(KeyError):
+            arrays.get_residue_index('A', 1000)
+
+    def test_save_load(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            arrays = read_structure_arrays(op.join('test_files', 'structures', '1kf6.pdb'))
+            outfile = arrays.save(op.join(tmpdir, '1kf6.arrays'), metadata={'source': '1kf6.pdb'})
+            self.assertEqual(StructureArrays.read_header(outfile)['metadata'], {'source': '1kf6.pdb'})
+
+            for mmap in [True, False]:
+                loaded = StructureArrays.load(outfile, mmap=mmap)
+                self.assert_arrays_equal(loaded, arrays)
+                self.assertEqual(loaded.metadata, {'source': '1kf6.pdb'})
+                self.assertEqual(loaded.get_residue_index('A', 22), arrays.get_residue_index('A', 22))
+            self.assertIsInstance(StructureArrays.load(outfile).coord.base, np.memmap)
+
+            with open(outfile, 'r+b') as f:
+                f.write(b'NOTARRAY')
+            with self.assertRaises(ValueError):
+                StructureArrays.load(outfile)
+        finally:
+            shutil.rmtree(tmpdir)
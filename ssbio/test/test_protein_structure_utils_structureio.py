@@ -0,0 +1,73 @@
+import bz2
+import gzip
+import lzma
+import os
+import os.path as op
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from Bio.PDB.mmtf import MMTFIO
+
+import ssbio.databases.pdb as pdb
+import ssbio.utils
+from ssbio.protein.structure.utils.structureio import StructureIO, read_structure_arrays
+
+
+class TestCompressedStructureFiles(unittest.TestCase):
+    """Unit tests for reading compressed structure files without decompressing them to disk
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        structures_dir = op.join('test_files', 'structures')
+        self.files = {'1cbn.pdb': op.join(structures_dir, '1cbn.pdb'),
+                      '1u8f.cif': op.join(structures_dir, '1u8f.cif'),
+                      '1kf6.mmtf': op.join(self.tmpdir, '1kf6.mmtf')}
+        io = MMTFIO()
+        io.set_structure(StructureIO(op.join(structures_dir, '1kf6.pdb'), use_cache=False).structure)
+        io.save(self.files['1kf6.mmtf'])
+
+        self.compressed = {}
+        for name, infile in self.files.items():
+            for extension, opener in [('.gz', gzip.open), ('.bz2', bz2.open), ('.xz', lzma.open)]:
+                outfile = op.join(self.tmpdir, name + extension)
+                with open(infile, 'rb') as f_in, opener(outfile, 'wb') as f_out:
+                    shutil.copyfileobj(f_in, f_out)
+                self.compressed[outfile] = infile
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_open_compressed(self):
+        self.assertEqual(ssbio.utils.strip_compressed_extension('1kf6.cif.gz'), '1kf6.cif')
+        self.assertEqual(ssbio.utils.strip_compressed_extension('1kf6.cif'), '1kf6.cif')
+        self.assertTrue(ssbio.utils.is_compressed('1kf6.pdb.XZ'))
+        for compressed, infile in self.compressed.items():
+            with ssbio.utils.open_compressed(compressed, 'rb') as f, open(infile, 'rb') as f_orig:
+                self.assertEqual(f.read(), f_orig.read())
+
+    def test_read_compressed(self):
+        files_before = sorted(os.listdir(self.tmpdir))
+        for compressed, infile in self.compressed.items():
+            structure = StructureIO(compressed, use_cache=False)
+            original = StructureIO(infile, use_cache=False)
+            np.testing.assert_allclose(structure.arrays.coord, original.arrays.coord, err_msg=compressed)
+
+            arrays = read_structure_arrays(compressed)
+            np.testing.assert_allclose(arrays.coord, original.arrays.coord, err_msg=compressed)
+
+        # The legacy '.gz' file type is read in the same way
+        gzipped = op.join(self.tmpdir, '1cbn.pdb.gz')
+        self.assertEqual(len(StructureIO(gzipped, file_type='.gz', use_cache=False).structure), 1)
+
+        # Nothing is written next to the compressed files
+        self.assertEqual(sorted(os.listdir(self.tmpdir)), files_before)
+
+    def test_parse_headers_compressed(self):
+        for extension in ['.gz', '.bz2', '.xz']:
+            self.assertEqual(pdb.parse_mmcif_header(op.join(self.tmpdir, '1u8f.cif' + extension)),
+                             pdb.parse_mmcif_header(self.files['1u8f.cif']))
+            self.assertEqual(pdb.parse_mmtf_header(op.join(self.tmpdir, '1kf6.mmtf' + extension)),
+                             pdb.parse_mmtf_header(self.files['1kf6.mmtf']))
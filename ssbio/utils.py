@@ -16,13 +16,25 @@ import json
 import re
 import warnings
 import gzip
+import bz2
 from collections import OrderedDict
 from collections import Callable
 import operator
 
+from ssbio.io.download import get_download_manager
+
+try:
+    import lzma
+except ImportError:
+    lzma = None
+
 log = logging.getLogger(__name__)
 
 
+COMPRESSED_EXTENSIONS = OrderedDict([('.gz', gzip.open), ('.bz2', bz2.open), ('.xz', lzma.open if lzma else None)])
+"""OrderedDict: Extensions of compressed files read by ``open_compressed``, and the functions used to open them"""
+
+
 def is_ipynb():
     """Return True if the module is running in IPython kernel,
     False if in IPython shell or other Python shell.
@@ -403,6 +415,55 @@ def gunzip_file(infile, outfile=None, outdir=None, delete_original=False, force_
     return outfile
 
 
+def open_compressed(infile, mode='rt'):
+    """Open a file for reading, decompressing it while it is read if it is compressed (has an extension in
+    ``COMPRESSED_EXTENSIONS``). Nothing is written to disk.
+
+    Args:
+        infile (str): Path to file
+        mode (str): ``rt`` to read text, ``rb`` to read bytes
+
+    Returns:
+        file: Open file handle
+
+    """
+    for extension, opener in COMPRESSED_EXTENSIONS.items():
+        if infile.lower().endswith(extension):
+            if opener is None:
+                raise ValueError('{}: reading {} files is not supported by this Python installation'.format(infile, extension))
+            return opener(infile, mode)
+    return open(infile, mode)
+
+
+def strip_compressed_extension(infile):
+    """Remove the compression extension (i.e. ``.gz``) of a file name, if it has one.
+
+    Args:
+        infile (str): Path to file
+
+    Returns:
+        str: Path without the compression extension
+
+    """
+    for extension in COMPRESSED_EXTENSIONS:
+        if infile.lower().endswith(extension):
+            return infile[:-len(extension)]
+    return infile
+
+
+def is_compressed(infile):
+    """Check if a file name has a compression extension (i.e. ``.gz``).
+
+    Args:
+        infile (str): Path to file
+
+    Returns:
+        bool: If the file is compressed
+
+    """
+    return strip_compressed_extension(infile) != infile
+
+
 def request_file(link, outfile, force_rerun_flag=False):
     """Download a file given a URL if the outfile does not exist already.
 
@@ -417,13 +478,11 @@ def request_file(link, outfile, force_rerun_flag=False):
 
     """
     if force_rerun(flag=force_rerun_flag, outfile=outfile):
-        req = requests.get(link)
-        if req.status_code == 200:
-            with open(outfile, 'w') as f:
-                f.write(req.text)
+        try:
+            get_download_manager().fetch(link, outfile, force_rerun=force_rerun_flag)
             log.debug('Loaded and saved {} to {}'.format(link, outfile))
-        else:
-            log.error('{}: request error {}'.format(link, req.status_code))
+        except requests.HTTPError as e:
+            log.error('{}: request error {}'.format(link, e.response.status_code))
     return outfile
 
 
@@ -445,7 +504,7 @@ def request_json(link, outfile, force_rerun_flag, outdir=None):
     outfile = op.join(outdir, outfile)
 
     if force_rerun(flag=force_rerun_flag, outfile=outfile):
-        text_raw = requests.get(link)
+        text_raw = get_download_manager().request(link)
         my_dict = text_raw.json()
         with open(outfile, 'w') as f:
             json.dump(my_dict, f)